@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +49,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'gestor.historial.usuario_actual_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,12 +77,62 @@ WSGI_APPLICATION = 'RivconRRHH.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# La base de datos se elige con variables de entorno:
+#   DB_ENGINE=sqlite (por defecto) | postgres
+#   DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+#   DB_CONN_MAX_AGE      segundos que se reutiliza una conexión SQLite
+#   DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT  pool de psycopg
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'rivcon_rrhh'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Con pool de psycopg las conexiones las administra el pool;
+            # Django exige CONN_MAX_AGE = 0 en ese caso.
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            },
+        }
     }
-}
+elif DB_ENGINE in ('sqlite', 'sqlite3'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'OPTIONS': {
+                # BEGIN IMMEDIATE toma el lock de escritura al iniciar la
+                # transacción: evita los "database is locked" que aparecen al
+                # promover un lock de lectura a escritura a mitad de transacción.
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA busy_timeout=5000;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=134217728;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+else:
+    # Un valor mal escrito no debe caer en silencio sobre la SQLite local
+    raise ImproperlyConfigured(f'DB_ENGINE desconocido: {DB_ENGINE!r}. Usa "sqlite" o "postgres".')
 
 
 # Password validation
@@ -126,6 +180,79 @@ MEDIA_ROOT = BASE_DIR / 'media'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@rivcon.com'
 
+# Vistas asíncronas (dashboard, kanban y detalle de empleado) al servir con ASGI
+GESTOR_VISTAS_ASYNC = os.environ.get('GESTOR_VISTAS_ASYNC', '0') == '1'
+
+# Eventos en vivo (SSE). El backend en memoria sirve para un solo proceso;
+# con varios workers se define REDIS_URL para difundirlos por Redis.
+if os.environ.get('REDIS_URL'):
+    GESTOR_EVENTOS = {
+        'BACKEND': 'gestor.eventos.BackendRedis',
+        'OPCIONES': {'url': os.environ['REDIS_URL']},
+    }
+else:
+    GESTOR_EVENTOS = {
+        'BACKEND': 'gestor.eventos.BackendMemoria',
+        'OPCIONES': {},
+    }
+
+# Caché (dotación por departamento y puesto). En memoria sirve para un solo
+# proceso; con varios workers se comparte por Redis para que la invalidación
+# llegue a todos.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Destinatarios de los avisos de tareas vencidas (scan_tareas_vencidas) cuando
+# la tarea no tiene un usuario responsable: área -> grupo de usuarios.
+GESTOR_AVISOS_AREAS = {
+    'rrhh': 'RRHH',
+    'it': 'IT',
+    'supervisor': 'Supervisores',
+    'finanzas': 'RRHH',
+    'legal': 'RRHH',
+    'otro': 'RRHH',
+}
+
+# Grupo que atiende cada área: las tareas automáticas nuevas de esas áreas se
+# asignan al miembro activo con menos tareas abiertas (gestor.asignacion). Las
+# del supervisor y del empleado no se asignan: ya tienen dueño.
+GESTOR_ASIGNACION_AREAS = {
+    'rrhh': 'RRHH',
+    'it': 'IT',
+    'finanzas': 'RRHH',
+    'legal': 'RRHH',
+    'otro': 'RRHH',
+}
+
+# Tareas abiertas por persona y día a partir de las cuales el calendario de
+# carga marca el día como sobrecargado
+GESTOR_CARGA_DIARIA_MAXIMA = 5
+
+# Tipos de documento requeridos para los puestos que no definen los suyos
+# (matriz de completitud documental)
+GESTOR_DOCUMENTOS_REQUERIDOS = ['contrato', 'cedula', 'nda', 'antecedentes']
+
+# Meses que un onboarding sigue completado antes de archivar sus tareas y
+# documentos (python manage.py archivar_onboardings)
+GESTOR_MESES_ARCHIVO = 12
+
+# Directorio de respaldos de la base y de MEDIA_ROOT (python manage.py backup)
+GESTOR_DIRECTORIO_RESPALDOS = Path(os.environ.get('GESTOR_RESPALDOS', BASE_DIR / 'respaldos'))
+
+# Directorio de los archivos de reportes (python manage.py procesar_reportes)
+GESTOR_DIRECTORIO_REPORTES = Path(os.environ.get('GESTOR_REPORTES', BASE_DIR / 'reportes'))
+
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'gestor:dashboard'
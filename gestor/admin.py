@@ -1,6 +1,35 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils.html import format_html
-from .models import Departamento, Puesto, Empleado, Documento, TareaOnboarding
+from .models import (
+    Departamento, Puesto, Empleado, Documento, TareaOnboarding, DependenciaTarea,
+    RegistroTransicion, ArchivoOnboarding, actualizar_bloqueos, recalcular_progresos, tareas_dependientes,
+)
+from . import maquina_estados
+from .forms import PuestoForm
+from .organizacion import anotar_departamentos, anotar_puestos
+from .sla import registrar_tareas
+
+
+class OpcionesRelacionadasMixin:
+    """
+    ``select_related`` en las opciones de los selects de claves foráneas: los
+    ``__str__`` de Puesto, Empleado y sus hijos leen relaciones, que de otro modo
+    costarían una consulta por opción.
+    """
+    
+    opciones_relacionadas = {
+        Puesto: ['departamento'],
+        Empleado: ['usuario'],
+        TareaOnboarding: ['empleado__usuario'],
+    }
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        relacionadas = self.opciones_relacionadas.get(db_field.related_model)
+        if relacionadas and 'queryset' not in kwargs:
+            kwargs['queryset'] = db_field.related_model._default_manager.select_related(*relacionadas)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Departamento)
@@ -12,19 +41,25 @@ class DepartamentoAdmin(admin.ModelAdmin):
     list_filter = ['fecha_creacion']
     ordering = ['nombre']
     
+    def get_queryset(self, request):
+        return anotar_departamentos(super().get_queryset(request))
+    
     def total_puestos(self, obj):
-        return obj.puestos.count()
+        return obj.total_puestos
     total_puestos.short_description = 'Total Puestos'
+    total_puestos.admin_order_field = 'total_puestos'
     
     def total_empleados(self, obj):
-        return Empleado.objects.filter(puesto__departamento=obj).count()
+        return obj.total_empleados
     total_empleados.short_description = 'Total Empleados'
+    total_empleados.admin_order_field = 'total_empleados'
 
 
 @admin.register(Puesto)
 class PuestoAdmin(admin.ModelAdmin):
     """Configuración del admin para Puestos."""
     
+    form = PuestoForm
     list_display = [
         'titulo', 'departamento', 'nivel', 'salario_minimo', 
         'salario_maximo', 'total_empleados', 'activo', 'fecha_creacion'
@@ -32,6 +67,7 @@ class PuestoAdmin(admin.ModelAdmin):
     list_filter = ['departamento', 'nivel', 'activo', 'fecha_creacion']
     search_fields = ['titulo', 'descripcion', 'departamento__nombre']
     list_editable = ['activo']
+    list_select_related = ['departamento']
     ordering = ['departamento', 'titulo']
     
     fieldsets = (
@@ -42,13 +78,21 @@ class PuestoAdmin(admin.ModelAdmin):
             'fields': ('salario_minimo', 'salario_maximo'),
             'classes': ('collapse',)
         }),
+        ('Documentación', {
+            'fields': ('documentos_requeridos',)
+        }),
         ('Estado', {
             'fields': ('activo',)
         }),
     )
     
+    def get_queryset(self, request):
+        # Puesto.__str__ lee el departamento (opciones del autocompletado). Un
+        # select_related aquí reemplaza a list_select_related en el listado
+        return anotar_puestos(super().get_queryset(request)).select_related(*self.list_select_related)
+    
     def total_empleados(self, obj):
-        count = obj.empleados.count()
+        count = obj.total_empleados
         if count > 0:
             return format_html(
                 '<span style="color: green; font-weight: bold;">{}</span>',
@@ -56,10 +100,11 @@ class PuestoAdmin(admin.ModelAdmin):
             )
         return count
     total_empleados.short_description = 'Empleados'
+    total_empleados.admin_order_field = 'total_empleados'
 
 
 @admin.register(Empleado)
-class EmpleadoAdmin(admin.ModelAdmin):
+class EmpleadoAdmin(OpcionesRelacionadasMixin, admin.ModelAdmin):
     """Configuración del admin para Empleados."""
     
     list_display = [
@@ -67,8 +112,9 @@ class EmpleadoAdmin(admin.ModelAdmin):
         'progreso_bar', 'fecha_ingreso', 'supervisor', 'fecha_creacion'
     ]
     list_filter = [
-        'estado', 'puesto__departamento', 'fecha_ingreso', 
-        'supervisor', 'fecha_creacion'
+        'estado', 'puesto__departamento', 'fecha_ingreso',
+        # Solo los usuarios que supervisan a alguien, no todos
+        ('supervisor', admin.RelatedOnlyFieldListFilter), 'fecha_creacion'
     ]
     search_fields = [
         'cedula', 'usuario__username', 'usuario__email',
@@ -78,6 +124,8 @@ class EmpleadoAdmin(admin.ModelAdmin):
     readonly_fields = [
         'progreso', 'fecha_creacion', 'fecha_actualizacion', 'creado_por'
     ]
+    list_select_related = ['usuario', 'puesto__departamento', 'supervisor']
+    autocomplete_fields = ['usuario', 'puesto', 'supervisor']
     list_per_page = 25
     date_hierarchy = 'fecha_ingreso'
     
@@ -106,6 +154,11 @@ class EmpleadoAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # Empleado.__str__ lee el usuario (opciones del autocompletado). Un
+        # select_related aquí reemplaza a list_select_related en el listado
+        return super().get_queryset(request).select_related(*self.list_select_related)
+    
     def get_nombre_completo(self, obj):
         return obj.usuario.get_full_name() or obj.usuario.username
     get_nombre_completo.short_description = 'Nombre'
@@ -142,23 +195,8 @@ class EmpleadoAdmin(admin.ModelAdmin):
     progreso_bar.short_description = 'Progreso'
     progreso_bar.admin_order_field = 'progreso'
     
-    actions = ['marcar_en_proceso', 'marcar_completado', 'actualizar_progreso']
-    
-    def marcar_en_proceso(self, request, queryset):
-        updated = queryset.update(estado='en_proceso')
-        self.message_user(
-            request,
-            f'{updated} empleado(s) marcado(s) como En Proceso.'
-        )
-    marcar_en_proceso.short_description = 'Marcar como En Proceso'
-    
-    def marcar_completado(self, request, queryset):
-        updated = queryset.update(estado='completado')
-        self.message_user(
-            request,
-            f'{updated} empleado(s) marcado(s) como Completado.'
-        )
-    marcar_completado.short_description = 'Marcar como Completado'
+    # El estado lo deriva la máquina de estados: no hay acciones para fijarlo a mano
+    actions = ['actualizar_progreso', 'reevaluar_estado']
     
     def actualizar_progreso(self, request, queryset):
         for empleado in queryset:
@@ -168,10 +206,18 @@ class EmpleadoAdmin(admin.ModelAdmin):
             f'Progreso actualizado para {queryset.count()} empleado(s).'
         )
     actualizar_progreso.short_description = 'Actualizar Progreso'
+    
+    def reevaluar_estado(self, request, queryset):
+        cambios = maquina_estados.reevaluar(queryset.values_list('pk', flat=True))
+        self.message_user(
+            request,
+            f'{len(cambios)} empleado(s) cambiaron de estado según sus tareas y documentos.'
+        )
+    reevaluar_estado.short_description = 'Reevaluar Estado según Tareas y Documentos'
 
 
 @admin.register(Documento)
-class DocumentoAdmin(admin.ModelAdmin):
+class DocumentoAdmin(OpcionesRelacionadasMixin, admin.ModelAdmin):
     """Configuración del admin para Documentos."""
     
     list_display = [
@@ -188,6 +234,8 @@ class DocumentoAdmin(admin.ModelAdmin):
     ]
     readonly_fields = ['fecha_subida', 'fecha_actualizacion']
     date_hierarchy = 'fecha_subida'
+    list_select_related = ['empleado__usuario', 'revisado_por']
+    autocomplete_fields = ['empleado', 'revisado_por']
     list_per_page = 30
     
     fieldsets = (
@@ -236,9 +284,23 @@ class DocumentoAdmin(admin.ModelAdmin):
     
     actions = ['aprobar_documentos', 'rechazar_documentos', 'marcar_en_revision']
     
+    def _revisar(self, queryset, **cambios):
+        """
+        Aplica ``cambios`` con un UPDATE y reevalúa el estado de los empleados
+        afectados (el UPDATE no pasa por los signals que lo harían por fila).
+        """
+        from django.utils import timezone
+        with transaction.atomic():
+            empleado_ids = set(queryset.values_list('empleado_id', flat=True))
+            # fecha_actualizacion mueve el ETag de la API de documentos
+            updated = queryset.update(fecha_actualizacion=timezone.now(), **cambios)
+            maquina_estados.reevaluar(empleado_ids)
+        return updated
+    
     def aprobar_documentos(self, request, queryset):
         from django.utils import timezone
-        updated = queryset.update(
+        updated = self._revisar(
+            queryset,
             estado='aprobado',
             revisado_por=request.user,
             fecha_revision=timezone.now()
@@ -251,7 +313,8 @@ class DocumentoAdmin(admin.ModelAdmin):
     
     def rechazar_documentos(self, request, queryset):
         from django.utils import timezone
-        updated = queryset.update(
+        updated = self._revisar(
+            queryset,
             estado='rechazado',
             revisado_por=request.user,
             fecha_revision=timezone.now()
@@ -263,7 +326,7 @@ class DocumentoAdmin(admin.ModelAdmin):
     rechazar_documentos.short_description = 'Rechazar Documentos Seleccionados'
     
     def marcar_en_revision(self, request, queryset):
-        updated = queryset.update(estado='en_revision')
+        updated = self._revisar(queryset, estado='en_revision')
         self.message_user(
             request,
             f'{updated} documento(s) marcado(s) como En Revisión.'
@@ -271,8 +334,17 @@ class DocumentoAdmin(admin.ModelAdmin):
     marcar_en_revision.short_description = 'Marcar como En Revisión'
 
 
+class DependenciaTareaInline(admin.TabularInline):
+    """Requisitos de una tarea (el modelo valida empleado y ciclos)."""
+    
+    model = DependenciaTarea
+    fk_name = 'tarea'
+    raw_id_fields = ['requisito']
+    extra = 0
+
+
 @admin.register(TareaOnboarding)
-class TareaOnboardingAdmin(admin.ModelAdmin):
+class TareaOnboardingAdmin(OpcionesRelacionadasMixin, admin.ModelAdmin):
     """Configuración del admin para Tareas de Onboarding."""
     
     list_display = [
@@ -289,10 +361,13 @@ class TareaOnboardingAdmin(admin.ModelAdmin):
     ]
     readonly_fields = [
         'fecha_creacion', 'fecha_actualizacion',
-        'fecha_completado', 'completado_por'
+        'fecha_completado', 'completado_por', 'aviso_vencimiento'
     ]
     date_hierarchy = 'fecha_limite'
+    list_select_related = ['empleado__usuario']
+    autocomplete_fields = ['empleado', 'responsable_usuario']
     list_per_page = 50
+    inlines = [DependenciaTareaInline]
     
     fieldsets = (
         ('Información de la Tarea', {
@@ -303,7 +378,7 @@ class TareaOnboardingAdmin(admin.ModelAdmin):
         }),
         ('Fechas y Prioridad', {
             'fields': (
-                'fecha_limite', 'fecha_inicio', 'prioridad'
+                'fecha_limite', 'fecha_inicio', 'prioridad', 'duracion_estimada'
             )
         }),
         ('Estado', {
@@ -314,7 +389,7 @@ class TareaOnboardingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Metadatos', {
-            'fields': ('fecha_creacion', 'fecha_actualizacion'),
+            'fields': ('fecha_creacion', 'fecha_actualizacion', 'aviso_vencimiento'),
             'classes': ('collapse',)
         }),
     )
@@ -359,39 +434,98 @@ class TareaOnboardingAdmin(admin.ModelAdmin):
     prioridad_badge.short_description = 'Prioridad'
     prioridad_badge.admin_order_field = 'prioridad'
     
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Con los requisitos ya guardados, bloquear o desbloquear la tarea
+        actualizar_bloqueos(TareaOnboarding.objects.filter(pk=form.instance.pk))
+    
     actions = [
         'marcar_en_progreso', 'marcar_completado',
         'marcar_pendiente', 'aumentar_prioridad'
     ]
     
+    def sin_requisitos_pendientes(self, request, queryset, completando=False):
+        """
+        Deja fuera las tareas con requisitos sin completar, como el lote de la
+        API: al completar, cuentan como completados los requisitos que están en
+        la misma selección. Avisa cuántas se omitieron; se llama dentro de la
+        transacción de la acción.
+        """
+        ids = list(queryset.values_list('pk', flat=True))
+        requisitos_pendientes = (
+            DependenciaTarea.objects.filter(tarea=OuterRef('pk'))
+            .exclude(requisito__estado='completado')
+        )
+        if completando:
+            requisitos_pendientes = requisitos_pendientes.exclude(requisito_id__in=ids)
+        # Bloqueadas hasta guardarlas: otro cambio no puede reabrir un requisito entretanto
+        tareas = list(
+            TareaOnboarding.objects.select_for_update().filter(pk__in=ids)
+            .annotate(requisitos_pendientes=Exists(requisitos_pendientes)).order_by('pk')
+        )
+        omitidas = sum(1 for tarea in tareas if tarea.requisitos_pendientes)
+        if omitidas:
+            self.message_user(
+                request,
+                f'{omitidas} tarea(s) omitida(s): tienen requisitos sin completar.',
+                messages.WARNING
+            )
+        return [tarea for tarea in tareas if not tarea.requisitos_pendientes]
+    
     def marcar_en_progreso(self, request, queryset):
         from django.utils import timezone
-        for tarea in queryset:
-            if not tarea.fecha_inicio:
-                tarea.fecha_inicio = timezone.now().date()
-            tarea.estado = 'en_progreso'
-            tarea.save()
+        # Una transacción: el progreso y el estado de cada empleado se recalculan una vez
+        with transaction.atomic():
+            tareas = self.sin_requisitos_pendientes(request, queryset)
+            for tarea in tareas:
+                if not tarea.fecha_inicio:
+                    tarea.fecha_inicio = timezone.now().date()
+                tarea.estado = 'en_progreso'
+                tarea.save()
         self.message_user(
             request,
-            f'{queryset.count()} tarea(s) marcada(s) como En Progreso.'
+            f'{len(tareas)} tarea(s) marcada(s) como En Progreso.'
         )
     marcar_en_progreso.short_description = 'Marcar como En Progreso'
     
     def marcar_completado(self, request, queryset):
         from django.utils import timezone
-        for tarea in queryset:
-            tarea.estado = 'completado'
-            tarea.fecha_completado = timezone.now().date()
-            tarea.completado_por = request.user
-            tarea.save()
+        with transaction.atomic():
+            tareas = self.sin_requisitos_pendientes(request, queryset, completando=True)
+            for tarea in tareas:
+                tarea.estado = 'completado'
+                tarea.fecha_completado = timezone.now().date()
+                tarea.completado_por = request.user
+                tarea.save()
         self.message_user(
             request,
-            f'{queryset.count()} tarea(s) marcada(s) como Completada.'
+            f'{len(tareas)} tarea(s) marcada(s) como Completada.'
         )
     marcar_completado.short_description = 'Marcar como Completado'
     
     def marcar_pendiente(self, request, queryset):
-        updated = queryset.update(estado='pendiente')
+        from django.utils import timezone
+        with transaction.atomic():
+            # Las bloqueadas siguen esperando a sus requisitos
+            reabrir = {
+                pk: (estado, empleado_id)
+                for pk, estado, empleado_id in queryset.exclude(estado__in=('pendiente', 'bloqueado'))
+                .values_list('pk', 'estado', 'empleado_id')
+            }
+            completadas = [pk for pk, (estado, _) in reabrir.items() if estado == 'completado']
+            # update() no dispara signals: descontar las reabiertas de los rollups de SLA
+            registrar_tareas(completadas, signo=-1)
+            updated = TareaOnboarding.objects.filter(pk__in=list(reabrir)).update(
+                estado='pendiente', fecha_actualizacion=timezone.now()
+            )
+            # Con requisitos sin completar vuelven a quedar bloqueadas, y las que
+            # dependían de una completada que se reabre también se bloquean
+            actualizar_bloqueos(TareaOnboarding.objects.filter(pk__in=list(reabrir)))
+            actualizar_bloqueos(tareas_dependientes(completadas))
+            # Ni el progreso ni el estado de los empleados se recalculan solos
+            empleados = {empleado_id for _, empleado_id in reabrir.values()}
+            recalcular_progresos(empleados)
+            maquina_estados.reevaluar(empleados)
         self.message_user(
             request,
             f'{updated} tarea(s) marcada(s) como Pendiente.'
@@ -400,10 +534,11 @@ class TareaOnboardingAdmin(admin.ModelAdmin):
     
     def aumentar_prioridad(self, request, queryset):
         prioridades = {'baja': 'media', 'media': 'alta', 'alta': 'urgente'}
-        for tarea in queryset:
-            if tarea.prioridad in prioridades:
-                tarea.prioridad = prioridades[tarea.prioridad]
-                tarea.save()
+        with transaction.atomic():
+            for tarea in queryset:
+                if tarea.prioridad in prioridades:
+                    tarea.prioridad = prioridades[tarea.prioridad]
+                    tarea.save()
         self.message_user(
             request,
             f'Prioridad aumentada para {queryset.count()} tarea(s).'
@@ -411,6 +546,49 @@ class TareaOnboardingAdmin(admin.ModelAdmin):
     aumentar_prioridad.short_description = 'Aumentar Prioridad'
 
 
+@admin.register(RegistroTransicion)
+class RegistroTransicionAdmin(admin.ModelAdmin):
+    """Historial de transiciones: solo lectura."""
+    
+    list_display = ['fecha', 'entidad', 'objeto_id', 'desde', 'hacia', 'usuario']
+    list_filter = ['entidad', 'hacia']
+    search_fields = ['=objeto_id']
+    date_hierarchy = 'fecha'
+    list_per_page = 50
+    list_select_related = ['usuario']
+    # Evita el COUNT(*) sobre toda la tabla en cada página
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivoOnboarding)
+class ArchivoOnboardingAdmin(admin.ModelAdmin):
+    """Onboardings archivados: solo lectura (se restauran con ``archivar_onboardings``)."""
+    
+    list_display = ['empleado', 'total_tareas', 'total_documentos', 'fecha_archivo']
+    search_fields = ['empleado__usuario__username', 'empleado__usuario__first_name', 'empleado__usuario__last_name']
+    date_hierarchy = 'fecha_archivo'
+    list_select_related = ['empleado__usuario']
+    exclude = ['datos']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 # Personalización del admin site
 admin.site.site_header = 'Rivcon RRHH - Administración'
 admin.site.site_title = 'Rivcon RRHH Admin'
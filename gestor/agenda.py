@@ -0,0 +1,236 @@
+"""
+Calendario de tareas por usuario (iCalendar) para suscribirse desde Google
+Calendar, Outlook o el calendario del teléfono.
+
+Cada usuario tiene una URL secreta (``SuscripcionCalendario.token``) con las
+tareas que tiene asignadas (``responsable_usuario``) y, si es empleado, las de
+su propio onboarding, como eventos de día completo en su fecha límite. Las
+tareas canceladas no se incluyen.
+
+Los clientes consultan el feed cada pocos minutos, así que:
+
+- Cada usuario tiene en la caché un sello (la hora del último cambio que lo
+  afecta) que los signals de tareas renuevan al confirmar la transacción; los
+  UPDATE masivos de tareas y el archivo renuevan un sello global. El ETag y el
+  Last-Modified salen de los sellos: un feed sin cambios responde 304 sin
+  consultar tareas.
+- El feed armado se guarda en la caché bajo su sello. Cuando cambia se rearma
+  de forma incremental: una consulta trae ``(id, fecha_actualizacion)`` de las
+  tareas y solo las que cambiaron se vuelven a leer y a convertir en VEVENT
+  (cada VEVENT queda en caché bajo su ``fecha_actualizacion`` y el sello
+  global, porque un UPDATE masivo puede no tocar ``fecha_actualizacion``).
+"""
+import hashlib
+import time
+from datetime import timedelta, timezone
+from functools import partial
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from . import efectos
+
+CLAVE_GLOBAL = 'gestor:agenda:global'
+DURACION_CACHE = 86400
+# Campos de TareaOnboarding que cambian el feed en un QuerySet.update()
+CAMPOS_AGENDA = (
+    'titulo', 'descripcion', 'fecha_limite', 'estado', 'prioridad', 'responsable',
+    'responsable_usuario', 'responsable_usuario_id', 'empleado', 'empleado_id',
+)
+CAMPOS = (
+    'id', 'titulo', 'descripcion', 'fecha_limite', 'estado', 'prioridad', 'responsable',
+    'fecha_actualizacion', 'empleado__usuario__first_name', 'empleado__usuario__last_name',
+    'empleado__usuario__username',
+)
+# Tareas por consulta al rearmar los VEVENT que cambiaron
+LOTE = 500
+
+
+# ======================
+# Sellos e invalidación
+# ======================
+
+def _clave_usuario(usuario_id):
+    return f'gestor:agenda:usuario:{usuario_id}'
+
+
+def _sellos(*claves):
+    sellos = cache.get_many(claves)
+    for clave in claves:
+        if clave not in sellos:
+            # Sin sello (caché vacía o expirada): cuenta como un cambio ahora
+            cache.add(clave, time.time(), None)
+            sellos[clave] = cache.get(clave, time.time())
+    return sellos
+
+
+def sello(usuario_id):
+    """Hora (timestamp) del último cambio que afecta al feed de ``usuario_id``."""
+    return max(_sellos(CLAVE_GLOBAL, _clave_usuario(usuario_id)).values())
+
+
+def sello_global():
+    return _sellos(CLAVE_GLOBAL)[CLAVE_GLOBAL]
+
+
+def _renovar(clave):
+    cache.set(clave, time.time(), None)
+
+
+def invalidar_usuario(usuario_id, using=None):
+    """Renueva el sello de ``usuario_id`` al confirmar (una vez por transacción)."""
+    if usuario_id:
+        efectos.diferir('agenda', usuario_id, partial(_renovar, _clave_usuario(usuario_id)), using=using)
+
+
+def invalidar_empleado(empleado_id, using=None):
+    """Como ``invalidar_usuario`` para el usuario del empleado, que se busca al confirmar."""
+    from .models import Empleado
+    
+    def renovar():
+        usuario_id = Empleado.objects.filter(pk=empleado_id).values_list('usuario_id', flat=True).first()
+        if usuario_id:
+            _renovar(_clave_usuario(usuario_id))
+    
+    efectos.diferir('agenda_empleado', empleado_id, renovar, using=using)
+
+
+def invalidar(using=None):
+    """Renueva el sello global (todos los feeds) al confirmar la transacción."""
+    efectos.diferir('agenda', None, partial(_renovar, CLAVE_GLOBAL), using=using)
+
+
+# ======================
+# iCalendar
+# ======================
+
+def _texto(valor):
+    """Escapa un valor TEXT (RFC 5545, 3.3.11)."""
+    return (
+        str(valor).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def _plegar(linea):
+    """Parte las líneas de más de 75 octetos sin cortar caracteres UTF-8."""
+    if len(linea.encode()) <= 75:
+        return linea
+    partes, actual, octetos = [], '', 0
+    for caracter in linea:
+        tamano = len(caracter.encode())
+        # Las continuaciones empiezan con un espacio, que también cuenta
+        if octetos + tamano > (75 if not partes else 74):
+            partes.append(actual)
+            actual, octetos = '', 0
+        actual += caracter
+        octetos += tamano
+    partes.append(actual)
+    return '\r\n '.join(partes)
+
+
+def evento(fila):
+    """VEVENT de día completo en la fecha límite de la tarea ``fila`` (``values(*CAMPOS)``)."""
+    from .models import TareaOnboarding
+    
+    empleado = (
+        f"{fila['empleado__usuario__first_name']} {fila['empleado__usuario__last_name']}".strip()
+        or fila['empleado__usuario__username']
+    )
+    titulo = f"{fila['titulo']} ({empleado})"
+    if fila['estado'] == 'completado':
+        titulo = f'✓ {titulo}'
+    descripcion = '\n'.join(filter(None, [
+        fila['descripcion'],
+        'Estado: {} · Prioridad: {} · Área: {}'.format(
+            dict(TareaOnboarding.ESTADO_CHOICES).get(fila['estado'], fila['estado']),
+            dict(TareaOnboarding.PRIORIDAD_CHOICES).get(fila['prioridad'], fila['prioridad']),
+            dict(TareaOnboarding.RESPONSABLE_CHOICES).get(fila['responsable'], fila['responsable']),
+        ),
+    ]))
+    actualizada = fila['fecha_actualizacion'].astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lineas = [
+        'BEGIN:VEVENT',
+        f"UID:tarea-{fila['id']}@rivcon-onboarding",
+        f'DTSTAMP:{actualizada}',
+        f'LAST-MODIFIED:{actualizada}',
+        f"DTSTART;VALUE=DATE:{fila['fecha_limite']:%Y%m%d}",
+        f"DTEND;VALUE=DATE:{fila['fecha_limite'] + timedelta(days=1):%Y%m%d}",
+        f'SUMMARY:{_texto(titulo)}',
+        f'DESCRIPTION:{_texto(descripcion)}',
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT',
+    ]
+    return '\r\n'.join(_plegar(linea) for linea in lineas)
+
+
+CABECERA = '\r\n'.join([
+    'BEGIN:VCALENDAR',
+    'VERSION:2.0',
+    'PRODID:-//Rivcon//Onboarding RRHH//ES',
+    'CALSCALE:GREGORIAN',
+    'METHOD:PUBLISH',
+    'X-WR-CALNAME:Tareas de onboarding',
+    'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+    'X-PUBLISHED-TTL:PT15M',
+])
+PIE = 'END:VCALENDAR'
+
+
+# ======================
+# Feed
+# ======================
+
+def tareas_de(usuario_id):
+    """Las tareas del feed de ``usuario_id``: asignadas a él o de su propio onboarding."""
+    from .models import Empleado, TareaOnboarding
+    
+    return TareaOnboarding.objects.filter(
+        Q(responsable_usuario_id=usuario_id)
+        | Q(empleado_id__in=Empleado.objects.filter(usuario_id=usuario_id).values('pk'))
+    ).exclude(estado='cancelado').order_by('fecha_limite', 'pk')
+
+
+def _clave_evento(pk, actualizada, global_):
+    # Con el sello global: un UPDATE masivo pudo cambiar la tarea sin tocar fecha_actualizacion
+    return f'gestor:agenda:evento:{pk}:{actualizada.timestamp()}:{global_!r}'
+
+
+def construir(usuario_id):
+    """
+    El feed de ``usuario_id``. Reutiliza los VEVENT en caché de las tareas cuya
+    ``fecha_actualizacion`` no cambió y solo lee y convierte las demás.
+    """
+    from .models import TareaOnboarding
+    
+    global_ = sello_global()
+    tareas = list(tareas_de(usuario_id).values_list('pk', 'fecha_actualizacion'))
+    claves = {pk: _clave_evento(pk, actualizada, global_) for pk, actualizada in tareas}
+    en_cache = cache.get_many(list(claves.values()))
+    eventos = {pk: en_cache[clave] for pk, clave in claves.items() if clave in en_cache}
+    
+    faltan = [pk for pk in claves if pk not in eventos]
+    for inicio in range(0, len(faltan), LOTE):
+        nuevos = {}
+        for fila in TareaOnboarding.objects.filter(pk__in=faltan[inicio:inicio + LOTE]).values(*CAMPOS):
+            clave = _clave_evento(fila['id'], fila['fecha_actualizacion'], global_)
+            eventos[fila['id']] = nuevos[clave] = evento(fila)
+        cache.set_many(nuevos, DURACION_CACHE)
+    
+    # Una tarea borrada entre ambas consultas simplemente no aparece
+    cuerpo = [eventos[pk] for pk, _ in tareas if pk in eventos]
+    return '\r\n'.join([CABECERA, *cuerpo, PIE]) + '\r\n'
+
+
+def feed(usuario_id, marca):
+    """El feed de ``usuario_id`` para el sello ``marca``, desde la caché si ya se armó."""
+    clave = f'gestor:agenda:feed:{usuario_id}:{marca}'
+    contenido = cache.get(clave)
+    if contenido is None:
+        contenido = construir(usuario_id)
+        cache.set(clave, contenido, DURACION_CACHE)
+    return contenido
+
+
+def etag(usuario_id, marca):
+    return hashlib.sha1(f'{usuario_id}:{marca!r}'.encode()).hexdigest()
@@ -0,0 +1,940 @@
+"""
+API JSON de solo lectura (v1) para integraciones: aprovisionamiento de IT,
+nómina, etc.
+
+- ``?fields=a,b,c`` selecciona columnas (filas construidas con ``values()``).
+- Mismos filtros que las vistas HTML de listado.
+- Paginación por cursor (keyset), estable aunque se inserten filas.
+- ETag fuerte y Last-Modified derivados de ``fecha_actualizacion`` (y, en los
+  recursos que muestran columnas de usuarios, puestos o departamentos, del
+  sello de esas tablas en ``versiones``): los clientes que consultan
+  periódicamente reciben 304 si nada cambió.
+"""
+import base64
+import hashlib
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, Max, OuterRef, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.generic import View
+
+from . import completitud, efectos, eventos, jerarquia, maquina_estados, revision, versiones
+from .forms import FiltroCompletitudForm, FiltroEmpleadosForm
+from .models import (
+    DependenciaTarea, Documento, Empleado, Puesto, TareaOnboarding, actualizar_bloqueos,
+    recalcular_progresos, tareas_dependientes,
+)
+from .sla import registrar_tareas
+
+
+class ErrorAPI(Exception):
+    """Error de parámetros que se devuelve al cliente como 400."""
+
+
+def respuesta_json(datos, status=200):
+    return JsonResponse(
+        datos, status=status, encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+class APIAuthMixin(LoginRequiredMixin):
+    """Responde 401/403 en JSON en lugar de redirigir al login."""
+    
+    def handle_no_permission(self):
+        if self.request.user.is_authenticated:
+            return respuesta_json({'error': 'Permiso denegado.'}, status=403)
+        return respuesta_json({'error': 'Autenticación requerida.'}, status=401)
+
+
+class RecursoAPIMixin(APIAuthMixin):
+    """
+    Definición de un recurso de la API.
+    
+    ``campos`` mapea el nombre público de cada campo a su ruta en el ORM;
+    ``campos_por_defecto`` son los que se devuelven sin ``?fields=``.
+    ``campos_con_permiso`` mapea los campos que exigen un permiso propio
+    (además del de la vista) a ese permiso.
+    """
+    
+    model = None
+    campos = {}
+    campos_por_defecto = None
+    campos_con_permiso = {}
+    # Si muestra columnas de usuarios, puestos o departamentos (``versiones``)
+    relacionadas = False
+    
+    def get_campos(self):
+        fields = self.request.GET.get('fields')
+        if not fields:
+            return list(self.campos_por_defecto or self.campos)
+        seleccion = [campo.strip() for campo in fields.split(',') if campo.strip()]
+        desconocidos = [campo for campo in seleccion if campo not in self.campos]
+        if desconocidos:
+            raise ErrorAPI(
+                f'Campos desconocidos: {", ".join(desconocidos)}. '
+                f'Disponibles: {", ".join(self.campos)}.'
+            )
+        sin_permiso = [
+            campo for campo in seleccion
+            if campo in self.campos_con_permiso
+            and not self.request.user.has_perm(self.campos_con_permiso[campo])
+        ]
+        if sin_permiso:
+            raise ErrorAPI(f'Sin permiso para los campos: {", ".join(sin_permiso)}.')
+        return seleccion
+    
+    def get_queryset(self):
+        return self.model.objects.all()
+    
+    def serializar(self, queryset, campos, extra=()):
+        """Filas ``values()`` renombradas a los nombres públicos."""
+        rutas = [self.campos[campo] for campo in campos]
+        for ruta in extra:
+            if ruta not in rutas:
+                rutas.append(ruta)
+        for fila in queryset.values(*rutas):
+            yield fila, {campo: fila[self.campos[campo]] for campo in campos}
+    
+    def etag(self, *partes):
+        digest = hashlib.sha1(
+            '|'.join(str(parte) for parte in partes).encode()
+        ).hexdigest()
+        return quote_etag(digest)
+    
+    def sello_relacionadas(self):
+        """Sello de las tablas unidas, o ``None`` si el recurso no muestra sus columnas."""
+        return versiones.sello() if self.relacionadas else None
+    
+    def responder_condicional(self, etag, ultima_modificacion, construir, sello=None):
+        """Devuelve 304 si el cliente ya tiene la versión actual; si no, la construye."""
+        timestamp = int(ultima_modificacion.timestamp()) if ultima_modificacion else None
+        if timestamp is not None and sello is not None:
+            timestamp = max(timestamp, int(sello))
+        respuesta = get_conditional_response(
+            self.request, etag=etag, last_modified=timestamp
+        )
+        if respuesta is None:
+            respuesta = respuesta_json(construir())
+        respuesta['ETag'] = etag
+        if timestamp is not None:
+            respuesta['Last-Modified'] = http_date(timestamp)
+        respuesta['Cache-Control'] = 'private, no-cache'
+        return respuesta
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            return self.responder(request, *args, **kwargs)
+        except ErrorAPI as e:
+            return respuesta_json({'error': str(e)}, status=400)
+
+
+class RecursoListAPIView(RecursoAPIMixin, View):
+    """Listado con filtros, selección de campos y paginación por cursor."""
+    
+    # Orden de paginación: debe terminar en un campo único (id)
+    orden = ('-id',)
+    limite_por_defecto = 50
+    limite_maximo = 500
+    
+    def filtrar(self, queryset):
+        return queryset
+    
+    def get_limite(self):
+        try:
+            limite = int(self.request.GET.get('limit', self.limite_por_defecto))
+        except ValueError:
+            raise ErrorAPI('El parámetro limit debe ser un entero.')
+        return max(1, min(limite, self.limite_maximo))
+    
+    def decodificar_cursor(self, cursor):
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise ErrorAPI('Cursor inválido.')
+        if not isinstance(valores, list) or len(valores) != len(self.orden):
+            raise ErrorAPI('Cursor inválido.')
+        try:
+            return [
+                self.model._meta.get_field(campo.lstrip('-')).to_python(valor)
+                for campo, valor in zip(self.orden, valores)
+            ]
+        except ValidationError:
+            raise ErrorAPI('Cursor inválido.')
+    
+    def codificar_cursor(self, fila):
+        # isoformat conserva los microsegundos (DjangoJSONEncoder los trunca)
+        valores = [
+            valor.isoformat() if hasattr(valor, 'isoformat') else valor
+            for valor in (fila[campo.lstrip('-')] for campo in self.orden)
+        ]
+        return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+    
+    def despues_de(self, valores):
+        """Q para las filas posteriores al cursor en el orden lexicográfico de ``orden``."""
+        condicion = Q()
+        iguales = {}
+        for campo, valor in zip(self.orden, valores):
+            nombre = campo.lstrip('-')
+            operador = 'lt' if campo.startswith('-') else 'gt'
+            condicion |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+            iguales[nombre] = valor
+        return condicion
+    
+    def responder(self, request, *args, **kwargs):
+        campos = self.get_campos()
+        limite = self.get_limite()
+        queryset = self.filtrar(self.get_queryset())
+        
+        resumen = queryset.order_by().aggregate(
+            ultima=Max('fecha_actualizacion'), total=Count('id')
+        )
+        sello = self.sello_relacionadas()
+        etag = self.etag(
+            request.path, request.GET.urlencode(), resumen['ultima'], resumen['total'], sello
+        )
+        
+        def construir():
+            pagina = queryset.order_by(*self.orden)
+            cursor = request.GET.get('cursor')
+            if cursor:
+                pagina = pagina.filter(self.despues_de(self.decodificar_cursor(cursor)))
+            claves = [campo.lstrip('-') for campo in self.orden]
+            filas = list(self.serializar(pagina[:limite + 1], campos, extra=claves))
+            
+            siguiente = None
+            if len(filas) > limite:
+                filas = filas[:limite]
+                parametros = request.GET.copy()
+                parametros['cursor'] = self.codificar_cursor(filas[-1][0])
+                siguiente = request.build_absolute_uri(f'{request.path}?{parametros.urlencode()}')
+            return {
+                'count': resumen['total'],
+                'next': siguiente,
+                'results': [publica for _, publica in filas],
+            }
+        
+        return self.responder_condicional(etag, resumen['ultima'], construir, sello)
+
+
+class RecursoDetailAPIView(RecursoAPIMixin, View):
+    """Detalle de un registro con selección de campos y GET condicional."""
+    
+    def responder(self, request, *args, **kwargs):
+        campos = self.get_campos()
+        queryset = self.get_queryset().filter(pk=kwargs['pk'])
+        ultima = queryset.values_list('fecha_actualizacion', flat=True).first()
+        if ultima is None:
+            return respuesta_json({'error': 'No encontrado.'}, status=404)
+        sello = self.sello_relacionadas()
+        etag = self.etag(request.path, request.GET.urlencode(), ultima, sello)
+        
+        def construir():
+            # Si la fila se borró entre ambas consultas, devolvemos un objeto vacío
+            for _, publica in self.serializar(queryset, campos):
+                return publica
+            return {}
+        
+        return self.responder_condicional(etag, ultima, construir, sello)
+
+
+# ======================
+# Recursos
+# ======================
+
+class EmpleadoAPIMixin(PermissionRequiredMixin):
+    permission_required = 'gestor.view_empleado'
+    model = Empleado
+    relacionadas = True
+    campos = {
+        'id': 'id',
+        'usuario_id': 'usuario_id',
+        'username': 'usuario__username',
+        'nombre': 'usuario__first_name',
+        'apellido': 'usuario__last_name',
+        'email': 'usuario__email',
+        'cedula': 'cedula',
+        'telefono': 'telefono',
+        'fecha_nacimiento': 'fecha_nacimiento',
+        'puesto_id': 'puesto_id',
+        'puesto': 'puesto__titulo',
+        'nivel': 'puesto__nivel',
+        'departamento_id': 'puesto__departamento_id',
+        'departamento': 'puesto__departamento__nombre',
+        'supervisor_id': 'supervisor_id',
+        'fecha_ingreso': 'fecha_ingreso',
+        'salario': 'salario',
+        'estado': 'estado',
+        'progreso': 'progreso',
+        'fecha_creacion': 'fecha_creacion',
+        'fecha_actualizacion': 'fecha_actualizacion',
+    }
+    # Datos sensibles (salario, fecha de nacimiento) solo si se piden explícitamente
+    campos_por_defecto = [
+        'id', 'usuario_id', 'username', 'nombre', 'apellido', 'email', 'cedula',
+        'telefono', 'puesto_id', 'puesto', 'nivel', 'departamento_id', 'departamento',
+        'supervisor_id', 'fecha_ingreso', 'estado', 'progreso', 'fecha_actualizacion',
+    ]
+    campos_con_permiso = {'salario': 'gestor.view_compensacion'}
+
+
+class EmpleadoListAPIView(EmpleadoAPIMixin, RecursoListAPIView):
+    """GET /api/v1/empleados/ - mismos filtros que la lista de empleados."""
+    
+    orden = ('-fecha_creacion', '-id')
+    
+    def filtrar(self, queryset):
+        form = FiltroEmpleadosForm(self.request.GET)
+        if not form.is_valid():
+            raise ErrorAPI(form.errors.as_text())
+        
+        buscar = form.cleaned_data.get('buscar')
+        if buscar:
+            queryset = queryset.filter(
+                Q(usuario__first_name__icontains=buscar) |
+                Q(usuario__last_name__icontains=buscar) |
+                Q(usuario__email__icontains=buscar) |
+                Q(cedula__icontains=buscar)
+            )
+        estado = form.cleaned_data.get('estado')
+        if estado:
+            queryset = queryset.filter(estado=estado)
+        departamento = form.cleaned_data.get('departamento')
+        if departamento:
+            queryset = queryset.filter(puesto__departamento=departamento)
+        supervisor = form.cleaned_data.get('supervisor')
+        if supervisor and form.cleaned_data.get('toda_la_linea'):
+            queryset = jerarquia.filtrar_equipo(queryset, supervisor)
+        elif supervisor:
+            queryset = queryset.filter(supervisor=supervisor)
+        return queryset
+
+
+class EmpleadoDetailAPIView(EmpleadoAPIMixin, RecursoDetailAPIView):
+    """GET /api/v1/empleados/<pk>/"""
+
+
+class TareaAPIMixin(PermissionRequiredMixin):
+    permission_required = 'gestor.view_tareaonboarding'
+    model = TareaOnboarding
+    campos = {
+        'id': 'id',
+        'empleado_id': 'empleado_id',
+        'titulo': 'titulo',
+        'descripcion': 'descripcion',
+        'responsable': 'responsable',
+        'responsable_usuario_id': 'responsable_usuario_id',
+        'fecha_limite': 'fecha_limite',
+        'fecha_inicio': 'fecha_inicio',
+        'fecha_completado': 'fecha_completado',
+        'estado': 'estado',
+        'prioridad': 'prioridad',
+        'es_automatica': 'es_automatica',
+        'orden': 'orden',
+        'duracion_estimada': 'duracion_estimada',
+        'notas': 'notas',
+        'completado_por_id': 'completado_por_id',
+        'fecha_creacion': 'fecha_creacion',
+        'fecha_actualizacion': 'fecha_actualizacion',
+    }
+
+
+class TareaListAPIView(TareaAPIMixin, RecursoListAPIView):
+    """GET /api/v1/tareas/ - filtros ``estado``, ``responsable`` y ``empleado``."""
+    
+    orden = ('fecha_limite', 'id')
+    
+    def filtrar(self, queryset):
+        estado = self.request.GET.get('estado')
+        if estado:
+            queryset = queryset.filter(estado=estado)
+        responsable = self.request.GET.get('responsable')
+        if responsable:
+            queryset = queryset.filter(responsable=responsable)
+        empleado = self.request.GET.get('empleado')
+        if empleado:
+            if not empleado.isdigit():
+                raise ErrorAPI('El parámetro empleado debe ser un id.')
+            queryset = queryset.filter(empleado_id=empleado)
+        return queryset
+
+
+class TareaDetailAPIView(TareaAPIMixin, RecursoDetailAPIView):
+    """GET /api/v1/tareas/<pk>/"""
+
+
+class TareaLoteAPIView(APIAuthMixin, PermissionRequiredMixin, View):
+    """
+    POST /api/v1/tareas/lote/ - actualiza el estado y las notas de muchas tareas.
+    
+    Cuerpo: ``{"tareas": [{"id": 1, "estado": "completado", "notas": "..."}, ...]}``.
+    Los ítems inválidos se informan y se omiten; el resto se aplica en una sola
+    transacción con UPDATEs por conjunto, y el progreso de cada empleado
+    afectado se recalcula una única vez.
+    """
+    
+    permission_required = 'gestor.change_tareaonboarding'
+    maximo_items = 1000
+    # Filas por UPDATE al guardar las notas (bulk_update)
+    tamano_lote = 500
+    estados_validos = {estado for estado, _ in TareaOnboarding.ESTADO_CHOICES}
+    
+    def post(self, request, *args, **kwargs):
+        try:
+            items = self.leer_items(request)
+        except ErrorAPI as e:
+            return respuesta_json({'error': str(e)}, status=400)
+        
+        with transaction.atomic():
+            resultados, validos = self.validar(items)
+            if validos:
+                self.aplicar(validos)
+        
+        errores = sum(1 for resultado in resultados if not resultado['ok'])
+        return respuesta_json({
+            'aplicadas': len(resultados) - errores,
+            'errores': errores,
+            'resultados': resultados,
+        })
+    
+    def leer_items(self, request):
+        try:
+            cuerpo = json.loads(request.body)
+        except ValueError:
+            raise ErrorAPI('El cuerpo debe ser JSON.')
+        items = cuerpo.get('tareas') if isinstance(cuerpo, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ErrorAPI('Se esperaba una lista no vacía en "tareas".')
+        if len(items) > self.maximo_items:
+            raise ErrorAPI(f'Máximo {self.maximo_items} tareas por lote.')
+        return items
+    
+    def validar(self, items):
+        """
+        Valida todos los ítems con una sola consulta, que bloquea las tareas
+        hasta aplicar: otra petición no puede cambiarlas entre la validación y
+        los UPDATE.
+        
+        Devuelve los resultados por ítem (en el orden recibido) y un dict
+        ``{id: (item, fila_actual)}`` con los que pueden aplicarse.
+        """
+        ids = [
+            item['id'] for item in items
+            if isinstance(item, dict) and isinstance(item.get('id'), int)
+        ]
+        a_completar = [
+            item['id'] for item in items
+            if isinstance(item, dict) and item.get('estado') == 'completado'
+            and isinstance(item.get('id'), int)
+        ]
+        # Requisitos sin completar que tampoco se completan en este mismo lote
+        requisitos_pendientes = (
+            DependenciaTarea.objects.filter(tarea=OuterRef('pk'))
+            .exclude(requisito__estado='completado')
+            .exclude(requisito_id__in=a_completar)
+        )
+        filas = {
+            fila['id']: fila
+            # of=('self',): se bloquean las tareas, no los empleados del JOIN;
+            # en orden de pk para que dos lotes no se bloqueen mutuamente
+            for fila in TareaOnboarding.objects.select_for_update(of=('self',)).filter(pk__in=ids).annotate(
+                requisitos_pendientes=Exists(requisitos_pendientes)
+            ).order_by('pk').values(
+                'id', 'empleado_id', 'titulo', 'estado', 'empleado__progreso',
+                'requisitos_pendientes',
+            )
+        }
+        
+        resultados, validos = [], {}
+        for item in items:
+            error = self.validar_item(item, filas, validos)
+            if error:
+                id_item = item.get('id') if isinstance(item, dict) else None
+                resultados.append({'id': id_item, 'ok': False, 'error': error})
+                continue
+            fila = filas[item['id']]
+            validos[item['id']] = (item, fila)
+            resultados.append({
+                'id': item['id'],
+                'ok': True,
+                'estado_anterior': fila['estado'],
+                'estado': item.get('estado', fila['estado']),
+            })
+        return resultados, validos
+    
+    def validar_item(self, item, filas, validos):
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            return 'Cada ítem necesita un "id" entero.'
+        if item['id'] in validos:
+            return 'Tarea repetida en el lote.'
+        if item['id'] not in filas:
+            return 'Tarea no encontrada.'
+        if 'estado' not in item and 'notas' not in item:
+            return 'Nada que actualizar: indique "estado" y/o "notas".'
+        if 'estado' in item and item['estado'] not in self.estados_validos:
+            return f'Estado inválido: {item["estado"]}.'
+        if item.get('estado') in ('en_progreso', 'completado') and filas[item['id']]['requisitos_pendientes']:
+            return 'La tarea tiene requisitos sin completar.'
+        if 'notas' in item and item['notas'] is not None and not isinstance(item['notas'], str):
+            return 'Las notas deben ser texto.'
+        return None
+    
+    def aplicar(self, validos):
+        ahora = timezone.now()
+        hoy = ahora.date()
+        usuario_id = self.request.user.pk
+        
+        # Completar (o reabrir) tareas desbloquea (o bloquea) a sus dependientes
+        # y suma (o resta) en los rollups de SLA
+        cambian_completado = [
+            id_tarea for id_tarea, (item, fila) in validos.items()
+            if 'estado' in item and item['estado'] != fila['estado']
+            and 'completado' in (item['estado'], fila['estado'])
+        ]
+        reabiertas = [
+            id_tarea for id_tarea in cambian_completado
+            if validos[id_tarea][1]['estado'] == 'completado'
+        ]
+        registrar_tareas(reabiertas, signo=-1)
+        
+        # Un UPDATE por estado destino, con las mismas reglas que TareaUpdateView
+        por_estado = {}
+        for id_tarea, (item, _) in validos.items():
+            if 'estado' in item:
+                por_estado.setdefault(item['estado'], []).append(id_tarea)
+        for estado, ids in por_estado.items():
+            cambios = {'estado': estado, 'fecha_actualizacion': ahora}
+            if estado == 'en_progreso':
+                cambios['fecha_inicio'] = Coalesce(F('fecha_inicio'), Value(hoy))
+            elif estado == 'completado':
+                cambios['fecha_completado'] = Coalesce(F('fecha_completado'), Value(hoy))
+                cambios['completado_por'] = Case(
+                    When(fecha_completado__isnull=True, then=Value(usuario_id)),
+                    default=F('completado_por'),
+                    output_field=IntegerField(),
+                )
+            TareaOnboarding.objects.filter(pk__in=ids).update(**cambios)
+        
+        # Las notas son distintas por tarea: bulk_update, por lotes
+        notas = [
+            TareaOnboarding(pk=id_tarea, notas=item['notas'], fecha_actualizacion=ahora)
+            for id_tarea, (item, _) in validos.items() if 'notas' in item
+        ]
+        TareaOnboarding.objects.bulk_update(
+            notas, ['notas', 'fecha_actualizacion'], batch_size=self.tamano_lote
+        )
+        
+        if cambian_completado:
+            actualizar_bloqueos(tareas_dependientes(cambian_completado))
+            registrar_tareas(set(cambian_completado) - set(reabiertas), signo=1)
+        
+        empleados = {fila['empleado_id']: fila['empleado__progreso'] for _, fila in validos.values()}
+        recalcular_progresos(empleados)
+        maquina_estados.reevaluar(empleados)
+        self.publicar_eventos(validos, empleados)
+    
+    def publicar_eventos(self, validos, progreso_anterior):
+        """Los UPDATE no disparan signals: se publican aquí los mismos eventos."""
+        for item, fila in validos.values():
+            if item.get('estado', fila['estado']) != fila['estado']:
+                eventos.publicar('tarea_estado', {
+                    'id': fila['id'],
+                    'empleado_id': fila['empleado_id'],
+                    'titulo': fila['titulo'],
+                    'desde': fila['estado'],
+                    'hacia': item['estado'],
+                })
+        progresos = Empleado.objects.filter(pk__in=progreso_anterior).values_list('id', 'progreso')
+        for empleado_id, progreso in progresos:
+            if progreso != progreso_anterior[empleado_id]:
+                eventos.publicar('empleado_progreso', {'id': empleado_id, 'progreso': progreso})
+
+
+class DocumentoAPIMixin(PermissionRequiredMixin):
+    model = Documento
+    permission_required = 'gestor.approve_documents'
+    campos = {
+        'id': 'id',
+        'empleado_id': 'empleado_id',
+        'tipo': 'tipo',
+        'nombre': 'nombre',
+        'archivo': 'archivo',
+        'estado': 'estado',
+        'obligatorio': 'obligatorio',
+        'revisado_por_id': 'revisado_por_id',
+        'fecha_revision': 'fecha_revision',
+        'comentarios': 'comentarios',
+        'fecha_subida': 'fecha_subida',
+        'fecha_actualizacion': 'fecha_actualizacion',
+    }
+
+
+class DocumentoListAPIView(DocumentoAPIMixin, RecursoListAPIView):
+    """GET /api/v1/documentos/ - filtros ``estado`` y ``empleado``."""
+    
+    orden = ('-fecha_subida', '-id')
+    
+    def filtrar(self, queryset):
+        estado = self.request.GET.get('estado')
+        if estado:
+            queryset = queryset.filter(estado=estado)
+        empleado = self.request.GET.get('empleado')
+        if empleado:
+            if not empleado.isdigit():
+                raise ErrorAPI('El parámetro empleado debe ser un id.')
+            queryset = queryset.filter(empleado_id=empleado)
+        return queryset
+
+
+class DocumentoDetailAPIView(DocumentoAPIMixin, RecursoDetailAPIView):
+    """GET /api/v1/documentos/<pk>/"""
+
+
+class DocumentoRevisionLoteAPIView(APIAuthMixin, PermissionRequiredMixin, View):
+    """
+    POST /api/v1/documentos/revision/ - registra decisiones de revisión en lote
+    y repone la cola del espacio de revisión.
+    
+    Cuerpo: ``{"decisiones": [{"id": 1, "estado": "aprobado", "comentarios": "..."}],
+    "reponer": 10, "excluir": [5, 6]}``. Las decisiones sobre documentos que ya
+    no están por revisar (otro revisor se adelantó) se informan y se omiten; el
+    resto se aplica con un UPDATE por estado que registra ``revisado_por`` y
+    ``fecha_revision``. ``siguientes`` trae hasta ``reponer`` documentos más de
+    la cola, sin los de ``excluir`` (los que el revisor ya tiene cargados).
+    """
+    
+    permission_required = 'gestor.approve_documents'
+    maximo_items = 500
+    maximo_reponer = 100
+    # Filas por UPDATE al guardar los comentarios (bulk_update)
+    tamano_lote = 500
+    
+    def post(self, request, *args, **kwargs):
+        try:
+            decisiones, reponer, excluir = self.leer_cuerpo(request)
+        except ErrorAPI as e:
+            return respuesta_json({'error': str(e)}, status=400)
+        
+        with transaction.atomic():
+            resultados, validos = self.validar(decisiones)
+            if validos:
+                self.aplicar(validos)
+        
+        siguientes = []
+        if reponer:
+            # Los que fallaron vuelven a la cola; los dejados en revisión, no
+            siguientes = [
+                revision.item_cola(documento)
+                for documento in revision.cola(reponer, excluir=excluir + list(validos))
+            ]
+        errores = sum(1 for resultado in resultados if not resultado['ok'])
+        return respuesta_json({
+            'aplicadas': len(resultados) - errores,
+            'errores': errores,
+            'resultados': resultados,
+            'siguientes': siguientes,
+        })
+    
+    def leer_cuerpo(self, request):
+        try:
+            cuerpo = json.loads(request.body)
+        except ValueError:
+            raise ErrorAPI('El cuerpo debe ser JSON.')
+        if not isinstance(cuerpo, dict):
+            raise ErrorAPI('Se esperaba un objeto JSON.')
+        decisiones = cuerpo.get('decisiones', [])
+        if not isinstance(decisiones, list):
+            raise ErrorAPI('"decisiones" debe ser una lista.')
+        if len(decisiones) > self.maximo_items:
+            raise ErrorAPI(f'Máximo {self.maximo_items} decisiones por lote.')
+        reponer = cuerpo.get('reponer', 0)
+        if not isinstance(reponer, int) or not 0 <= reponer <= self.maximo_reponer:
+            raise ErrorAPI(f'"reponer" debe ser un entero entre 0 y {self.maximo_reponer}.')
+        excluir = cuerpo.get('excluir', [])
+        if not isinstance(excluir, list) or not all(isinstance(pk, int) for pk in excluir):
+            raise ErrorAPI('"excluir" debe ser una lista de ids.')
+        return decisiones, reponer, excluir
+    
+    def validar(self, decisiones):
+        """
+        Valida todas las decisiones con una sola consulta (que bloquea las filas
+        hasta aplicar). Devuelve los resultados por ítem y ``{id: (item, fila)}``.
+        """
+        ids = [
+            item['id'] for item in decisiones
+            if isinstance(item, dict) and isinstance(item.get('id'), int)
+        ]
+        filas = {
+            fila['id']: fila
+            for fila in Documento.objects.select_for_update().filter(pk__in=ids)
+            .order_by().values('id', 'empleado_id', 'estado')
+        }
+        
+        resultados, validos = [], {}
+        for item in decisiones:
+            error = self.validar_item(item, filas, validos)
+            if error:
+                id_item = item.get('id') if isinstance(item, dict) else None
+                resultados.append({'id': id_item, 'ok': False, 'error': error})
+                continue
+            fila = filas[item['id']]
+            validos[item['id']] = (item, fila)
+            resultados.append({
+                'id': item['id'],
+                'ok': True,
+                'estado_anterior': fila['estado'],
+                'estado': item['estado'],
+            })
+        return resultados, validos
+    
+    def validar_item(self, item, filas, validos):
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            return 'Cada decisión necesita un "id" entero.'
+        if item['id'] in validos:
+            return 'Documento repetido en el lote.'
+        if item['id'] not in filas:
+            return 'Documento no encontrado.'
+        if item.get('estado') not in revision.ESTADOS_DECISION:
+            return f'Estado inválido: {item.get("estado")}.'
+        if filas[item['id']]['estado'] not in revision.ESTADOS_REVISABLES:
+            return 'El documento ya fue revisado.'
+        if item.get('comentarios') is not None and not isinstance(item['comentarios'], str):
+            return 'Los comentarios deben ser texto.'
+        return None
+    
+    def aplicar(self, validos):
+        ahora = timezone.now()
+        por_estado = {}
+        for id_documento, (item, _) in validos.items():
+            por_estado.setdefault(item['estado'], []).append(id_documento)
+        for estado, ids in por_estado.items():
+            Documento.objects.filter(pk__in=ids).update(
+                estado=estado,
+                revisado_por=self.request.user,
+                fecha_revision=ahora,
+                fecha_actualizacion=ahora,
+            )
+        
+        # Con la clave presente se escriben siempre: "" o null borran una nota vieja
+        comentarios = [
+            Documento(pk=id_documento, comentarios=item['comentarios'] or '')
+            for id_documento, (item, _) in validos.items() if 'comentarios' in item
+        ]
+        Documento.objects.bulk_update(comentarios, ['comentarios'], batch_size=self.tamano_lote)
+        
+        maquina_estados.reevaluar({fila['empleado_id'] for _, fila in validos.values()})
+        
+        # Los UPDATE no disparan signals: se publican aquí los mismos eventos
+        for item, fila in validos.values():
+            if item['estado'] != fila['estado']:
+                eventos.publicar('documento_estado', {
+                    'id': fila['id'],
+                    'empleado_id': fila['empleado_id'],
+                    'desde': fila['estado'],
+                    'hacia': item['estado'],
+                })
+
+
+class CompletitudAPIView(APIAuthMixin, PermissionRequiredMixin, View):
+    """
+    GET /api/v1/documentos/completitud/ - matriz de documentos requeridos por
+    empleado, con los filtros de la vista (``departamento``, ``puesto``,
+    ``estado``, ``tipo``, ``incompletos``) y paginación con ``pagina`` y
+    ``por_pagina``. Cada documento vale ``aprobado``, ``pendiente``,
+    ``rechazado``, ``faltante`` o ``null`` si el puesto no lo requiere.
+    """
+    
+    permission_required = 'gestor.approve_documents'
+    por_pagina = 200
+    maximo_por_pagina = 1000
+    
+    def get(self, request, *args, **kwargs):
+        form = FiltroCompletitudForm(request.GET)
+        try:
+            if not form.is_valid():
+                raise ErrorAPI(form.errors.as_text())
+            pagina, por_pagina = self.leer_paginacion(request)
+        except ErrorAPI as e:
+            return respuesta_json({'error': str(e)}, status=400)
+        
+        matriz = form.matriz()
+        tipos = matriz['tipos']
+        inicio = (pagina - 1) * por_pagina
+        filas = matriz['filas'][inicio:inicio + por_pagina]
+        return respuesta_json({
+            'tipos': tipos,
+            'resumen': matriz['resumen'],
+            'completos': matriz['completos'],
+            'total': len(matriz['filas']),
+            'pagina': pagina,
+            'siguiente': pagina + 1 if inicio + por_pagina < len(matriz['filas']) else None,
+            'resultados': [
+                {
+                    'empleado_id': pk,
+                    'nombre': nombre,
+                    'puesto': puesto,
+                    'completo': completitud.es_completa(celdas),
+                    'documentos': {
+                        tipo: completitud.NOMBRES_ESTADO.get(celda) for tipo, celda in zip(tipos, celdas)
+                    },
+                }
+                for pk, nombre, puesto, celdas in filas
+            ],
+        })
+    
+    def leer_paginacion(self, request):
+        try:
+            pagina = int(request.GET.get('pagina', 1))
+            por_pagina = int(request.GET.get('por_pagina', self.por_pagina))
+        except ValueError:
+            raise ErrorAPI('pagina y por_pagina deben ser enteros.')
+        if pagina < 1 or not 1 <= por_pagina <= self.maximo_por_pagina:
+            raise ErrorAPI(f'pagina >= 1 y por_pagina entre 1 y {self.maximo_por_pagina}.')
+        return pagina, por_pagina
+
+
+class EfectosAPIView(APIAuthMixin, UserPassesTestMixin, View):
+    """
+    GET /api/v1/efectos/ - por efecto diferido de los signals (progreso,
+    estado, cachés), cuántos se pidieron, se ejecutaron, se ahorraron por
+    repetidos dentro de una transacción y fallaron, desde el arranque del
+    proceso (ver ``gestor.efectos``). Solo staff.
+    """
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get(self, request, *args, **kwargs):
+        return respuesta_json({'efectos': efectos.contadores()})
+
+
+# ======================
+# Autocompletado
+# ======================
+
+class AutocompletarAPIView(PermissionRequiredMixin, RecursoListAPIView):
+    """
+    Opciones de los selects con autocompletado (``forms.AutocompletarSelect``).
+    
+    ``?q=`` filtra por prefijo: cada palabra debe ser el comienzo de alguno de
+    ``campos_busqueda``. Las páginas se recorren con el cursor sobre ``orden``,
+    que sigue un índice único, así que cada página cuesta lo mismo sin importar
+    cuántas filas haya.
+    
+    ``permission_required`` son los permisos de las vistas cuyos formularios
+    usan el select: basta con tener uno (vacío, basta con iniciar sesión).
+    ``texto`` arma la etiqueta de cada opción; las subclases la ajustan.
+    """
+    
+    campos_busqueda = ()
+    limite_por_defecto = 20
+    limite_maximo = 100
+    
+    def has_permission(self):
+        usuario = self.request.user
+        permisos = self.get_permission_required()
+        return not permisos or any(usuario.has_perm(permiso) for permiso in permisos)
+    
+    def get_campos(self):
+        return list(self.campos)
+    
+    def filtrar(self, queryset):
+        for palabra in self.request.GET.get('q', '').split()[:5]:
+            condicion = Q()
+            for campo in self.campos_busqueda:
+                condicion |= Q(**{f'{campo}__istartswith': palabra})
+            queryset = queryset.filter(condicion)
+        return queryset
+    
+    def texto(self, fila):
+        # Los campos visibles, sin el id
+        return ' '.join(str(valor) for campo, valor in fila.items() if campo != 'id' and valor)
+    
+    def responder(self, request, *args, **kwargs):
+        limite = self.get_limite()
+        pagina = self.filtrar(self.get_queryset()).order_by(*self.orden)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            pagina = pagina.filter(self.despues_de(self.decodificar_cursor(cursor)))
+        claves = [campo.lstrip('-') for campo in self.orden]
+        filas = list(self.serializar(pagina[:limite + 1], self.get_campos(), extra=claves))
+        
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            parametros = request.GET.copy()
+            parametros['cursor'] = self.codificar_cursor(filas[-1][0])
+            siguiente = request.build_absolute_uri(f'{request.path}?{parametros.urlencode()}')
+        return respuesta_json({
+            'next': siguiente,
+            'results': [dict(publica, texto=self.texto(publica)) for _, publica in filas],
+        })
+
+
+class UsuarioAutocompletarAPIView(AutocompletarAPIView):
+    """GET /api/v1/autocompletar/usuarios/ - usuarios activos (supervisor, responsable)."""
+    
+    model = User
+    # Solo lo que muestra el select: id y texto
+    campos = {
+        'id': 'id',
+        'username': 'username',
+        'nombre': 'first_name',
+        'apellido': 'last_name',
+    }
+    campos_busqueda = ('username', 'first_name', 'last_name')
+    orden = ('username',)
+    # Supervisor del empleado y responsable de una tarea
+    permission_required = (
+        'gestor.add_empleado', 'gestor.change_empleado',
+        'gestor.add_tareaonboarding', 'gestor.change_tareaonboarding',
+    )
+    
+    def get_queryset(self):
+        return User.objects.filter(is_active=True)
+    
+    def texto(self, fila):
+        nombre = f"{fila['nombre']} {fila['apellido']}".strip()
+        return f"{nombre} ({fila['username']})" if nombre else fila['username']
+
+
+class SupervisorAutocompletarAPIView(UsuarioAutocompletarAPIView):
+    """GET /api/v1/autocompletar/supervisores/ - usuarios con alguien a cargo (filtros)."""
+    
+    # El filtro de la lista de empleados, que solo pide iniciar sesión
+    permission_required = ()
+    
+    def get_queryset(self):
+        return User.objects.filter(Exists(Empleado.objects.filter(supervisor=OuterRef('pk'))))
+
+
+class PuestoAutocompletarAPIView(AutocompletarAPIView):
+    """GET /api/v1/autocompletar/puestos/ - puestos activos con su departamento."""
+    
+    model = Puesto
+    campos = {
+        'id': 'id',
+        'titulo': 'titulo',
+        'departamento_id': 'departamento_id',
+        'departamento': 'departamento__nombre',
+    }
+    campos_busqueda = ('titulo', 'departamento__nombre')
+    # Mismo orden que el índice único (titulo, departamento)
+    orden = ('titulo', 'departamento')
+    # El puesto del empleado
+    permission_required = ('gestor.add_empleado', 'gestor.change_empleado')
+    
+    def get_queryset(self):
+        return Puesto.objects.filter(activo=True)
+    
+    def texto(self, fila):
+        return f"{fila['titulo']} - {fila['departamento']}"
@@ -0,0 +1,231 @@
+"""
+Archivo de onboardings completados.
+
+Las tareas y los documentos de los empleados que llevan más de
+``GESTOR_MESES_ARCHIVO`` meses completados salen de las tablas que recorren los
+listados, el dashboard y el Kanban, y pasan a una fila por empleado en
+``ArchivoOnboarding`` (JSON comprimido). Se archiva por lotes de empleados, cada
+uno en su propia transacción; los borrados no disparan signals (no cambian el
+estado, el progreso ni los rollups de SLA, que ya contaron esas tareas).
+
+``leer`` descomprime el archivo de un empleado para mostrarlo a pedido y
+``restaurar`` devuelve sus filas a las tablas con los mismos ids.
+"""
+import calendar
+import json
+import zlib
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import agenda, completitud
+
+MESES_POR_DEFECTO = 12
+
+
+def meses_por_defecto():
+    return getattr(settings, 'GESTOR_MESES_ARCHIVO', MESES_POR_DEFECTO)
+
+
+def _restar_meses(fecha, meses):
+    mes = fecha.month - 1 - meses
+    anio, mes = fecha.year + mes // 12, mes % 12 + 1
+    return fecha.replace(year=anio, month=mes, day=min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+def candidatos(meses=None, hoy=None):
+    """
+    Empleados completados hace más de ``meses`` y aún sin archivar. La fecha de
+    completado es la del historial (la última transición a ``completado``) o,
+    para los que no tienen historial, la última actualización del empleado.
+    """
+    from .models import Empleado, RegistroTransicion
+    
+    meses = meses_por_defecto() if meses is None else meses
+    limite = timezone.make_aware(datetime.combine(
+        _restar_meses(hoy or timezone.localdate(), meses), time.min
+    ))
+    completado_el = (
+        RegistroTransicion.objects
+        .filter(entidad='empleado', objeto_id=OuterRef('pk'), hacia='completado')
+        .order_by('-fecha').values('fecha')[:1]
+    )
+    return (
+        Empleado.objects.filter(estado='completado', archivado=False)
+        .annotate(completado_el=Coalesce(Subquery(completado_el), F('fecha_actualizacion')))
+        .filter(completado_el__lt=limite)
+    )
+
+
+def _campos(modelo):
+    return [campo.attname for campo in modelo._meta.concrete_fields]
+
+
+def _comprimir(datos):
+    return zlib.compress(json.dumps(datos, cls=DjangoJSONEncoder, separators=(',', ':')).encode())
+
+
+def _archivar_lote(empleado_ids):
+    """Archiva ``empleado_ids`` (ya elegidos) en una transacción; devuelve los archivados."""
+    from .models import ArchivoOnboarding, DependenciaTarea, Documento, Empleado, TareaOnboarding
+    
+    with transaction.atomic():
+        # Se vuelve a comprobar con las filas bloqueadas: pudieron reabrirse
+        ids = list(
+            Empleado.objects.select_for_update()
+            .filter(pk__in=empleado_ids, estado='completado', archivado=False)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+        
+        datos = {pk: {'tareas': [], 'dependencias': [], 'documentos': []} for pk in ids}
+        tareas = TareaOnboarding.objects.filter(empleado_id__in=ids)
+        empleado_de = {}
+        for fila in tareas.order_by('empleado_id', 'orden', 'pk').values(*_campos(TareaOnboarding)):
+            datos[fila['empleado_id']]['tareas'].append(fila)
+            empleado_de[fila['id']] = fila['empleado_id']
+        dependencias = DependenciaTarea.objects.filter(tarea__empleado_id__in=ids)
+        for tarea_id, requisito_id in dependencias.order_by('pk').values_list('tarea_id', 'requisito_id'):
+            datos[empleado_de[tarea_id]]['dependencias'].append([tarea_id, requisito_id])
+        documentos = Documento.objects.filter(empleado_id__in=ids)
+        for fila in documentos.order_by('empleado_id', 'pk').values(*_campos(Documento)):
+            datos[fila['empleado_id']]['documentos'].append(fila)
+        
+        ArchivoOnboarding.objects.bulk_create([
+            ArchivoOnboarding(
+                empleado_id=pk,
+                datos=_comprimir(contenido),
+                total_tareas=len(contenido['tareas']),
+                total_documentos=len(contenido['documentos']),
+            )
+            for pk, contenido in datos.items()
+        ])
+        
+        # DELETE directos, sin cargar instancias ni disparar signals por fila.
+        # delete() no sirve: con receivers de post_delete carga cada fila y sus
+        # signals descontarían rollups de SLA y recalcularían progreso y estado.
+        # _raw_delete es seguro porque nada más apunta a estas filas: la única FK
+        # hacia las tareas es DependenciaTarea (se borra primero, en los dos
+        # sentidos) y ninguna hacia Documento, así que no hay cascadas omitidas.
+        DependenciaTarea.objects.filter(requisito__empleado_id__in=ids)._raw_delete(DependenciaTarea.objects.db)
+        dependencias._raw_delete(dependencias.db)
+        tareas._raw_delete(tareas.db)
+        documentos._raw_delete(documentos.db)
+        Empleado.objects.filter(pk__in=ids).update(archivado=True)
+    
+    # Fuera del bloque: las cachés se renuevan con el lote ya confirmado
+    completitud.invalidar()
+    agenda.invalidar()
+    return len(ids)
+
+
+def archivar(meses=None, lote=200, hoy=None, simular=False):
+    """
+    Archiva los candidatos por lotes de ``lote`` empleados, cada lote en su
+    propia transacción. Devuelve cuántos empleados se archivaron (o, con
+    ``simular``, cuántos se archivarían).
+    """
+    pendientes = candidatos(meses, hoy)
+    if simular:
+        return pendientes.count()
+    
+    archivados = 0
+    ultimo = 0
+    while True:
+        ids = list(
+            pendientes.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            return archivados
+        ultimo = ids[-1]
+        archivados += _archivar_lote(ids)
+
+
+def _descomprimir(archivo):
+    return json.loads(zlib.decompress(bytes(archivo.datos)))
+
+
+def _convertir(modelo, fila):
+    """Devuelve los valores de ``fila`` (JSON) a tipos de Python (fechas, etc.)."""
+    return {
+        campo.attname: campo.to_python(fila[campo.attname])
+        for campo in modelo._meta.concrete_fields if campo.attname in fila
+    }
+
+
+def leer(empleado):
+    """
+    Tareas y documentos archivados de ``empleado`` (``None`` si no tiene archivo),
+    como diccionarios listos para la plantilla.
+    """
+    from .models import ArchivoOnboarding, Documento, TareaOnboarding
+    
+    archivo = ArchivoOnboarding.objects.filter(empleado=empleado).first()
+    if archivo is None:
+        return None
+    
+    datos = _descomprimir(archivo)
+    estados_tarea = dict(TareaOnboarding.ESTADO_CHOICES)
+    responsables = dict(TareaOnboarding.RESPONSABLE_CHOICES)
+    tareas = []
+    for fila in datos['tareas']:
+        tarea = _convertir(TareaOnboarding, fila)
+        tarea['estado_display'] = estados_tarea.get(tarea['estado'], tarea['estado'])
+        tarea['responsable_display'] = responsables.get(tarea['responsable'], tarea['responsable'])
+        tareas.append(tarea)
+    estados_documento = dict(Documento.ESTADO_CHOICES)
+    tipos = dict(Documento.TIPO_CHOICES)
+    documentos = []
+    for fila in datos['documentos']:
+        documento = _convertir(Documento, fila)
+        documento['estado_display'] = estados_documento.get(documento['estado'], documento['estado'])
+        documento['tipo_display'] = tipos.get(documento['tipo'], documento['tipo'])
+        documento['url'] = default_storage.url(documento['archivo']) if documento['archivo'] else ''
+        documentos.append(documento)
+    return {
+        'fecha_archivo': archivo.fecha_archivo,
+        'total_tareas': archivo.total_tareas,
+        'total_documentos': archivo.total_documentos,
+        'tareas': tareas,
+        'documentos': documentos,
+    }
+
+
+def restaurar(empleado_ids):
+    """
+    Devuelve a sus tablas (con los mismos ids) las tareas, dependencias y
+    documentos archivados de ``empleado_ids``. Devuelve cuántos se restauraron.
+    """
+    from .models import ArchivoOnboarding, DependenciaTarea, Documento, Empleado, TareaOnboarding
+    
+    with transaction.atomic():
+        archivos = list(
+            ArchivoOnboarding.objects.select_for_update().filter(empleado_id__in=list(empleado_ids))
+        )
+        tareas, dependencias, documentos = [], [], []
+        for archivo in archivos:
+            datos = _descomprimir(archivo)
+            tareas += [TareaOnboarding(**_convertir(TareaOnboarding, fila)) for fila in datos['tareas']]
+            dependencias += [
+                DependenciaTarea(tarea_id=tarea_id, requisito_id=requisito_id)
+                for tarea_id, requisito_id in datos['dependencias']
+            ]
+            documentos += [Documento(**_convertir(Documento, fila)) for fila in datos['documentos']]
+        TareaOnboarding.objects.bulk_create(tareas, batch_size=500)
+        DependenciaTarea.objects.bulk_create(dependencias, batch_size=500)
+        Documento.objects.bulk_create(documentos, batch_size=500)
+        
+        ids = [archivo.empleado_id for archivo in archivos]
+        ArchivoOnboarding.objects.filter(empleado_id__in=ids).delete()
+        Empleado.objects.filter(pk__in=ids).update(archivado=False)
+    
+    completitud.invalidar()
+    agenda.invalidar()
+    return len(archivos)
@@ -0,0 +1,127 @@
+"""
+Asignación automática de ``responsable_usuario`` al miembro menos cargado.
+
+Cada área de responsable (``TareaOnboarding.responsable``) la atienden los
+usuarios activos de un grupo (``GESTOR_ASIGNACION_AREAS``, con los grupos de
+``setup_groups``). ``Asignador`` trae los miembros de esos grupos con una
+consulta y su carga (tareas abiertas asignadas) con otra, agrupada; después
+cada tarea va al miembro con menos tareas abiertas, sacado de un heap por
+grupo y sin volver a la base, así que asignar miles de tareas es un solo
+recorrido de O(n log k) (k, los miembros del grupo).
+
+Un usuario puede estar en varios grupos: su carga es una sola y la comparten
+los heaps; las entradas que quedaron viejas se corrigen al sacarlas. A igual
+carga se reparte por turnos. Las tareas del empleado y de su supervisor no se
+asignan: ya tienen dueño.
+"""
+import heapq
+from collections import Counter
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+
+class Asignador:
+    """Reparte tareas entre los miembros del grupo de cada área, según su carga."""
+    
+    def __init__(self, areas=None, using=None):
+        from .avisos import ESTADOS_ABIERTOS
+        from .models import TareaOnboarding
+        
+        self.areas = dict(getattr(settings, 'GESTOR_ASIGNACION_AREAS', {}) if areas is None else areas)
+        self.turno = count()
+        self.carga = Counter()
+        self.heaps = {}
+        
+        miembros = {}
+        for grupo, usuario_id in (
+            User.objects.db_manager(using)
+            .filter(groups__name__in=set(self.areas.values()), is_active=True)
+            .order_by('pk').values_list('groups__name', 'pk')
+        ):
+            miembros.setdefault(grupo, []).append(usuario_id)
+        if not miembros:
+            return
+        
+        self.carga.update(dict(
+            TareaOnboarding.objects.db_manager(using).filter(
+                estado__in=ESTADOS_ABIERTOS,
+                responsable_usuario__in={pk for pks in miembros.values() for pk in pks},
+            ).order_by().values_list('responsable_usuario').annotate(total=Count('pk'))
+        ))
+        for grupo, pks in miembros.items():
+            heap = [(self.carga[pk], next(self.turno), pk) for pk in pks]
+            heapq.heapify(heap)
+            self.heaps[grupo] = heap
+    
+    def atiende(self, area):
+        return bool(self.heaps.get(self.areas.get(area)))
+    
+    def elegir(self, area):
+        """
+        El id del miembro menos cargado del grupo de ``area`` (``None`` si el
+        área no tiene grupo o está vacío), con la nueva tarea ya sumada.
+        """
+        heap = self.heaps.get(self.areas.get(area))
+        while heap:
+            carga, _, pk = heapq.heappop(heap)
+            if carga != self.carga[pk]:
+                # Otro grupo le asignó tareas mientras tanto: vuelve con su carga real
+                heapq.heappush(heap, (self.carga[pk], next(self.turno), pk))
+                continue
+            self.carga[pk] += 1
+            heapq.heappush(heap, (carga + 1, next(self.turno), pk))
+            return pk
+        return None
+    
+    def asignar(self, tareas):
+        """
+        Completa ``responsable_usuario_id`` en las ``tareas`` (instancias,
+        guardadas o no, p. ej. antes de un ``bulk_create``) que no lo tienen.
+        Devuelve cuántas asignó; guardarlas queda a cargo de quien llama.
+        """
+        asignadas = 0
+        for tarea in tareas:
+            if tarea.responsable_usuario_id is None:
+                tarea.responsable_usuario_id = self.elegir(tarea.responsable)
+                asignadas += tarea.responsable_usuario_id is not None
+        return asignadas
+
+
+def asignar_sin_responsable(lote=2000, simular=False):
+    """
+    Asigna las tareas abiertas sin persona responsable de las áreas con grupo,
+    las de fecha límite más próxima primero. Devuelve un ``Counter``
+    ``{usuario_id: tareas asignadas}``.
+    
+    Un recorrido de las tareas y un UPDATE por miembro (y por tramo de
+    ``lote`` ids), todo en una transacción. Con ``simular`` no escribe.
+    """
+    from .avisos import ESTADOS_ABIERTOS
+    from .models import TareaOnboarding
+    
+    asignador = Asignador()
+    areas = [area for area in asignador.areas if asignador.atiende(area)]
+    por_usuario = {}
+    tareas = (
+        TareaOnboarding.objects.filter(
+            estado__in=ESTADOS_ABIERTOS, responsable_usuario__isnull=True, responsable__in=areas,
+        )
+        .order_by('fecha_limite', 'pk').values_list('pk', 'responsable')
+    )
+    for pk, area in tareas.iterator(chunk_size=lote):
+        por_usuario.setdefault(asignador.elegir(area), []).append(pk)
+    
+    if not simular:
+        ahora = timezone.now()
+        with transaction.atomic():
+            for usuario_id, ids in por_usuario.items():
+                for inicio in range(0, len(ids), lote):
+                    TareaOnboarding.objects.filter(pk__in=ids[inicio:inicio + lote]).update(
+                        responsable_usuario_id=usuario_id, fecha_actualizacion=ahora,
+                    )
+    return Counter({usuario_id: len(ids) for usuario_id, ids in por_usuario.items()})
@@ -0,0 +1,207 @@
+"""
+Avisos de tareas de onboarding vencidas o próximas a vencer.
+
+``escanear`` recorre las tareas abiertas con fecha límite dentro de la ventana
+(con el índice ``estado, aviso_vencimiento, fecha_limite``), las agrupa por destinatario
+y envía un único correo resumen a cada uno. Cada tarea recuerda en
+``aviso_vencimiento`` el último aviso enviado, así que volver a ejecutar el
+escaneo no repite avisos: una tarea se avisa una vez al entrar en la ventana
+y otra al vencer.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TareaOnboarding
+
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_ABIERTOS = ('pendiente', 'en_progreso', 'bloqueado')
+
+CAMPOS = (
+    'id', 'titulo', 'fecha_limite', 'prioridad', 'responsable',
+    'responsable_usuario_id', 'empleado__usuario_id', 'empleado__supervisor_id',
+    'empleado__usuario__first_name', 'empleado__usuario__last_name',
+    'empleado__usuario__username',
+)
+
+
+@dataclass
+class Resumen:
+    """Tareas a avisar a un destinatario, separadas por nivel de aviso."""
+    
+    vencidas: list = field(default_factory=list)
+    proximas: list = field(default_factory=list)
+    
+    @property
+    def total(self):
+        return len(self.vencidas) + len(self.proximas)
+
+
+@dataclass
+class Resultado:
+    tareas: int = 0
+    resumenes_enviados: int = 0
+    tareas_avisadas: int = 0
+    sin_destinatario: int = 0
+    errores: int = 0
+    segundos_escaneo: float = 0.0
+    segundos_total: float = 0.0
+
+
+def tareas_pendientes_de_aviso(hoy, dias):
+    """
+    Tareas abiertas vencidas o que vencen en los próximos ``dias`` días y que
+    todavía no recibieron el aviso correspondiente a su situación.
+    """
+    # Dos rangos del índice: sin aviso dentro de la ventana, y avisadas como
+    # próximas que ya vencieron. Las ya avisadas como vencidas no se recorren.
+    return TareaOnboarding.objects.filter(
+        Q(aviso_vencimiento='', fecha_limite__lte=hoy + timedelta(days=dias)) |
+        Q(aviso_vencimiento='proxima', fecha_limite__lt=hoy),
+        estado__in=ESTADOS_ABIERTOS,
+    ).order_by()
+
+
+def clave_destinatario(tarea):
+    """
+    ``('usuario', id)`` si la tarea tiene una persona responsable, o
+    ``('area', responsable)`` para avisar al grupo del área.
+    """
+    if tarea['responsable_usuario_id']:
+        return ('usuario', tarea['responsable_usuario_id'])
+    if tarea['responsable'] == 'empleado':
+        return ('usuario', tarea['empleado__usuario_id'])
+    if tarea['responsable'] == 'supervisor' and tarea['empleado__supervisor_id']:
+        return ('usuario', tarea['empleado__supervisor_id'])
+    return ('area', tarea['responsable'])
+
+
+def resolver_correos(claves):
+    """Correos de cada destinatario (a lo sumo una consulta por tipo de clave)."""
+    usuarios = [valor for tipo, valor in claves if tipo == 'usuario']
+    correos = {
+        ('usuario', pk): [email]
+        for pk, email in User.objects.filter(pk__in=usuarios, is_active=True)
+        .exclude(email='').values_list('pk', 'email')
+    }
+    
+    grupos = getattr(settings, 'GESTOR_AVISOS_AREAS', {})
+    areas = {valor: grupos.get(valor) for tipo, valor in claves if tipo == 'area'}
+    if areas:
+        por_grupo = {}
+        for grupo, email in (
+            User.objects.filter(groups__name__in=set(areas.values()), is_active=True)
+            .exclude(email='').values_list('groups__name', 'email')
+        ):
+            por_grupo.setdefault(grupo, []).append(email)
+        for area, grupo in areas.items():
+            if por_grupo.get(grupo):
+                correos[('area', area)] = sorted(set(por_grupo[grupo]))
+    return correos
+
+
+def redactar(resumen, hoy):
+    """Asunto y cuerpo del correo resumen."""
+    asunto = (
+        f'Tareas de onboarding: {len(resumen.vencidas)} vencidas, '
+        f'{len(resumen.proximas)} por vencer'
+    )
+    lineas = [f'Resumen de tareas de onboarding al {hoy.strftime("%d/%m/%Y")}.', '']
+    for titulo, tareas in (('Vencidas', resumen.vencidas), ('Próximas a vencer', resumen.proximas)):
+        if not tareas:
+            continue
+        lineas.append(f'{titulo} ({len(tareas)}):')
+        for tarea in sorted(tareas, key=lambda t: t['fecha_limite']):
+            empleado = (
+                f"{tarea['empleado__usuario__first_name']} {tarea['empleado__usuario__last_name']}".strip()
+                or tarea['empleado__usuario__username']
+            )
+            lineas.append(
+                f"  - {tarea['fecha_limite'].strftime('%d/%m/%Y')}  {tarea['titulo']} "
+                f"({empleado}, prioridad {tarea['prioridad']})"
+            )
+        lineas.append('')
+    lineas.append('Equipo de Recursos Humanos')
+    lineas.append('Rivcon')
+    return asunto, '\n'.join(lineas)
+
+
+def escanear(hoy=None, dias=2, enviar=True, lote=2000):
+    """
+    Busca las tareas a avisar y envía un resumen por destinatario.
+    
+    Con ``enviar=False`` solo cuenta (no envía ni marca nada). Solo se marcan
+    las tareas de los resúmenes enviados: si un envío falla, sus tareas se
+    reintentan en la próxima ejecución.
+    """
+    hoy = hoy or timezone.localdate()
+    resultado = Resultado()
+    inicio = time.perf_counter()
+    
+    resumenes = {}
+    for tarea in tareas_pendientes_de_aviso(hoy, dias).values(*CAMPOS).iterator(chunk_size=lote):
+        resumen = resumenes.setdefault(clave_destinatario(tarea), Resumen())
+        if tarea['fecha_limite'] < hoy:
+            resumen.vencidas.append(tarea)
+        else:
+            resumen.proximas.append(tarea)
+        resultado.tareas += 1
+    resultado.segundos_escaneo = time.perf_counter() - inicio
+    
+    correos = resolver_correos(resumenes)
+    avisadas = {'vencida': [], 'proxima': []}
+    
+    def marcar(minimo=1):
+        for nivel, ids in avisadas.items():
+            if len(ids) >= minimo:
+                TareaOnboarding.objects.filter(pk__in=ids).update(aviso_vencimiento=nivel)
+                resultado.tareas_avisadas += len(ids)
+                ids.clear()
+    
+    conexion = mail.get_connection() if enviar else None
+    if conexion:
+        # Una sola conexión SMTP para todos los resúmenes
+        conexion.open()
+    try:
+        for clave, resumen in resumenes.items():
+            if clave not in correos:
+                resultado.sin_destinatario += resumen.total
+                continue
+            if not enviar:
+                resultado.resumenes_enviados += 1
+                continue
+            
+            asunto, cuerpo = redactar(resumen, hoy)
+            try:
+                mail.EmailMessage(
+                    asunto, cuerpo, settings.DEFAULT_FROM_EMAIL, correos[clave],
+                    connection=conexion,
+                ).send()
+            except Exception:
+                logger.exception('No se pudo enviar el resumen de vencimientos a %s', correos[clave])
+                resultado.errores += 1
+                continue
+            
+            avisadas['vencida'].extend(tarea['id'] for tarea in resumen.vencidas)
+            avisadas['proxima'].extend(tarea['id'] for tarea in resumen.proximas)
+            resultado.resumenes_enviados += 1
+            # Se marca por lotes: un UPDATE por resumen sería demasiado con
+            # miles de destinatarios
+            marcar(minimo=lote)
+    finally:
+        # Incluso si algo falla a mitad, lo ya enviado queda marcado
+        marcar()
+        if conexion:
+            conexion.close()
+    
+    resultado.segundos_total = time.perf_counter() - inicio
+    return resultado
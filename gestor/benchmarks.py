@@ -0,0 +1,1574 @@
+"""
+Escenarios de benchmark del sistema de onboarding.
+
+Cada escenario se ejecuta sobre una base de datos desechable (creada igual que
+la de los tests) para no tocar los datos reales. Se invocan con:
+
+    python manage.py benchmark <escenario> [opciones]
+"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import types
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import Count
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import path
+
+from .models import Departamento, Empleado, Puesto, TareaOnboarding
+
+
+ESCENARIOS = {}
+
+
+def escenario(nombre, descripcion, argumentos=()):
+    """
+    Registra una función como escenario de benchmark.
+    
+    ``argumentos`` es una lista de tuplas ``(flag, kwargs)`` que se pasan a
+    ``add_argument`` del subcomando correspondiente.
+    """
+    def decorador(funcion):
+        ESCENARIOS[nombre] = {
+            'funcion': funcion,
+            'descripcion': descripcion,
+            'argumentos': argumentos,
+        }
+        return funcion
+    return decorador
+
+
+# ======================
+# Utilidades
+# ======================
+
+@contextmanager
+def base_de_datos_temporal(sqlite_por_defecto=False):
+    """
+    Crea una base de datos de pruebas y la destruye al salir.
+    
+    En SQLite se usa un archivo temporal (no ``:memory:``) para que WAL, los
+    locks y el acceso desde varios hilos se comporten como en producción.
+    Con ``sqlite_por_defecto`` se descartan las OPTIONS (pragmas y modo de
+    transacción) para poder comparar contra la configuración de fábrica.
+    """
+    settings_dict = connection.settings_dict
+    test_settings = settings_dict.setdefault('TEST', {})
+    nombre_test_anterior = test_settings.get('NAME')
+    opciones_anteriores = settings_dict.get('OPTIONS', {})
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(directorio, 'benchmark.sqlite3')
+            if sqlite_por_defecto:
+                connection.close()
+                settings_dict['OPTIONS'] = {}
+        nombre_original = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            test_settings['NAME'] = nombre_test_anterior
+            settings_dict['OPTIONS'] = opciones_anteriores
+
+
+def poblar(empleados=100, tareas_por_empleado=10, departamentos=5, lote=2000):
+    """
+    Genera datos sintéticos con ``bulk_create`` (sin disparar signals).
+    
+    Devuelve la lista de ids de empleados creados.
+    """
+    hoy = date.today()
+    deptos = Departamento.objects.bulk_create([
+        Departamento(nombre=f'Departamento {i}') for i in range(departamentos)
+    ])
+    niveles = [nivel for nivel, _ in Puesto.NIVEL_CHOICES]
+    puestos = Puesto.objects.bulk_create([
+        Puesto(
+            titulo=f'Puesto {i}',
+            departamento=deptos[i % len(deptos)],
+            nivel=niveles[i % len(niveles)],
+        )
+        for i in range(departamentos * 4)
+    ])
+    
+    inicio = User.objects.count()
+    User.objects.bulk_create(
+        [
+            User(username=f'bench{inicio + i}', first_name='Bench', last_name=str(i))
+            for i in range(empleados)
+        ],
+        batch_size=lote,
+    )
+    usuarios = list(
+        User.objects.filter(username__startswith='bench')
+        .order_by('-id')
+        .values_list('id', flat=True)[:empleados]
+    )
+    
+    estados = [estado for estado, _ in Empleado.ESTADO_CHOICES]
+    Empleado.objects.bulk_create(
+        [
+            Empleado(
+                usuario_id=usuario_id,
+                cedula=f'B{usuario_id:010d}',
+                telefono='000',
+                fecha_nacimiento=date(1990, 1, 1),
+                fecha_ingreso=hoy + timedelta(days=random.randint(-120, 60)),
+                puesto=puestos[i % len(puestos)],
+                estado=estados[i % 3],
+            )
+            for i, usuario_id in enumerate(usuarios)
+        ],
+        batch_size=lote,
+    )
+    ids = list(
+        Empleado.objects.filter(usuario_id__in=usuarios).values_list('id', flat=True)
+    )
+    
+    responsables = [r for r, _ in TareaOnboarding.RESPONSABLE_CHOICES]
+    estados_tarea = ['pendiente', 'en_progreso', 'completado']
+    buffer = []
+    for empleado_id in ids:
+        for orden in range(tareas_por_empleado):
+            buffer.append(TareaOnboarding(
+                empleado_id=empleado_id,
+                titulo=f'Tarea {orden}',
+                descripcion='Tarea generada para benchmark',
+                responsable=responsables[orden % len(responsables)],
+                fecha_limite=hoy + timedelta(days=random.randint(-30, 30)),
+                estado=random.choice(estados_tarea),
+                orden=orden,
+            ))
+            if len(buffer) >= lote:
+                TareaOnboarding.objects.bulk_create(buffer)
+                buffer = []
+    if buffer:
+        TareaOnboarding.objects.bulk_create(buffer)
+    return ids
+
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) por el método del rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumen_latencias(latencias):
+    """Resume una lista de latencias (en segundos) en milisegundos."""
+    if not latencias:
+        return 'sin muestras'
+    return 'p50={:.1f}ms p95={:.1f}ms max={:.1f}ms'.format(
+        statistics.median(latencias) * 1000,
+        percentil(latencias, 95) * 1000,
+        max(latencias) * 1000,
+    )
+
+
+# ======================
+# Escenarios
+# ======================
+
+@escenario(
+    'contencion',
+    'Escrituras y lecturas concurrentes sobre tareas (contención de la base de datos).',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 200}),
+        ('--hilos-escritura', {'type': int, 'default': 4}),
+        ('--hilos-lectura', {'type': int, 'default': 4}),
+        ('--segundos', {'type': float, 'default': 5.0}),
+        ('--sqlite-por-defecto', {
+            'action': 'store_true',
+            'help': 'Usa SQLite sin pragmas ni BEGIN IMMEDIATE para comparar.',
+        }),
+    ],
+)
+def contencion(escribir, empleados, hilos_escritura, hilos_lectura, segundos,
+               sqlite_por_defecto):
+    """
+    Reproduce la carga de ``TareaUpdateView`` (leer la tarea, cambiarla y
+    guardarla, con el recálculo de progreso del signal) en paralelo con la
+    carga de lectura del dashboard.
+    """
+    with base_de_datos_temporal(sqlite_por_defecto=sqlite_por_defecto):
+        poblar(empleados=empleados)
+        tarea_ids = list(TareaOnboarding.objects.values_list('id', flat=True))
+        
+        alias = connection.alias
+        vendor = connection.vendor
+        fin = time.perf_counter() + segundos
+        barrera = threading.Barrier(hilos_escritura + hilos_lectura)
+        resultados = {'escritura': [], 'lectura': [], 'errores': []}
+        lock = threading.Lock()
+        
+        def escritor():
+            latencias, errores = [], []
+            barrera.wait()
+            while time.perf_counter() < fin:
+                t0 = time.perf_counter()
+                try:
+                    with transaction.atomic(using=alias):
+                        tarea = TareaOnboarding.objects.get(pk=random.choice(tarea_ids))
+                        tarea.estado = random.choice(['pendiente', 'en_progreso', 'completado'])
+                        tarea.notas = f'benchmark {t0}'
+                        tarea.save()
+                    latencias.append(time.perf_counter() - t0)
+                except Exception as e:
+                    errores.append(str(e))
+            connections[alias].close()
+            with lock:
+                resultados['escritura'].extend(latencias)
+                resultados['errores'].extend(errores)
+        
+        def lector():
+            latencias, errores = [], []
+            barrera.wait()
+            while time.perf_counter() < fin:
+                t0 = time.perf_counter()
+                try:
+                    Empleado.objects.count()
+                    TareaOnboarding.objects.filter(
+                        estado__in=['pendiente', 'en_progreso']
+                    ).count()
+                    list(Empleado.objects.values('estado').annotate(total=Count('id')))
+                    latencias.append(time.perf_counter() - t0)
+                except Exception as e:
+                    errores.append(str(e))
+            connections[alias].close()
+            with lock:
+                resultados['lectura'].extend(latencias)
+                resultados['errores'].extend(errores)
+        
+        hilos = (
+            [threading.Thread(target=escritor) for _ in range(hilos_escritura)]
+            + [threading.Thread(target=lector) for _ in range(hilos_lectura)]
+        )
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        close_old_connections()
+        
+        if vendor == 'sqlite':
+            perfil = 'sqlite (por defecto)' if sqlite_por_defecto else 'sqlite (WAL + pragmas)'
+        else:
+            perfil = vendor
+        escribir(f'Backend: {perfil}')
+        escribir(f'Hilos: {hilos_escritura} escritura / {hilos_lectura} lectura, {segundos:.1f}s')
+        escribir('Escrituras: {} ({:.0f}/s) {}'.format(
+            len(resultados['escritura']),
+            len(resultados['escritura']) / segundos,
+            resumen_latencias(resultados['escritura']),
+        ))
+        escribir('Lecturas:   {} ({:.0f}/s) {}'.format(
+            len(resultados['lectura']),
+            len(resultados['lectura']) / segundos,
+            resumen_latencias(resultados['lectura']),
+        ))
+        bloqueos = sum('locked' in e for e in resultados['errores'])
+        escribir(f'Errores: {len(resultados["errores"])} (database is locked: {bloqueos})')
+
+
+@escenario(
+    'asgi',
+    'Latencia y peticiones/s de dashboard, kanban y detalle: vistas WSGI vs ASGI.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 500}),
+        ('--clientes', {'type': int, 'default': 8}),
+        ('--peticiones', {'type': int, 'default': 20, 'help': 'Peticiones por cliente.'}),
+    ],
+)
+def asgi(escribir, empleados, clientes, peticiones):
+    """
+    Compara las vistas síncronas servidas por el handler WSGI (un hilo por
+    cliente) con sus variantes async servidas por el handler ASGI (clientes
+    concurrentes en un event loop).
+    """
+    from RivconRRHH import urls as urls_proyecto
+    from . import views
+    
+    # URLconf con ambas variantes publicadas a la vez
+    urlconf = types.ModuleType('benchmark_urls')
+    urlconf.urlpatterns = list(urls_proyecto.urlpatterns) + [
+        path('bench/sync/', views.DashboardView.as_view()),
+        path('bench/sync/kanban/', views.KanbanView.as_view()),
+        path('bench/sync/empleados/<int:pk>/', views.EmpleadoDetailView.as_view()),
+        path('bench/async/', views.DashboardAsyncView.as_view()),
+        path('bench/async/kanban/', views.KanbanAsyncView.as_view()),
+        path('bench/async/empleados/<int:pk>/', views.EmpleadoDetailAsyncView.as_view()),
+    ]
+    
+    with base_de_datos_temporal(), override_settings(
+        ROOT_URLCONF=urlconf, ALLOWED_HOSTS=['testserver']
+    ):
+        ids = poblar(empleados=empleados)
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        rutas = ['', 'kanban/'] + [f'empleados/{pk}/' for pk in ids[:20]]
+        
+        def medir_wsgi():
+            latencias, lock = [], threading.Lock()
+            
+            def cliente(indice):
+                client = Client()
+                client.force_login(usuario)
+                propias = []
+                for i in range(peticiones):
+                    ruta = rutas[(indice + i) % len(rutas)]
+                    t0 = time.perf_counter()
+                    respuesta = client.get(f'/bench/sync/{ruta}')
+                    propias.append(time.perf_counter() - t0)
+                    assert respuesta.status_code == 200, respuesta.status_code
+                close_old_connections()
+                with lock:
+                    latencias.extend(propias)
+            
+            hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+            t0 = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            return latencias, time.perf_counter() - t0
+        
+        async def medir_asgi():
+            latencias = []
+            
+            async def cliente(indice):
+                client = AsyncClient()
+                await client.aforce_login(usuario)
+                for i in range(peticiones):
+                    ruta = rutas[(indice + i) % len(rutas)]
+                    t0 = time.perf_counter()
+                    respuesta = await client.get(f'/bench/async/{ruta}')
+                    latencias.append(time.perf_counter() - t0)
+                    assert respuesta.status_code == 200, respuesta.status_code
+            
+            t0 = time.perf_counter()
+            await asyncio.gather(*(cliente(i) for i in range(clientes)))
+            return latencias, time.perf_counter() - t0
+        
+        escribir(f'{clientes} clientes x {peticiones} peticiones, {empleados} empleados')
+        for nombre, medir in (('WSGI', medir_wsgi), ('ASGI', lambda: asyncio.run(medir_asgi()))):
+            latencias, duracion = medir()
+            escribir('{}: {:.0f} req/s {}'.format(
+                nombre, len(latencias) / duracion, resumen_latencias(latencias)
+            ))
+
+
+@escenario(
+    'lote_tareas',
+    'Actualización masiva de tareas vía POST /api/v1/tareas/lote/.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 200}),
+        ('--items', {'type': int, 'default': 500, 'help': 'Tareas por lote.'}),
+        ('--repeticiones', {'type': int, 'default': 10}),
+    ],
+)
+def lote_tareas(escribir, empleados, items, repeticiones):
+    """
+    Mide la latencia del endpoint de lote y cuántas consultas ejecuta, frente
+    al equivalente de un POST a ``TareaUpdateView`` por tarea.
+    """
+    import json
+    
+    from django.db import reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    
+    with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+        poblar(empleados=empleados)
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        client = Client()
+        client.force_login(usuario)
+        ids = list(TareaOnboarding.objects.values_list('id', flat=True))
+        url = reverse('gestor:api_tarea_lote')
+        estados = ['pendiente', 'en_progreso', 'completado']
+        
+        latencias, consultas = [], []
+        for repeticion in range(repeticiones):
+            muestra = random.sample(ids, min(items, len(ids)))
+            cuerpo = json.dumps({'tareas': [
+                {'id': pk, 'estado': estados[(pk + repeticion) % 3], 'notas': f'lote {repeticion}'}
+                for pk in muestra
+            ]})
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                respuesta = client.post(url, cuerpo, content_type='application/json')
+                latencias.append(time.perf_counter() - t0)
+            assert respuesta.status_code == 200, respuesta.content
+            assert respuesta.json()['errores'] == 0, respuesta.json()
+            consultas.append(len(capturadas))
+            reset_queries()
+        
+        escribir(f'{repeticiones} lotes de {items} tareas, {empleados} empleados')
+        escribir(f'Lote: {resumen_latencias(latencias)}')
+        escribir(f'Consultas por lote: {statistics.median(consultas):.0f}')
+        
+        # Referencia: el mismo trabajo tarea por tarea, como TareaUpdateView
+        tareas = list(TareaOnboarding.objects.filter(pk__in=ids[:items]))
+        t0 = time.perf_counter()
+        with CaptureQueriesContext(connection) as capturadas:
+            for tarea in tareas:
+                tarea.estado = 'completado'
+                tarea.save()
+        escribir('Uno a uno: {:.0f} ms, {} consultas'.format(
+            (time.perf_counter() - t0) * 1000, len(capturadas)
+        ))
+
+
+@escenario(
+    'tareas_vencidas',
+    'Escaneo de tareas vencidas y envío de resúmenes (scan_tareas_vencidas).',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 100000,
+                         'help': 'Con 10 tareas por empleado, 100000 = 1M de tareas.'}),
+        ('--dias', {'type': int, 'default': 2}),
+    ],
+)
+def tareas_vencidas(escribir, empleados, dias):
+    """
+    Mide el escaneo sobre una tabla grande, muestra el plan de la consulta
+    (debe usar ``tarea_estado_limite_idx``) y comprueba que una segunda
+    ejecución no vuelve a avisar.
+    """
+    from django.contrib.auth.models import Group
+    from django.core import mail
+    from django.db.models import F, Value
+    from django.db.models.functions import Concat
+    
+    from .avisos import CAMPOS, escanear, tareas_pendientes_de_aviso
+    
+    with base_de_datos_temporal(), override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    ):
+        t0 = time.perf_counter()
+        poblar(empleados=empleados, lote=5000)
+        User.objects.update(email=Concat(F('username'), Value('@bench.rivcon.com')))
+        for nombre in set(settings.GESTOR_AVISOS_AREAS.values()):
+            usuario = User.objects.create(username=f'grupo-{nombre}', email=f'{nombre}@rivcon.com')
+            usuario.groups.add(Group.objects.create(name=nombre))
+        total = TareaOnboarding.objects.count()
+        escribir(f'{total} tareas generadas en {time.perf_counter() - t0:.1f}s')
+        
+        hoy = date.today()
+        plan = tareas_pendientes_de_aviso(hoy, dias).values(*CAMPOS).explain()
+        escribir('Plan:\n  ' + plan.replace('\n', '\n  '))
+        
+        for ejecucion in ('Primera', 'Segunda'):
+            mail.outbox = []
+            resultado = escanear(hoy=hoy, dias=dias)
+            escribir(
+                f'{ejecucion} ejecución: {resultado.tareas} tareas, escaneo '
+                f'{resultado.segundos_escaneo * 1000:.0f} ms, total '
+                f'{resultado.segundos_total * 1000:.0f} ms, '
+                f'{len(mail.outbox)} correos'
+            )
+
+
+@escenario(
+    'dependencias',
+    'Ruta crítica, detección de ciclos y desbloqueo masivo sobre grafos crecientes.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 2000}),
+    ],
+)
+def dependencias(escribir, empleados):
+    """
+    Comprueba que el costo crece linealmente con el número de aristas: los
+    recorridos en Python sobre grafos sintéticos y el desbloqueo en la base
+    de datos al completar cada vez más tareas.
+    """
+    from .dependencias import calcular_ruta_critica, encontrar_ciclo
+    from .models import DependenciaTarea, actualizar_bloqueos, tareas_dependientes
+    
+    # 1) Algoritmos en memoria: cadena con un requisito extra cada tres tareas
+    hoy = date.today()
+    for n in (1000, 10000, 100000):
+        tareas = [
+            types.SimpleNamespace(
+                pk=i, orden=i, estado='pendiente', duracion_estimada=1,
+                fecha_inicio=None, fecha_completado=None,
+            )
+            for i in range(n)
+        ]
+        aristas = [(i, i - 1) for i in range(1, n)] + [(i, i - 3) for i in range(3, n, 3)]
+        t0 = time.perf_counter()
+        calcular_ruta_critica(tareas, aristas, hoy=hoy)
+        t_ruta = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        # Peor caso: el nuevo requisito obliga a recorrer todo el grafo
+        assert encontrar_ciclo(aristas, 0, [n - 1])
+        t_ciclo = time.perf_counter() - t0
+        escribir('{:>7} aristas: ruta crítica {:.1f} ms, ciclo {:.1f} ms ({:.2f} µs/arista)'.format(
+            len(aristas), t_ruta * 1000, t_ciclo * 1000, (t_ruta + t_ciclo) / len(aristas) * 1e6
+        ))
+    
+    # 2) Desbloqueo en la base de datos: cada tarea depende de la anterior
+    with base_de_datos_temporal():
+        poblar(empleados=empleados)
+        TareaOnboarding.objects.update(estado='bloqueado')
+        ids = list(TareaOnboarding.objects.order_by('empleado_id', 'orden').values_list('id', 'empleado_id'))
+        DependenciaTarea.objects.bulk_create(
+            [
+                DependenciaTarea(tarea_id=actual, requisito_id=anterior)
+                for (anterior, emp_a), (actual, emp_b) in zip(ids, ids[1:]) if emp_a == emp_b
+            ],
+            batch_size=5000,
+        )
+        escribir(f'{len(ids)} tareas, {DependenciaTarea.objects.count()} dependencias')
+        
+        primeras = [pk for pk, _ in ids[::10]]
+        for cantidad in (100, 1000, min(10000, len(primeras))):
+            completadas = primeras[:cantidad]
+            with transaction.atomic():
+                TareaOnboarding.objects.filter(pk__in=completadas).update(estado='completado')
+                t0 = time.perf_counter()
+                cambiadas = actualizar_bloqueos(tareas_dependientes(completadas))
+                duracion = time.perf_counter() - t0
+                transaction.set_rollback(True)
+            escribir('Completar {:>5} tareas: {} desbloqueadas en {:.0f} ms'.format(
+                cantidad, cambiadas, duracion * 1000
+            ))
+
+
+@escenario(
+    'sla',
+    'Rollups de SLA: backfill, actualización incremental y página de analítica.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 20000,
+                         'help': 'Tamaño mayor; también se mide con 1/100 y 1/10.'}),
+    ],
+)
+def sla(escribir, empleados):
+    """
+    La página de analítica debe tardar lo mismo con 10 veces más tareas: solo
+    lee ``ResumenSLA``, cuyo tamaño depende de la ventana de días.
+    """
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    
+    from .models import ResumenSLA
+    from .sla import reconstruir, registrar_tareas
+    
+    for cantidad in (max(empleados // 100, 1), max(empleados // 10, 1), empleados):
+        with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+            poblar(empleados=cantidad, lote=5000)
+            # poblar no fija fechas de inicio ni de completado: repartirlas en el último año
+            hoy = date.today()
+            completadas = list(
+                TareaOnboarding.objects.filter(estado='completado').values_list('id', 'fecha_limite')
+            )
+            with transaction.atomic():
+                TareaOnboarding.objects.bulk_update(
+                    [
+                        TareaOnboarding(
+                            pk=pk,
+                            fecha_completado=min(limite + timedelta(days=random.randint(-10, 5)), hoy),
+                            fecha_inicio=limite - timedelta(days=random.randint(5, 40)),
+                        )
+                        for pk, limite in completadas
+                    ],
+                    ['fecha_completado', 'fecha_inicio'],
+                    batch_size=500,
+                )
+            
+            t0 = time.perf_counter()
+            tareas, filas = reconstruir()
+            t_backfill = time.perf_counter() - t0
+            
+            muestra = [pk for pk, _ in random.sample(completadas, min(200, len(completadas)))]
+            t0 = time.perf_counter()
+            with transaction.atomic():
+                for pk in muestra:
+                    registrar_tareas([pk], signo=-1)
+                    registrar_tareas([pk], signo=1)
+            t_incremental = (time.perf_counter() - t0) / (2 * len(muestra))
+            
+            usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+            client = Client()
+            client.force_login(usuario)
+            url = reverse('gestor:analitica_sla') + '?dias=365'
+            client.get(url)
+            latencias = []
+            for _ in range(20):
+                with CaptureQueriesContext(connection) as capturadas:
+                    t0 = time.perf_counter()
+                    respuesta = client.get(url)
+                    latencias.append(time.perf_counter() - t0)
+                assert respuesta.status_code == 200
+            
+            escribir(
+                f'{cantidad * 10:>8} tareas ({tareas} completadas → {ResumenSLA.objects.count()} filas): '
+                f'backfill {t_backfill:.2f}s, incremental {t_incremental * 1000:.2f} ms/tarea, '
+                f'página {resumen_latencias(latencias)}, {len(capturadas)} consultas'
+            )
+
+
+@escenario(
+    'historial',
+    'Escritura agrupada del historial de transiciones y auditorías por rango de fechas.',
+    argumentos=[
+        ('--registros', {'type': int, 'default': 1000000,
+                         'help': 'Entradas sintéticas repartidas en 5 años.'}),
+    ],
+)
+def historial(escribir, registros):
+    """
+    Cuenta las sentencias INSERT del historial al cambiar muchas tareas en una
+    transacción y mide consultas de auditoría sobre una tabla grande.
+    """
+    from django.db import reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+    
+    from .models import RegistroTransicion
+    
+    with base_de_datos_temporal():
+        poblar(empleados=200)
+        tareas = list(TareaOnboarding.objects.exclude(estado='completado')[:1000])
+        with CaptureQueriesContext(connection) as capturadas:
+            t0 = time.perf_counter()
+            with transaction.atomic():
+                for tarea in tareas:
+                    tarea.estado = 'completado'
+                    tarea.save()
+            duracion = time.perf_counter() - t0
+        inserts = sum('gestor_registrotransicion' in q['sql'] for q in capturadas.captured_queries)
+        escribir(f'{len(tareas)} save() en una transacción: {duracion * 1000:.0f} ms, '
+                 f'{inserts} INSERT de historial')
+        
+        # El registro de consultas guarda solo las últimas 9000
+        reset_queries()
+        with CaptureQueriesContext(connection) as capturadas:
+            TareaOnboarding.objects.filter(estado='completado').update(estado='pendiente')
+        inserts = sum('gestor_registrotransicion' in q['sql'] for q in capturadas.captured_queries)
+        escribir(f'update() de {RegistroTransicion.objects.filter(hacia="pendiente").count()} '
+                 f'tareas: {inserts} INSERT de historial')
+        
+        ahora = timezone.now()
+        entidades = [entidad for entidad, _ in RegistroTransicion.ENTIDAD_CHOICES]
+        t0 = time.perf_counter()
+        for inicio in range(0, registros, 10000):
+            RegistroTransicion.objects.bulk_create([
+                RegistroTransicion(
+                    entidad=entidades[i % 3], objeto_id=i % 50000, desde='pendiente',
+                    hacia='completado', fecha=ahora - timedelta(minutes=random.randint(0, 5 * 525600)),
+                )
+                for i in range(inicio, min(inicio + 10000, registros))
+            ])
+        escribir(f'{registros} entradas sintéticas en {time.perf_counter() - t0:.1f}s')
+        
+        mes = RegistroTransicion.objects.filter(
+            entidad='documento', fecha__range=(ahora - timedelta(days=400), ahora - timedelta(days=370)),
+        )
+        objeto = RegistroTransicion.objects.filter(entidad='tareaonboarding', objeto_id=1234)
+        for nombre, queryset in (('Un mes de documentos', mes), ('Historial de una tarea', objeto)):
+            latencias = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                filas = len(list(queryset.values_list('objeto_id', 'hacia', 'fecha')))
+                latencias.append(time.perf_counter() - t0)
+            escribir(f'{nombre} ({filas} filas): {resumen_latencias(latencias)}')
+        escribir('Plan:\n  ' + mes.explain().replace('\n', '\n  '))
+
+
+@escenario(
+    'lista_streaming',
+    'Lista de tareas sin paginar: página completa en memoria frente a streaming.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 3000,
+                         'help': 'Con 10 tareas por empleado, 3000 = 30000 filas.'}),
+    ],
+)
+def lista_streaming(escribir, empleados):
+    """
+    Compara tiempo hasta el primer byte, tiempo total y pico de memoria de
+    ``TareaListView`` renderizada de una vez (sin paginar) y con ``?completo=1``.
+    """
+    import tracemalloc
+    
+    from django.test import RequestFactory
+    
+    from .views import TareaListView
+    
+    with base_de_datos_temporal():
+        poblar(empleados=empleados, lote=5000)
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        filas = TareaOnboarding.objects.count()
+        
+        def medir(vista, url):
+            request = RequestFactory().get(url)
+            request.user = usuario
+            request._messages = []
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            respuesta = vista(request)
+            primer_byte = None
+            total_bytes = 0
+            if respuesta.streaming:
+                for parte in respuesta.streaming_content:
+                    if primer_byte is None:
+                        primer_byte = time.perf_counter() - t0
+                    total_bytes += len(parte)
+            else:
+                respuesta.render()
+                primer_byte = time.perf_counter() - t0
+                total_bytes = len(respuesta.content)
+            total = time.perf_counter() - t0
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return primer_byte, total, pico, total_bytes
+        
+        for nombre, vista, url in (
+            ('De una vez', TareaListView.as_view(paginate_by=None), '/tareas/'),
+            ('Streaming', TareaListView.as_view(), '/tareas/?completo=1'),
+        ):
+            primer_byte, total, pico, total_bytes = medir(vista, url)
+            escribir(
+                f'{nombre:>10}: {filas} filas, {total_bytes / 1e6:.1f} MB de HTML, primer byte '
+                f'{primer_byte * 1000:.0f} ms, total {total:.1f}s, pico de memoria {pico / 1e6:.1f} MB'
+            )
+
+
+@escenario(
+    'carga',
+    'Calendario de carga: grilla con una consulta agrupada frente a un conteo por celda.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 20000,
+                         'help': 'Con 10 tareas por empleado, 20000 = 200000 tareas en 2 meses.'}),
+        ('--responsables', {'type': int, 'default': 50}),
+        ('--semanas', {'type': int, 'default': 4}),
+    ],
+)
+def carga(escribir, empleados, responsables, semanas):
+    """
+    Muestra el plan de la consulta agrupada (debe resolverse solo con
+    ``tarea_estado_limite_idx``) y compara ``calcular_carga`` con un
+    ``count()`` por responsable y día, además de la latencia de la página.
+    """
+    from django.db import reset_queries
+    from django.db.models.functions import Mod
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    
+    from .avisos import ESTADOS_ABIERTOS
+    from .carga import calcular_carga, tareas_abiertas
+    
+    with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+        poblar(empleados=empleados, lote=5000)
+        # Dos de cada tres tareas con una persona responsable; el resto, solo el área
+        usuarios = list(User.objects.order_by('id').values_list('id', flat=True)[:responsables])
+        modulo = responsables + responsables // 2
+        for i, usuario_id in enumerate(usuarios):
+            TareaOnboarding.objects.annotate(resto=Mod('id', modulo)).filter(resto=i).update(
+                responsable_usuario_id=usuario_id
+            )
+        inicio = date.today() - timedelta(days=date.today().weekday())
+        dias = semanas * 7
+        fin = inicio + timedelta(days=dias - 1)
+        abiertas = tareas_abiertas(inicio, fin).count()
+        escribir(f'{TareaOnboarding.objects.count()} tareas, {abiertas} abiertas en {semanas} semanas')
+        
+        plan = (
+            tareas_abiertas(inicio, fin)
+            .values('responsable_usuario', 'responsable', 'fecha_limite')
+            .annotate(total=Count('pk'))
+            .explain()
+        )
+        escribir('Plan:\n  ' + plan.replace('\n', '\n  '))
+        
+        def por_celda():
+            fechas = [inicio + timedelta(days=i) for i in range(dias)]
+            return [
+                [
+                    TareaOnboarding.objects.filter(
+                        estado__in=ESTADOS_ABIERTOS, fecha_limite=fecha,
+                        responsable_usuario_id=usuario_id,
+                    ).count()
+                    for fecha in fechas
+                ]
+                for usuario_id in usuarios
+            ]
+        
+        for nombre, funcion in (
+            ('Por celda', por_celda),
+            ('Agrupada', lambda: calcular_carga(inicio, dias)),
+        ):
+            reset_queries()
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                funcion()
+                duracion = time.perf_counter() - t0
+            escribir(f'{nombre:>10}: {duracion * 1000:.0f} ms, {len(capturadas)} consultas')
+        
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        client = Client()
+        client.force_login(usuario)
+        url = reverse('gestor:calendario_carga') + f'?semanas={semanas}'
+        client.get(url)
+        latencias = []
+        for _ in range(20):
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                respuesta = client.get(url)
+                latencias.append(time.perf_counter() - t0)
+            assert respuesta.status_code == 200
+        escribir(f'    Página: {resumen_latencias(latencias)}, {len(capturadas)} consultas')
+
+
+@escenario(
+    'asignacion',
+    'Asignación de responsables: heap con una consulta agrupada frente a un conteo por tarea.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 5000,
+                         'help': 'Con 10 tareas por empleado, 5000 = 50000 tareas sin asignar.'}),
+        ('--miembros', {'type': int, 'default': 20, 'help': 'Usuarios por grupo.'}),
+        ('--muestra', {'type': int, 'default': 500,
+                       'help': 'Tareas asignadas con un conteo por tarea (se extrapola).'}),
+    ],
+)
+def asignacion(escribir, empleados, miembros, muestra):
+    """
+    Asigna todas las tareas abiertas sin responsable con ``asignar_sin_responsable``
+    (un recorrido, un UPDATE por miembro) y lo compara con elegir a cada tarea
+    su responsable con un ``COUNT ... GROUP BY`` de la carga del grupo y guardarla.
+    Informa también la diferencia de carga entre el más y el menos cargado.
+    """
+    from django.contrib.auth.models import Group
+    from django.test.utils import CaptureQueriesContext
+    
+    from .asignacion import asignar_sin_responsable
+    from .avisos import ESTADOS_ABIERTOS
+    
+    with base_de_datos_temporal():
+        poblar(empleados=empleados, lote=5000)
+        areas = settings.GESTOR_ASIGNACION_AREAS
+        for nombre in set(areas.values()):
+            grupo = Group.objects.create(name=nombre)
+            usuarios = User.objects.bulk_create([
+                User(username=f'{nombre.lower()}{i}') for i in range(miembros)
+            ])
+            grupo.user_set.add(*usuarios)
+        sin_asignar = TareaOnboarding.objects.filter(
+            estado__in=ESTADOS_ABIERTOS, responsable_usuario__isnull=True, responsable__in=list(areas),
+        )
+        total = sin_asignar.count()
+        escribir(f'{total} tareas abiertas sin responsable, {miembros} usuarios por grupo')
+        
+        def carga_de(grupo):
+            return dict(
+                TareaOnboarding.objects.filter(
+                    estado__in=ESTADOS_ABIERTOS, responsable_usuario__groups__name=grupo,
+                ).order_by().values_list('responsable_usuario').annotate(total=Count('pk'))
+            )
+        
+        miembros_de = {}
+        for nombre, pk in User.objects.filter(groups__name__in=set(areas.values())).values_list('groups__name', 'pk'):
+            miembros_de.setdefault(nombre, []).append(pk)
+        
+        with transaction.atomic():
+            tareas = list(sin_asignar.order_by('fecha_limite', 'pk').values_list('pk', 'responsable')[:muestra])
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                for pk, area in tareas:
+                    carga_grupo = carga_de(areas[area])
+                    elegido = min(miembros_de[areas[area]], key=lambda usuario: (carga_grupo.get(usuario, 0), usuario))
+                    TareaOnboarding.objects.filter(pk=pk).update(responsable_usuario_id=elegido)
+                duracion = time.perf_counter() - t0
+            transaction.set_rollback(True)
+        escribir(
+            f'Conteo por tarea: {duracion / len(tareas) * 1000:.2f} ms/tarea '
+            f'(≈ {duracion / len(tareas) * total:.1f} s para todas), '
+            f'{len(capturadas) / len(tareas):.0f} consultas por tarea'
+        )
+        
+        with CaptureQueriesContext(connection) as capturadas:
+            t0 = time.perf_counter()
+            reparto = asignar_sin_responsable(lote=5000)
+            duracion = time.perf_counter() - t0
+        escribir(
+            f'            Heap: {duracion * 1000:.0f} ms para {sum(reparto.values())} tareas '
+            f'({duracion / max(total, 1) * 1e6:.1f} µs/tarea), {len(capturadas)} consultas'
+        )
+        for nombre in sorted(set(areas.values())):
+            carga_grupo = carga_de(nombre)
+            cargas = [carga_grupo.get(pk, 0) for pk in miembros_de[nombre]]
+            escribir(f'  {nombre}: carga entre {min(cargas)} y {max(cargas)} tareas abiertas por persona')
+
+
+@escenario(
+    'jerarquia',
+    'Subárbol de un jefe: recorrido por niveles, CTE recursiva y tabla de clausura.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 100000}),
+        ('--ramas', {'type': int, 'default': 4,
+                     'help': 'Subordinados directos por jefe; con 4 y 100000 personas, 10 niveles.'}),
+    ],
+)
+def jerarquia(escribir, empleados, ramas):
+    """
+    Arma un árbol completo (cada persona ``i`` reporta a ``(i - 1) // ramas``),
+    reconstruye la clausura y compara las tres formas de obtener el subárbol de
+    jefes a distintas profundidades, además de la lista de empleados con
+    ``?equipo=1`` y el costo de mover un subárbol.
+    """
+    from django.db import reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    
+    from . import jerarquia as modulo
+    from .models import JerarquiaSupervision
+    
+    with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+        t0 = time.perf_counter()
+        poblar(empleados=empleados, tareas_por_empleado=1, lote=5000)
+        usuarios = list(Empleado.objects.order_by('id').values_list('usuario_id', flat=True))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {Empleado._meta.db_table} SET supervisor_id = %s WHERE usuario_id = %s',
+                [(usuarios[(i - 1) // ramas], usuarios[i]) for i in range(1, len(usuarios))],
+            )
+        escribir(f'{len(usuarios)} empleados generados en {time.perf_counter() - t0:.1f}s')
+        
+        t0 = time.perf_counter()
+        _, filas, _ = modulo.reconstruir()
+        escribir(f'reconstruir_jerarquia: {filas} filas en {time.perf_counter() - t0:.1f}s')
+        
+        def por_niveles(jefe):
+            frontera, total = [jefe], 0
+            while frontera:
+                frontera = list(
+                    Empleado.objects.filter(supervisor_id__in=frontera).values_list('usuario_id', flat=True)
+                )
+                total += len(frontera)
+            return total
+        
+        tabla = Empleado._meta.db_table
+        
+        def cte(jefe):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'WITH RECURSIVE equipo(usuario_id) AS ('
+                    f' SELECT usuario_id FROM {tabla} WHERE supervisor_id = %s'
+                    f' UNION ALL SELECT e.usuario_id FROM {tabla} e'
+                    f' JOIN equipo ON e.supervisor_id = equipo.usuario_id'
+                    f') SELECT COUNT(*) FROM equipo',
+                    [jefe],
+                )
+                return cursor.fetchone()[0]
+        
+        def clausura(jefe):
+            return modulo.filtrar_equipo(Empleado.objects.all(), jefe).count()
+        
+        plan = modulo.filtrar_equipo(Empleado.objects.all(), usuarios[0]).values('pk').explain()
+        escribir('Plan:\n  ' + plan.replace('\n', '\n  '))
+        
+        # Primer jefe de cada nivel: índice 0, 1, 1 + ramas, 1 + ramas + ramas², ...
+        inicio, nivel = 0, 0
+        while inicio < len(usuarios) and nivel < 8:
+            jefe = usuarios[inicio]
+            resultados = []
+            for funcion in (por_niveles, cte, clausura):
+                reset_queries()
+                with CaptureQueriesContext(connection) as capturadas:
+                    t0 = time.perf_counter()
+                    cantidad = funcion(jefe)
+                    resultados.append((time.perf_counter() - t0, len(capturadas), cantidad))
+            assert len({cantidad for _, _, cantidad in resultados}) == 1
+            escribir(
+                f'Nivel {nivel} ({resultados[0][2]:>6} subordinados): ' + ', '.join(
+                    f'{nombre} {duracion * 1000:.1f} ms/{consultas}q'
+                    for nombre, (duracion, consultas, _) in zip(('niveles', 'CTE', 'clausura'), resultados)
+                )
+            )
+            inicio = inicio * ramas + 1
+            nivel += 1
+        
+        jefe = User.objects.get(pk=usuarios[1])
+        jefe.is_superuser = jefe.is_staff = True
+        jefe.save()
+        client = Client()
+        client.force_login(jefe)
+        for url in (reverse('gestor:empleado_list'), reverse('gestor:empleado_list') + '?equipo=1', reverse('gestor:tarea_list') + '?equipo=1'):
+            client.get(url)
+            latencias = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                respuesta = client.get(url)
+                latencias.append(time.perf_counter() - t0)
+                assert respuesta.status_code == 200
+            escribir(f'{url}: {resumen_latencias(latencias)}')
+        
+        # Mover un subárbol de nivel 2 bajo otro jefe de nivel 1
+        empleado = Empleado.objects.get(usuario_id=usuarios[1 + ramas])
+        tamano = JerarquiaSupervision.objects.filter(ancestro_id=empleado.usuario_id).count()
+        empleado.supervisor_id = usuarios[2]
+        t0 = time.perf_counter()
+        empleado.save()
+        escribir(f'Mover un subárbol de {tamano} personas: {(time.perf_counter() - t0) * 1000:.0f} ms')
+
+
+@escenario(
+    'compensacion',
+    'Analítica salarial: carga en arreglos y cálculo vectorizado frente a un recorrido en Python.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 100000}),
+        ('--departamentos', {'type': int, 'default': 10}),
+    ],
+)
+def compensacion(escribir, empleados, departamentos):
+    """
+    Asigna bandas por nivel y salarios aleatorios (~10% fuera de banda), y mide
+    por separado la carga de columnas, el cálculo sin caché, la lectura desde
+    la caché y la página, contra un cálculo equivalente con Decimals y listas.
+    """
+    from decimal import Decimal
+    
+    from django.core.cache import cache
+    from django.urls import reverse
+    
+    from . import compensacion as modulo
+    
+    with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+        t0 = time.perf_counter()
+        poblar(empleados=empleados, tareas_por_empleado=1, departamentos=departamentos, lote=5000)
+        rng = random.Random(0)
+        bandas = {}
+        for i, puesto in enumerate(Puesto.objects.order_by('pk')):
+            minimo = 30000 + 15000 * (i % len(Puesto.NIVEL_CHOICES))
+            bandas[puesto.pk] = (minimo, minimo * 1.5)
+            Puesto.objects.filter(pk=puesto.pk).update(
+                salario_minimo=minimo, salario_maximo=Decimal(minimo) * Decimal('1.5')
+            )
+        filas = []
+        for pk, puesto_id in Empleado.objects.values_list('pk', 'puesto_id'):
+            minimo, maximo = bandas[puesto_id]
+            salario = rng.uniform(minimo * 0.85, maximo * 1.1)
+            filas.append((round(salario, 2), pk))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(f'UPDATE {Empleado._meta.db_table} SET salario = %s WHERE id = %s', filas)
+        escribir(f'{len(filas)} empleados con salario en {time.perf_counter() - t0:.1f}s')
+        
+        def en_python():
+            grupos = {}
+            for salario, minimo, maximo, departamento_id, nivel in (
+                Empleado.objects.exclude(estado='cancelado').filter(salario__isnull=False)
+                .values_list('salario', 'puesto__salario_minimo', 'puesto__salario_maximo',
+                             'puesto__departamento_id', 'puesto__nivel')
+            ):
+                grupo = grupos.setdefault((departamento_id, nivel), {'salarios': [], 'compa': [], 'fuera': 0})
+                grupo['salarios'].append(salario)
+                if minimo is not None and maximo is not None and maximo > minimo:
+                    grupo['compa'].append(salario / ((minimo + maximo) / 2))
+                    grupo['fuera'] += salario < minimo or salario > maximo
+            for grupo in grupos.values():
+                grupo['salarios'].sort()
+                grupo['p50'] = statistics.median(grupo['salarios'])
+                grupo['compa'] = statistics.fmean(grupo['compa']) if grupo['compa'] else None
+            return grupos
+        
+        for nombre, funcion in (
+            ('Carga (arreglos)', modulo.cargar),
+            ('Cálculo completo', modulo.calcular),
+            ('Python/Decimal', en_python),
+        ):
+            latencias = []
+            for _ in range(5):
+                t0 = time.perf_counter()
+                funcion()
+                latencias.append(time.perf_counter() - t0)
+            escribir(f'{nombre:>18}: {resumen_latencias(latencias)}')
+        
+        cache.clear()
+        modulo.resumen()
+        latencias = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            modulo.resumen()
+            latencias.append(time.perf_counter() - t0)
+        escribir(f'{"Desde la caché":>18}: {resumen_latencias(latencias)}')
+        
+        datos = modulo.calcular()
+        escribir(
+            f'{len(datos["grupos"])} grupos, {datos["total"]["debajo"]} bajo banda, '
+            f'{datos["total"]["encima"]} sobre banda'
+        )
+        
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        client = Client()
+        client.force_login(usuario)
+        url = reverse('gestor:analitica_compensacion')
+        for descripcion, antes in (('Página (caché fría)', cache.clear), ('Página (caché)', lambda: None)):
+            latencias = []
+            for _ in range(10):
+                antes()
+                t0 = time.perf_counter()
+                respuesta = client.get(url)
+                latencias.append(time.perf_counter() - t0)
+                assert respuesta.status_code == 200
+            escribir(f'{descripcion:>18}: {resumen_latencias(latencias)}')
+
+
+@escenario(
+    'revision',
+    'Revisión de documentos: una página por documento frente al espacio de revisión con lotes.',
+    argumentos=[
+        ('--documentos', {'type': int, 'default': 20000}),
+        ('--decisiones', {'type': int, 'default': 100}),
+    ],
+)
+def revision(escribir, documentos, decisiones):
+    """
+    Mide el costo del servidor por decisión: el flujo clásico (formulario de
+    revisión, POST y redirección a la lista) frente a la carga del espacio de
+    revisión y el envío de las decisiones en lotes a la API.
+    """
+    import json
+    
+    from django.db import reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    
+    from .models import Documento
+    from .views import RevisionDocumentosView
+    
+    with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+        empleados = poblar(empleados=max(documentos // 4, 1), tareas_por_empleado=1, lote=5000)
+        tipos = [tipo for tipo, _ in Documento.TIPO_CHOICES]
+        Documento.objects.bulk_create(
+            [
+                Documento(
+                    empleado_id=empleados[i % len(empleados)], tipo=tipos[i % len(tipos)],
+                    nombre=f'Documento {i}', archivo=f'documentos/bench/{i}.pdf',
+                    estado='pendiente' if i % 3 else 'aprobado', obligatorio=i % 5 == 0,
+                )
+                for i in range(documentos)
+            ],
+            batch_size=5000,
+        )
+        escribir(f'{Documento.objects.filter(estado="pendiente").count()} documentos pendientes')
+        
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        client = Client()
+        client.force_login(usuario)
+        
+        def clasico():
+            ids = list(Documento.objects.filter(estado='pendiente').values_list('pk', flat=True)[:decisiones])
+            for documento_id in ids:
+                url = reverse('gestor:documento_revisar', args=[documento_id])
+                assert client.get(url).status_code == 200
+                respuesta = client.post(url, {'estado': 'aprobado', 'comentarios': ''}, follow=True)
+                assert respuesta.status_code == 200
+            return len(ids)
+        
+        def espacio():
+            respuesta = client.get(reverse('gestor:documento_revision'))
+            assert respuesta.status_code == 200
+            contenido = respuesta.content.decode()
+            inicio = contenido.index('>', contenido.index('id="revision-cola"')) + 1
+            cola = [item['id'] for item in json.loads(contenido[inicio:contenido.index('</script>', inicio)])]
+            hechas = 0
+            lote = RevisionDocumentosView.tamano_lote
+            # Si se acaban los documentos revisables antes, la cola queda vacía
+            while cola and hechas < decisiones:
+                tamano = min(lote, decisiones - hechas)
+                enviar, cola = cola[:tamano], cola[tamano:]
+                respuesta = client.post(
+                    reverse('gestor:api_documento_revision'),
+                    json.dumps({
+                        'decisiones': [{'id': pk, 'estado': 'aprobado'} for pk in enviar],
+                        'reponer': RevisionDocumentosView.tamano_cola - len(cola),
+                        'excluir': cola,
+                    }),
+                    content_type='application/json',
+                )
+                assert respuesta.status_code == 200 and respuesta.json()['aplicadas'] == len(enviar)
+                cola += [item['id'] for item in respuesta.json()['siguientes']]
+                hechas += len(enviar)
+            return hechas
+        
+        for nombre, funcion in (('Una página por documento', clasico), ('Espacio de revisión', espacio)):
+            reset_queries()
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                hechas = funcion()
+                duracion = time.perf_counter() - t0
+            if not hechas:
+                escribir(f'{nombre:>25}: no quedaron documentos pendientes')
+                continue
+            escribir(
+                f'{nombre:>25}: {hechas} decisiones, {duracion * 1000 / hechas:.1f} ms y '
+                f'{len(capturadas) / hechas:.1f} consultas por decisión'
+            )
+
+
+@escenario(
+    'completitud',
+    'Matriz de completitud documental: una consulta pivote frente a una consulta por empleado.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 100000}),
+        ('--muestra', {'type': int, 'default': 2000,
+                       'help': 'Empleados sobre los que se mide (y extrapola) el recorrido N+1.'}),
+    ],
+)
+def completitud(escribir, empleados, muestra):
+    """
+    Genera entre cero y cinco documentos por empleado en estados variados y
+    compara el cálculo de la matriz con una consulta de documentos por
+    empleado, además de la lectura desde la caché, la página y el CSV.
+    """
+    from django.core.cache import cache
+    from django.urls import reverse
+    
+    from . import completitud as modulo
+    from .models import Documento
+    
+    with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+        ids = poblar(empleados=empleados, tareas_por_empleado=1, lote=5000)
+        rng = random.Random(0)
+        tipos = ['contrato', 'cedula', 'nda', 'antecedentes', 'titulo']
+        estados = ['aprobado', 'aprobado', 'aprobado', 'pendiente', 'rechazado']
+        documentos = (
+            Documento(
+                empleado_id=empleado_id, tipo=tipo, nombre=tipo, archivo=f'documentos/{tipo}.pdf',
+                estado=rng.choice(estados),
+            )
+            for empleado_id in ids
+            for tipo in rng.sample(tipos, rng.randint(0, len(tipos)))
+        )
+        t0 = time.perf_counter()
+        lote = []
+        for documento in documentos:
+            lote.append(documento)
+            if len(lote) >= 5000:
+                Documento.objects.bulk_create(lote)
+                lote = []
+        Documento.objects.bulk_create(lote)
+        Puesto.objects.filter(pk__in=Puesto.objects.order_by('pk').values('pk')[:3]).update(
+            documentos_requeridos=['contrato', 'cedula', 'titulo']
+        )
+        escribir(f'{len(ids)} empleados, {Documento.objects.count()} documentos en {time.perf_counter() - t0:.1f}s')
+        
+        def por_empleado():
+            for empleado in Empleado.objects.exclude(estado='cancelado').select_related('puesto')[:muestra]:
+                requeridos = set(empleado.puesto.documentos_requeridos or modulo.requeridos_por_defecto())
+                list(empleado.documentos.filter(tipo__in=requeridos).values_list('tipo', 'estado'))
+        
+        t0 = time.perf_counter()
+        por_empleado()
+        duracion = (time.perf_counter() - t0) * len(ids) / muestra
+        escribir(f'{"Consulta por empleado":>22}: ~{duracion:.1f}s estimado ({len(ids) + 1} consultas)')
+        
+        latencias = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            matriz = modulo.calcular()
+            latencias.append(time.perf_counter() - t0)
+        escribir(f'{"Consulta pivote":>22}: {resumen_latencias(latencias)} (3 consultas)')
+        escribir(f'{len(matriz["filas"])} filas, {matriz["completos"]} legajos completos')
+        
+        cache.clear()
+        modulo.resumen()
+        latencias = []
+        for _ in range(10):
+            t0 = time.perf_counter()
+            modulo.resumen()
+            latencias.append(time.perf_counter() - t0)
+        escribir(f'{"Desde la caché":>22}: {resumen_latencias(latencias)}')
+        
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        client = Client()
+        client.force_login(usuario)
+        url = reverse('gestor:documento_completitud')
+        for nombre, parametros in (('Página', ''), ('Página incompletos', '?incompletos=on&page=50')):
+            latencias = []
+            for _ in range(10):
+                t0 = time.perf_counter()
+                respuesta = client.get(url + parametros)
+                latencias.append(time.perf_counter() - t0)
+                assert respuesta.status_code == 200
+            escribir(f'{nombre:>22}: {resumen_latencias(latencias)}')
+        
+        t0 = time.perf_counter()
+        tamano = sum(len(parte) for parte in client.get(url + '?exportar=csv').streaming_content)
+        escribir(f'{"CSV":>22}: {tamano / 1e6:.1f} MB en {time.perf_counter() - t0:.1f}s')
+
+
+@escenario(
+    'estados',
+    'Reevaluación masiva del estado del onboarding: por tramos con consultas de conjunto frente a empleado por empleado.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 100000}),
+        ('--lote', {'type': int, 'default': 2000}),
+        ('--muestra', {'type': int, 'default': 2000,
+                       'help': 'Empleados sobre los que se mide (y extrapola) el recorrido uno por uno.'}),
+    ],
+)
+def estados(escribir, empleados, lote, muestra):
+    """
+    Parte de estados desalineados (los de ``poblar`` no siguen a las tareas) y
+    compara la evaluación de las reglas empleado por empleado con
+    ``reevaluar_todos``, además de una segunda pasada sin cambios y la
+    reevaluación incremental de un solo empleado.
+    """
+    from . import completitud, maquina_estados
+    from .models import Documento
+    
+    with base_de_datos_temporal():
+        ids = poblar(empleados=empleados, tareas_por_empleado=3, lote=5000)
+        rng = random.Random(0)
+        requeridos = completitud.requeridos_por_defecto()
+        t0 = time.perf_counter()
+        lote_documentos = []
+        for empleado_id in ids:
+            for tipo in requeridos:
+                if rng.random() < 0.9:
+                    lote_documentos.append(Documento(
+                        empleado_id=empleado_id, tipo=tipo, nombre=tipo, archivo=f'documentos/{tipo}.pdf',
+                        estado='aprobado' if rng.random() < 0.85 else 'pendiente',
+                    ))
+            if len(lote_documentos) >= 5000:
+                Documento.objects.bulk_create(lote_documentos)
+                lote_documentos = []
+        Documento.objects.bulk_create(lote_documentos)
+        escribir(f'{len(ids)} empleados, {Documento.objects.count()} documentos en {time.perf_counter() - t0:.1f}s')
+        
+        hoy = date.today()
+        defecto, requeridos_de = completitud.requeridos_por_puesto()
+        
+        def uno_por_uno(empleados):
+            derivados = {}
+            for empleado in empleados:
+                tareas = [
+                    estado for estado in empleado.tareas.exclude(estado='cancelado').values_list('estado', flat=True)
+                ]
+                aprobados = {
+                    tipo for tipo, estado in empleado.documentos.values_list('tipo', 'estado')
+                    if estado == 'aprobado'
+                }
+                ingreso = empleado.fecha_ingreso <= hoy
+                if (
+                    ingreso and tareas and all(estado == 'completado' for estado in tareas)
+                    and requeridos_de.get(empleado.puesto_id, defecto) <= aprobados
+                ):
+                    derivados[empleado.pk] = 'completado'
+                elif ingreso or any(estado in ('en_progreso', 'completado') for estado in tareas):
+                    derivados[empleado.pk] = 'en_proceso'
+                else:
+                    derivados[empleado.pk] = 'pre_ingreso'
+            return derivados
+        
+        ejemplo = list(Empleado.objects.filter(
+            estado__in=maquina_estados.ESTADOS_AUTOMATICOS
+        ).order_by('pk')[:muestra])
+        t0 = time.perf_counter()
+        esperados = uno_por_uno(ejemplo)
+        duracion = (time.perf_counter() - t0) * len(ids) / muestra
+        escribir(f'{"Uno por uno":>22}: ~{duracion:.1f}s estimado ({2 * len(ids)} consultas, sin escribir)')
+        
+        t0 = time.perf_counter()
+        simuladas = maquina_estados.reevaluar_todos(lote=lote, simular=True)
+        escribir(f'{"Simulación por tramos":>22}: {time.perf_counter() - t0:.1f}s')
+        
+        t0 = time.perf_counter()
+        transiciones = maquina_estados.reevaluar_todos(lote=lote)
+        escribir(f'{"Reevaluación":>22}: {time.perf_counter() - t0:.1f}s, {sum(transiciones.values())} cambios')
+        for (desde, hacia), cantidad in sorted(transiciones.items()):
+            escribir(f'{"":>24}{desde} → {hacia}: {cantidad}')
+        assert transiciones == simuladas
+        
+        t0 = time.perf_counter()
+        sin_cambios = maquina_estados.reevaluar_todos(lote=lote)
+        escribir(f'{"Segunda pasada":>22}: {time.perf_counter() - t0:.1f}s, {sum(sin_cambios.values())} cambios')
+        
+        actuales = dict(Empleado.objects.filter(pk__in=list(esperados)).values_list('pk', 'estado'))
+        assert actuales == esperados, 'Las reglas por conjunto difieren de la evaluación uno por uno'
+        
+        latencias = []
+        for empleado_id in ids[:200]:
+            t0 = time.perf_counter()
+            maquina_estados.reevaluar([empleado_id], publicar=False)
+            latencias.append(time.perf_counter() - t0)
+        escribir(f'{"Un empleado":>22}: {resumen_latencias(latencias)}')
+
+
+@escenario(
+    'archivo',
+    'Listados y dashboard antes y después de archivar los onboardings completados hace más de un año.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 30000}),
+        ('--tareas', {'type': int, 'default': 12}),
+        ('--lote', {'type': int, 'default': 200}),
+    ],
+)
+def archivo(escribir, empleados, tareas, lote):
+    """
+    Dos tercios de los empleados quedan completados hace dos años; se miden
+    las páginas que recorren tareas y documentos, se archiva y se vuelven a
+    medir. También se mide el detalle de un archivado con el archivo abierto.
+    """
+    from django.urls import reverse
+    from django.utils import timezone
+    
+    from . import archivo as modulo
+    from .models import ArchivoOnboarding, Documento, RegistroTransicion
+    
+    with base_de_datos_temporal(), override_settings(ALLOWED_HOSTS=['testserver']):
+        ids = poblar(empleados=empleados, tareas_por_empleado=tareas, lote=5000)
+        rng = random.Random(0)
+        tipos = ['contrato', 'cedula', 'nda', 'antecedentes']
+        lote_documentos = []
+        for empleado_id in ids:
+            lote_documentos += [
+                Documento(
+                    empleado_id=empleado_id, tipo=tipo, nombre=tipo, archivo=f'documentos/{tipo}.pdf',
+                    estado=rng.choice(['aprobado', 'aprobado', 'pendiente']),
+                )
+                for tipo in tipos
+            ]
+            if len(lote_documentos) >= 5000:
+                Documento.objects.bulk_create(lote_documentos)
+                lote_documentos = []
+        Documento.objects.bulk_create(lote_documentos)
+        # Completados hace dos años, también en el historial
+        hace_dos_anios = timezone.now() - timedelta(days=730)
+        viejos = [pk for pk in ids if pk % 3]
+        for inicio in range(0, len(viejos), 5000):
+            Empleado.objects.filter(pk__in=viejos[inicio:inicio + 5000]).update(
+                estado='completado', fecha_actualizacion=hace_dos_anios
+            )
+        RegistroTransicion.objects.filter(entidad='empleado', hacia='completado').update(fecha=hace_dos_anios)
+        escribir(
+            f'{len(ids)} empleados ({len(viejos)} completados hace 2 años), '
+            f'{TareaOnboarding.objects.count()} tareas, {Documento.objects.count()} documentos'
+        )
+        
+        usuario = User.objects.create_superuser('benchmark', 'bench@rivcon.com', 'x')
+        client = Client()
+        client.force_login(usuario)
+        paginas = [
+            ('Dashboard', reverse('gestor:dashboard')),
+            ('Tareas', reverse('gestor:tarea_list')),
+            ('Tareas pendientes', reverse('gestor:tarea_list') + '?estado=pendiente'),
+            ('Documentos', reverse('gestor:documento_list')),
+        ]
+        
+        def medir():
+            for nombre, url in paginas:
+                client.get(url)
+                latencias = []
+                for _ in range(10):
+                    t0 = time.perf_counter()
+                    respuesta = client.get(url)
+                    latencias.append(time.perf_counter() - t0)
+                    assert respuesta.status_code == 200
+                escribir(f'{nombre:>22}: {resumen_latencias(latencias)}')
+        
+        escribir('Antes de archivar:')
+        medir()
+        
+        t0 = time.perf_counter()
+        archivados = modulo.archivar(lote=lote)
+        duracion = time.perf_counter() - t0
+        escribir(
+            f'Archivados {archivados} empleados en {duracion:.1f}s '
+            f'({archivados / duracion:.0f}/s); quedan {TareaOnboarding.objects.count()} tareas, '
+            f'{Documento.objects.count()} documentos'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        
+        escribir('Después de archivar:')
+        medir()
+        
+        detalle = reverse('gestor:empleado_detail', args=[ArchivoOnboarding.objects.values_list('pk', flat=True)[0]])
+        for nombre, parametros in (('Detalle archivado', ''), ('Detalle con archivo', '?archivo=1')):
+            latencias = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                respuesta = client.get(detalle + parametros)
+                latencias.append(time.perf_counter() - t0)
+                assert respuesta.status_code == 200
+            escribir(f'{nombre:>22}: {resumen_latencias(latencias)}')
+
+
+@escenario(
+    'respaldo',
+    'Respaldo nocturno: copia completa frente a respaldo incremental con manifiesto.',
+    argumentos=[
+        ('--empleados', {'type': int, 'default': 20000}),
+        ('--archivos', {'type': int, 'default': 3000}),
+        ('--tamano-kb', {'type': int, 'default': 64}),
+    ],
+)
+def respaldo(escribir, empleados, archivos, tamano_kb):
+    """
+    Genera la base y ``archivos`` documentos en un ``MEDIA_ROOT`` temporal y
+    compara copiar todo (base y árbol de archivos) con ``backup`` el primer
+    día, un día sin cambios y un día con el 1% de archivos nuevos.
+    """
+    import shutil
+    
+    from . import respaldo as modulo
+    
+    with base_de_datos_temporal(), tempfile.TemporaryDirectory() as media, \
+            tempfile.TemporaryDirectory() as destino, override_settings(MEDIA_ROOT=media):
+        poblar(empleados=empleados, tareas_por_empleado=10, lote=5000)
+        carpeta = os.path.join(media, 'documentos', '2026', '01')
+        os.makedirs(carpeta)
+        for i in range(archivos):
+            with open(os.path.join(carpeta, f'documento{i}.pdf'), 'wb') as archivo:
+                archivo.write(os.urandom(tamano_kb * 1024))
+        base = connection.settings_dict['NAME']
+        escribir(
+            f'Base de {os.path.getsize(base) / 1e6:.0f} MB, '
+            f'{archivos} archivos ({archivos * tamano_kb / 1024:.0f} MB)'
+        )
+        
+        t0 = time.perf_counter()
+        copia = os.path.join(destino, 'copia')
+        os.makedirs(copia)
+        shutil.copy2(base, copia)
+        shutil.copytree(media, os.path.join(copia, 'media'))
+        escribir(f'{"Copia completa":>22}: {time.perf_counter() - t0:.2f}s')
+        shutil.rmtree(copia)
+        
+        incremental = os.path.join(destino, 'respaldos')
+        for nombre in ('Primer respaldo', 'Día sin cambios', 'Día con 1% nuevos'):
+            if nombre == 'Día con 1% nuevos':
+                for i in range(archivos // 100):
+                    with open(os.path.join(carpeta, f'nuevo{i}.pdf'), 'wb') as archivo:
+                        archivo.write(os.urandom(tamano_kb * 1024))
+            # Un nombre por segundo
+            time.sleep(1)
+            t0 = time.perf_counter()
+            directorio, resumen = modulo.respaldar(incremental)
+            escribir(
+                f'{nombre:>22}: {time.perf_counter() - t0:.2f}s '
+                f'({resumen["copiados"]} archivos, {resumen["bytes_copiados"] / 1e6:.1f} MB copiados)'
+            )
+        
+        t0 = time.perf_counter()
+        problemas = modulo.verificar(directorio)
+        escribir(f'{"Verificación":>22}: {time.perf_counter() - t0:.2f}s, {len(problemas)} problemas')
+        t0 = time.perf_counter()
+        resumen = modulo.restaurar(directorio, base=False)
+        escribir(
+            f'{"Restaurar archivos":>22}: {time.perf_counter() - t0:.2f}s '
+            f'({resumen["restaurados"]} reescritos)'
+        )
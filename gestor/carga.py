@@ -0,0 +1,95 @@
+"""
+Calendario de carga: tareas abiertas por responsable y día límite.
+
+Toda la grilla sale de una sola consulta agrupada sobre el rango de fechas
+(``GROUP BY responsable_usuario, responsable, fecha_limite``), que el índice
+``tarea_estado_limite_idx`` resuelve sin leer la tabla. Las tareas con una
+persona responsable se cuentan para esa persona; las demás, para su área.
+El detalle de cada celda se consulta aparte, solo cuando se abre.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+
+from .avisos import ESTADOS_ABIERTOS
+from .models import TareaOnboarding
+
+
+@dataclass
+class FilaCarga:
+    """Una fila de la grilla: un usuario o un área sin persona asignada."""
+    
+    tipo: str
+    valor: object
+    nombre: str = ''
+    celdas: list = field(default_factory=list)
+    
+    @property
+    def total(self):
+        return sum(self.celdas)
+    
+    @property
+    def maximo(self):
+        return max(self.celdas, default=0)
+
+
+def tareas_abiertas(inicio, fin, responsable=None):
+    tareas = TareaOnboarding.objects.filter(
+        estado__in=ESTADOS_ABIERTOS, fecha_limite__range=(inicio, fin)
+    )
+    if responsable:
+        tareas = tareas.filter(responsable=responsable)
+    return tareas.order_by()
+
+
+def calcular_carga(inicio, dias, responsable=None):
+    """
+    Devuelve ``(fechas, filas, totales)``: los días de la grilla, una
+    ``FilaCarga`` por responsable con su conteo diario y el total de cada día.
+    """
+    fechas = [inicio + timedelta(days=i) for i in range(dias)]
+    conteos = defaultdict(lambda: [0] * dias)
+    grupos = (
+        tareas_abiertas(inicio, fechas[-1], responsable)
+        .values('responsable_usuario', 'responsable', 'fecha_limite')
+        .annotate(total=Count('pk'))
+    )
+    for grupo in grupos:
+        clave = (
+            ('usuario', grupo['responsable_usuario']) if grupo['responsable_usuario']
+            else ('area', grupo['responsable'])
+        )
+        conteos[clave][(grupo['fecha_limite'] - inicio).days] += grupo['total']
+    
+    nombres = {
+        ('usuario', pk): f'{nombre} {apellido}'.strip() or usuario
+        for pk, nombre, apellido, usuario in User.objects.filter(
+            pk__in=[valor for tipo, valor in conteos if tipo == 'usuario']
+        ).values_list('pk', 'first_name', 'last_name', 'username')
+    }
+    areas = dict(TareaOnboarding.RESPONSABLE_CHOICES)
+    filas = [
+        FilaCarga(
+            tipo, valor, celdas=celdas,
+            nombre=nombres.get((tipo, valor), '') if tipo == 'usuario'
+            else f'{areas.get(valor, valor)} (sin asignar)',
+        )
+        for (tipo, valor), celdas in conteos.items()
+    ]
+    # Primero las personas, luego las áreas; cada grupo por nombre
+    filas.sort(key=lambda fila: (fila.tipo != 'usuario', fila.nombre.lower()))
+    totales = [sum(columna) for columna in zip(*(fila.celdas for fila in filas))] or [0] * dias
+    return fechas, filas, totales
+
+
+def tareas_de_celda(fecha, usuario_id=None, area=None, responsable=None):
+    """Tareas abiertas de una celda de la grilla (detalle bajo demanda)."""
+    tareas = tareas_abiertas(fecha, fecha, responsable).select_related(
+        'empleado__usuario'
+    ).order_by('-prioridad', 'titulo')
+    if usuario_id:
+        return tareas.filter(responsable_usuario_id=usuario_id)
+    return tareas.filter(responsable_usuario__isnull=True, responsable=area)
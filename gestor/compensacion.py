@@ -0,0 +1,211 @@
+"""
+Analítica de compensación: bandas salariales por departamento y nivel.
+
+Las columnas de salario se cargan de una vez (``values_list`` con los
+decimales convertidos a float en la base de datos) en arreglos de NumPy, y
+todas las métricas se calculan vectorizadas, sin recorrer empleados en Python:
+
+- compa-ratio: salario / punto medio de la banda del puesto.
+- Penetración: posición del salario dentro de la banda (0 = mínimo, 1 = máximo).
+- Fuera de banda: salarios por debajo del mínimo o por encima del máximo.
+- Percentiles del salario por departamento × nivel.
+
+Se consideran los empleados no cancelados con salario. Las métricas de banda
+solo cuentan a los que tienen un puesto con mínimo y máximo válidos.
+
+El resultado se guarda en la caché bajo la versión de datos vigente. La versión
+cambia al confirmar una transacción que modifica el salario, el puesto o el
+estado de un empleado, o la banda de un puesto.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from . import efectos
+
+PERCENTILES = (10, 25, 50, 75, 90)
+CLAVE_VERSION = 'gestor:compensacion:version'
+DURACION_CACHE = 3600
+# Campos de Empleado que cambian el resultado en un QuerySet.update()
+CAMPOS_COMPENSACION = ('salario', 'puesto', 'puesto_id', 'estado')
+# Desvíos fuera de banda que se listan (los mayores primero)
+LIMITE_ATIPICOS = 100
+
+
+def _niveles():
+    from .models import Puesto
+    
+    return [nivel for nivel, _ in Puesto.NIVEL_CHOICES]
+
+
+def cargar(departamento_id=None, nivel=None):
+    """
+    Columnas de salario como arreglos: ``id``, ``salario``, ``minimo``,
+    ``maximo`` (``nan`` sin banda), ``departamento`` e índice de ``nivel``.
+    """
+    from .models import Empleado
+    
+    empleados = Empleado.objects.exclude(estado='cancelado').filter(salario__isnull=False)
+    if departamento_id:
+        empleados = empleados.filter(puesto__departamento_id=departamento_id)
+    if nivel:
+        empleados = empleados.filter(puesto__nivel=nivel)
+    
+    # Todo numérico desde la base de datos: np.array convierte las tuplas
+    # directamente, sin crear un Decimal por celda
+    filas = empleados.order_by().annotate(
+        salario_f=Cast('salario', FloatField()),
+        minimo_f=Coalesce(Cast('puesto__salario_minimo', FloatField()), Value(-1.0)),
+        maximo_f=Coalesce(Cast('puesto__salario_maximo', FloatField()), Value(-1.0)),
+        nivel_i=Case(
+            *[When(puesto__nivel=codigo, then=Value(i)) for i, codigo in enumerate(_niveles())],
+            default=Value(-1),
+            output_field=IntegerField(),
+        ),
+    ).values_list('pk', 'salario_f', 'minimo_f', 'maximo_f', F('puesto__departamento_id'), 'nivel_i')
+    
+    datos = np.array(list(filas), dtype=np.float64).reshape(-1, 6)
+    minimo, maximo = datos[:, 2], datos[:, 3]
+    return {
+        'id': datos[:, 0].astype(np.int64),
+        'salario': datos[:, 1],
+        'minimo': np.where(minimo < 0, np.nan, minimo),
+        'maximo': np.where(maximo < 0, np.nan, maximo),
+        'departamento': datos[:, 4].astype(np.int64),
+        'nivel': datos[:, 5].astype(np.int64),
+    }
+
+
+def _percentiles_por_grupo(valores, grupo, cantidades):
+    """
+    Percentiles (interpolación lineal, como ``np.percentile``) de ``valores``
+    por grupo, todos a la vez: matriz grupos × ``PERCENTILES``.
+    """
+    orden = np.lexsort((valores, grupo))
+    ordenados = valores[orden]
+    inicios = np.concatenate(([0], np.cumsum(cantidades)[:-1]))
+    fraccion = np.array(PERCENTILES, dtype=np.float64) / 100
+    posicion = inicios[:, None] + fraccion[None, :] * (cantidades[:, None] - 1)
+    abajo = np.floor(posicion).astype(np.int64)
+    arriba = np.minimum(abajo + 1, (inicios + cantidades - 1)[:, None])
+    peso = posicion - abajo
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * peso
+
+
+def _redondear(valor, decimales=2):
+    return None if valor is None or not np.isfinite(valor) else round(float(valor), decimales)
+
+
+def calcular(departamento_id=None, nivel=None):
+    """Métricas por departamento × nivel, totales y desvíos fuera de banda (sin caché)."""
+    columnas = cargar(departamento_id, nivel)
+    salario, minimo, maximo = columnas['salario'], columnas['minimo'], columnas['maximo']
+    niveles = _niveles()
+    vacio = {'grupos': [], 'total': None, 'atipicos': []}
+    if not len(salario):
+        return vacio
+    
+    con_banda = np.isfinite(minimo) & np.isfinite(maximo) & (maximo > minimo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        compa = np.where(con_banda, salario / ((minimo + maximo) / 2), np.nan)
+        penetracion = np.where(con_banda, (salario - minimo) / (maximo - minimo), np.nan)
+    debajo = con_banda & (salario < minimo)
+    encima = con_banda & (salario > maximo)
+    
+    # Un código por departamento × nivel; inverse asigna cada empleado a su grupo
+    claves = columnas['departamento'] * (len(niveles) + 1) + (columnas['nivel'] + 1)
+    claves_unicas, grupo, cantidades = np.unique(claves, return_inverse=True, return_counts=True)
+    n = len(claves_unicas)
+    
+    def suma(pesos):
+        return np.bincount(grupo, weights=pesos, minlength=n)
+    
+    con_banda_n = suma(con_banda)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        medias = suma(salario) / cantidades
+        compa_media = suma(np.where(con_banda, compa, 0)) / con_banda_n
+        penetracion_media = suma(np.where(con_banda, penetracion, 0)) / con_banda_n
+    debajo_n, encima_n = suma(debajo), suma(encima)
+    percentiles = _percentiles_por_grupo(salario, grupo, cantidades)
+    
+    grupos = []
+    for i, clave in enumerate(claves_unicas.tolist()):
+        departamento, nivel_i = divmod(clave, len(niveles) + 1)
+        grupos.append({
+            'departamento_id': departamento,
+            'nivel': niveles[nivel_i - 1] if nivel_i else '',
+            'empleados': int(cantidades[i]),
+            'con_banda': int(con_banda_n[i]),
+            'media': _redondear(medias[i]),
+            'percentiles': [_redondear(valor) for valor in percentiles[i]],
+            'compa_ratio': _redondear(compa_media[i], 3),
+            'penetracion': _redondear(penetracion_media[i], 3),
+            'debajo': int(debajo_n[i]),
+            'encima': int(encima_n[i]),
+        })
+    
+    total_banda = int(con_banda.sum())
+    total = {
+        'empleados': int(len(salario)),
+        'con_banda': total_banda,
+        'media': _redondear(salario.mean()),
+        'percentiles': [_redondear(valor) for valor in np.percentile(salario, PERCENTILES)],
+        'compa_ratio': _redondear(np.nanmean(compa), 3) if total_banda else None,
+        'penetracion': _redondear(np.nanmean(penetracion), 3) if total_banda else None,
+        'debajo': int(debajo.sum()),
+        'encima': int(encima.sum()),
+    }
+    
+    # Desvío relativo respecto del límite de la banda que se cruza
+    fuera = np.flatnonzero(debajo | encima)
+    desvio = np.where(
+        debajo[fuera],
+        (salario[fuera] - minimo[fuera]) / minimo[fuera],
+        (salario[fuera] - maximo[fuera]) / maximo[fuera],
+    )
+    mayores = fuera[np.argsort(-np.abs(desvio))[:LIMITE_ATIPICOS]]
+    desvio_de = dict(zip(fuera.tolist(), desvio.tolist()))
+    atipicos = [
+        {
+            'empleado_id': int(columnas['id'][i]),
+            'salario': _redondear(salario[i]),
+            'minimo': _redondear(minimo[i]),
+            'maximo': _redondear(maximo[i]),
+            'desvio': _redondear(desvio_de[i], 3),
+        }
+        for i in mayores.tolist()
+    ]
+    return {'grupos': grupos, 'total': total, 'atipicos': atipicos}
+
+
+def version():
+    """Versión vigente de los datos de compensación (cambia con ``invalidar``)."""
+    actual = cache.get(CLAVE_VERSION)
+    if actual is None:
+        cache.add(CLAVE_VERSION, 1, None)
+        actual = cache.get(CLAVE_VERSION, 1)
+    return actual
+
+
+def resumen(departamento_id=None, nivel=None):
+    """``calcular`` desde la caché de la versión de datos vigente."""
+    clave = f'gestor:compensacion:{version()}:{departamento_id or ""}:{nivel or ""}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular(departamento_id, nivel)
+        cache.set(clave, datos, DURACION_CACHE)
+    return datos
+
+
+def _nueva_version():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        # La clave expiró o la caché se vació: cualquier valor nuevo sirve
+        cache.set(CLAVE_VERSION, 1, None)
+
+
+def invalidar(using=None):
+    """Pasa a una nueva versión de datos al confirmar la transacción (una vez por transacción)."""
+    efectos.diferir('cache_compensacion', None, _nueva_version, using=using)
@@ -0,0 +1,181 @@
+"""
+Completitud documental: qué documentos requeridos le faltan a cada empleado.
+
+Cada puesto define sus tipos de documento requeridos
+(``Puesto.documentos_requeridos``; si está vacío, se usan los de
+``GESTOR_DOCUMENTOS_REQUERIDOS``). La matriz empleado × tipo sale de una sola
+consulta pivote con agregación condicional (``GROUP BY`` empleado y, por cada
+tipo, ``MAX(CASE ...)`` con el mejor estado de sus documentos de ese tipo); los
+nombres de los empleados se leen aparte, sin agrupar.
+
+El resultado se guarda en la caché bajo la versión de datos vigente, que cambia
+al confirmar una transacción que agrega, borra o cambia de estado o tipo un
+documento, cambia el puesto o el estado de un empleado, o toca un puesto.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Max, Value, When
+
+from . import efectos
+
+# Estado de cada celda (el mayor gana si hay varios documentos del mismo tipo)
+APROBADO = 3
+PENDIENTE = 2
+RECHAZADO = 1
+FALTANTE = 0
+NOMBRES_ESTADO = {
+    APROBADO: 'aprobado',
+    PENDIENTE: 'pendiente',
+    RECHAZADO: 'rechazado',
+    FALTANTE: 'faltante',
+}
+REQUERIDOS_POR_DEFECTO = ('contrato', 'cedula', 'nda', 'antecedentes')
+CLAVE_VERSION = 'gestor:completitud:version'
+DURACION_CACHE = 3600
+# Campos que cambian la matriz en un QuerySet.update()
+CAMPOS_EMPLEADO = ('estado', 'puesto', 'puesto_id')
+CAMPOS_DOCUMENTO = ('estado', 'tipo', 'empleado', 'empleado_id')
+
+
+def requeridos_por_defecto():
+    return tuple(getattr(settings, 'GESTOR_DOCUMENTOS_REQUERIDOS', REQUERIDOS_POR_DEFECTO))
+
+
+def requeridos_por_puesto():
+    """``(defecto, {puesto_id: tipos})``: los tipos requeridos de cada puesto (1 consulta)."""
+    from .models import Puesto
+    
+    defecto = frozenset(requeridos_por_defecto())
+    return defecto, {
+        pk: frozenset(requeridos) if requeridos else defecto
+        for pk, requeridos in Puesto.objects.order_by().values_list('pk', 'documentos_requeridos')
+    }
+
+
+def calcular(departamento_id=None, puesto_id=None, estado=None):
+    """
+    Matriz sin caché (tres consultas: puestos, pivote y empleados) para los
+    empleados no cancelados ni archivados del filtro:
+    
+    - ``tipos``: columnas (tipos requeridos por algún puesto), en el orden de
+      ``Documento.TIPO_CHOICES``.
+    - ``filas``: ``(empleado_id, nombre, puesto, celdas)``, con una celda por
+      tipo: ``None`` si su puesto no lo requiere o el estado (``APROBADO``...).
+    - ``resumen``: por tipo, ``{'requerido': n, 'aprobado': n, ...}``.
+    - ``completos``: empleados con todos sus requeridos aprobados.
+    """
+    from .models import Documento, Empleado
+    
+    defecto, requeridos_de = requeridos_por_puesto()
+    en_uso = set(defecto).union(*requeridos_de.values())
+    tipos = [tipo for tipo, _ in Documento.TIPO_CHOICES if tipo in en_uso]
+    
+    # Los archivados ya no tienen sus documentos en la tabla
+    empleados = Empleado.objects.exclude(estado='cancelado').filter(archivado=False)
+    documentos = Documento.objects.all()
+    if departamento_id or puesto_id or estado:
+        if departamento_id:
+            empleados = empleados.filter(puesto__departamento_id=departamento_id)
+        if puesto_id:
+            empleados = empleados.filter(puesto_id=puesto_id)
+        if estado:
+            empleados = empleados.filter(estado=estado)
+        documentos = documentos.filter(empleado__in=empleados.order_by().values('pk'))
+    
+    # Pivote: una fila por empleado y una columna por tipo con el mejor estado
+    # de sus documentos de ese tipo. Se agrupa sobre los documentos (sin JOIN):
+    # agrupar el JOIN con empleados y usuarios por el nombre duplica el costo
+    columnas = {
+        f'doc_{tipo}': Max(Case(
+            When(tipo=tipo, estado='aprobado', then=Value(APROBADO)),
+            When(tipo=tipo, estado='rechazado', then=Value(RECHAZADO)),
+            When(tipo=tipo, then=Value(PENDIENTE)),
+            default=Value(FALTANTE),
+            output_field=IntegerField(),
+        ))
+        for tipo in tipos
+    }
+    estados_de = {
+        empleado_id: estados
+        for empleado_id, *estados in documentos.order_by().values_list('empleado_id').annotate(**columnas)
+    }
+    sin_documentos = [FALTANTE] * len(tipos)
+    
+    resumen = {
+        tipo: dict.fromkeys(('requerido', *NOMBRES_ESTADO.values()), 0) for tipo in tipos
+    }
+    filas = []
+    completos = 0
+    for pk, puesto, nombre, apellido, usuario, titulo in empleados.order_by(
+        'usuario__last_name', 'usuario__first_name', 'pk'
+    ).values_list(
+        'pk', 'puesto_id', 'usuario__first_name', 'usuario__last_name',
+        'usuario__username', 'puesto__titulo',
+    ):
+        requeridos = requeridos_de.get(puesto, defecto)
+        celdas = tuple(
+            valor if tipo in requeridos else None
+            for tipo, valor in zip(tipos, estados_de.get(pk, sin_documentos))
+        )
+        completo = True
+        for tipo, celda in zip(tipos, celdas):
+            if celda is None:
+                continue
+            conteo = resumen[tipo]
+            conteo['requerido'] += 1
+            conteo[NOMBRES_ESTADO[celda]] += 1
+            completo = completo and celda == APROBADO
+        completos += completo
+        filas.append((pk, f'{nombre} {apellido}'.strip() or usuario, titulo or '', celdas))
+    return {'tipos': tipos, 'filas': filas, 'resumen': resumen, 'completos': completos}
+
+
+def es_completa(celdas):
+    return all(celda in (None, APROBADO) for celda in celdas)
+
+
+def filtrar(matriz, incompletos=False, tipo=None):
+    """
+    Filas de ``matriz`` sin todos sus requeridos aprobados (``incompletos``) o
+    que requieren ``tipo`` y no lo tienen aprobado.
+    """
+    filas = matriz['filas']
+    if incompletos:
+        filas = [fila for fila in filas if not es_completa(fila[3])]
+    if tipo:
+        if tipo not in matriz['tipos']:
+            return []
+        columna = matriz['tipos'].index(tipo)
+        filas = [fila for fila in filas if fila[3][columna] not in (None, APROBADO)]
+    return filas
+
+
+def version():
+    """Versión vigente de los datos de completitud (cambia con ``invalidar``)."""
+    actual = cache.get(CLAVE_VERSION)
+    if actual is None:
+        cache.add(CLAVE_VERSION, 1, None)
+        actual = cache.get(CLAVE_VERSION, 1)
+    return actual
+
+
+def resumen(departamento_id=None, puesto_id=None, estado=None):
+    """``calcular`` desde la caché de la versión de datos vigente."""
+    clave = f'gestor:completitud:{version()}:{departamento_id or ""}:{puesto_id or ""}:{estado or ""}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular(departamento_id, puesto_id, estado)
+        cache.set(clave, datos, DURACION_CACHE)
+    return datos
+
+
+def _nueva_version():
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 1, None)
+
+
+def invalidar(using=None):
+    """Pasa a una nueva versión de datos al confirmar la transacción (una vez por transacción)."""
+    efectos.diferir('cache_completitud', None, _nueva_version, using=using)
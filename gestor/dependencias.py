@@ -0,0 +1,190 @@
+"""
+Grafo de dependencias entre tareas de onboarding.
+
+Las aristas (``DependenciaTarea``) van de una tarea a su requisito y nunca
+cruzan de un empleado a otro, así que cada grafo es pequeño y se carga con una
+sola consulta. Todos los recorridos son O(V + E):
+
+- ``encontrar_ciclo``: búsqueda en profundidad iterativa desde los requisitos
+  nuevos hacia la tarea.
+- ``orden_topologico`` / ``calcular_ruta_critica``: algoritmo de Kahn.
+
+El desbloqueo al completar tareas se hace en la base de datos
+(``models.actualizar_bloqueos``), no aquí.
+"""
+from collections import deque
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .models import DependenciaTarea, TareaOnboarding
+
+
+def cargar_aristas(empleado_id):
+    """Pares ``(tarea_id, requisito_id)`` del grafo de un empleado."""
+    return list(
+        DependenciaTarea.objects.filter(tarea__empleado_id=empleado_id)
+        .values_list('tarea_id', 'requisito_id')
+    )
+
+
+def requisitos_por_tarea(aristas):
+    requisitos = {}
+    for tarea_id, requisito_id in aristas:
+        requisitos.setdefault(tarea_id, []).append(requisito_id)
+    return requisitos
+
+
+def encontrar_ciclo(aristas, tarea_id, nuevos_requisitos):
+    """
+    Devuelve el ciclo (lista de ids) que se formaría al hacer que ``tarea_id``
+    dependa de ``nuevos_requisitos``, o ``None`` si no hay ciclo.
+    
+    Hay ciclo si ``tarea_id`` ya es alcanzable desde algún requisito nuevo
+    siguiendo las dependencias existentes.
+    """
+    requisitos = requisitos_por_tarea(
+        (tarea, requisito) for tarea, requisito in aristas if tarea != tarea_id
+    )
+    anterior = {}
+    pila = []
+    for requisito_id in nuevos_requisitos:
+        if requisito_id not in anterior:
+            anterior[requisito_id] = tarea_id
+            pila.append(requisito_id)
+    
+    while pila:
+        actual = pila.pop()
+        if actual == tarea_id:
+            ciclo = [tarea_id]
+            nodo = anterior[tarea_id]
+            while nodo != tarea_id:
+                ciclo.append(nodo)
+                nodo = anterior[nodo]
+            return [tarea_id] + ciclo[:0:-1]
+        for siguiente in requisitos.get(actual, ()):
+            if siguiente not in anterior:
+                anterior[siguiente] = actual
+                pila.append(siguiente)
+    return None
+
+
+def validar_requisitos(tarea, requisitos):
+    """
+    Valida que ``tarea`` pueda depender de ``requisitos`` (instancias).
+    
+    Lanza ``ValidationError`` si alguno es la propia tarea, pertenece a otro
+    empleado o formaría un ciclo.
+    """
+    for requisito in requisitos:
+        if tarea.pk and requisito.pk == tarea.pk:
+            raise ValidationError('Una tarea no puede depender de sí misma.')
+        if requisito.empleado_id != tarea.empleado_id:
+            raise ValidationError(
+                f'"{requisito.titulo}" pertenece a otro empleado.'
+            )
+    if not tarea.pk:
+        # Una tarea nueva aún no tiene dependientes: no puede cerrar un ciclo
+        return
+    
+    aristas = cargar_aristas(tarea.empleado_id)
+    ciclo = encontrar_ciclo(aristas, tarea.pk, [requisito.pk for requisito in requisitos])
+    if ciclo:
+        titulos = dict(
+            TareaOnboarding.objects.filter(pk__in=ciclo).values_list('pk', 'titulo')
+        )
+        raise ValidationError(
+            'La dependencia formaría un ciclo: {}.'.format(
+                ' → '.join(titulos[pk] for pk in ciclo + [ciclo[0]])
+            )
+        )
+
+
+def orden_topologico(ids, aristas):
+    """
+    Ordena ``ids`` de modo que cada tarea aparezca después de sus requisitos.
+    
+    Lanza ``ValueError`` si el grafo tiene un ciclo.
+    """
+    pendientes = {pk: 0 for pk in ids}
+    dependientes = {}
+    for tarea_id, requisito_id in aristas:
+        pendientes[tarea_id] += 1
+        dependientes.setdefault(requisito_id, []).append(tarea_id)
+    
+    cola = deque(pk for pk, grado in pendientes.items() if grado == 0)
+    orden = []
+    while cola:
+        actual = cola.popleft()
+        orden.append(actual)
+        for dependiente in dependientes.get(actual, ()):
+            pendientes[dependiente] -= 1
+            if pendientes[dependiente] == 0:
+                cola.append(dependiente)
+    if len(orden) != len(pendientes):
+        raise ValueError('El grafo de dependencias tiene un ciclo.')
+    return orden
+
+
+def calcular_ruta_critica(tareas, aristas, hoy=None):
+    """
+    Estima inicio y fin de cada tarea y la ruta crítica del onboarding.
+    
+    Las tareas completadas terminan en ``fecha_completado``; las canceladas no
+    condicionan a nadie. Una tarea abierta empieza cuando terminan todos sus
+    requisitos (y no antes de hoy) y dura ``duracion_estimada`` días.
+    
+    Anota en cada tarea ``inicio_estimado``, ``fin_estimado``, ``es_critica``
+    y ``requisitos`` (las tareas de las que depende) y devuelve ``(fecha_fin_estimada, ruta)``, donde
+    ``ruta`` es la lista de tareas de la cadena más larga.
+    """
+    hoy = hoy or timezone.localdate()
+    por_id = {tarea.pk: tarea for tarea in tareas}
+    aristas = [
+        (tarea_id, requisito_id) for tarea_id, requisito_id in aristas
+        if tarea_id in por_id and requisito_id in por_id
+    ]
+    requisitos = requisitos_por_tarea(aristas)
+    
+    # Requisito que retrasa el inicio de cada tarea abierta (para reconstruir la ruta)
+    determinante = {}
+    for pk in orden_topologico(por_id, aristas):
+        tarea = por_id[pk]
+        tarea.requisitos = [por_id[r] for r in requisitos.get(pk, ())]
+        tarea.es_critica = False
+        fines = [
+            (requisito.fin_estimado, requisito.pk) for requisito in tarea.requisitos
+            if requisito.fin_estimado is not None
+        ]
+        
+        if tarea.estado == 'cancelado':
+            tarea.inicio_estimado = tarea.fin_estimado = None
+        elif tarea.estado == 'completado':
+            tarea.fin_estimado = tarea.fecha_completado or hoy
+            tarea.inicio_estimado = tarea.fecha_inicio or tarea.fin_estimado
+        else:
+            inicio = max([hoy] + [fin for fin, _ in fines])
+            if tarea.estado == 'en_progreso' and tarea.fecha_inicio:
+                inicio = min(inicio, tarea.fecha_inicio)
+            tarea.inicio_estimado = inicio
+            tarea.fin_estimado = max(inicio + timedelta(days=tarea.duracion_estimada), hoy)
+            if fines and max(fines)[0] >= inicio:
+                determinante[pk] = max(fines)[1]
+    
+    abiertas = [
+        tarea for tarea in por_id.values()
+        if tarea.estado not in ('completado', 'cancelado')
+    ]
+    if not abiertas:
+        fines = [tarea.fin_estimado for tarea in por_id.values() if tarea.fin_estimado]
+        return (max(fines) if fines else None), []
+    
+    ultima = max(abiertas, key=lambda tarea: (tarea.fin_estimado, -tarea.orden))
+    ruta = [ultima]
+    while ruta[-1].pk in determinante:
+        ruta.append(por_id[determinante[ruta[-1].pk]])
+    ruta.reverse()
+    for tarea in ruta:
+        tarea.es_critica = True
+    return ultima.fin_estimado, ruta
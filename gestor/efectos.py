@@ -0,0 +1,117 @@
+"""
+Efectos secundarios de los signals, agrupados por transacción.
+
+Los signals ``post_save`` piden sus efectos (recalcular el progreso de un
+empleado, reevaluar su estado, invalidar una caché) con ``diferir(nombre,
+objetivo, funcion)`` en lugar de ejecutarlos en el momento. Dentro de una
+transacción los pedidos se acumulan en un buffer por conexión, indexados por
+``(nombre, objetivo)``: si una acción del admin guarda 50 tareas del mismo
+empleado, su progreso se recalcula una sola vez, al confirmar (``on_commit``).
+Fuera de una transacción (autocommit) el efecto se ejecuta en el momento.
+
+Los efectos deben ser recálculos idempotentes que leen la base al ejecutarse:
+se ejecuta el último pedido de cada clave y, si se revierte un savepoint
+intermedio, sus pedidos pueden ejecutarse igual (recalcular de más no daña).
+Si se revierte la transacción completa, Django descarta el buffer.
+
+``contadores()`` devuelve, por nombre de efecto, cuántos se pidieron, cuántos
+se ejecutaron y cuántos se ahorraron por repetidos (desde el arranque del
+proceso, o desde ``reiniciar_contadores()``).
+"""
+import logging
+import threading
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+logger = logging.getLogger(__name__)
+
+_contadores = {}
+_bloqueo_contadores = threading.Lock()
+
+
+def _contar(nombre, evento, cantidad=1):
+    with _bloqueo_contadores:
+        _contadores.setdefault(nombre, Counter())[evento] += cantidad
+
+
+def contadores():
+    """``{nombre: {'pedidos': n, 'ejecutados': n, 'coalescidos': n, 'errores': n}}``."""
+    with _bloqueo_contadores:
+        return {
+            nombre: {
+                evento: contador[evento]
+                for evento in ('pedidos', 'ejecutados', 'coalescidos', 'errores')
+            }
+            for nombre, contador in sorted(_contadores.items())
+        }
+
+
+def reiniciar_contadores():
+    with _bloqueo_contadores:
+        _contadores.clear()
+
+
+class Pendientes:
+    """Efectos de una transacción a la espera del commit, en orden de llegada."""
+    
+    def __init__(self, conexion):
+        # run_on_commit se reemplaza por una lista nueva al confirmar o revertir
+        # (también un savepoint): mientras sea la misma, el callback sigue ahí
+        self.lista = conexion.run_on_commit
+        self.efectos = {}
+        self.ejecutado = False
+    
+    def vigente(self, conexion):
+        if self.ejecutado:
+            return False
+        if self.lista is conexion.run_on_commit:
+            return True
+        # Tras revertir un savepoint: sigue vigente si su callback sobrevivió
+        if any(callback[1] == self.ejecutar for callback in conexion.run_on_commit):
+            self.lista = conexion.run_on_commit
+            return True
+        return False
+    
+    def ejecutar(self):
+        self.ejecutado = True
+        efectos, self.efectos = self.efectos, {}
+        for (nombre, _), funcion in efectos.items():
+            _ejecutar(nombre, funcion)
+
+
+def _ejecutar(nombre, funcion):
+    _contar(nombre, 'ejecutados')
+    try:
+        funcion()
+    except Exception:
+        # La transacción ya confirmó: un efecto que falla no impide los demás
+        _contar(nombre, 'errores')
+        logger.exception('Falló el efecto diferido %s', nombre)
+
+
+def diferir(nombre, objetivo, funcion, using=None):
+    """
+    Ejecuta ``funcion()`` al confirmar la transacción en curso, una sola vez
+    por ``(nombre, objetivo)`` (se queda con la última ``funcion`` pedida).
+    Sin transacción en curso se ejecuta de inmediato.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    _contar(nombre, 'pedidos')
+    conexion = transaction.get_connection(using)
+    if not conexion.in_atomic_block:
+        # Como on_commit() fuera de una transacción: en el momento y sin ocultar errores
+        _contar(nombre, 'ejecutados')
+        funcion()
+        return
+    
+    pendientes = getattr(conexion, 'efectos_pendientes', None)
+    if pendientes is None or not pendientes.vigente(conexion):
+        pendientes = Pendientes(conexion)
+        conexion.efectos_pendientes = pendientes
+        transaction.on_commit(pendientes.ejecutar, using=using)
+    
+    clave = (nombre, objetivo)
+    if clave in pendientes.efectos:
+        _contar(nombre, 'coalescidos')
+    pendientes.efectos[clave] = funcion
@@ -0,0 +1,202 @@
+"""
+Difusión de eventos en vivo (Server-Sent Events) para el Kanban y el dashboard.
+
+Los signals de ``models.py`` publican deltas pequeños (cambios de estado,
+progreso, documentos y tareas) a través de un hub con backend intercambiable:
+
+- ``BackendMemoria``: difusión dentro del proceso (un solo worker).
+- ``BackendRedis``: pub/sub de Redis para despliegues con varios procesos.
+
+Se configura en ``settings.GESTOR_EVENTOS``::
+
+    GESTOR_EVENTOS = {
+        'BACKEND': 'gestor.eventos.BackendRedis',
+        'OPCIONES': {'url': 'redis://localhost:6379/0'},
+    }
+"""
+import asyncio
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackendMemoria:
+    """Hub en memoria: reparte cada evento a las colas de los suscriptores del proceso."""
+    
+    def __init__(self, tamano_cola=100):
+        self.tamano_cola = tamano_cola
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+    
+    def publicar(self, evento):
+        # Puede llamarse desde cualquier hilo: se entrega en el loop de cada suscriptor
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for loop, cola in suscriptores:
+            loop.call_soon_threadsafe(self._entregar, cola, evento)
+    
+    @staticmethod
+    def _entregar(cola, evento):
+        if cola.full():
+            # Un cliente lento pierde el evento más antiguo, no bloquea al resto
+            cola.get_nowait()
+        cola.put_nowait(evento)
+    
+    @asynccontextmanager
+    async def suscribir(self):
+        cola = asyncio.Queue(maxsize=self.tamano_cola)
+        entrada = (asyncio.get_running_loop(), cola)
+        with self._lock:
+            self._suscriptores.add(entrada)
+        try:
+            yield SuscripcionMemoria(cola)
+        finally:
+            with self._lock:
+                self._suscriptores.discard(entrada)
+
+
+class SuscripcionMemoria:
+
+    def __init__(self, cola):
+        self.cola = cola
+    
+    async def recibir(self, timeout):
+        """Devuelve el siguiente evento o ``None`` si vence el timeout."""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class BackendRedis:
+    """Hub sobre pub/sub de Redis; requiere el paquete ``redis``."""
+    
+    def __init__(self, url='redis://localhost:6379/0', canal='gestor:eventos'):
+        self.url = url
+        self.canal = canal
+        self._cliente = None
+    
+    def publicar(self, evento):
+        if self._cliente is None:
+            import redis
+            self._cliente = redis.Redis.from_url(self.url)
+        self._cliente.publish(self.canal, json.dumps(evento))
+    
+    @asynccontextmanager
+    async def suscribir(self):
+        import redis.asyncio as aioredis
+        
+        cliente = aioredis.Redis.from_url(self.url)
+        pubsub = cliente.pubsub()
+        await pubsub.subscribe(self.canal)
+        try:
+            yield SuscripcionRedis(pubsub)
+        finally:
+            await pubsub.unsubscribe(self.canal)
+            await pubsub.aclose()
+            await cliente.aclose()
+
+
+class SuscripcionRedis:
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+    
+    async def recibir(self, timeout):
+        """Devuelve el siguiente evento o ``None`` si vence el timeout."""
+        mensaje = await self.pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        if mensaje is None:
+            return None
+        return json.loads(mensaje['data'])
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """Devuelve la instancia del backend configurado (se crea una vez por proceso)."""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                config = getattr(settings, 'GESTOR_EVENTOS', {})
+                backend = import_string(config.get('BACKEND', 'gestor.eventos.BackendMemoria'))
+                _hub = backend(**config.get('OPCIONES', {}))
+    return _hub
+
+
+def publicar(tipo, datos):
+    """
+    Publica un evento cuando la transacción actual confirma.
+    
+    Los errores del backend se registran pero nunca interrumpen el guardado.
+    """
+    evento = {'tipo': tipo, 'datos': datos}
+    
+    def enviar():
+        try:
+            get_hub().publicar(evento)
+        except Exception:
+            logger.exception('No se pudo publicar el evento %s', tipo)
+    
+    transaction.on_commit(enviar)
+
+
+async def flujo_sse(intervalo_ping=15):
+    """Generador async con el stream ``text/event-stream`` para un cliente."""
+    yield 'retry: 5000\n\n'
+    async with get_hub().suscribir() as suscripcion:
+        while True:
+            evento = await suscripcion.recibir(timeout=intervalo_ping)
+            if evento is None:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ': ping\n\n'
+                continue
+            yield 'event: {}\ndata: {}\n\n'.format(
+                evento['tipo'], json.dumps(evento['datos'])
+            )
+
+
+# ======================
+# Payloads
+# ======================
+
+def tarjeta_empleado(empleado):
+    """Datos de la tarjeta del Kanban; se usan en el render inicial y en los eventos."""
+    usuario = empleado.usuario
+    return {
+        'id': empleado.pk,
+        'nombre': usuario.get_full_name() or usuario.username,
+        'inicial': (usuario.first_name[:1] or usuario.username[:1]).upper(),
+        'puesto': empleado.puesto.titulo if empleado.puesto_id else '',
+        'fecha_ingreso': empleado.fecha_ingreso.strftime('%d/%m/%Y'),
+        'estado': empleado.estado,
+        'progreso': empleado.progreso,
+        'url': reverse('gestor:empleado_detail', args=[empleado.pk]),
+    }
+
+
+def fila_documento(documento):
+    """Datos de un documento para la lista de pendientes del dashboard."""
+    usuario = documento.empleado.usuario
+    return {
+        'id': documento.pk,
+        'nombre': documento.nombre,
+        'tipo': documento.get_tipo_display(),
+        'empleado': usuario.get_full_name() or usuario.username,
+        'fecha_subida': timezone.localtime(documento.fecha_subida).strftime('%d/%m/%Y %H:%M'),
+        'url': reverse('gestor:documento_revisar', args=[documento.pk]),
+    }
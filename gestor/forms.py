@@ -1,6 +1,52 @@
 from django import forms
 from django.contrib.auth.models import User
-from .models import Empleado, Documento, TareaOnboarding, Departamento, Puesto
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from .models import Empleado, Documento, TareaOnboarding, Departamento, Puesto, Reporte
+from . import completitud, reportes
+from .dependencias import validar_requisitos
+
+
+class AutocompletarSelect(forms.Select):
+    """
+    Select de un ``ModelChoiceField`` que solo renderiza la opción elegida; las
+    demás se buscan al escribir en ``url_name`` (``api.AutocompletarAPIView``),
+    con el script de ``partials/_autocompletar.html``. La página pesa y consulta
+    lo mismo con diez opciones que con cien mil.
+    """
+    
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+    
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocompletar'] = reverse(self.url_name)
+        return attrs
+    
+    def optgroups(self, name, value, attrs=None):
+        campo = self.choices.field
+        clave = campo.queryset.model._meta.pk
+        elegidos = []
+        for valor in value:
+            if valor in campo.empty_values:
+                continue
+            try:
+                elegidos.append(clave.to_python(valor))
+            except ValidationError:
+                # Valor inválido en un form ligado: el error ya lo muestra el campo
+                pass
+        opciones = [] if campo.empty_label is None else [('', campo.empty_label)]
+        if elegidos:
+            opciones += [
+                (campo.prepare_value(obj), campo.label_from_instance(obj))
+                for obj in campo.queryset.filter(pk__in=elegidos)
+            ]
+        todas, self.choices = self.choices, opciones
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = todas
 
 
 class EmpleadoForm(forms.ModelForm):
@@ -33,6 +79,8 @@ class EmpleadoForm(forms.ModelForm):
             'salario', 'supervisor', 'estado', 'notas'
         ]
         widgets = {
+            'puesto': AutocompletarSelect('gestor:api_autocompletar_puestos'),
+            'supervisor': AutocompletarSelect('gestor:api_autocompletar_usuarios'),
             'fecha_nacimiento': forms.DateInput(attrs={'type': 'date'}),
             'fecha_ingreso': forms.DateInput(attrs={'type': 'date'}),
             'direccion': forms.Textarea(attrs={'rows': 3}),
@@ -52,6 +100,8 @@ class EmpleadoForm(forms.ModelForm):
             kwargs['initial'] = initial
         
         super().__init__(*args, **kwargs)
+        # Puesto.__str__ incluye el departamento (para la opción elegida)
+        self.fields['puesto'].queryset = self.fields['puesto'].queryset.select_related('departamento')
     
     def clean_username(self):
         username = self.cleaned_data['username']
@@ -114,10 +164,10 @@ class DocumentoForm(forms.ModelForm):
             'nombre': forms.TextInput(attrs={'placeholder': 'Ej: Cédula escaneada'}),
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, user_is_staff=False, **kwargs):
         super().__init__(*args, **kwargs)
         # El campo obligatorio solo es editable por RRHH
-        if not kwargs.get('user_is_staff'):
+        if not user_is_staff:
             self.fields['obligatorio'].widget = forms.HiddenInput()
 
 
@@ -132,30 +182,66 @@ class DocumentoRevisionForm(forms.ModelForm):
         }
 
 
-class TareaOnboardingForm(forms.ModelForm):
+class DependenciasFormMixin:
+    """
+    Campo ``depende_de`` limitado a las tareas del mismo empleado, con
+    validación de ciclos y de requisitos pendientes.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.instance.empleado_id and self.initial.get('empleado'):
+            self.instance.empleado_id = self.initial['empleado']
+        
+        requisitos = TareaOnboarding.objects.filter(empleado_id=self.instance.empleado_id)
+        if self.instance.pk:
+            requisitos = requisitos.exclude(pk=self.instance.pk)
+        self.fields['depende_de'].queryset = requisitos.order_by('orden', 'fecha_limite')
+    
+    def clean_depende_de(self):
+        requisitos = self.cleaned_data['depende_de']
+        validar_requisitos(self.instance, requisitos)
+        return requisitos
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        requisitos = cleaned_data.get('depende_de') or []
+        pendientes = [r.titulo for r in requisitos if r.estado != 'completado']
+        if cleaned_data.get('estado') in ('en_progreso', 'completado') and pendientes:
+            self.add_error('estado', 'Faltan requisitos por completar: {}.'.format(
+                ', '.join(pendientes)
+            ))
+        return cleaned_data
+
+
+class TareaOnboardingForm(DependenciasFormMixin, forms.ModelForm):
     """Formulario para crear/editar tareas de onboarding."""
     
     class Meta:
         model = TareaOnboarding
         fields = [
             'titulo', 'descripcion', 'responsable', 'responsable_usuario',
-            'fecha_limite', 'prioridad', 'estado', 'notas', 'orden'
+            'fecha_limite', 'prioridad', 'estado', 'notas', 'orden',
+            'duracion_estimada', 'depende_de'
         ]
         widgets = {
+            'responsable_usuario': AutocompletarSelect('gestor:api_autocompletar_usuarios'),
             'fecha_limite': forms.DateInput(attrs={'type': 'date'}),
             'descripcion': forms.Textarea(attrs={'rows': 3}),
             'notas': forms.Textarea(attrs={'rows': 2}),
+            'depende_de': forms.CheckboxSelectMultiple,
         }
 
 
-class TareaEstadoForm(forms.ModelForm):
+class TareaEstadoForm(DependenciasFormMixin, forms.ModelForm):
     """Formulario simple para actualizar el estado de una tarea."""
     
     class Meta:
         model = TareaOnboarding
-        fields = ['estado', 'notas']
+        fields = ['estado', 'notas', 'depende_de']
         widgets = {
             'notas': forms.Textarea(attrs={'rows': 2}),
+            'depende_de': forms.CheckboxSelectMultiple,
         }
 
 
@@ -173,11 +259,19 @@ class DepartamentoForm(forms.ModelForm):
 class PuestoForm(forms.ModelForm):
     """Formulario para crear/editar puestos."""
     
+    documentos_requeridos = forms.MultipleChoiceField(
+        choices=Documento.TIPO_CHOICES,
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+        label='Documentos Requeridos',
+        help_text='Sin marcar ninguno se usan los requeridos por defecto de la empresa'
+    )
+    
     class Meta:
         model = Puesto
         fields = [
             'titulo', 'departamento', 'nivel', 'descripcion',
-            'salario_minimo', 'salario_maximo', 'activo'
+            'salario_minimo', 'salario_maximo', 'documentos_requeridos', 'activo'
         ]
         widgets = {
             'descripcion': forms.Textarea(attrs={'rows': 3}),
@@ -226,6 +320,99 @@ class FiltroEmpleadosForm(forms.Form):
         required=False,
         label='Supervisor',
         queryset=User.objects.filter(empleados_supervisados__isnull=False).distinct(),
-        widget=forms.Select(attrs={'class': 'form-control'})
+        widget=AutocompletarSelect('gestor:api_autocompletar_supervisores', attrs={'class': 'form-control'})
+    )
+    
+    toda_la_linea = forms.BooleanField(
+        required=False,
+        label='Toda la línea de reporte',
+        help_text='Incluye también a los subordinados indirectos del supervisor'
     )
 
+
+class FiltroCompletitudForm(forms.Form):
+    """Filtros de la matriz de completitud documental (vista y API)."""
+    
+    departamento = forms.ModelChoiceField(
+        required=False,
+        label='Departamento',
+        queryset=Departamento.objects.all(),
+    )
+    
+    puesto = forms.ModelChoiceField(
+        required=False,
+        label='Puesto',
+        queryset=Puesto.objects.select_related('departamento'),
+    )
+    
+    estado = forms.ChoiceField(
+        required=False,
+        label='Estado del empleado',
+        choices=[('', 'Todos')] + [
+            (codigo, nombre) for codigo, nombre in Empleado.ESTADO_CHOICES if codigo != 'cancelado'
+        ],
+    )
+    
+    tipo = forms.ChoiceField(
+        required=False,
+        label='Sin aprobar',
+        choices=[('', 'Cualquier tipo')] + Documento.TIPO_CHOICES,
+        help_text='Solo empleados que requieren este tipo y no lo tienen aprobado'
+    )
+    
+    incompletos = forms.BooleanField(
+        required=False,
+        label='Solo incompletos',
+    )
+    
+    def matriz(self):
+        """Matriz (desde la caché) con las filas ya filtradas; el form debe ser válido."""
+        datos = self.cleaned_data
+        matriz = completitud.resumen(
+            datos['departamento'] and datos['departamento'].pk,
+            datos['puesto'] and datos['puesto'].pk,
+            datos['estado'],
+        )
+        return dict(matriz, filas=completitud.filtrar(
+            matriz, incompletos=datos['incompletos'], tipo=datos['tipo'],
+        ))
+
+
+class SolicitudReporteForm(forms.Form):
+    """Pedido de un reporte en segundo plano (``gestor.reportes``)."""
+    
+    definicion = forms.ChoiceField(
+        label='Reporte',
+        choices=[(nombre, info['titulo']) for nombre, info in reportes.DEFINICIONES.items()],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    mes = forms.DateField(
+        required=False,
+        label='Mes',
+        input_formats=['%Y-%m'],
+        widget=forms.DateInput(attrs={'type': 'month', 'class': 'form-control'}, format='%Y-%m'),
+        help_text='Por defecto, el mes en curso (el de documentos pendientes es siempre a hoy)'
+    )
+    
+    departamento = forms.ModelChoiceField(
+        required=False,
+        label='Departamento',
+        queryset=Departamento.objects.all(),
+        empty_label='Todos los departamentos',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    formato = forms.ChoiceField(
+        label='Formato',
+        choices=Reporte.FORMATO_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    def solicitar(self, usuario):
+        """``reportes.solicitar`` con los datos del form, que debe ser válido."""
+        datos = self.cleaned_data
+        return reportes.solicitar(
+            datos['definicion'], datos['formato'], usuario=usuario, mes=datos['mes'],
+            departamento_id=datos['departamento'] and datos['departamento'].pk,
+        )
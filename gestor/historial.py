@@ -0,0 +1,129 @@
+"""
+Historial append-only de cambios de estado de empleados, documentos y tareas.
+
+Las transiciones llegan por dos caminos:
+
+- ``save()``: el signal ``registrar_transicion`` de ``models.py``.
+- ``QuerySet.update(estado=...)``: ``TransicionesQuerySet`` (el manager de los
+  tres modelos), usado por las acciones del admin y las actualizaciones masivas.
+
+Las entradas se acumulan en un buffer por savepoint (cada ``atomic()``
+anidado tiene el suyo, con su propio ``on_commit``) y se escriben con un
+``bulk_create`` por buffer cuando la transacción confirma. Si se revierte la
+transacción o un ``atomic()`` anidado, Django descarta el callback y con él
+las entradas de ese bloque.
+El usuario se toma de la petición en curso (``usuario_actual_middleware``);
+fuera de una petición (comandos, tareas automáticas) queda vacío.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+
+_peticion_actual = ContextVar('peticion_actual', default=None)
+
+
+@sync_and_async_middleware
+def usuario_actual_middleware(get_response):
+    """Deja la petición disponible para ``usuario_actual_id`` (vistas sync y async)."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _peticion_actual.set(request)
+            try:
+                return await get_response(request)
+            finally:
+                _peticion_actual.reset(token)
+        markcoroutinefunction(middleware)
+    else:
+        def middleware(request):
+            token = _peticion_actual.set(request)
+            try:
+                return get_response(request)
+            finally:
+                _peticion_actual.reset(token)
+    return middleware
+
+
+def usuario_actual_id():
+    """Id del usuario autenticado de la petición en curso, o ``None``."""
+    request = _peticion_actual.get()
+    # request.user es perezoso: solo se consulta si de verdad hay una transición
+    usuario = getattr(request, 'user', None)
+    if usuario is not None and usuario.is_authenticated:
+        return usuario.pk
+    return None
+
+
+class Pendientes:
+    """Entradas de un savepoint a la espera del commit."""
+    
+    def __init__(self, using):
+        self.using = using
+        self.registros = []
+        self.escrito = False
+    
+    def escribir(self):
+        from .models import RegistroTransicion
+        
+        self.escrito = True
+        registros, self.registros = self.registros, []
+        RegistroTransicion.objects.using(self.using).bulk_create(registros, batch_size=1000)
+
+
+def _pendientes(conexion, using):
+    """
+    Buffer del savepoint en curso, creándolo (con su ``on_commit``) si no existe.
+    
+    Los buffers se indexan por los savepoints abiertos. Django reemplaza la
+    lista ``run_on_commit`` al confirmar y al revertir (también un savepoint):
+    mientras sea la misma, los buffers conocidos siguen vigentes sin
+    recorrerla; si cambió, se recorre una vez para quedarse con los que
+    sobrevivieron.
+    """
+    lista, buffers = getattr(conexion, 'historial_pendientes', (None, {}))
+    if lista is not conexion.run_on_commit:
+        vigentes = {
+            getattr(callback, '__self__', None) for _, callback, _ in conexion.run_on_commit
+        }
+        buffers = {clave: buffer for clave, buffer in buffers.items() if buffer in vigentes}
+        conexion.historial_pendientes = (conexion.run_on_commit, buffers)
+    
+    clave = tuple(conexion.savepoint_ids)
+    pendientes = buffers.get(clave)
+    if pendientes is None or pendientes.escrito:
+        pendientes = buffers[clave] = Pendientes(using)
+        # robust: un fallo al escribir el historial no afecta a la petición
+        transaction.on_commit(pendientes.escribir, using=using, robust=True)
+    return pendientes
+
+
+def registrar(modelo, transiciones, using=None):
+    """
+    Registra ``transiciones`` (iterable de ``(id, desde, hacia)``) de ``modelo``.
+    
+    Las que no cambian de estado se ignoran; ``desde=None`` indica un alta.
+    """
+    from .models import RegistroTransicion
+    
+    using = using or DEFAULT_DB_ALIAS
+    usuario_id = usuario_actual_id()
+    ahora = timezone.now()
+    registros = [
+        RegistroTransicion(
+            entidad=modelo._meta.model_name, objeto_id=pk, desde=desde or '',
+            hacia=hacia, usuario_id=usuario_id, fecha=ahora,
+        )
+        for pk, desde, hacia in transiciones if desde != hacia
+    ]
+    if not registros:
+        return
+    
+    conexion = transaction.get_connection(using)
+    if not conexion.in_atomic_block:
+        RegistroTransicion.objects.using(using).bulk_create(registros, batch_size=1000)
+        return
+    
+    _pendientes(conexion, using).registros.extend(registros)
@@ -0,0 +1,66 @@
+"""
+Comando de Django para archivar los onboardings completados hace tiempo.
+
+Mueve las tareas y los documentos (solo metadatos) de los empleados completados
+hace más de ``GESTOR_MESES_ARCHIVO`` meses a ``ArchivoOnboarding``, por lotes de
+empleados en transacciones separadas. Conviene ejecutarlo periódicamente:
+    python manage.py archivar_onboardings
+    python manage.py archivar_onboardings --meses 6 --simular
+    python manage.py archivar_onboardings --restaurar 15 42
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestor import archivo
+
+
+class Command(BaseCommand):
+    help = 'Archiva las tareas y documentos de los onboardings completados hace más de N meses'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            help=f'Meses desde que se completó el onboarding (por defecto, {archivo.meses_por_defecto()})',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Empleados por transacción (por defecto, 200)',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo informa cuántos empleados se archivarían',
+        )
+        parser.add_argument(
+            '--restaurar',
+            type=int,
+            nargs='+',
+            metavar='EMPLEADO_ID',
+            help='Devuelve a sus tablas las tareas y documentos archivados de estos empleados',
+        )
+    
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if options['restaurar']:
+            restaurados = archivo.restaurar(options['restaurar'])
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {restaurados} empleado(s) restaurado(s) ({time.perf_counter() - inicio:.1f} s)'
+            ))
+            return
+        
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+        if options['meses'] is not None and options['meses'] < 0:
+            raise CommandError('--meses no puede ser negativo.')
+        
+        archivados = archivo.archivar(
+            meses=options['meses'], lote=options['lote'], simular=options['simular'],
+        )
+        verbo = 'se archivarían' if options['simular'] else 'archivado(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {archivados} empleado(s) {verbo} ({time.perf_counter() - inicio:.1f} s)'
+        ))
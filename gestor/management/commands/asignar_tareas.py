@@ -0,0 +1,47 @@
+"""
+Comando de Django para asignar las tareas abiertas sin persona responsable.
+
+Las tareas automáticas nuevas ya se asignan al crearse; este comando reparte
+las anteriores (o las que quedaron sin asignar porque el grupo del área estaba
+vacío) entre los miembros de cada grupo, siempre al menos cargado:
+    python manage.py asignar_tareas --simular
+    python manage.py asignar_tareas
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from gestor.asignacion import asignar_sin_responsable
+
+
+class Command(BaseCommand):
+    help = 'Asigna las tareas abiertas sin responsable al miembro menos cargado del grupo de su área'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=2000,
+            help='Tareas por consulta y por UPDATE (por defecto, 2000)',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo informa el reparto, sin aplicarlo',
+        )
+    
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+        
+        inicio = time.perf_counter()
+        reparto = asignar_sin_responsable(lote=options['lote'], simular=options['simular'])
+        nombres = dict(User.objects.filter(pk__in=list(reparto)).values_list('pk', 'username'))
+        for usuario_id, cantidad in reparto.most_common():
+            self.stdout.write(f'  {nombres.get(usuario_id, usuario_id)}: {cantidad}')
+        verbo = 'se asignarían' if options['simular'] else 'asignadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {sum(reparto.values())} tarea(s) {verbo} '
+            f'({time.perf_counter() - inicio:.1f} s)'
+        ))
@@ -0,0 +1,56 @@
+"""
+Comando de Django para reconstruir los rollups de SLA desde las tareas completadas.
+
+Necesario tras la migración que crea ``ResumenSLA`` o si los rollups quedaron
+desalineados (por ejemplo, tras cargar datos con ``loaddata`` o SQL directo).
+Las tareas archivadas (``archivar_onboardings``) ya no están en la tabla: si
+las hay, el comando exige ``--desde`` con una fecha posterior a las archivadas
+(sin ella, o con una anterior, borraría sus rollups sin poder recalcularlos):
+    python manage.py backfill_sla
+    python manage.py backfill_sla --desde 2026-01-01
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from gestor.models import ArchivoOnboarding
+from gestor.sla import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups de SLA y tiempos de ciclo de las tareas de onboarding'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Solo recalcula los días a partir de esta fecha AAAA-MM-DD (por defecto, todo)',
+        )
+    
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = date.fromisoformat(options['desde'])
+            except ValueError:
+                raise CommandError('La fecha debe tener el formato AAAA-MM-DD.')
+        
+        ultimo = ArchivoOnboarding.objects.aggregate(ultimo=Max('fecha_archivo'))['ultimo']
+        if ultimo:
+            # Toda tarea archivada se completó antes de archivarse
+            seguro = timezone.localdate(ultimo) + timedelta(days=1)
+            if desde is None or desde < seguro:
+                raise CommandError(
+                    'Hay onboardings archivados: sus tareas ya no están en la tabla y '
+                    'reconstruir desde antes de archivarlas borraría sus rollups. Usar --desde '
+                    f'con una fecha posterior a las tareas archivadas (--desde {seguro.isoformat()} o después).'
+                )
+        
+        inicio = time.perf_counter()
+        tareas, filas = reconstruir(desde=desde)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {tareas} tarea(s) completada(s) agregadas en {filas} fila(s) de rollup '
+            f'({time.perf_counter() - inicio:.1f} s)'
+        ))
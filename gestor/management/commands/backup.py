@@ -0,0 +1,65 @@
+"""
+Comando de Django para respaldar en caliente la base de datos y los archivos subidos.
+
+La base se copia de forma consistente (API de backup de SQLite o ``pg_dump``)
+y de ``MEDIA_ROOT`` solo se copian los archivos nuevos o cambiados desde el
+respaldo anterior. Pensado para ejecutarse cada noche, por ejemplo con cron:
+    0 2 * * * cd /ruta/al/proyecto && python manage.py backup --conservar 30
+    python manage.py backup --destino /mnt/respaldos
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestor import respaldo
+
+
+class Command(BaseCommand):
+    help = 'Respalda la base de datos y, de forma incremental, los archivos subidos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--destino',
+            help=f'Directorio de respaldos (por defecto, {respaldo.directorio_por_defecto()})',
+        )
+        parser.add_argument(
+            '--conservar',
+            type=int,
+            help='Cantidad de respaldos a conservar; borra los más antiguos (por defecto, todos)',
+        )
+        parser.add_argument(
+            '--sin-media',
+            action='store_true',
+            help='Solo respalda la base de datos',
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Alias de la base de datos (por defecto, "default")',
+        )
+    
+    def handle(self, *args, **options):
+        if options['conservar'] is not None and options['conservar'] < 1:
+            raise CommandError('--conservar debe ser mayor que cero.')
+        
+        inicio = time.perf_counter()
+        try:
+            directorio, resumen = respaldo.respaldar(
+                destino=options['destino'],
+                media=not options['sin_media'],
+                conservar=options['conservar'],
+                using=options['database'],
+            )
+        except respaldo.ErrorRespaldo as error:
+            raise CommandError(str(error))
+        
+        self.stdout.write(
+            f'  Base: {resumen["base"] / 1e6:.1f} MB\n'
+            f'  Archivos: {resumen["archivos"]} ({resumen["copiados"]} nuevos o cambiados, '
+            f'{resumen["bytes_copiados"] / 1e6:.1f} MB copiados)'
+        )
+        if resumen['borrados']:
+            self.stdout.write(f'  {resumen["borrados"]} respaldo(s) antiguo(s) borrado(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Respaldo {directorio} ({time.perf_counter() - inicio:.1f} s)'
+        ))
@@ -0,0 +1,34 @@
+"""
+Comando de Django para ejecutar los benchmarks del sistema de onboarding.
+
+Uso:
+    python manage.py benchmark contencion --hilos-escritura 8 --segundos 10
+    DB_ENGINE=postgres python manage.py benchmark contencion
+"""
+from django.core.management.base import BaseCommand
+
+from gestor.benchmarks import ESCENARIOS
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta un escenario de benchmark sobre una base de datos temporal'
+    
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='escenario', required=True)
+        for nombre, escenario in ESCENARIOS.items():
+            subparser = subparsers.add_parser(nombre, help=escenario['descripcion'])
+            for flag, kwargs in escenario['argumentos']:
+                subparser.add_argument(flag, **kwargs)
+    
+    def handle(self, *args, **options):
+        nombre = options['escenario']
+        escenario = ESCENARIOS[nombre]
+        parametros = {
+            flag.lstrip('-').replace('-', '_'): options[flag.lstrip('-').replace('-', '_')]
+            for flag, _ in escenario['argumentos']
+        }
+        
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(f'Benchmark: {nombre}'))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        escenario['funcion'](self.stdout.write, **parametros)
@@ -0,0 +1,75 @@
+"""
+Comando de Django que hace de worker de los reportes en segundo plano.
+
+Toma los reportes en cola (``gestor.reportes``), los genera de a uno y escribe
+sus archivos en ``GESTOR_DIRECTORIO_REPORTES``. Corre como servicio (systemd,
+supervisor) o, con ``--una-vez``, desde cron:
+    python manage.py procesar_reportes
+    python manage.py procesar_reportes --una-vez
+    python manage.py procesar_reportes --podar 30
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from gestor import reportes
+
+
+class Command(BaseCommand):
+    help = 'Genera los reportes en cola y escribe sus archivos (worker)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa la cola y termina, en lugar de esperar nuevos pedidos',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos entre consultas a la cola vacía (por defecto, 5)',
+        )
+        parser.add_argument(
+            '--colgados',
+            type=int,
+            default=30,
+            help='Minutos tras los que un reporte en proceso vuelve a la cola (por defecto, 30)',
+        )
+        parser.add_argument(
+            '--podar',
+            type=int,
+            metavar='DIAS',
+            help='Antes de empezar, borra los reportes terminados hace más de DIAS días',
+        )
+    
+    def handle(self, *args, **options):
+        if options['intervalo'] <= 0:
+            raise CommandError('--intervalo debe ser mayor que cero.')
+        if options['colgados'] < 1:
+            raise CommandError('--colgados debe ser mayor que cero.')
+        
+        if options['podar'] is not None:
+            borrados = reportes.podar(options['podar'])
+            self.stdout.write(f'{borrados} reporte(s) viejo(s) borrado(s)')
+        
+        try:
+            while True:
+                # Como al terminar una petición: descarta conexiones caídas o viejas
+                close_old_connections()
+                liberados = reportes.liberar_colgados(options['colgados'])
+                if liberados:
+                    self.stdout.write(f'{liberados} reporte(s) interrumpido(s) de vuelta a la cola')
+                
+                inicio = time.perf_counter()
+                procesados = reportes.procesar_pendientes()
+                if procesados:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✓ {procesados} reporte(s) procesado(s) ({time.perf_counter() - inicio:.1f} s)'
+                    ))
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker detenido.')
@@ -0,0 +1,29 @@
+"""
+Comando de Django para reconstruir la tabla de clausura de la línea de reporte.
+
+Necesario tras la migración que crea ``JerarquiaSupervision`` o si la tabla
+quedó desalineada con ``Empleado.supervisor`` (por ejemplo, tras cargar datos
+con ``loaddata`` o SQL directo):
+    python manage.py reconstruir_jerarquia
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestor.jerarquia import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la jerarquía de supervisión (tabla de clausura) desde los empleados'
+    
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        usuarios, filas, ciclos = reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {usuarios} usuario(s) en {filas} fila(s) de jerarquía '
+            f'({time.perf_counter() - inicio:.1f} s)'
+        ))
+        if ciclos:
+            self.stdout.write(self.style.WARNING(
+                f'⚠ {ciclos} ciclo(s) en Empleado.supervisor: se cortaron y cada uno quedó como raíz'
+            ))
@@ -0,0 +1,53 @@
+"""
+Comando de Django para reevaluar el estado del onboarding de todos los empleados.
+
+Los cambios de tareas y documentos ya reevalúan al empleado afectado, pero el
+paso de ``pre_ingreso`` a ``en_proceso`` al llegar la fecha de ingreso depende
+solo del calendario, y los estados fijados a mano (acciones del admin, SQL
+directo) quedan desalineados. Conviene ejecutarlo a diario, por ejemplo con cron:
+    0 5 * * * cd /ruta/al/proyecto && python manage.py reevaluar_estados
+    python manage.py reevaluar_estados --simular
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestor.maquina_estados import reevaluar_todos
+
+
+class Command(BaseCommand):
+    help = 'Reevalúa el estado del onboarding de los empleados según sus tareas, documentos y fecha de ingreso'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=2000,
+            help='Empleados por transacción (por defecto, 2000)',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo informa los cambios, sin aplicarlos',
+        )
+        parser.add_argument(
+            '--publicar',
+            action='store_true',
+            help='Publica los cambios de estado en los eventos en vivo (Kanban)',
+        )
+    
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+        
+        inicio = time.perf_counter()
+        transiciones = reevaluar_todos(
+            lote=options['lote'], simular=options['simular'], publicar=options['publicar'],
+        )
+        for (desde, hacia), cantidad in sorted(transiciones.items()):
+            self.stdout.write(f'  {desde} → {hacia}: {cantidad}')
+        verbo = 'cambiarían' if options['simular'] else 'cambiaron'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {sum(transiciones.values())} empleado(s) {verbo} de estado '
+            f'({time.perf_counter() - inicio:.1f} s)'
+        ))
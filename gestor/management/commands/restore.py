@@ -0,0 +1,103 @@
+"""
+Comando de Django para restaurar un respaldo creado con ``backup``.
+
+Antes de escribir nada verifica el hash de la base y de cada archivo del
+respaldo; de ``MEDIA_ROOT`` solo reescribe los archivos que difieren:
+    python manage.py restore --verificar            # solo comprueba el último respaldo
+    python manage.py restore 20261019-020000
+    python manage.py restore --sin-base             # solo los archivos subidos
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestor import respaldo
+
+
+class Command(BaseCommand):
+    help = 'Verifica y restaura un respaldo de la base de datos y los archivos subidos'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'respaldo',
+            nargs='?',
+            help='Nombre o ruta del respaldo (por defecto, el más reciente)',
+        )
+        parser.add_argument(
+            '--destino',
+            help=f'Directorio de respaldos (por defecto, {respaldo.directorio_por_defecto()})',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo verifica la integridad del respaldo, sin restaurar',
+        )
+        parser.add_argument(
+            '--sin-base',
+            action='store_true',
+            help='No restaura la base de datos',
+        )
+        parser.add_argument(
+            '--sin-media',
+            action='store_true',
+            help='No restaura los archivos subidos',
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='No pide confirmación',
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Alias de la base de datos (por defecto, "default")',
+        )
+    
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            directorio = respaldo.resolver(options['destino'], options['respaldo'])
+            if options['verificar']:
+                problemas = respaldo.verificar(directorio)
+                for problema in problemas:
+                    self.stdout.write(self.style.ERROR(f'  {problema}'))
+                if problemas:
+                    raise CommandError(f'{directorio}: {len(problemas)} problema(s).')
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ {directorio} íntegro ({time.perf_counter() - inicio:.1f} s)'
+                ))
+                return
+            
+            if options['interactive']:
+                partes = [
+                    nombre for nombre, incluida in (
+                        ('la base de datos', not options['sin_base']),
+                        ('los archivos subidos', not options['sin_media']),
+                    ) if incluida
+                ]
+                respuesta = input(
+                    f'Se reemplazarán {" y ".join(partes)} con el respaldo {directorio.name}. '
+                    '¿Continuar? [s/N] '
+                )
+                if respuesta.strip().lower() not in ('s', 'si', 'sí'):
+                    self.stdout.write('Restauración cancelada.')
+                    return
+            
+            resumen = respaldo.restaurar(
+                directorio,
+                base=not options['sin_base'],
+                media=not options['sin_media'],
+                using=options['database'],
+            )
+        except respaldo.ErrorRespaldo as error:
+            raise CommandError(str(error))
+        
+        if not options['sin_media']:
+            self.stdout.write(
+                f'  Archivos: {resumen["restaurados"]} de {resumen["archivos"]} restaurados '
+                '(el resto ya coincidía)'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Restaurado {directorio} ({time.perf_counter() - inicio:.1f} s)'
+        ))
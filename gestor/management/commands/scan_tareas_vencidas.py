@@ -0,0 +1,58 @@
+"""
+Comando de Django para avisar de las tareas de onboarding vencidas o por vencer.
+
+Pensado para ejecutarse periódicamente (cron, systemd timer):
+    python manage.py scan_tareas_vencidas
+    python manage.py scan_tareas_vencidas --dias 3 --dry-run
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestor.avisos import escanear
+
+
+class Command(BaseCommand):
+    help = 'Envía un resumen por responsable con sus tareas vencidas o próximas a vencer'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=2,
+            help='Días de anticipación para avisar de tareas por vencer (por defecto 2)',
+        )
+        parser.add_argument(
+            '--fecha', help='Fecha de referencia AAAA-MM-DD (por defecto hoy)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo informa qué se enviaría, sin enviar correos ni marcar tareas',
+        )
+    
+    def handle(self, *args, **options):
+        hoy = None
+        if options['fecha']:
+            try:
+                hoy = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError('La fecha debe tener el formato AAAA-MM-DD.')
+        
+        resultado = escanear(hoy=hoy, dias=options['dias'], enviar=not options['dry_run'])
+        
+        prefijo = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(
+            f'{prefijo}{resultado.tareas} tarea(s) a avisar en '
+            f'{resultado.segundos_escaneo * 1000:.0f} ms de escaneo'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefijo}✓ {resultado.resumenes_enviados} resumen(es) '
+            f'({resultado.tareas_avisadas} tarea(s) marcadas)'
+        ))
+        if resultado.sin_destinatario:
+            self.stdout.write(self.style.WARNING(
+                f'{resultado.sin_destinatario} tarea(s) sin destinatario con email; '
+                'revisa GESTOR_AVISOS_AREAS y los grupos'
+            ))
+        if resultado.errores:
+            self.stdout.write(self.style.ERROR(
+                f'{resultado.errores} resumen(es) no se pudieron enviar; se reintentarán'
+            ))
@@ -0,0 +1,180 @@
+"""
+Máquina de estados del onboarding: ``Empleado.estado`` derivado de los datos.
+
+Las reglas (``REGLAS``) se evalúan en orden y gana la primera que se cumple
+(si ninguna se cumple, ``ESTADO_POR_DEFECTO``).
+Cada condición es un ``Q`` sobre empleados anotados con el avance de sus tareas
+y sus documentos requeridos aprobados, de modo que el estado derivado de todo
+un conjunto sale de una sola consulta (``CASE WHEN ...``) y los cambios se
+aplican con un UPDATE por estado destino (que además deja el historial).
+
+``cancelado`` es manual: esos empleados no se reevalúan, como tampoco los
+archivados (sus tareas y documentos ya no están en las tablas).
+
+La reevaluación es incremental (los signals de tareas, documentos y empleados
+reevalúan al empleado afectado) y masiva con ``reevaluar_estados``, que además
+recoge las transiciones que dependen solo de la fecha (el día de ingreso).
+"""
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Case, CharField, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from . import completitud, eventos
+
+# Estados que administra la máquina (los demás se fijan a mano)
+ESTADOS_AUTOMATICOS = ('pre_ingreso', 'en_proceso', 'completado')
+
+
+def evaluables(queryset):
+    """Los empleados de ``queryset`` que la máquina administra."""
+    return queryset.filter(estado__in=ESTADOS_AUTOMATICOS, archivado=False)
+
+
+@dataclass(frozen=True)
+class Regla:
+    """El empleado pasa a ``hacia`` si cumple ``condicion(hoy)``."""
+    
+    hacia: str
+    descripcion: str
+    condicion: object
+
+
+REGLAS = (
+    Regla(
+        'completado',
+        'Ya ingresó, completó sus tareas y tiene aprobados los documentos requeridos',
+        lambda hoy: Q(
+            fecha_ingreso__lte=hoy, tiene_tareas=True, tareas_abiertas=False,
+            documentos_completos=True,
+        ),
+    ),
+    Regla(
+        'en_proceso',
+        'Ya ingresó o empezó alguna tarea',
+        lambda hoy: Q(fecha_ingreso__lte=hoy) | Q(tareas_iniciadas=True),
+    ),
+)
+# Si no se cumple ninguna regla: aún no ingresó ni empezó ninguna tarea
+ESTADO_POR_DEFECTO = 'pre_ingreso'
+
+
+def _documentos_completos():
+    """
+    Anotaciones (``aprobado_<tipo>``) y condición de "todos los documentos
+    requeridos por su puesto aprobados", sin recorrer empleados.
+    """
+    from .models import Documento
+    
+    defecto, requeridos_de = completitud.requeridos_por_puesto()
+    anotaciones = {}
+    condicion = Q()
+    for tipo in set(defecto).union(*requeridos_de.values()):
+        anotaciones[f'aprobado_{tipo}'] = Exists(Documento.objects.filter(
+            empleado=OuterRef('pk'), tipo=tipo, estado='aprobado',
+        ))
+        requiere = Q(puesto_id__in=[pk for pk, tipos in requeridos_de.items() if tipo in tipos])
+        if tipo in defecto:
+            requiere |= Q(puesto__isnull=True)
+        condicion &= ~requiere | Q(**{f'aprobado_{tipo}': True})
+    return anotaciones, condicion
+
+
+def anotar(queryset, hoy=None):
+    """Anota ``estado_derivado`` (y los hechos que usan las reglas) en ``queryset``."""
+    from .models import TareaOnboarding
+    
+    hoy = hoy or timezone.localdate()
+    # Las tareas canceladas no cuentan
+    tareas = TareaOnboarding.objects.filter(empleado=OuterRef('pk')).exclude(estado='cancelado')
+    anotaciones, documentos_completos = _documentos_completos()
+    return queryset.annotate(
+        tiene_tareas=Exists(tareas),
+        tareas_abiertas=Exists(tareas.exclude(estado='completado')),
+        tareas_iniciadas=Exists(tareas.filter(estado__in=('en_progreso', 'completado'))),
+        **anotaciones,
+    ).annotate(
+        documentos_completos=Case(
+            When(documentos_completos, then=Value(True)), default=Value(False),
+        ),
+    ).annotate(
+        estado_derivado=Case(
+            *[When(regla.condicion(hoy), then=Value(regla.hacia)) for regla in REGLAS],
+            default=Value(ESTADO_POR_DEFECTO),
+            output_field=CharField(),
+        ),
+    )
+
+
+def _aplicar(empleados, hoy, publicar):
+    """Aplica el estado derivado a ``empleados`` (queryset); devuelve ``{pk: (desde, hacia)}``."""
+    from .models import Empleado
+    
+    cambios = {
+        pk: (desde, hacia)
+        for pk, desde, hacia in anotar(evaluables(empleados), hoy)
+        .order_by().values_list('pk', 'estado', 'estado_derivado')
+        if desde != hacia
+    }
+    por_estado = {}
+    for pk, (_, hacia) in cambios.items():
+        por_estado.setdefault(hacia, []).append(pk)
+    ahora = timezone.now()
+    for hacia, ids in por_estado.items():
+        # Pasa por TransicionesQuerySet: historial e invalidación de cachés
+        Empleado.objects.filter(pk__in=ids).update(estado=hacia, fecha_actualizacion=ahora)
+    
+    if publicar and cambios:
+        # Los UPDATE no disparan signals: mismos eventos que Empleado.save()
+        for empleado in Empleado.objects.filter(pk__in=list(cambios)).select_related('usuario', 'puesto'):
+            datos = eventos.tarjeta_empleado(empleado)
+            datos['desde'] = cambios[empleado.pk][0]
+            eventos.publicar('empleado_estado', datos)
+    return cambios
+
+
+def reevaluar(empleado_ids, hoy=None, publicar=True):
+    """
+    Reevalúa a los empleados de ``empleado_ids`` (una consulta más un UPDATE
+    por estado destino). Devuelve ``{pk: (desde, hacia)}`` con los que cambiaron.
+    """
+    from .models import Empleado
+    
+    if not empleado_ids:
+        return {}
+    with transaction.atomic():
+        return _aplicar(Empleado.objects.filter(pk__in=list(empleado_ids)), hoy or timezone.localdate(), publicar)
+
+
+def reevaluar_todos(lote=2000, hoy=None, simular=False, publicar=False):
+    """
+    Reevalúa a todos los empleados por tramos de ``lote`` ids consecutivos, cada
+    tramo en su propia transacción. Devuelve un ``Counter`` de ``(desde, hacia)``.
+    
+    Con ``simular`` solo cuenta las transiciones, sin escribir.
+    """
+    from .models import Empleado
+    
+    hoy = hoy or timezone.localdate()
+    transiciones = Counter()
+    ultimo = 0
+    while True:
+        limites = list(
+            Empleado.objects.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:lote]
+        )
+        if not limites:
+            return transiciones
+        tramo = Empleado.objects.filter(pk__gt=ultimo, pk__lte=limites[-1])
+        ultimo = limites[-1]
+        if simular:
+            transiciones.update(
+                (desde, hacia) for desde, hacia in
+                anotar(evaluables(tramo), hoy)
+                .order_by().values_list('estado', 'estado_derivado')
+                if desde != hacia
+            )
+            continue
+        with transaction.atomic():
+            transiciones.update(_aplicar(tramo, hoy, publicar).values())
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tareaonboarding',
+            name='aviso_vencimiento',
+            field=models.CharField(blank=True, choices=[('', 'Sin aviso'), ('proxima', 'Próxima a vencer'), ('vencida', 'Vencida')], default='', help_text='Último aviso de vencimiento enviado (scan_tareas_vencidas)', max_length=10, verbose_name='Aviso de Vencimiento'),
+        ),
+        migrations.AddIndex(
+            model_name='tareaonboarding',
+            index=models.Index(fields=['estado', 'fecha_limite'], name='tarea_estado_limite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tareaonboarding',
+            index=models.Index(fields=['estado', 'aviso_vencimiento', 'fecha_limite'], name='tarea_aviso_limite_idx'),
+        ),
+    ]
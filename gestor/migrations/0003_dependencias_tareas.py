@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0002_aviso_vencimiento_tareas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tareaonboarding',
+            name='duracion_estimada',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Días que suele tomar la tarea; se usa para estimar la ruta crítica', verbose_name='Duración Estimada (días)'),
+        ),
+        migrations.CreateModel(
+            name='DependenciaTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requisito', models.ForeignKey(help_text='Tarea que debe completarse primero', on_delete=django.db.models.deletion.CASCADE, related_name='requisito_de', to='gestor.tareaonboarding', verbose_name='Requisito')),
+                ('tarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependencias', to='gestor.tareaonboarding', verbose_name='Tarea')),
+            ],
+            options={
+                'verbose_name': 'Dependencia de Tarea',
+                'verbose_name_plural': 'Dependencias de Tareas',
+            },
+        ),
+        migrations.AddField(
+            model_name='tareaonboarding',
+            name='depende_de',
+            field=models.ManyToManyField(blank=True, help_text='Tareas que deben completarse antes de iniciar esta', related_name='dependientes', through='gestor.DependenciaTarea', through_fields=('tarea', 'requisito'), to='gestor.tareaonboarding', verbose_name='Depende de'),
+        ),
+        migrations.AddConstraint(
+            model_name='dependenciatarea',
+            constraint=models.UniqueConstraint(fields=('tarea', 'requisito'), name='dependencia_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='dependenciatarea',
+            constraint=models.CheckConstraint(condition=models.Q(('tarea', models.F('requisito')), _negated=True), name='dependencia_no_reflexiva'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0003_dependencias_tareas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenSLA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día en que se completaron las tareas', verbose_name='Fecha')),
+                ('responsable', models.CharField(choices=[('rrhh', 'Recursos Humanos'), ('it', 'Tecnología (IT)'), ('supervisor', 'Jefe Directo'), ('finanzas', 'Finanzas'), ('empleado', 'Empleado'), ('legal', 'Legal'), ('otro', 'Otro')], max_length=20, verbose_name='Responsable')),
+                ('ciclo_dias', models.PositiveSmallIntegerField(help_text='Días desde el inicio (o la creación) hasta completar la tarea', verbose_name='Ciclo (días)')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Tareas Completadas')),
+                ('a_tiempo', models.IntegerField(default=0, verbose_name='Completadas a Tiempo')),
+                ('departamento', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='gestor.departamento', verbose_name='Departamento')),
+            ],
+            options={
+                'verbose_name': 'Resumen SLA',
+                'verbose_name_plural': 'Resúmenes SLA',
+                'ordering': ['-fecha', 'responsable'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'responsable', 'departamento', 'ciclo_dias'), name='resumen_sla_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0004_resumen_sla'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroTransicion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(choices=[('empleado', 'Empleado'), ('documento', 'Documento'), ('tareaonboarding', 'Tarea de Onboarding')], max_length=20, verbose_name='Entidad')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID del Objeto')),
+                ('desde', models.CharField(blank=True, help_text='Vacío si el objeto se creó con este estado', max_length=20, verbose_name='Estado Anterior')),
+                ('hacia', models.CharField(max_length=20, verbose_name='Estado Nuevo')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Registro de Transición',
+                'verbose_name_plural': 'Historial de Transiciones',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['entidad', 'fecha'], name='transicion_entidad_fecha_idx'), models.Index(fields=['entidad', 'objeto_id', 'fecha'], name='transicion_objeto_idx')],
+            },
+        ),
+    ]
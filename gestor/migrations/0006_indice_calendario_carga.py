@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0005_historial_transiciones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tareaonboarding',
+            name='tarea_estado_limite_idx',
+        ),
+        migrations.AddIndex(
+            model_name='tareaonboarding',
+            index=models.Index(fields=['estado', 'fecha_limite', 'responsable_usuario', 'responsable'], name='tarea_estado_limite_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0006_indice_calendario_carga'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JerarquiaSupervision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profundidad', models.PositiveSmallIntegerField(help_text='Niveles entre el jefe y el subordinado (0 para el propio usuario)', verbose_name='Profundidad')),
+                ('ancestro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Jefe')),
+                ('descendiente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Subordinado')),
+            ],
+            options={
+                'verbose_name': 'Relación Jerárquica',
+                'verbose_name_plural': 'Jerarquía de Supervisión',
+                'indexes': [models.Index(fields=['ancestro', 'profundidad', 'descendiente'], name='jerarquia_subarbol_idx')],
+                'constraints': [models.UniqueConstraint(fields=('descendiente', 'ancestro'), name='jerarquia_par_unico')],
+            },
+        ),
+    ]
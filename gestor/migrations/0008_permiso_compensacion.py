@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0007_jerarquia_supervision'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='empleado',
+            options={'ordering': ['-fecha_creacion'], 'permissions': [('view_dashboard', 'Puede ver el dashboard de RRHH'), ('approve_documents', 'Puede aprobar documentos'), ('manage_onboarding', 'Puede gestionar el proceso de onboarding'), ('view_compensacion', 'Puede ver la analítica de compensación')], 'verbose_name': 'Empleado', 'verbose_name_plural': 'Empleados'},
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0008_permiso_compensacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['estado', 'fecha_subida'], name='documento_cola_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0009_indice_cola_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='puesto',
+            name='documentos_requeridos',
+            field=models.JSONField(blank=True, default=list, help_text='Tipos de documento que deben estar aprobados; vacío = GESTOR_DOCUMENTOS_REQUERIDOS', verbose_name='Documentos Requeridos'),
+        ),
+    ]
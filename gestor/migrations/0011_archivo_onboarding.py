@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0010_documentos_requeridos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoOnboarding',
+            fields=[
+                ('empleado', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archivo_onboarding', serialize=False, to='gestor.empleado', verbose_name='Empleado')),
+                ('datos', models.BinaryField(help_text='JSON comprimido con zlib: tareas, dependencias y documentos', verbose_name='Datos')),
+                ('total_tareas', models.PositiveIntegerField(default=0, verbose_name='Tareas')),
+                ('total_documentos', models.PositiveIntegerField(default=0, verbose_name='Documentos')),
+                ('fecha_archivo', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Archivo')),
+            ],
+            options={
+                'verbose_name': 'Onboarding Archivado',
+                'verbose_name_plural': 'Onboardings Archivados',
+                'ordering': ['-fecha_archivo'],
+            },
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='archivado',
+            field=models.BooleanField(default=False, editable=False, help_text='Sus tareas y documentos se movieron a ArchivoOnboarding', verbose_name='Archivado'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:57
+
+import django.db.models.deletion
+import django.utils.timezone
+import gestor.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0011_archivo_onboarding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuscripcionCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=gestor.models.generar_token_calendario, max_length=64, unique=True, verbose_name='Token')),
+                ('fecha_generacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Generación')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suscripcion_calendario', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Suscripción al Calendario',
+                'verbose_name_plural': 'Suscripciones al Calendario',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:06
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0012_suscripcion_calendario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('definicion', models.CharField(max_length=50, verbose_name='Reporte')),
+                ('parametros', models.JSONField(default=dict, verbose_name='Parámetros')),
+                ('formato', models.CharField(choices=[('xlsx', 'Excel (XLSX)'), ('csv', 'CSV'), ('html', 'HTML')], max_length=10, verbose_name='Formato')),
+                ('version_datos', models.CharField(max_length=64, verbose_name='Versión de los Datos')),
+                ('clave', models.CharField(help_text='Hash de la definición, los parámetros, el formato y la versión de los datos', max_length=64, unique=True, verbose_name='Clave')),
+                ('estado', models.CharField(choices=[('pendiente', 'En cola'), ('en_proceso', 'Generando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('archivo', models.CharField(blank=True, help_text='Nombre del archivo en GESTOR_DIRECTORIO_REPORTES', max_length=255, verbose_name='Archivo')),
+                ('filas', models.PositiveIntegerField(blank=True, null=True, verbose_name='Filas')),
+                ('tamano', models.PositiveIntegerField(blank=True, null=True, verbose_name='Tamaño (bytes)')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('fecha_solicitud', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Solicitud')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio de la Generación')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin de la Generación')),
+                ('solicitantes', models.ManyToManyField(blank=True, related_name='reportes', to=settings.AUTH_USER_MODEL, verbose_name='Solicitantes')),
+            ],
+            options={
+                'verbose_name': 'Reporte',
+                'verbose_name_plural': 'Reportes',
+                'ordering': ['-fecha_solicitud'],
+                'indexes': [models.Index(fields=['estado', 'fecha_solicitud'], name='reporte_cola_idx')],
+            },
+        ),
+    ]
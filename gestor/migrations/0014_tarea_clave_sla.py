@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestor', '0013_reportes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tareaonboarding',
+            name='clave_sla',
+            field=models.JSONField(blank=True, editable=False, help_text='Fila de los rollups de SLA en la que se contó al completarse; al reabrirla se descuenta de esa', null=True, verbose_name='Clave de SLA'),
+        ),
+    ]
@@ -1,11 +1,107 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 import secrets
 
+from . import (
+    agenda, asignacion, compensacion, completitud, efectos, eventos, historial, jerarquia, maquina_estados,
+    organizacion, versiones,
+)
+
+
+class SeguimientoCambiosMixin:
+    """
+    Recuerda los valores con que se cargaron de la base de datos los campos
+    listados en ``CAMPOS_SEGUIDOS``, para que los signals puedan saber qué cambió.
+    """
+    
+    CAMPOS_SEGUIDOS = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_valores_originales()
+        return instance
+    
+    def _guardar_valores_originales(self):
+        # __dict__ evita disparar consultas si algún campo fue diferido
+        self._valores_originales = {
+            campo: self.__dict__.get(campo) for campo in self.CAMPOS_SEGUIDOS
+        }
+    
+    def valor_original(self, campo):
+        """Valor del campo al cargarse (``None`` si la instancia es nueva)."""
+        return getattr(self, '_valores_originales', {}).get(campo)
+    
+    def campo_cambio(self, campo):
+        """Indica si el campo cambió; una instancia aún sin guardar no reporta cambios."""
+        if not hasattr(self, '_valores_originales'):
+            return False
+        return self.valor_original(campo) != getattr(self, campo)
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Los signals post_save ya vieron los valores anteriores
+        self._guardar_valores_originales()
+
+
+class TransicionesQuerySet(models.QuerySet):
+    """
+    QuerySet cuyo ``update()`` registra en el historial los cambios de
+    ``estado``, que de otro modo no pasan por ``save()`` ni por los signals.
+    """
+    
+    def update(self, **kwargs):
+        if self.model is Empleado and not kwargs.keys().isdisjoint(organizacion.CAMPOS_DOTACION):
+            organizacion.invalidar(using=self.db)
+        if self.model is Empleado and not kwargs.keys().isdisjoint(compensacion.CAMPOS_COMPENSACION):
+            compensacion.invalidar(using=self.db)
+        if (
+            self.model is Empleado and not kwargs.keys().isdisjoint(completitud.CAMPOS_EMPLEADO)
+            or self.model is Documento and not kwargs.keys().isdisjoint(completitud.CAMPOS_DOCUMENTO)
+        ):
+            completitud.invalidar(using=self.db)
+        if self.model is TareaOnboarding and not kwargs.keys().isdisjoint(agenda.CAMPOS_AGENDA):
+            # No se sabe a quiénes afecta sin otra consulta: se renuevan todos los feeds
+            agenda.invalidar(using=self.db)
+        if self.model is Empleado and not kwargs.keys().isdisjoint(jerarquia.CAMPOS_JERARQUIA):
+            # Los empleados cambian de jefe: mover sus subárboles en la clausura
+            with transaction.atomic(using=self.db):
+                usuarios = list(self.order_by().values_list('usuario_id', flat=True))
+                filas = self._actualizar(**kwargs)
+                jerarquia.reubicar(usuarios, using=self.db)
+            return filas
+        return self._actualizar(**kwargs)
+    
+    def _actualizar(self, **kwargs):
+        if 'estado' not in kwargs:
+            return super().update(**kwargs)
+        
+        with transaction.atomic(using=self.db):
+            antes = dict(self.select_for_update().order_by().values_list('pk', 'estado'))
+            filas = super().update(**kwargs)
+            if isinstance(kwargs['estado'], str):
+                despues = dict.fromkeys(antes, kwargs['estado'])
+            else:
+                # Expresión (Case, F...): leer el valor que quedó
+                despues = dict(
+                    self.model._base_manager.using(self.db)
+                    .filter(pk__in=list(antes)).values_list('pk', 'estado')
+                )
+            historial.registrar(
+                self.model,
+                ((pk, desde, despues.get(pk, desde)) for pk, desde in antes.items()),
+                using=self.db,
+            )
+        return filas
+
 
 class Departamento(models.Model):
     """Modelo para representar los departamentos de la empresa."""
@@ -89,6 +185,12 @@ class Puesto(models.Model):
         verbose_name='Salario Máximo',
         help_text='Rango salarial máximo para este puesto'
     )
+    documentos_requeridos = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Documentos Requeridos',
+        help_text='Tipos de documento que deben estar aprobados; vacío = GESTOR_DOCUMENTOS_REQUERIDOS'
+    )
     activo = models.BooleanField(
         default=True,
         verbose_name='Activo',
@@ -109,9 +211,13 @@ class Puesto(models.Model):
         return f"{self.titulo} - {self.departamento.nombre}"
 
 
-class Empleado(models.Model):
+class Empleado(SeguimientoCambiosMixin, models.Model):
     """Modelo para representar a los empleados en proceso de onboarding."""
     
+    CAMPOS_SEGUIDOS = ('estado', 'progreso', 'puesto_id', 'supervisor_id', 'salario', 'fecha_ingreso')
+    
+    objects = TransicionesQuerySet.as_manager()
+    
     ESTADO_CHOICES = [
         ('pre_ingreso', 'Pre-ingreso'),
         ('en_proceso', 'En Proceso'),
@@ -220,6 +326,12 @@ class Empleado(models.Model):
         verbose_name='Progreso (%)',
         help_text='Porcentaje de avance en el proceso de onboarding'
     )
+    archivado = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Archivado',
+        help_text='Sus tareas y documentos se movieron a ArchivoOnboarding'
+    )
     
     # Notas internas
     notas = models.TextField(
@@ -254,13 +366,27 @@ class Empleado(models.Model):
             ('view_dashboard', 'Puede ver el dashboard de RRHH'),
             ('approve_documents', 'Puede aprobar documentos'),
             ('manage_onboarding', 'Puede gestionar el proceso de onboarding'),
+            ('view_compensacion', 'Puede ver la analítica de compensación'),
         ]
     
     def __str__(self):
         return f"{self.usuario.get_full_name() or self.usuario.username} - {self.estado}"
     
+    def clean(self):
+        # Un jefe no puede reportar a alguien de su propia línea de reporte
+        if self.supervisor_id and self.usuario_id and (
+            self.supervisor_id == self.usuario_id
+            or jerarquia.es_subordinado(self.supervisor_id, self.usuario_id)
+        ):
+            raise ValidationError({
+                'supervisor': 'El supervisor no puede ser el propio empleado ni alguien de su línea de reporte.'
+            })
+    
     def calcular_progreso(self):
         """Calcula el progreso del onboarding basado en tareas completadas."""
+        if self.archivado:
+            # Sus tareas ya no están en la tabla: el progreso quedó fijo al archivar
+            return self.progreso
         total_tareas = self.tareas.count()
         if total_tareas == 0:
             return 0
@@ -273,9 +399,13 @@ class Empleado(models.Model):
         self.save(update_fields=['progreso'])
 
 
-class Documento(models.Model):
+class Documento(SeguimientoCambiosMixin, models.Model):
     """Modelo para gestionar los documentos del empleado."""
     
+    CAMPOS_SEGUIDOS = ('estado', 'tipo')
+    
+    objects = TransicionesQuerySet.as_manager()
+    
     TIPO_CHOICES = [
         ('contrato', 'Contrato de Trabajo'),
         ('cedula', 'Cédula de Identidad'),
@@ -367,14 +497,22 @@ class Documento(models.Model):
         verbose_name = 'Documento'
         verbose_name_plural = 'Documentos'
         ordering = ['-fecha_subida']
+        indexes = [
+            # Cola de revisión (documentos pendientes, los más antiguos primero)
+            models.Index(fields=['estado', 'fecha_subida'], name='documento_cola_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.empleado.usuario.get_full_name() or self.empleado.usuario.username}"
 
 
-class TareaOnboarding(models.Model):
+class TareaOnboarding(SeguimientoCambiosMixin, models.Model):
     """Modelo para gestionar las tareas del proceso de onboarding."""
     
+    CAMPOS_SEGUIDOS = ('estado', 'fecha_limite', 'responsable_usuario_id')
+    
+    objects = TransicionesQuerySet.as_manager()
+    
     RESPONSABLE_CHOICES = [
         ('rrhh', 'Recursos Humanos'),
         ('it', 'Tecnología (IT)'),
@@ -400,6 +538,12 @@ class TareaOnboarding(models.Model):
         ('urgente', 'Urgente'),
     ]
     
+    AVISO_CHOICES = [
+        ('', 'Sin aviso'),
+        ('proxima', 'Próxima a vencer'),
+        ('vencida', 'Vencida'),
+    ]
+    
     empleado = models.ForeignKey(
         Empleado,
         on_delete=models.CASCADE,
@@ -448,6 +592,13 @@ class TareaOnboarding(models.Model):
         blank=True,
         verbose_name='Fecha de Completado'
     )
+    clave_sla = models.JSONField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Clave de SLA',
+        help_text='Fila de los rollups de SLA en la que se contó al completarse; al reabrirla se descuenta de esa'
+    )
     
     # Estado y prioridad
     estado = models.CharField(
@@ -474,6 +625,21 @@ class TareaOnboarding(models.Model):
         verbose_name='Orden',
         help_text='Orden de ejecución de la tarea'
     )
+    duracion_estimada = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Duración Estimada (días)',
+        help_text='Días que suele tomar la tarea; se usa para estimar la ruta crítica'
+    )
+    depende_de = models.ManyToManyField(
+        'self',
+        through='DependenciaTarea',
+        through_fields=('tarea', 'requisito'),
+        symmetrical=False,
+        related_name='dependientes',
+        blank=True,
+        verbose_name='Depende de',
+        help_text='Tareas que deben completarse antes de iniciar esta'
+    )
     
     # Notas
     notas = models.TextField(
@@ -500,14 +666,531 @@ class TareaOnboarding(models.Model):
         related_name='tareas_completadas',
         verbose_name='Completado Por'
     )
+    aviso_vencimiento = models.CharField(
+        max_length=10,
+        choices=AVISO_CHOICES,
+        blank=True,
+        default='',
+        verbose_name='Aviso de Vencimiento',
+        help_text='Último aviso de vencimiento enviado (scan_tareas_vencidas)'
+    )
     
     class Meta:
         verbose_name = 'Tarea de Onboarding'
         verbose_name_plural = 'Tareas de Onboarding'
         ordering = ['orden', 'fecha_limite', '-prioridad']
+        indexes = [
+            # Tareas abiertas por fecha límite (dashboard); con los responsables,
+            # el calendario de carga se agrupa leyendo solo el índice
+            models.Index(
+                fields=['estado', 'fecha_limite', 'responsable_usuario', 'responsable'],
+                name='tarea_estado_limite_idx',
+            ),
+            # scan_tareas_vencidas: solo recorre las tareas que aún deben avisarse
+            models.Index(
+                fields=['estado', 'aviso_vencimiento', 'fecha_limite'],
+                name='tarea_aviso_limite_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.titulo} - {self.empleado.usuario.get_full_name() or self.empleado.usuario.username}"
+    
+    def save(self, *args, **kwargs):
+        # Un nuevo plazo vuelve a habilitar los avisos de vencimiento
+        if self.aviso_vencimiento and self.campo_cambio('fecha_limite'):
+            self.aviso_vencimiento = ''
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'aviso_vencimiento'}
+        # Los rollups de SLA se agrupan por fecha de completado
+        if self.estado == 'completado' and not self.fecha_completado:
+            self.fecha_completado = timezone.localdate()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'fecha_completado'}
+        super().save(*args, **kwargs)
+
+
+class DependenciaTarea(models.Model):
+    """Arista del grafo de dependencias: ``tarea`` no puede iniciarse sin completar ``requisito``."""
+    
+    tarea = models.ForeignKey(
+        TareaOnboarding,
+        on_delete=models.CASCADE,
+        related_name='dependencias',
+        verbose_name='Tarea'
+    )
+    requisito = models.ForeignKey(
+        TareaOnboarding,
+        on_delete=models.CASCADE,
+        related_name='requisito_de',
+        verbose_name='Requisito',
+        help_text='Tarea que debe completarse primero'
+    )
+    
+    class Meta:
+        verbose_name = 'Dependencia de Tarea'
+        verbose_name_plural = 'Dependencias de Tareas'
+        constraints = [
+            models.UniqueConstraint(fields=['tarea', 'requisito'], name='dependencia_unica'),
+            models.CheckConstraint(
+                condition=~Q(tarea=F('requisito')), name='dependencia_no_reflexiva'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.tarea.titulo} ← {self.requisito.titulo}"
+    
+    def clean(self):
+        from .dependencias import validar_requisitos
+        
+        if self.tarea_id and self.requisito_id:
+            validar_requisitos(self.tarea, [self.requisito])
+
+
+class ResumenSLA(models.Model):
+    """
+    Rollup de tareas completadas por día, área responsable, departamento y
+    duración del ciclo (en días). Guardar el histograma de duraciones permite
+    combinar cualquier rango de días y obtener la media y el p90 exactos.
+    
+    Se mantiene de forma incremental (``gestor.sla``) y se puede reconstruir
+    con ``python manage.py backfill_sla``.
+    """
+    
+    fecha = models.DateField(
+        verbose_name='Fecha',
+        help_text='Día en que se completaron las tareas'
+    )
+    responsable = models.CharField(
+        max_length=20,
+        choices=TareaOnboarding.RESPONSABLE_CHOICES,
+        verbose_name='Responsable'
+    )
+    # Sin restricción de FK: el histórico se conserva aunque se borre el departamento
+    departamento = models.ForeignKey(
+        Departamento,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Departamento'
+    )
+    ciclo_dias = models.PositiveSmallIntegerField(
+        verbose_name='Ciclo (días)',
+        help_text='Días desde el inicio (o la creación) hasta completar la tarea'
+    )
+    cantidad = models.IntegerField(
+        default=0,
+        verbose_name='Tareas Completadas'
+    )
+    a_tiempo = models.IntegerField(
+        default=0,
+        verbose_name='Completadas a Tiempo'
+    )
+    
+    class Meta:
+        verbose_name = 'Resumen SLA'
+        verbose_name_plural = 'Resúmenes SLA'
+        ordering = ['-fecha', 'responsable']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'responsable', 'departamento', 'ciclo_dias'],
+                name='resumen_sla_unico',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.get_responsable_display()} ({self.cantidad})"
+
+
+class RegistroTransicion(models.Model):
+    """
+    Historial append-only de cambios de estado de empleados, documentos y
+    tareas, capturados desde ``save()`` y desde ``QuerySet.update()``
+    (ver ``gestor.historial``). Las entradas no se modifican ni se borran.
+    """
+    
+    ENTIDAD_CHOICES = [
+        ('empleado', 'Empleado'),
+        ('documento', 'Documento'),
+        ('tareaonboarding', 'Tarea de Onboarding'),
+    ]
+    
+    entidad = models.CharField(
+        max_length=20,
+        choices=ENTIDAD_CHOICES,
+        verbose_name='Entidad'
+    )
+    objeto_id = models.BigIntegerField(
+        verbose_name='ID del Objeto'
+    )
+    desde = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Estado Anterior',
+        help_text='Vacío si el objeto se creó con este estado'
+    )
+    hacia = models.CharField(
+        max_length=20,
+        verbose_name='Estado Nuevo'
+    )
+    # Sin restricción de FK: el historial no cambia aunque se borre el usuario
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Usuario'
+    )
+    fecha = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Fecha'
+    )
+    
+    class Meta:
+        verbose_name = 'Registro de Transición'
+        verbose_name_plural = 'Historial de Transiciones'
+        ordering = ['-fecha']
+        indexes = [
+            # Auditorías por entidad y rango de fechas
+            models.Index(fields=['entidad', 'fecha'], name='transicion_entidad_fecha_idx'),
+            # Historial de un objeto concreto
+            models.Index(fields=['entidad', 'objeto_id', 'fecha'], name='transicion_objeto_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.entidad} #{self.objeto_id}: {self.desde or '—'} → {self.hacia}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('El historial de transiciones no se puede modificar.')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError('El historial de transiciones no se puede borrar.')
+
+
+class JerarquiaSupervision(models.Model):
+    """
+    Tabla de clausura de la línea de reporte (``Empleado.supervisor``): una
+    fila por cada par (jefe, subordinado directo o indirecto) con la distancia
+    entre ambos, más la fila de cada usuario consigo mismo (profundidad 0).
+    
+    Se mantiene al cambiar el supervisor de un empleado (``gestor.jerarquia``)
+    y se reconstruye con ``python manage.py reconstruir_jerarquia``.
+    """
+    
+    ancestro = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Jefe'
+    )
+    descendiente = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Subordinado'
+    )
+    profundidad = models.PositiveSmallIntegerField(
+        verbose_name='Profundidad',
+        help_text='Niveles entre el jefe y el subordinado (0 para el propio usuario)'
+    )
+    
+    class Meta:
+        verbose_name = 'Relación Jerárquica'
+        verbose_name_plural = 'Jerarquía de Supervisión'
+        constraints = [
+            # También resuelve "ancestros de un usuario" (descendiente = X)
+            models.UniqueConstraint(
+                fields=['descendiente', 'ancestro'],
+                name='jerarquia_par_unico',
+            ),
+        ]
+        indexes = [
+            # Subárbol de un jefe leyendo solo el índice
+            models.Index(
+                fields=['ancestro', 'profundidad', 'descendiente'],
+                name='jerarquia_subarbol_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestro_id} → {self.descendiente_id} ({self.profundidad})"
+
+
+class ArchivoOnboarding(models.Model):
+    """
+    Tareas (con sus dependencias) y metadatos de documentos de un onboarding
+    completado hace tiempo, en una fila comprimida (JSON + zlib) fuera de las
+    tablas que recorren los listados. Los archivos subidos no se mueven.
+    
+    Lo escribe ``python manage.py archivar_onboardings`` (``gestor.archivo``),
+    que también lo restaura.
+    """
+    
+    empleado = models.OneToOneField(
+        Empleado,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='archivo_onboarding',
+        verbose_name='Empleado'
+    )
+    datos = models.BinaryField(
+        verbose_name='Datos',
+        help_text='JSON comprimido con zlib: tareas, dependencias y documentos'
+    )
+    total_tareas = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Tareas'
+    )
+    total_documentos = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Documentos'
+    )
+    fecha_archivo = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Fecha de Archivo'
+    )
+    
+    class Meta:
+        verbose_name = 'Onboarding Archivado'
+        verbose_name_plural = 'Onboardings Archivados'
+        ordering = ['-fecha_archivo']
+    
+    def __str__(self):
+        return f"{self.empleado} ({self.total_tareas} tareas, {self.total_documentos} documentos)"
+
+
+def tareas_dependientes(tarea_ids):
+    """Queryset de las tareas que tienen como requisito alguna de ``tarea_ids``."""
+    return TareaOnboarding.objects.filter(
+        pk__in=DependenciaTarea.objects.filter(requisito_id__in=tarea_ids).values('tarea_id')
+    )
+
+
+def actualizar_bloqueos(tareas):
+    """
+    Sincroniza el estado de ``tareas`` (queryset) con sus requisitos:
+    
+    - ``bloqueado`` con dependencias, todas completadas -> ``pendiente``.
+    - ``pendiente`` con algún requisito sin completar -> ``bloqueado``.
+    
+    Cada transición es un único UPDATE por conjunto, sin importar cuántas
+    tareas cambien. Devuelve el número de tareas modificadas.
+    """
+    aristas = DependenciaTarea.objects.filter(tarea=OuterRef('pk'))
+    candidatas = tareas.order_by().annotate(
+        tiene_requisitos=Exists(aristas),
+        requisitos_pendientes=Exists(aristas.exclude(requisito__estado='completado')),
+    )
+    transiciones = [
+        ('bloqueado', 'pendiente', candidatas.filter(
+            estado='bloqueado', tiene_requisitos=True, requisitos_pendientes=False
+        )),
+        ('pendiente', 'bloqueado', candidatas.filter(
+            estado='pendiente', requisitos_pendientes=True
+        )),
+    ]
+    
+    ahora = timezone.now()
+    cambiadas = 0
+    for desde, hacia, queryset in transiciones:
+        filas = list(queryset.values('id', 'empleado_id', 'titulo'))
+        if not filas:
+            continue
+        cambiadas += TareaOnboarding.objects.filter(
+            pk__in=[fila['id'] for fila in filas], estado=desde
+        ).update(estado=hacia, fecha_actualizacion=ahora)
+        for fila in filas:
+            eventos.publicar('tarea_estado', {**fila, 'desde': desde, 'hacia': hacia})
+    return cambiadas
+
+
+def recalcular_progresos(empleado_ids):
+    """
+    Recalcula ``progreso`` de varios empleados con un único UPDATE.
+    
+    Equivale a ``Empleado.actualizar_progreso`` para cada uno, pero sin cargar
+    instancias ni disparar signals (se usa en las actualizaciones masivas).
+    """
+    tareas = TareaOnboarding.objects.filter(empleado=OuterRef('pk')).order_by()
+    total = tareas.values('empleado').annotate(n=Count('pk')).values('n')
+    completadas = (
+        tareas.filter(estado='completado')
+        .values('empleado').annotate(n=Count('pk')).values('n')
+    )
+    # División entera, igual que int(completadas / total * 100)
+    return Empleado.objects.filter(pk__in=empleado_ids).update(
+        progreso=Coalesce(
+            Subquery(completadas) * 100 / Subquery(total),
+            Value(0),
+            output_field=models.IntegerField(),
+        ),
+        fecha_actualizacion=timezone.now(),
+    )
+
+
+def generar_token_calendario():
+    return secrets.token_urlsafe(32)
+
+
+class SuscripcionCalendario(models.Model):
+    """
+    URL secreta del calendario (iCalendar) de tareas de un usuario
+    (``gestor.agenda``). Regenerar el token invalida la URL anterior.
+    """
+    
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suscripcion_calendario',
+        verbose_name='Usuario'
+    )
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        default=generar_token_calendario,
+        verbose_name='Token'
+    )
+    fecha_generacion = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Fecha de Generación'
+    )
+    
+    class Meta:
+        verbose_name = 'Suscripción al Calendario'
+        verbose_name_plural = 'Suscripciones al Calendario'
+    
+    def __str__(self):
+        return f"Calendario de {self.usuario.username}"
+    
+    @classmethod
+    def para(cls, usuario):
+        return cls.objects.get_or_create(usuario=usuario)[0]
+    
+    def regenerar(self):
+        self.token = generar_token_calendario()
+        self.fecha_generacion = timezone.now()
+        self.save(update_fields=['token', 'fecha_generacion'])
+
+
+class Reporte(models.Model):
+    """
+    Un reporte pedido a ``gestor.reportes``: definición, parámetros y formato
+    para una versión de los datos. Es a la vez el trabajo en cola del worker y
+    el resultado en caché: la ``clave`` es única, así que los pedidos iguales
+    comparten la fila (y el archivo generado).
+    """
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'En cola'),
+        ('en_proceso', 'Generando'),
+        ('listo', 'Listo'),
+        ('error', 'Error'),
+    ]
+    
+    FORMATO_CHOICES = [
+        ('xlsx', 'Excel (XLSX)'),
+        ('csv', 'CSV'),
+        ('html', 'HTML'),
+    ]
+    
+    definicion = models.CharField(
+        max_length=50,
+        verbose_name='Reporte'
+    )
+    parametros = models.JSONField(
+        default=dict,
+        verbose_name='Parámetros'
+    )
+    formato = models.CharField(
+        max_length=10,
+        choices=FORMATO_CHOICES,
+        verbose_name='Formato'
+    )
+    version_datos = models.CharField(
+        max_length=64,
+        verbose_name='Versión de los Datos'
+    )
+    clave = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Clave',
+        help_text='Hash de la definición, los parámetros, el formato y la versión de los datos'
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADO_CHOICES,
+        default='pendiente',
+        verbose_name='Estado'
+    )
+    archivo = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Archivo',
+        help_text='Nombre del archivo en GESTOR_DIRECTORIO_REPORTES'
+    )
+    filas = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Filas'
+    )
+    tamano = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Tamaño (bytes)'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Error'
+    )
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+    solicitantes = models.ManyToManyField(
+        User,
+        related_name='reportes',
+        blank=True,
+        verbose_name='Solicitantes'
+    )
+    fecha_solicitud = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Fecha de Solicitud'
+    )
+    fecha_inicio = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Inicio de la Generación'
+    )
+    fecha_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fin de la Generación'
+    )
+    
+    class Meta:
+        verbose_name = 'Reporte'
+        verbose_name_plural = 'Reportes'
+        ordering = ['-fecha_solicitud']
+        indexes = [
+            # Cola del worker: los pendientes más antiguos primero
+            models.Index(fields=['estado', 'fecha_solicitud'], name='reporte_cola_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.definicion} ({self.formato}) - {self.get_estado_display()}"
+    
+    @property
+    def duracion(self):
+        """Segundos que tomó generarlo (``None`` si no terminó)."""
+        if self.fecha_inicio and self.fecha_fin:
+            return (self.fecha_fin - self.fecha_inicio).total_seconds()
+        return None
 
 
 # ======================
@@ -551,6 +1234,8 @@ def crear_tareas_automaticas(sender, instance, created, **kwargs):
                 'prioridad': 'media',
                 'dias_antes': 1,
                 'orden': 3,
+                # Correo creado y contrato/NDA firmados
+                'requisitos': [1, 4, 5],
             },
             {
                 'titulo': 'Firmar contrato de trabajo',
@@ -575,6 +1260,7 @@ def crear_tareas_automaticas(sender, instance, created, **kwargs):
                 'prioridad': 'alta',
                 'dias_antes': 7,
                 'orden': 6,
+                'duracion_estimada': 3,
             },
             {
                 'titulo': 'Inscripción en sistema de nómina',
@@ -583,6 +1269,9 @@ def crear_tareas_automaticas(sender, instance, created, **kwargs):
                 'prioridad': 'alta',
                 'dias_antes': 3,
                 'orden': 7,
+                'duracion_estimada': 2,
+                # Contrato firmado y documentos personales recibidos
+                'requisitos': [4, 6],
             },
             {
                 'titulo': 'Asignación de supervisor y equipo',
@@ -607,20 +1296,37 @@ def crear_tareas_automaticas(sender, instance, created, **kwargs):
                 'prioridad': 'alta',
                 'dias_antes': 0,
                 'orden': 10,
+                'requisitos': [5],
             },
         ]
         
-        # Crear las tareas
-        for tarea_data in tareas_predeterminadas:
-            dias_antes = tarea_data.pop('dias_antes')
-            fecha_limite = fecha_base - timedelta(days=dias_antes) if dias_antes > 0 else fecha_base
+        # Crear las tareas; las que tienen requisitos empiezan bloqueadas. En una
+        # transacción: el progreso y el estado se recalculan una vez, no por tarea.
+        # Las de áreas con grupo van al miembro con menos tareas abiertas
+        asignador = asignacion.Asignador(using=kwargs['using'])
+        creadas = {}
+        dependencias = []
+        with transaction.atomic(using=kwargs['using']):
+            for tarea_data in tareas_predeterminadas:
+                dias_antes = tarea_data.pop('dias_antes')
+                requisitos = tarea_data.pop('requisitos', [])
+                fecha_limite = fecha_base - timedelta(days=dias_antes) if dias_antes > 0 else fecha_base
+                
+                tarea = TareaOnboarding.objects.create(
+                    empleado=instance,
+                    fecha_limite=fecha_limite,
+                    es_automatica=True,
+                    responsable_usuario_id=asignador.elegir(tarea_data['responsable']),
+                    estado='bloqueado' if requisitos else 'pendiente',
+                    **tarea_data
+                )
+                creadas[tarea.orden] = tarea
+                dependencias.extend((tarea, orden) for orden in requisitos)
             
-            TareaOnboarding.objects.create(
-                empleado=instance,
-                fecha_limite=fecha_limite,
-                es_automatica=True,
-                **tarea_data
-            )
+            DependenciaTarea.objects.bulk_create([
+                DependenciaTarea(tarea=tarea, requisito=creadas[orden])
+                for tarea, orden in dependencias
+            ])
 
 
 @receiver(post_save, sender=Empleado)
@@ -677,4 +1383,303 @@ def actualizar_progreso_empleado(sender, instance, **kwargs):
     """
     Signal que actualiza el progreso del empleado cuando cambia el estado de una tarea.
     """
-    instance.empleado.actualizar_progreso()
+    # Una vez por empleado al confirmar, aunque la transacción guarde muchas tareas
+    efectos.diferir('progreso', instance.empleado_id, instance.empleado.actualizar_progreso, using=kwargs['using'])
+    
+    # Completar (o reabrir) una tarea desbloquea (o bloquea) a sus dependientes
+    if not kwargs.get('created') and 'completado' in (
+        instance.estado, instance.valor_original('estado')
+    ) and instance.campo_cambio('estado'):
+        actualizar_bloqueos(tareas_dependientes([instance.pk]))
+    
+    # Rollups de SLA: sumar al completar, restar al reabrir
+    if kwargs.get('created') or instance.campo_cambio('estado'):
+        from .sla import registrar_tareas
+        
+        # La instancia refleja la clave guardada: un save() posterior no la pisa
+        if instance.estado == 'completado':
+            instance.clave_sla = registrar_tareas([instance.pk], signo=1).get(instance.pk)
+        elif not kwargs.get('created') and instance.valor_original('estado') == 'completado':
+            registrar_tareas([instance.pk], signo=-1)
+            instance.clave_sla = None
+    
+    if kwargs.get('created') or instance.campo_cambio('estado'):
+        eventos.publicar('tarea_estado', {
+            'id': instance.pk,
+            'empleado_id': instance.empleado_id,
+            'titulo': instance.titulo,
+            'desde': None if kwargs.get('created') else instance.valor_original('estado'),
+            'hacia': instance.estado,
+        })
+
+
+# ======================
+# SIGNALS (Historial)
+# ======================
+
+@receiver(post_save, sender=Empleado)
+@receiver(post_save, sender=Documento)
+@receiver(post_save, sender=TareaOnboarding)
+def registrar_transicion(sender, instance, created, **kwargs):
+    """Registra en el historial las altas y los cambios de estado hechos con ``save()``."""
+    if created or instance.campo_cambio('estado'):
+        desde = None if created else instance.valor_original('estado')
+        historial.registrar(sender, [(instance.pk, desde, instance.estado)], using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Dotación)
+# ======================
+
+@receiver(post_save, sender=Empleado)
+def invalidar_dotacion_empleado(sender, instance, created, **kwargs):
+    """Descarta la dotación en caché si el empleado entra, cambia de estado o de puesto."""
+    if created or instance.campo_cambio('estado') or instance.campo_cambio('puesto_id'):
+        organizacion.invalidar(using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Empleado)
+@receiver(post_save, sender=Puesto)
+@receiver(post_delete, sender=Puesto)
+@receiver(post_delete, sender=Departamento)
+def invalidar_dotacion(sender, **kwargs):
+    """Bajas de empleados y cambios en la estructura de puestos y departamentos."""
+    organizacion.invalidar(using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Compensación)
+# ======================
+
+@receiver(post_save, sender=Empleado)
+def invalidar_compensacion_empleado(sender, instance, created, **kwargs):
+    """Nueva versión de la analítica salarial si cambia el salario, el puesto o el estado."""
+    if created or any(
+        instance.campo_cambio(campo) for campo in ('salario', 'puesto_id', 'estado')
+    ):
+        compensacion.invalidar(using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Empleado)
+@receiver(post_save, sender=Puesto)
+@receiver(post_delete, sender=Puesto)
+@receiver(post_delete, sender=Departamento)
+def invalidar_compensacion(sender, **kwargs):
+    """Bajas de empleados y cambios de bandas salariales o de estructura."""
+    compensacion.invalidar(using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Completitud documental)
+# ======================
+
+@receiver(post_save, sender=Empleado)
+def invalidar_completitud_empleado(sender, instance, created, **kwargs):
+    """Nueva versión de la matriz si el empleado entra, cambia de estado o de puesto."""
+    if created or instance.campo_cambio('estado') or instance.campo_cambio('puesto_id'):
+        completitud.invalidar(using=kwargs['using'])
+
+
+@receiver(post_save, sender=Documento)
+def invalidar_completitud_documento(sender, instance, created, **kwargs):
+    """Documentos nuevos y cambios de estado o de tipo."""
+    if created or instance.campo_cambio('estado') or instance.campo_cambio('tipo'):
+        completitud.invalidar(using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Empleado)
+@receiver(post_delete, sender=Documento)
+@receiver(post_save, sender=Puesto)
+@receiver(post_delete, sender=Puesto)
+def invalidar_completitud(sender, **kwargs):
+    """Bajas y cambios en los documentos requeridos de un puesto."""
+    completitud.invalidar(using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Jerarquía)
+# ======================
+
+@receiver(post_save, sender=Empleado)
+def actualizar_jerarquia(sender, instance, created, **kwargs):
+    """Mueve al empleado (y a su equipo) en la línea de reporte al cambiar de supervisor."""
+    if created or instance.campo_cambio('supervisor_id'):
+        jerarquia.mover(instance.usuario_id, instance.supervisor_id, using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Empleado)
+def quitar_de_jerarquia(sender, instance, **kwargs):
+    """El usuario deja de reportar a su supervisor; conserva a su propio equipo."""
+    jerarquia.desvincular(instance.usuario_id, using=kwargs['using'])
+
+
+@receiver(pre_delete, sender=User)
+def desvincular_equipo(sender, instance, **kwargs):
+    """
+    Al borrar un jefe, su equipo directo pasa a ser raíz antes de que
+    ``SET_NULL`` vacíe ``supervisor`` con un UPDATE que no dispara signals.
+    """
+    for usuario_id in instance.empleados_supervisados.values_list('usuario_id', flat=True):
+        jerarquia.desvincular(usuario_id, using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Estado del onboarding)
+# ======================
+
+def _reevaluar_estado(empleado_id, empleado=None, publicar=True, using=None):
+    """
+    Reevalúa el estado de un empleado (una vez por transacción, al confirmar)
+    y, si se tiene su instancia en memoria, la sincroniza para que un
+    ``save()`` posterior no lo pise.
+    """
+    def reevaluar():
+        cambios = maquina_estados.reevaluar([empleado_id], publicar=publicar)
+        if empleado is not None and empleado_id in cambios:
+            empleado.estado = cambios[empleado_id][1]
+            empleado._guardar_valores_originales()
+    
+    efectos.diferir('estado', empleado_id, reevaluar, using=using)
+
+
+@receiver(post_save, sender=Empleado)
+def reevaluar_estado_empleado(sender, instance, created, **kwargs):
+    """Altas y cambios de fecha de ingreso o de puesto (cambian los documentos requeridos)."""
+    if created or instance.campo_cambio('fecha_ingreso') or instance.campo_cambio('puesto_id'):
+        # El alta ya se publica con su estado final (empleado_creado)
+        _reevaluar_estado(instance.pk, instance, publicar=not created, using=kwargs['using'])
+
+
+@receiver(post_save, sender=TareaOnboarding)
+@receiver(post_save, sender=Documento)
+def reevaluar_estado_por_cambio(sender, instance, created, **kwargs):
+    """Tareas y documentos nuevos o que cambian de estado (o de tipo, los documentos)."""
+    if created or instance.campo_cambio('estado') or (
+        sender is Documento and instance.campo_cambio('tipo')
+    ):
+        empleado = instance.empleado if sender.empleado.is_cached(instance) else None
+        _reevaluar_estado(instance.empleado_id, empleado, using=kwargs['using'])
+
+
+@receiver(post_delete, sender=TareaOnboarding)
+@receiver(post_delete, sender=Documento)
+def reevaluar_estado_por_baja(sender, instance, **kwargs):
+    """Tareas y documentos borrados (no en cascada al borrar su empleado)."""
+    origen = kwargs.get('origin')
+    if isinstance(origen, Empleado) or getattr(origen, 'model', None) is Empleado:
+        return
+    _reevaluar_estado(instance.empleado_id, using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Calendario)
+# ======================
+
+@receiver(post_save, sender=TareaOnboarding)
+@receiver(post_delete, sender=TareaOnboarding)
+def invalidar_agenda_tarea(sender, instance, **kwargs):
+    """Renueva el feed del responsable (y del anterior, si cambió) y el del empleado."""
+    using = kwargs['using']
+    agenda.invalidar_usuario(instance.responsable_usuario_id, using=using)
+    if instance.campo_cambio('responsable_usuario_id'):
+        agenda.invalidar_usuario(instance.valor_original('responsable_usuario_id'), using=using)
+    if sender.empleado.is_cached(instance):
+        agenda.invalidar_usuario(instance.empleado.usuario_id, using=using)
+    else:
+        agenda.invalidar_empleado(instance.empleado_id, using=using)
+
+
+@receiver(post_delete, sender=Empleado)
+def invalidar_agenda_empleado(sender, instance, **kwargs):
+    """Sus tareas se borran en cascada: el empleado ya no existe al confirmar."""
+    agenda.invalidar_usuario(instance.usuario_id, using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Versiones de la API)
+# ======================
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Puesto)
+@receiver(post_save, sender=Departamento)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Puesto)
+@receiver(post_delete, sender=Departamento)
+def invalidar_versiones(sender, **kwargs):
+    """Cambios en las tablas que la API une a los empleados (ETag de sus recursos)."""
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        # Cada inicio de sesión guarda last_login, que la API no muestra
+        return
+    versiones.invalidar(using=kwargs['using'])
+
+
+# ======================
+# SIGNALS (Eventos en vivo)
+# ======================
+
+@receiver(post_save, sender=Empleado)
+def publicar_evento_empleado(sender, instance, created, **kwargs):
+    """Publica altas, cambios de estado y de progreso para el Kanban y el dashboard."""
+    if created:
+        eventos.publicar('empleado_creado', eventos.tarjeta_empleado(instance))
+        return
+    
+    if instance.campo_cambio('estado'):
+        datos = eventos.tarjeta_empleado(instance)
+        datos['desde'] = instance.valor_original('estado')
+        eventos.publicar('empleado_estado', datos)
+    elif instance.campo_cambio('progreso'):
+        eventos.publicar('empleado_progreso', {
+            'id': instance.pk,
+            'progreso': instance.progreso,
+        })
+
+
+@receiver(post_save, sender=Documento)
+def publicar_evento_documento(sender, instance, created, **kwargs):
+    """Publica los documentos nuevos y los cambios de estado de revisión."""
+    if not created and not instance.campo_cambio('estado'):
+        return
+    
+    datos = {
+        'id': instance.pk,
+        'empleado_id': instance.empleado_id,
+        'desde': None if created else instance.valor_original('estado'),
+        'hacia': instance.estado,
+    }
+    if instance.estado == 'pendiente':
+        datos.update(eventos.fila_documento(instance))
+    eventos.publicar('documento_estado', datos)
+
+
+@receiver(post_delete, sender=Empleado)
+def publicar_baja_empleado(sender, instance, **kwargs):
+    """Quita la tarjeta del Kanban y descuenta al empleado de los KPIs del dashboard."""
+    eventos.publicar('empleado_eliminado', {
+        'id': instance.pk,
+        'estado': instance.estado,
+        'este_mes': timezone.localdate(instance.fecha_creacion) >= timezone.localdate().replace(day=1),
+    })
+
+
+@receiver(post_delete, sender=TareaOnboarding)
+def publicar_baja_tarea(sender, instance, **kwargs):
+    """Una baja es un cambio de estado hacia ``None``: el dashboard la descuenta."""
+    eventos.publicar('tarea_estado', {
+        'id': instance.pk,
+        'empleado_id': instance.empleado_id,
+        'titulo': instance.titulo,
+        'desde': instance.estado,
+        'hacia': None,
+    })
+
+
+@receiver(post_delete, sender=Documento)
+def publicar_baja_documento(sender, instance, **kwargs):
+    """Descuenta el documento de los pendientes (y lo quita de la lista si estaba)."""
+    eventos.publicar('documento_estado', {
+        'id': instance.pk,
+        'empleado_id': instance.empleado_id,
+        'desde': instance.estado,
+        'hacia': None,
+    })
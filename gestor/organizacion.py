@@ -0,0 +1,116 @@
+"""
+Dotación por departamento y por puesto, desglosada por estado del empleado.
+
+Los conteos salen de dos consultas agrupadas independientes (empleados por
+puesto y estado; puestos por departamento). Contar ambos sobre el mismo JOIN
+multiplica las filas: un departamento con 3 puestos y 10 empleados reportaba
+10 puestos, y la consulta crecía con puestos × empleados.
+
+El resumen se guarda en la caché y se invalida al confirmar la transacción que
+cambia un empleado (alta, baja, estado o puesto), un puesto o un departamento.
+"""
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import efectos
+
+CLAVE_CACHE = 'gestor:organizacion:dotacion'
+# Por si algo escribe sin pasar por el ORM (SQL directo, otra aplicación)
+DURACION_CACHE = 600
+# Campos de Empleado que cambian la dotación en un QuerySet.update()
+CAMPOS_DOTACION = ('estado', 'puesto', 'puesto_id')
+
+
+@dataclass
+class Dotacion:
+    """Empleados por estado (y puestos, para un departamento)."""
+    
+    por_estado: dict = field(default_factory=dict)
+    puestos: int = 0
+    
+    @property
+    def total(self):
+        return sum(self.por_estado.values())
+    
+    def estados(self):
+        """``(codigo, nombre, cantidad)`` de los estados con empleados, en orden."""
+        from .models import Empleado
+        
+        return [
+            (codigo, nombre, self.por_estado[codigo])
+            for codigo, nombre in Empleado.ESTADO_CHOICES
+            if self.por_estado.get(codigo)
+        ]
+
+
+def calcular():
+    """``{'departamentos': {id: Dotacion}, 'puestos': {id: Dotacion}}`` sin caché."""
+    from .models import Empleado, Puesto
+    
+    departamentos = {}
+    puestos = {}
+    departamento_de = {}
+    for puesto_id, departamento_id in Puesto.objects.order_by().values_list('pk', 'departamento_id'):
+        puestos[puesto_id] = Dotacion()
+        departamento_de[puesto_id] = departamento_id
+        departamentos.setdefault(departamento_id, Dotacion()).puestos += 1
+    
+    grupos = (
+        Empleado.objects.order_by()
+        .values_list('puesto_id', 'estado')
+        .annotate(total=Count('pk'))
+    )
+    for puesto_id, estado, total in grupos:
+        for dotacion in (puestos[puesto_id], departamentos[departamento_de[puesto_id]]):
+            dotacion.por_estado[estado] = dotacion.por_estado.get(estado, 0) + total
+    return {'departamentos': departamentos, 'puestos': puestos}
+
+
+def resumen():
+    """Dotación desde la caché; se recalcula (2 consultas) si no está."""
+    datos = cache.get(CLAVE_CACHE)
+    if datos is None:
+        datos = calcular()
+        cache.set(CLAVE_CACHE, datos, DURACION_CACHE)
+    return datos
+
+
+def _borrar_cache():
+    cache.delete(CLAVE_CACHE)
+
+
+def invalidar(using=None):
+    """Descarta el resumen cuando confirme la transacción en curso (una vez por transacción)."""
+    efectos.diferir('cache_dotacion', None, _borrar_cache, using=using)
+
+
+def _contar(subconsulta, campo):
+    return Coalesce(
+        Subquery(subconsulta.order_by().values(campo).annotate(n=Count('pk')).values('n')),
+        Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def anotar_departamentos(queryset):
+    """Anota ``total_puestos`` y ``total_empleados`` con subconsultas independientes."""
+    from .models import Empleado, Puesto
+    
+    return queryset.annotate(
+        total_puestos=_contar(Puesto.objects.filter(departamento=OuterRef('pk')), 'departamento'),
+        total_empleados=_contar(
+            Empleado.objects.filter(puesto__departamento=OuterRef('pk')), 'puesto__departamento'
+        ),
+    )
+
+
+def anotar_puestos(queryset):
+    """Anota ``total_empleados`` con una subconsulta por puesto."""
+    from .models import Empleado
+    
+    return queryset.annotate(
+        total_empleados=_contar(Empleado.objects.filter(puesto=OuterRef('pk')), 'puesto'),
+    )
@@ -0,0 +1,473 @@
+"""
+Reportes mensuales de onboarding, generados en segundo plano (XLSX, CSV o HTML).
+
+Un reporte es una definición registrada con ``@definicion`` (una función que
+devuelve ``{'columnas': [...], 'filas': [...]}``), sus parámetros (mes y
+departamento) y un formato. Pedirlo (``solicitar``) no lo calcula: deja una
+fila de ``Reporte`` pendiente que el worker (``python manage.py
+procesar_reportes``) toma, calcula y escribe en ``GESTOR_DIRECTORIO_REPORTES``.
+
+La fila se identifica por su clave, el hash de la definición, los parámetros,
+el formato y la versión de los datos que lee la definición. La clave es única:
+
+- Dos pedidos iguales mientras el primero espera o se genera son un solo
+  trabajo; el segundo solicitante se suma a la fila.
+- Un pedido igual a uno ya generado, sin cambios en los datos, descarga el
+  archivo existente sin volver a calcular.
+
+La versión de los datos sale de la base y no de la caché, porque el worker es
+otro proceso y la caché local no se comparte: cantidad de filas y última
+``fecha_actualizacion`` (o último id) de cada modelo que lee la definición,
+más el último id del historial de transiciones, que también registra los
+cambios de estado hechos con ``QuerySet.update()``. Los cambios que no dejan
+rastro en esos campos (renombrar un departamento, p. ej.) no generan una
+versión nueva.
+"""
+import calendar
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Avg, Count, F, Max, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from . import completitud, sla
+from .models import Departamento, Documento, Empleado, RegistroTransicion, Reporte, ResumenSLA, TareaOnboarding
+
+logger = logging.getLogger(__name__)
+
+DEFINICIONES = {}
+TIPOS_CONTENIDO = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'html': 'text/html; charset=utf-8',
+}
+# Un reporte cuyo worker se cayó vuelve a la cola hasta este número de veces
+INTENTOS_MAXIMOS = 3
+
+
+def directorio():
+    return Path(getattr(settings, 'GESTOR_DIRECTORIO_REPORTES', settings.BASE_DIR / 'reportes'))
+
+
+def ruta(reporte):
+    return directorio() / reporte.archivo
+
+
+def definicion(nombre, titulo, descripcion, modelos, usa_mes=True):
+    """
+    Registra una definición de reporte: ``funcion(desde, hasta, departamento_id)``.
+    ``modelos`` son los modelos de gestor que lee (para la versión de los datos);
+    sin ``usa_mes`` el mes no forma parte de los parámetros.
+    """
+    def registrar(funcion):
+        DEFINICIONES[nombre] = {
+            'titulo': titulo,
+            'descripcion': descripcion,
+            'modelos': modelos,
+            'usa_mes': usa_mes,
+            'funcion': funcion,
+        }
+        return funcion
+    return registrar
+
+
+# ======================
+# Definiciones
+# ======================
+
+@definicion(
+    'ingresos', 'Ingresos por departamento',
+    'Empleados que ingresaron en el mes, por departamento y puesto, con el avance de su onboarding.',
+    modelos=('Empleado',),
+)
+def ingresos(desde, hasta, departamento_id):
+    empleados = Empleado.objects.filter(fecha_ingreso__range=(desde, hasta)).exclude(estado='cancelado')
+    if departamento_id:
+        empleados = empleados.filter(puesto__departamento_id=departamento_id)
+    grupos = (
+        empleados.order_by('puesto__departamento__nombre', 'puesto__titulo')
+        .values_list('puesto__departamento__nombre', 'puesto__titulo')
+        .annotate(
+            total=Count('pk'),
+            completados=Count('pk', filter=Q(estado='completado')),
+            progreso=Avg('progreso'),
+        )
+    )
+    return {
+        'columnas': ['Departamento', 'Puesto', 'Ingresos', 'Completados', 'Progreso medio (%)'],
+        'filas': [
+            (departamento or 'Sin departamento', puesto or 'Sin puesto', total, completados, round(progreso or 0, 1))
+            for departamento, puesto, total, completados, progreso in grupos
+        ],
+    }
+
+
+@definicion(
+    'tiempos', 'Tiempos de completado',
+    'Tareas completadas en el mes: cantidad, % a tiempo y ciclo en días (media y p90), '
+    'por área responsable y por departamento.',
+    modelos=('TareaOnboarding', 'ResumenSLA'),
+)
+def tiempos(desde, hasta, departamento_id):
+    rollups = ResumenSLA.objects.filter(fecha__range=(desde, hasta))
+    if departamento_id:
+        rollups = rollups.filter(departamento_id=departamento_id)
+    estadisticas = sla.estadisticas(rollups)
+    nombres = {
+        'responsable': dict(TareaOnboarding.RESPONSABLE_CHOICES),
+        'departamento': dict(Departamento.objects.values_list('pk', 'nombre')),
+    }
+    filas = [
+        (
+            'Área' if dimension == 'responsable' else 'Departamento',
+            nombres[dimension].get(fila['grupo'], fila['grupo'] or 'Sin departamento'),
+            fila['cantidad'], fila['a_tiempo_pct'], fila['ciclo_medio'], fila['ciclo_p90'],
+        )
+        for dimension in ('responsable', 'departamento')
+        for fila in estadisticas[dimension]
+    ]
+    total = estadisticas['total']
+    if total:
+        filas.append(('Total', '', total['cantidad'], total['a_tiempo_pct'], total['ciclo_medio'], total['ciclo_p90']))
+    return {
+        'columnas': ['Dimensión', 'Grupo', 'Tareas', 'A tiempo (%)', 'Ciclo medio (días)', 'Ciclo p90 (días)'],
+        'filas': filas,
+    }
+
+
+@definicion(
+    'documentos', 'Documentos pendientes',
+    'Empleados en onboarding sin todos sus documentos requeridos aprobados, con el estado de cada uno.',
+    modelos=('Empleado', 'Documento', 'Puesto'),
+    usa_mes=False,
+)
+def documentos(desde, hasta, departamento_id):
+    matriz = completitud.calcular(departamento_id=departamento_id)
+    tipos = dict(Documento.TIPO_CHOICES)
+    return {
+        'columnas': ['Empleado', 'Puesto', *[tipos.get(tipo, tipo) for tipo in matriz['tipos']], 'Sin aprobar'],
+        'filas': [
+            (
+                nombre, puesto or 'Sin puesto',
+                *['' if celda is None else completitud.NOMBRES_ESTADO[celda] for celda in celdas],
+                sum(celda not in (None, completitud.APROBADO) for celda in celdas),
+            )
+            for _, nombre, puesto, celdas in completitud.filtrar(matriz, incompletos=True)
+        ],
+    }
+
+
+# ======================
+# Solicitud y caché
+# ======================
+
+def version_datos(modelos):
+    """Huella de los datos de ``modelos`` (una consulta por modelo, más la del historial)."""
+    partes = []
+    for nombre in modelos:
+        modelo = apps.get_model('gestor', nombre)
+        campos = {campo.name for campo in modelo._meta.concrete_fields}
+        ultimo = Max('fecha_actualizacion') if 'fecha_actualizacion' in campos else Max('pk')
+        partes.append(modelo._base_manager.aggregate(total=Count('pk'), ultimo=ultimo))
+    partes.append(RegistroTransicion.objects.aggregate(ultimo=Max('pk')))
+    return hashlib.sha256(json.dumps(partes, default=str, sort_keys=True).encode()).hexdigest()
+
+
+def parametros_de(nombre, mes=None, departamento_id=None):
+    """Parámetros normalizados de ``nombre`` (el mes, como ``AAAA-MM``)."""
+    parametros = {'departamento': departamento_id or None}
+    if DEFINICIONES[nombre]['usa_mes']:
+        parametros['mes'] = (mes or timezone.localdate()).strftime('%Y-%m')
+    return parametros
+
+
+def calcular_clave(definicion, parametros, formato, version_datos):
+    datos = json.dumps([definicion, parametros, formato, version_datos], sort_keys=True)
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+
+def solicitar(nombre, formato, usuario=None, mes=None, departamento_id=None):
+    """
+    El ``Reporte`` de ``nombre`` para la versión vigente de los datos y si
+    quedó en cola por este pedido (``False``: ya estaba listo, en cola o
+    generándose). ``usuario`` se suma a sus solicitantes.
+    """
+    info = DEFINICIONES[nombre]
+    datos = {
+        'definicion': nombre,
+        'parametros': parametros_de(nombre, mes, departamento_id),
+        'formato': formato,
+        'version_datos': version_datos(info['modelos']),
+    }
+    # get_or_create resuelve la carrera de dos pedidos simultáneos con el UNIQUE de la clave
+    reporte, encolado = Reporte.objects.get_or_create(clave=calcular_clave(**datos), defaults=datos)
+    if reporte.estado == 'error' or reporte.estado == 'listo' and not ruta(reporte).is_file():
+        # Reintento de un fallido, o el archivo se borró: de nuevo a la cola
+        encolado = bool(Reporte.objects.filter(pk=reporte.pk, estado=reporte.estado).update(
+            estado='pendiente', error='', intentos=0, fecha_solicitud=timezone.now(),
+        ))
+        reporte.refresh_from_db()
+    if usuario is not None:
+        reporte.solicitantes.add(usuario)
+    return reporte, encolado
+
+
+def describir(reporte, departamentos):
+    """Texto de los parámetros de ``reporte``; ``departamentos``: ``{id: nombre}``."""
+    partes = []
+    if 'mes' in reporte.parametros:
+        partes.append(date_format(_periodo(reporte.parametros)[0], 'F Y').capitalize())
+    departamento_id = reporte.parametros.get('departamento')
+    partes.append(departamentos.get(departamento_id, '—') if departamento_id else 'Todos los departamentos')
+    return ' · '.join(partes)
+
+
+def nombre_descarga(reporte):
+    return '{}_{}.{}'.format(
+        reporte.definicion, reporte.parametros.get('mes', reporte.fecha_solicitud.strftime('%Y-%m-%d')),
+        reporte.formato,
+    )
+
+
+# ======================
+# Worker
+# ======================
+
+def _periodo(parametros):
+    if 'mes' not in parametros:
+        return None, None
+    anio, mes = map(int, parametros['mes'].split('-'))
+    return date(anio, mes, 1), date(anio, mes, calendar.monthrange(anio, mes)[1])
+
+
+def tomar_siguiente():
+    """Marca como en proceso el pendiente más antiguo y lo devuelve (``None`` si no hay)."""
+    candidatos = list(
+        Reporte.objects.filter(estado='pendiente')
+        .order_by('fecha_solicitud', 'pk').values_list('pk', flat=True)[:10]
+    )
+    for pk in candidatos:
+        # Otro worker pudo tomarlo entre la lectura y el UPDATE
+        if Reporte.objects.filter(pk=pk, estado='pendiente').update(
+            estado='en_proceso', fecha_inicio=timezone.now(), intentos=F('intentos') + 1,
+        ):
+            return Reporte.objects.get(pk=pk)
+    return None
+
+
+def generar(reporte):
+    """Calcula ``reporte`` y escribe su archivo. Devuelve si terminó bien."""
+    try:
+        info = DEFINICIONES[reporte.definicion]
+        desde, hasta = _periodo(reporte.parametros)
+        tabla = info['funcion'](desde, hasta, reporte.parametros.get('departamento'))
+        archivo = f'{reporte.clave}.{reporte.formato}'
+        tamano = escribir(reporte, info['titulo'], tabla, directorio() / archivo)
+    except Exception as error:
+        logger.exception('Falló el reporte %s (%s)', reporte.pk, reporte.definicion)
+        Reporte.objects.filter(pk=reporte.pk).update(
+            estado='error', error=f'{type(error).__name__}: {error}', fecha_fin=timezone.now(),
+        )
+        return False
+    Reporte.objects.filter(pk=reporte.pk).update(
+        estado='listo', archivo=archivo, filas=len(tabla['filas']), tamano=tamano,
+        error='', fecha_fin=timezone.now(),
+    )
+    return True
+
+
+def procesar_pendientes(limite=None):
+    """Genera los reportes en cola, de a uno. Devuelve cuántos procesó."""
+    procesados = 0
+    while limite is None or procesados < limite:
+        reporte = tomar_siguiente()
+        if reporte is None:
+            break
+        generar(reporte)
+        procesados += 1
+    return procesados
+
+
+def liberar_colgados(minutos=30):
+    """
+    Devuelve a la cola los reportes en proceso hace más de ``minutos`` (su
+    worker se interrumpió) y da por fallidos los que agotaron sus intentos.
+    Devuelve cuántos volvieron a la cola.
+    """
+    colgados = Reporte.objects.filter(
+        estado='en_proceso', fecha_inicio__lt=timezone.now() - timedelta(minutes=minutos),
+    )
+    colgados.filter(intentos__gte=INTENTOS_MAXIMOS).update(
+        estado='error', error='El worker se interrumpió en cada intento.', fecha_fin=timezone.now(),
+    )
+    return colgados.update(estado='pendiente')
+
+
+def podar(dias):
+    """Borra los reportes terminados hace más de ``dias`` días y sus archivos."""
+    viejos = Reporte.objects.filter(
+        estado__in=('listo', 'error'), fecha_fin__lt=timezone.now() - timedelta(days=dias),
+    )
+    for archivo in viejos.exclude(archivo='').values_list('archivo', flat=True):
+        (directorio() / archivo).unlink(missing_ok=True)
+    return viejos.delete()[1].get(Reporte._meta.label, 0)
+
+
+# ======================
+# Formatos
+# ======================
+
+def escribir(reporte, titulo, tabla, destino):
+    """Escribe ``tabla`` en ``destino`` con el formato de ``reporte``; devuelve el tamaño."""
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    # Se escribe aparte y se renombra: una descarga nunca ve un archivo a medias
+    descriptor, temporal = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            ESCRITORES[reporte.formato](archivo, reporte, titulo, tabla)
+        # mkstemp lo crea con 0600: el worker y el servidor web pueden ser usuarios distintos
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, destino)
+    except BaseException:
+        Path(temporal).unlink(missing_ok=True)
+        raise
+    return destino.stat().st_size
+
+
+def _csv(archivo, reporte, titulo, tabla):
+    # Con BOM, para que Excel lo abra como UTF-8
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    escritor = csv.writer(texto)
+    escritor.writerow(tabla['columnas'])
+    escritor.writerows(tabla['filas'])
+    texto.flush()
+    texto.detach()
+
+
+def _html(archivo, reporte, titulo, tabla):
+    departamento_id = reporte.parametros.get('departamento')
+    departamentos = dict(Departamento.objects.filter(pk=departamento_id).values_list('pk', 'nombre'))
+    archivo.write(render_to_string('gestor/reporte_archivo.html', {
+        'titulo': titulo,
+        'parametros': describir(reporte, departamentos),
+        'columnas': tabla['columnas'],
+        'filas': tabla['filas'],
+        'generado': timezone.localtime(),
+    }).encode())
+
+
+# Caracteres que XML 1.0 no admite ni escapados
+_CONTROL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_TIPOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+XLSX_RELACIONES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilo 0: normal; estilo 1: negrita (encabezados)
+XLSX_ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+
+
+def _columna(indice):
+    """Letra de la columna ``indice`` (0 → A, 26 → AA)."""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(ord('A') + resto) + letras
+    return letras
+
+
+def _celda(referencia, valor, estilo=0):
+    atributos = f' r="{referencia}"' + (f' s="{estilo}"' if estilo else '')
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f'<c{atributos}><v>{valor}</v></c>'
+    texto = escape(_CONTROL.sub('', str(valor)))
+    return f'<c{atributos} t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila(numero, valores, estilo=0):
+    celdas = ''.join(_celda(f'{_columna(i)}{numero}', valor, estilo) for i, valor in enumerate(valores))
+    return f'<row r="{numero}">{celdas}</row>'
+
+
+def _xlsx(archivo, reporte, titulo, tabla):
+    # SpreadsheetML mínimo (una hoja, textos en línea), sin dependencias externas
+    hoja = re.sub(r'[\[\]:*?/\\]', '', titulo)[:31]
+    with zipfile.ZipFile(archivo, 'w', zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', XLSX_TIPOS)
+        libro.writestr('_rels/.rels', XLSX_RELACIONES)
+        libro.writestr('xl/_rels/workbook.xml.rels', XLSX_RELACIONES_LIBRO)
+        libro.writestr('xl/styles.xml', XLSX_ESTILOS)
+        libro.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name={quoteattr(hoja)} sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        with libro.open('xl/worksheets/sheet1.xml', 'w') as datos:
+            datos.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            datos.write(_fila(1, tabla['columnas'], estilo=1).encode())
+            for numero, fila in enumerate(tabla['filas'], start=2):
+                datos.write(_fila(numero, fila).encode())
+            datos.write(b'</sheetData></worksheet>')
+
+
+ESCRITORES = {'xlsx': _xlsx, 'csv': _csv, 'html': _html}
@@ -0,0 +1,365 @@
+"""
+Respaldos en caliente de la base de datos y de los archivos subidos.
+
+Cada respaldo es un directorio ``AAAAMMDD-HHMMSS`` dentro del destino con:
+
+- la base: una copia consistente tomada con la API de backup de SQLite
+  (``base.sqlite3``) o con ``pg_dump`` en PostgreSQL (``base.dump``);
+- ``manifiesto.json``: ruta, tamaño, mtime y SHA-256 de cada archivo de
+  ``MEDIA_ROOT``, más el hash de la base.
+
+Los archivos se guardan una sola vez en ``objetos/`` (nombrados por su hash) y
+los respaldos solo los referencian: los que no cambiaron (mismo tamaño y mtime
+que en el respaldo anterior) ni se vuelven a leer, así que un respaldo de un
+día sin cambios solo copia la base. El respaldo se arma en ``<nombre>.parcial``
+y se renombra al terminar, de modo que un respaldo interrumpido no cuenta.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+MANIFIESTO = 'manifiesto.json'
+OBJETOS = 'objetos'
+SUFIJO_PARCIAL = '.parcial'
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class ErrorRespaldo(Exception):
+    """Fallo al respaldar o restaurar (se informa al usuario del comando)."""
+
+
+def directorio_por_defecto():
+    return Path(getattr(settings, 'GESTOR_DIRECTORIO_RESPALDOS', Path(settings.BASE_DIR) / 'respaldos'))
+
+
+def respaldos(destino):
+    """Directorios de respaldos completos en ``destino``, del más antiguo al más reciente."""
+    destino = Path(destino)
+    if not destino.is_dir():
+        return []
+    return sorted(
+        hijo for hijo in destino.iterdir()
+        if hijo.is_dir() and hijo.name != OBJETOS and not hijo.name.endswith(SUFIJO_PARCIAL)
+        and (hijo / MANIFIESTO).is_file()
+    )
+
+
+def leer_manifiesto(respaldo):
+    with open(Path(respaldo) / MANIFIESTO, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def _ruta_objeto(destino, sha256):
+    return Path(destino) / OBJETOS / sha256[:2] / sha256
+
+
+def _hash(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _copiar_con_hash(origen, directorio_temporal):
+    """Copia ``origen`` a un temporal calculando su hash en la misma lectura."""
+    sha = hashlib.sha256()
+    descriptor, temporal = tempfile.mkstemp(dir=directorio_temporal)
+    with open(origen, 'rb') as entrada, os.fdopen(descriptor, 'wb') as salida:
+        for bloque in iter(lambda: entrada.read(TAMANO_BLOQUE), b''):
+            sha.update(bloque)
+            salida.write(bloque)
+    return Path(temporal), sha.hexdigest()
+
+
+# ======================
+# Base de datos
+# ======================
+
+def _uri_solo_lectura(ruta):
+    return Path(ruta).resolve().as_uri() + '?mode=ro'
+
+
+def _respaldar_base(directorio, using):
+    conexion = connections[using]
+    datos = conexion.settings_dict
+    if conexion.vendor == 'sqlite':
+        ruta = Path(directorio) / 'base.sqlite3'
+        # Conexión aparte, de solo lectura: la API de backup copia una
+        # instantánea consistente aunque otros procesos sigan escribiendo
+        origen = sqlite3.connect(_uri_solo_lectura(datos['NAME']), uri=True)
+        copia = sqlite3.connect(ruta)
+        try:
+            with copia:
+                origen.backup(copia)
+        finally:
+            copia.close()
+            origen.close()
+        return 'sqlite', ruta
+    if conexion.vendor == 'postgresql':
+        ruta = Path(directorio) / 'base.dump'
+        _ejecutar_pg(
+            ['pg_dump', '--format=custom', f'--file={ruta}', datos['NAME']], datos,
+        )
+        return 'postgres', ruta
+    raise ErrorRespaldo(f'Motor de base de datos no soportado: {conexion.vendor}.')
+
+
+def _restaurar_base(ruta, motor, using):
+    conexion = connections[using]
+    datos = conexion.settings_dict
+    if motor == 'sqlite':
+        if conexion.vendor != 'sqlite':
+            raise ErrorRespaldo('El respaldo es de SQLite y la base configurada no.')
+        connections.close_all()
+        origen = sqlite3.connect(_uri_solo_lectura(ruta), uri=True)
+        destino = sqlite3.connect(datos['NAME'])
+        try:
+            origen.backup(destino)
+        finally:
+            destino.close()
+            origen.close()
+    elif motor == 'postgres':
+        if conexion.vendor != 'postgresql':
+            raise ErrorRespaldo('El respaldo es de PostgreSQL y la base configurada no.')
+        connections.close_all()
+        _ejecutar_pg(
+            ['pg_restore', '--clean', '--if-exists', '--no-owner', f'--dbname={datos["NAME"]}', str(ruta)],
+            datos,
+        )
+    else:
+        raise ErrorRespaldo(f'Motor de base de datos desconocido en el manifiesto: {motor}.')
+
+
+def _ejecutar_pg(comando, datos):
+    entorno = dict(os.environ)
+    for variable, clave in (
+        ('PGHOST', 'HOST'), ('PGPORT', 'PORT'), ('PGUSER', 'USER'), ('PGPASSWORD', 'PASSWORD'),
+    ):
+        if datos.get(clave):
+            entorno[variable] = str(datos[clave])
+    try:
+        subprocess.run(comando, env=entorno, check=True, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise ErrorRespaldo(f'No se encontró {comando[0]}: instala el cliente de PostgreSQL.')
+    except subprocess.CalledProcessError as error:
+        raise ErrorRespaldo(f'{comando[0]} falló: {error.stderr.strip()}')
+
+
+# ======================
+# Archivos subidos
+# ======================
+
+def _recorrer_media(raiz):
+    """``(ruta relativa con /, stat)`` de cada archivo bajo ``raiz``."""
+    raiz = Path(raiz)
+    if not raiz.is_dir():
+        return
+    pendientes = [raiz]
+    while pendientes:
+        with os.scandir(pendientes.pop()) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    pendientes.append(entrada.path)
+                elif entrada.is_file(follow_symlinks=False):
+                    yield Path(entrada.path).relative_to(raiz).as_posix(), entrada.stat()
+
+
+def _respaldar_media(destino, anterior):
+    """
+    Manifiesto de ``MEDIA_ROOT``; copia a ``objetos/`` solo los archivos nuevos o
+    cambiados respecto de ``anterior`` (el manifiesto del respaldo previo).
+    Devuelve ``(manifiesto, copiados, bytes_copiados)``.
+    """
+    temporales = Path(destino) / OBJETOS / 'tmp'
+    temporales.mkdir(parents=True, exist_ok=True)
+    manifiesto = {}
+    copiados = bytes_copiados = 0
+    for ruta, estado in _recorrer_media(settings.MEDIA_ROOT):
+        previo = anterior.get(ruta)
+        if previo and previo['tamano'] == estado.st_size and previo['mtime_ns'] == estado.st_mtime_ns:
+            manifiesto[ruta] = previo
+            continue
+        temporal, sha256 = _copiar_con_hash(Path(settings.MEDIA_ROOT) / ruta, temporales)
+        objeto = _ruta_objeto(destino, sha256)
+        if objeto.exists():
+            temporal.unlink()
+        else:
+            objeto.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temporal, objeto)
+            copiados += 1
+            bytes_copiados += estado.st_size
+        manifiesto[ruta] = {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns, 'sha256': sha256}
+    return manifiesto, copiados, bytes_copiados
+
+
+def _destino_media(ruta):
+    """Ruta absoluta de ``ruta`` (del manifiesto) dentro de ``MEDIA_ROOT``."""
+    raiz = Path(settings.MEDIA_ROOT).resolve()
+    destino = (raiz / ruta).resolve()
+    if raiz not in destino.parents:
+        raise ErrorRespaldo(f'Ruta fuera de MEDIA_ROOT en el manifiesto: {ruta}.')
+    return destino
+
+
+# ======================
+# Operaciones
+# ======================
+
+def respaldar(destino=None, media=True, conservar=None, using=DEFAULT_DB_ALIAS):
+    """
+    Crea un respaldo en ``destino`` y devuelve ``(directorio, resumen)``. Con
+    ``conservar`` borra los respaldos más antiguos que excedan esa cantidad y los
+    objetos que ya nadie referencia.
+    """
+    destino = Path(destino or directorio_por_defecto())
+    destino.mkdir(parents=True, exist_ok=True)
+    anteriores = respaldos(destino)
+    anterior = leer_manifiesto(anteriores[-1])['media'] if anteriores else {}
+    
+    nombre = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+    if (destino / nombre).exists():
+        raise ErrorRespaldo(f'Ya existe un respaldo {nombre}.')
+    parcial = destino / (nombre + SUFIJO_PARCIAL)
+    shutil.rmtree(parcial, ignore_errors=True)
+    parcial.mkdir()
+    
+    motor, ruta_base = _respaldar_base(parcial, using)
+    if media:
+        manifiesto_media, copiados, bytes_copiados = _respaldar_media(destino, anterior)
+    else:
+        manifiesto_media, copiados, bytes_copiados = {}, 0, 0
+    manifiesto = {
+        'version': 1,
+        'fecha': timezone.now().isoformat(),
+        'motor': motor,
+        'base': {
+            'archivo': ruta_base.name,
+            'tamano': ruta_base.stat().st_size,
+            'sha256': _hash(ruta_base),
+        },
+        'media': manifiesto_media,
+    }
+    with open(parcial / MANIFIESTO, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=1, sort_keys=True)
+    os.replace(parcial, destino / nombre)
+    
+    borrados = podar(destino, conservar) if conservar else 0
+    return destino / nombre, {
+        'base': manifiesto['base']['tamano'],
+        'archivos': len(manifiesto_media),
+        'copiados': copiados,
+        'bytes_copiados': bytes_copiados,
+        'borrados': borrados,
+    }
+
+
+def podar(destino, conservar):
+    """Deja los ``conservar`` respaldos más recientes y borra los objetos huérfanos."""
+    destino = Path(destino)
+    existentes = respaldos(destino)
+    viejos = existentes[:-conservar] if conservar else []
+    for respaldo in viejos:
+        shutil.rmtree(respaldo)
+    
+    referenciados = set()
+    for respaldo in existentes[len(viejos):]:
+        referenciados.update(datos['sha256'] for datos in leer_manifiesto(respaldo)['media'].values())
+    objetos = destino / OBJETOS
+    if objetos.is_dir():
+        for prefijo in objetos.iterdir():
+            if not prefijo.is_dir():
+                continue
+            for objeto in prefijo.iterdir():
+                # En tmp/ solo quedan copias de respaldos interrumpidos
+                if prefijo.name == 'tmp' or objeto.name not in referenciados:
+                    objeto.unlink()
+    return len(viejos)
+
+
+def resolver(destino, nombre=None):
+    """Directorio del respaldo ``nombre`` (o ruta) o, sin nombre, el más reciente."""
+    if nombre and Path(nombre).is_dir():
+        respaldo = Path(nombre)
+    elif nombre:
+        respaldo = Path(destino or directorio_por_defecto()) / nombre
+    else:
+        existentes = respaldos(destino or directorio_por_defecto())
+        if not existentes:
+            raise ErrorRespaldo('No hay respaldos.')
+        respaldo = existentes[-1]
+    if not (respaldo / MANIFIESTO).is_file():
+        raise ErrorRespaldo(f'{respaldo} no es un respaldo completo.')
+    return respaldo
+
+
+def verificar(respaldo, media=True):
+    """
+    Comprueba el hash de la base y de cada archivo referenciado. Devuelve la
+    lista de problemas (vacía si el respaldo está íntegro).
+    """
+    respaldo = Path(respaldo)
+    destino = respaldo.parent
+    manifiesto = leer_manifiesto(respaldo)
+    problemas = []
+    base = respaldo / manifiesto['base']['archivo']
+    if not base.is_file():
+        problemas.append(f'Falta la base {base.name}.')
+    elif _hash(base) != manifiesto['base']['sha256']:
+        problemas.append(f'La base {base.name} no coincide con su hash.')
+    
+    if media:
+        vistos = {}
+        for ruta, datos in manifiesto['media'].items():
+            sha256 = datos['sha256']
+            if sha256 not in vistos:
+                objeto = _ruta_objeto(destino, sha256)
+                vistos[sha256] = objeto.is_file() and _hash(objeto) == sha256
+            if not vistos[sha256]:
+                problemas.append(f'Falta o está dañado el archivo {ruta}.')
+    return problemas
+
+
+def restaurar(respaldo, base=True, media=True, using=DEFAULT_DB_ALIAS):
+    """
+    Verifica ``respaldo`` y restaura la base y/o los archivos. Solo se
+    reescriben los archivos de ``MEDIA_ROOT`` que difieren del respaldo; los que
+    no figuran en él se dejan. Devuelve ``{'archivos': n, 'restaurados': n}``.
+    """
+    respaldo = Path(respaldo)
+    problemas = verificar(respaldo, media=media)
+    if problemas:
+        raise ErrorRespaldo('El respaldo no pasó la verificación:\n' + '\n'.join(problemas))
+    manifiesto = leer_manifiesto(respaldo)
+    
+    if base:
+        _restaurar_base(respaldo / manifiesto['base']['archivo'], manifiesto['motor'], using)
+    
+    restaurados = 0
+    if media:
+        for ruta, datos in manifiesto['media'].items():
+            destino = _destino_media(ruta)
+            if destino.is_file():
+                estado = destino.stat()
+                if estado.st_size == datos['tamano'] and (
+                    estado.st_mtime_ns == datos['mtime_ns'] or _hash(destino) == datos['sha256']
+                ):
+                    continue
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            temporal, sha256 = _copiar_con_hash(_ruta_objeto(respaldo.parent, datos['sha256']), destino.parent)
+            if sha256 != datos['sha256']:
+                temporal.unlink()
+                raise ErrorRespaldo(f'El archivo {ruta} cambió durante la restauración.')
+            os.replace(temporal, destino)
+            os.utime(destino, ns=(datos['mtime_ns'], datos['mtime_ns']))
+            restaurados += 1
+    return {'archivos': len(manifiesto['media']), 'restaurados': restaurados}
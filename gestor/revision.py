@@ -0,0 +1,62 @@
+"""
+Cola de revisión de documentos.
+
+El espacio de revisión carga de una vez (una consulta) los próximos documentos
+por revisar y el navegador precarga el archivo del siguiente mientras se revisa
+el actual. Las decisiones se envían en lotes a ``DocumentoRevisionLoteAPIView``,
+que responde con más documentos para reponer la cola.
+"""
+import os
+
+from django.urls import reverse
+from django.utils import timezone
+
+ESTADOS_REVISABLES = ('pendiente', 'en_revision')
+# Decisiones posibles en la revisión (``en_revision`` deja el documento en espera)
+ESTADOS_DECISION = ('aprobado', 'rechazado', 'en_revision')
+EXTENSIONES_IMAGEN = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
+
+
+def cola(limite=30, excluir=()):
+    """
+    Próximos documentos por revisar: los pendientes antes que los que se dejaron
+    en revisión, y dentro de cada grupo los obligatorios y los más antiguos
+    primero. ``excluir`` son los que el revisor ya tiene en su cola.
+    """
+    from .models import Documento
+    
+    documentos = (
+        Documento.objects.filter(estado__in=ESTADOS_REVISABLES)
+        .select_related('empleado__usuario', 'empleado__puesto')
+        .order_by('-estado', '-obligatorio', 'fecha_subida', 'pk')
+    )
+    if excluir:
+        documentos = documentos.exclude(pk__in=excluir)
+    return list(documentos[:limite])
+
+
+def tipo_vista_previa(nombre_archivo):
+    """``'pdf'``, ``'imagen'`` o ``''`` (sin vista previa) según la extensión."""
+    extension = os.path.splitext(nombre_archivo or '')[1].lower()
+    if extension == '.pdf':
+        return 'pdf'
+    return 'imagen' if extension in EXTENSIONES_IMAGEN else ''
+
+
+def item_cola(documento):
+    """Datos de un documento para el espacio de revisión."""
+    usuario = documento.empleado.usuario
+    return {
+        'id': documento.pk,
+        'nombre': documento.nombre,
+        'tipo': documento.get_tipo_display(),
+        'estado': documento.estado,
+        'obligatorio': documento.obligatorio,
+        'empleado': usuario.get_full_name() or usuario.username,
+        'empleado_url': reverse('gestor:empleado_detail', args=[documento.empleado_id]),
+        'puesto': documento.empleado.puesto.titulo if documento.empleado.puesto_id else '',
+        'fecha_subida': timezone.localtime(documento.fecha_subida).strftime('%d/%m/%Y %H:%M'),
+        'archivo': documento.archivo.url if documento.archivo else '',
+        'vista_previa': tipo_vista_previa(documento.archivo.name),
+        'comentarios': documento.comentarios or '',
+    }
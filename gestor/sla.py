@@ -0,0 +1,280 @@
+"""
+Rollups de SLA y tiempos de ciclo de las tareas de onboarding.
+
+Cada tarea completada suma 1 a la fila de ``ResumenSLA`` de su clave
+(día de completado, área responsable, departamento, días de ciclo); si se
+reabre, resta 1. La clave se guarda en la tarea al completarla
+(``TareaOnboarding.clave_sla``) y al reabrirla se resta de esa fila, aunque
+desde entonces hayan cambiado sus fechas, su área o el puesto del empleado.
+La página de analítica agrega solo esas filas, cuyo número depende de la
+ventana de fechas y no del tamaño de la tabla de tareas.
+
+- Ciclo: ``fecha_completado - (fecha_inicio o fecha de creación)``, en días.
+- A tiempo: ``fecha_completado <= fecha_limite``.
+"""
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import ResumenSLA, TareaOnboarding
+
+
+CICLO_MAXIMO = 365
+
+CAMPOS = (
+    'responsable', 'empleado__puesto__departamento_id', 'fecha_inicio',
+    'fecha_completado', 'fecha_limite', 'fecha_creacion', 'fecha_actualizacion',
+)
+
+
+def clave_y_a_tiempo(fila):
+    """Clave del rollup de una tarea completada y si se completó a tiempo."""
+    completado = fila['fecha_completado'] or timezone.localdate(fila['fecha_actualizacion'])
+    inicio = fila['fecha_inicio'] or timezone.localdate(fila['fecha_creacion'])
+    ciclo = min(max((completado - inicio).days, 0), CICLO_MAXIMO)
+    clave = (completado, fila['responsable'], fila['empleado__puesto__departamento_id'], ciclo)
+    return clave, completado <= fila['fecha_limite']
+
+
+def guardar_clave(clave, a_tiempo):
+    """Clave y resultado como lista JSON, para ``TareaOnboarding.clave_sla``."""
+    fecha, responsable, departamento_id, ciclo = clave
+    return [fecha.isoformat(), responsable, departamento_id, ciclo, a_tiempo]
+
+
+def leer_clave(guardada):
+    """Inversa de ``guardar_clave``: ``(clave, a_tiempo)``."""
+    fecha, responsable, departamento_id, ciclo, a_tiempo = guardada
+    return (date.fromisoformat(fecha), responsable, departamento_id, ciclo), a_tiempo
+
+
+def acumular(claves, signo=1):
+    """``{clave: [cantidad, a_tiempo]}`` a partir de pares ``(clave, a_tiempo)``."""
+    deltas = defaultdict(lambda: [0, 0])
+    for clave, a_tiempo in claves:
+        deltas[clave][0] += signo
+        deltas[clave][1] += signo if a_tiempo else 0
+    return deltas
+
+
+def aplicar_delta(clave, cantidad, a_tiempo):
+    """Suma un delta a su fila con UPDATE ... SET x = x + n, creándola si no existe."""
+    fecha, responsable, departamento_id, ciclo = clave
+    fila = ResumenSLA.objects.filter(
+        fecha=fecha, responsable=responsable,
+        departamento_id=departamento_id, ciclo_dias=ciclo,
+    )
+    incremento = {'cantidad': F('cantidad') + cantidad, 'a_tiempo': F('a_tiempo') + a_tiempo}
+    if fila.update(**incremento):
+        if cantidad < 0:
+            fila.filter(cantidad__lte=0).delete()
+        return
+    if cantidad <= 0:
+        return
+    try:
+        with transaction.atomic():
+            ResumenSLA.objects.create(
+                fecha=fecha, responsable=responsable, departamento_id=departamento_id,
+                ciclo_dias=ciclo, cantidad=cantidad, a_tiempo=a_tiempo,
+            )
+    except IntegrityError:
+        # Otra transacción creó la fila entre ambas sentencias
+        fila.update(**incremento)
+
+
+def aplicar_deltas(deltas):
+    """
+    Suma los deltas a sus filas. El número de consultas no depende de cuántas
+    claves cambien: una lectura de las filas existentes, un UPDATE por cada
+    delta distinto (casi siempre uno o dos: +1 a tiempo, +1 tarde) y un
+    ``bulk_create`` para las nuevas.
+    """
+    deltas = {clave: valores for clave, valores in deltas.items() if valores[0]}
+    if not deltas:
+        return
+    if len(deltas) == 1:
+        (clave, (cantidad, a_tiempo)), = deltas.items()
+        aplicar_delta(clave, cantidad, a_tiempo)
+        return
+    
+    existentes = {
+        tuple(clave): pk
+        for pk, *clave in ResumenSLA.objects.filter(
+            fecha__in={clave[0] for clave in deltas},
+            responsable__in={clave[1] for clave in deltas},
+        ).values_list('pk', 'fecha', 'responsable', 'departamento_id', 'ciclo_dias')
+    }
+    incrementos = defaultdict(list)
+    for clave, (cantidad, a_tiempo) in deltas.items():
+        if clave in existentes:
+            incrementos[cantidad, a_tiempo].append(existentes[clave])
+    nuevas = {
+        clave: valores for clave, valores in deltas.items()
+        if clave not in existentes and valores[0] > 0
+    }
+    
+    with transaction.atomic():
+        for (cantidad, a_tiempo), pks in incrementos.items():
+            ResumenSLA.objects.filter(pk__in=pks).update(
+                cantidad=F('cantidad') + cantidad, a_tiempo=F('a_tiempo') + a_tiempo,
+            )
+        restadas = [pk for (cantidad, _), pks in incrementos.items() if cantidad < 0 for pk in pks]
+        if restadas:
+            ResumenSLA.objects.filter(pk__in=restadas, cantidad__lte=0).delete()
+        if nuevas:
+            try:
+                with transaction.atomic():
+                    ResumenSLA.objects.bulk_create([
+                        ResumenSLA(
+                            fecha=fecha, responsable=responsable, departamento_id=departamento_id,
+                            ciclo_dias=ciclo, cantidad=cantidad, a_tiempo=a_tiempo,
+                        )
+                        for (fecha, responsable, departamento_id, ciclo), (cantidad, a_tiempo)
+                        in nuevas.items()
+                    ])
+            except IntegrityError:
+                # Otra transacción creó alguna de las filas después de la lectura
+                for clave, (cantidad, a_tiempo) in nuevas.items():
+                    aplicar_delta(clave, cantidad, a_tiempo)
+
+
+def registrar_tareas(tarea_ids, signo=1):
+    """
+    Suma (``signo=1``) o resta (``signo=-1``) tareas completadas a los rollups.
+    
+    Al sumar guarda en cada tarea la clave en la que se contó y devuelve
+    ``{tarea_id: clave_sla}``; al restar usa esa clave (o la actual, para las
+    completadas antes de que se guardara) y la borra.
+    """
+    tareas = TareaOnboarding.objects.filter(pk__in=tarea_ids)
+    if signo < 0:
+        claves = [
+            leer_clave(fila['clave_sla']) if fila['clave_sla'] else clave_y_a_tiempo(fila)
+            for fila in tareas.values('clave_sla', *CAMPOS)
+        ]
+        aplicar_deltas(acumular(claves, signo))
+        tareas.filter(clave_sla__isnull=False).update(clave_sla=None)
+        return {}
+    
+    guardadas = {
+        fila['pk']: guardar_clave(*clave_y_a_tiempo(fila))
+        for fila in tareas.values('pk', *CAMPOS)
+    }
+    aplicar_deltas(acumular((leer_clave(guardada) for guardada in guardadas.values()), signo))
+    TareaOnboarding.objects.bulk_update(
+        [TareaOnboarding(pk=pk, clave_sla=guardada) for pk, guardada in guardadas.items()],
+        ['clave_sla'], batch_size=500,
+    )
+    return guardadas
+
+
+@transaction.atomic
+def reconstruir(desde=None, lote=5000):
+    """
+    Recalcula los rollups desde las tareas completadas (todas, o las
+    completadas a partir de ``desde``). Devuelve ``(tareas, filas)``.
+    """
+    rollups = ResumenSLA.objects.all()
+    tareas = TareaOnboarding.objects.filter(estado='completado')
+    if desde:
+        rollups = rollups.filter(fecha__gte=desde)
+        tareas = tareas.filter(fecha_completado__gte=desde)
+    rollups.delete()
+    
+    cantidades, a_tiempo = Counter(), Counter()
+    total = 0
+    # Las claves guardadas en las tareas pasan a ser las recalculadas
+    claves = []
+    for fila in tareas.order_by().values('pk', 'clave_sla', *CAMPOS).iterator(chunk_size=lote):
+        clave, en_plazo = clave_y_a_tiempo(fila)
+        if desde and clave[0] < desde:
+            continue
+        cantidades[clave] += 1
+        a_tiempo[clave] += en_plazo
+        total += 1
+        guardada = guardar_clave(clave, en_plazo)
+        if fila['clave_sla'] != guardada:
+            claves.append(TareaOnboarding(pk=fila['pk'], clave_sla=guardada))
+    TareaOnboarding.objects.bulk_update(claves, ['clave_sla'], batch_size=lote)
+    
+    ResumenSLA.objects.bulk_create(
+        [
+            ResumenSLA(
+                fecha=fecha, responsable=responsable, departamento_id=departamento_id,
+                ciclo_dias=ciclo, cantidad=cantidad,
+                a_tiempo=a_tiempo[(fecha, responsable, departamento_id, ciclo)],
+            )
+            for (fecha, responsable, departamento_id, ciclo), cantidad in cantidades.items()
+        ],
+        batch_size=lote,
+    )
+    return total, len(cantidades)
+
+
+# ======================
+# Consultas para la analítica
+# ======================
+
+def percentil_histograma(histograma, p):
+    """Percentil ``p`` (0-100) de un histograma ``{valor: cantidad}``."""
+    total = sum(histograma.values())
+    if not total:
+        return None
+    objetivo = total * p / 100
+    acumulado = 0
+    for valor in sorted(histograma):
+        acumulado += histograma[valor]
+        if acumulado >= objetivo:
+            return valor
+    return max(histograma)
+
+
+def fila_estadistica(grupo, histograma, en_plazo):
+    cantidad = sum(histograma.values())
+    return {
+        'grupo': grupo,
+        'cantidad': cantidad,
+        'a_tiempo_pct': round(en_plazo * 100 / cantidad, 1),
+        'ciclo_medio': round(sum(dias * n for dias, n in histograma.items()) / cantidad, 1),
+        'ciclo_p90': percentil_histograma(histograma, 90),
+    }
+
+
+def estadisticas(rollups):
+    """
+    Cantidad, % a tiempo, media y p90 del ciclo por área responsable, por
+    departamento y en total, con una sola consulta agrupada sobre ``rollups``.
+    
+    Devuelve ``{'responsable': [...], 'departamento': [...], 'total': fila o None}``,
+    con las listas ordenadas por cantidad descendente.
+    """
+    histogramas = {'responsable': defaultdict(Counter), 'departamento': defaultdict(Counter)}
+    en_plazo = {'responsable': Counter(), 'departamento': Counter()}
+    total, total_en_plazo = Counter(), 0
+    filas = (
+        rollups.order_by().values('responsable', 'departamento_id', 'ciclo_dias')
+        .annotate(cantidad_total=Sum('cantidad'), a_tiempo_total=Sum('a_tiempo'))
+    )
+    for fila in filas:
+        ciclo, cantidad, a_tiempo = fila['ciclo_dias'], fila['cantidad_total'], fila['a_tiempo_total']
+        for dimension, grupo in (('responsable', fila['responsable']), ('departamento', fila['departamento_id'])):
+            histogramas[dimension][grupo][ciclo] += cantidad
+            en_plazo[dimension][grupo] += a_tiempo
+        total[ciclo] += cantidad
+        total_en_plazo += a_tiempo
+    
+    resultado = {
+        dimension: sorted(
+            (
+                fila_estadistica(grupo, histograma, en_plazo[dimension][grupo])
+                for grupo, histograma in por_grupo.items() if sum(histograma.values()) > 0
+            ),
+            key=lambda fila: -fila['cantidad'],
+        )
+        for dimension, por_grupo in histogramas.items()
+    }
+    resultado['total'] = fila_estadistica(None, total, total_en_plazo) if sum(total.values()) > 0 else None
+    return resultado
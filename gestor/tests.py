@@ -1,3 +1,1787 @@
-from django.test import TestCase
+"""
+Presupuesto de consultas de las vistas, la API y el admin de gestor.
 
-# Create your tests here.
+Cada página se pide con pocos datos y de nuevo con varias veces más filas; la
+cantidad de consultas no debe crecer con las filas (un N+1 la haría crecer con
+cada empleado, tarea o documento de la página). Si crece, el error muestra las
+consultas que se repiten de más, con los valores reemplazados por ``?``.
+
+También se comprueba que:
+
+- los efectos de los signals (progreso, estado, cachés) se ejecuten una vez
+  por transacción y no una vez por fila;
+- la asignación automática de responsables reparta por carga sin consultar
+  por tarea;
+- el calendario de tareas responda 304 sin consultar tareas si no cambió;
+- los pedidos iguales de un reporte compartan un solo trabajo y archivo.
+
+El resto de las clases prueba el comportamiento de cada módulo: la API
+(cursor, ETag, lotes y autocompletado), dependencias, SLA, máquina de estados,
+historial, eventos, archivo, avisos, respaldos, línea de reporte, dotación,
+compensación, cola de revisión, completitud, listas sin paginar, calendario de
+carga, configuración de la base de datos y meses del dashboard.
+"""
+import csv
+import json
+import os
+import re
+import runpy
+import sqlite3
+import tempfile
+import zipfile
+from collections import Counter
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from . import (
+    agenda, api, archivo, asignacion, avisos, carga, compensacion, completitud, efectos, jerarquia,
+    organizacion, reportes, respaldo, revision, sla, urls, views,
+)
+from .dependencias import encontrar_ciclo, orden_topologico, validar_requisitos
+from .models import (
+    ArchivoOnboarding, DependenciaTarea, Departamento, Documento, Empleado, JerarquiaSupervision, Puesto,
+    RegistroTransicion, Reporte, ResumenSLA, SuscripcionCalendario, TareaOnboarding, actualizar_bloqueos,
+)
+
+# Filas que agrega cada tanda de datos (la segunda multiplica la primera)
+EMPLEADOS_POCOS = 2
+EMPLEADOS_MUCHOS = 8
+TIPOS_DOCUMENTO = ('contrato', 'cedula', 'nda')
+
+
+# ======================
+# Fábricas
+# ======================
+
+class Fabrica:
+    """Crea datos con los mismos caminos que la aplicación (``save()`` y signals)."""
+    
+    def __init__(self):
+        self.secuencia = 0
+        self.departamentos = []
+        self.puestos = []
+    
+    def siguiente(self):
+        self.secuencia += 1
+        return self.secuencia
+    
+    def departamento(self):
+        n = self.siguiente()
+        departamento = Departamento.objects.create(nombre=f'Departamento {n}')
+        self.departamentos.append(departamento)
+        return departamento
+    
+    def puesto(self, departamento):
+        n = self.siguiente()
+        puesto = Puesto.objects.create(
+            titulo=f'Puesto {n}',
+            departamento=departamento,
+            salario_minimo=1000,
+            salario_maximo=5000,
+        )
+        self.puestos.append(puesto)
+        return puesto
+    
+    def usuario(self, **extra):
+        n = self.siguiente()
+        return User.objects.create_user(
+            f'usuario{n}', f'usuario{n}@rivcon.com', 'clave', first_name='Nombre', last_name=str(n), **extra
+        )
+    
+    def empleado(self, supervisor=None, **extra):
+        n = self.siguiente()
+        datos = {
+            'cedula': f'C{n:08d}',
+            'telefono': '0990000000',
+            'fecha_nacimiento': date(1990, 1, 1),
+            'fecha_ingreso': date.today() + timedelta(days=n % 20 - 10),
+            'puesto': self.puestos[n % len(self.puestos)],
+            'salario': 1000 + n * 10,
+            'supervisor': supervisor,
+        }
+        datos.update(extra)
+        datos.setdefault('usuario', self.usuario())
+        return Empleado.objects.create(**datos)
+    
+    def documentos(self, empleado):
+        estados = ['pendiente', 'aprobado', 'en_revision']
+        return [
+            Documento.objects.create(
+                empleado=empleado, tipo=tipo, nombre=f'{tipo} {empleado.pk}',
+                archivo=f'documentos/{tipo}_{empleado.pk}.pdf',
+                estado=estados[i % len(estados)],
+            )
+            for i, tipo in enumerate(TIPOS_DOCUMENTO)
+        ]
+    
+    def tanda(self, cantidad, supervisor):
+        """
+        ``cantidad`` empleados con sus tareas automáticas, documentos y
+        dependencias, repartidos en departamentos y puestos nuevos (los listados
+        de puestos también deben crecer).
+        """
+        departamento = self.departamento()
+        for _ in range(cantidad // 2):
+            self.puesto(departamento)
+        empleados = []
+        for i in range(cantidad):
+            empleado = self.empleado(supervisor=supervisor if i % 2 else None)
+            self.documentos(empleado)
+            tareas = list(empleado.tareas.order_by('orden')[:3])
+            if len(tareas) == 3:
+                DependenciaTarea.objects.create(tarea=tareas[1], requisito=tareas[0])
+                tareas[2].estado = 'completado'
+                tareas[2].fecha_completado = date.today()
+                tareas[2].save()
+            empleados.append(empleado)
+        return empleados
+    
+    def archivar(self, empleado):
+        """Marca a ``empleado`` como completado y archiva su onboarding."""
+        Empleado.objects.filter(pk=empleado.pk).update(estado='completado')
+        archivo.archivar(meses=0, hoy=date.today() + timedelta(days=1))
+
+
+# ======================
+# Medición
+# ======================
+
+def normalizar(sql):
+    """SQL sin valores literales, para agrupar las consultas repetidas."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+    return re.sub(r'IN \(\?(?:, \?)*\)', 'IN (...)', sql)
+
+
+class PresupuestoConsultasMixin:
+    """Mide cada petición y compara las consultas de la tanda chica y la grande."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        # El jefe también es empleado ("Mi equipo"). Al crearlo se le asigna una
+        # clave temporal, que invalidaría una sesión abierta antes
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jefe = self.fabrica.usuario(is_staff=True, is_superuser=True)
+            self.fabrica.empleado(usuario=self.jefe, puesto=self.fabrica.puesto(self.fabrica.departamento()))
+        self.client.force_login(self.jefe)
+    
+    def tanda(self, cantidad):
+        # Ejecuta los on_commit (historial, versiones de caché, progreso y
+        # estado) como en producción, antes de archivar: si no, la reevaluación
+        # diferida pisaría el estado completado
+        with self.captureOnCommitCallbacks(execute=True):
+            empleados = self.fabrica.tanda(cantidad, supervisor=self.jefe)
+        # Un completado archivado por tanda (para el admin y el detalle)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.archivar(empleados[0])
+        return empleados
+    
+    def medir(self, peticion):
+        """``(consultas, respuesta)`` de ``peticion()`` con la caché vacía."""
+        cache.clear()
+        # Los on_commit de la petición se ejecutan al final, fuera de la medición:
+        # un buffer sin confirmar se quedaría con los efectos de la tanda siguiente
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as capturadas:
+            respuesta = peticion()
+            if getattr(respuesta, 'streaming', False) and not respuesta.is_async:
+                b''.join(respuesta.streaming_content)
+                respuesta.close()
+        return [consulta['sql'] for consulta in capturadas.captured_queries], respuesta
+    
+    def comprobar_presupuesto(self, peticiones):
+        """
+        ``peticiones``: ``{nombre: función(empleados) -> respuesta}``. Se miden
+        con la primera tanda de datos, se agrega la segunda y se vuelven a medir.
+        """
+        empleados = self.tanda(EMPLEADOS_POCOS)
+        pocas = {}
+        for nombre, peticion in peticiones.items():
+            consultas, respuesta = self.medir(lambda: peticion(empleados))
+            # 204: el stream de eventos no se abre con el handler WSGI de pruebas
+            self.assertIn(respuesta.status_code, (200, 204), f'{nombre}: respuesta {respuesta.status_code}')
+            pocas[nombre] = consultas
+        
+        empleados = self.tanda(EMPLEADOS_MUCHOS) + empleados
+        for nombre, peticion in peticiones.items():
+            with self.subTest(nombre):
+                consultas, respuesta = self.medir(lambda: peticion(empleados))
+                self.assertIn(respuesta.status_code, (200, 204), f'{nombre}: respuesta {respuesta.status_code}')
+                if len(consultas) > len(pocas[nombre]):
+                    self.fail(self.informe(nombre, pocas[nombre], consultas))
+    
+    def informe(self, nombre, pocas, muchas):
+        antes, despues = Counter(map(normalizar, pocas)), Counter(map(normalizar, muchas))
+        crecen = [
+            f'  {antes[sql]} → {cantidad}: {sql}'
+            for sql, cantidad in despues.most_common() if cantidad > antes[sql]
+        ]
+        return (
+            f'{nombre}: {len(pocas)} consultas con {EMPLEADOS_POCOS} empleados, '
+            f'{len(muchas)} con {EMPLEADOS_POCOS + EMPLEADOS_MUCHOS}. Consultas que crecen:\n'
+            + '\n'.join(crecen)
+        )
+
+
+# ======================
+# Vistas y API
+# ======================
+
+def _argumentos(nombre, empleados):
+    """Argumentos de la URL ``nombre`` (todas las de gestor/urls.py deben figurar)."""
+    empleado = empleados[-1]
+    if nombre in ('empleado_detail', 'empleado_update', 'empleado_delete', 'api_empleado_detail'):
+        return [empleado.pk]
+    if nombre in ('documento_create', 'tarea_create'):
+        return [empleado.pk]
+    if nombre in ('documento_revisar', 'api_documento_detail'):
+        return [Documento.objects.filter(empleado=empleado).values_list('pk', flat=True)[0]]
+    if nombre in ('tarea_update', 'api_tarea_detail'):
+        return [TareaOnboarding.objects.filter(empleado=empleado).values_list('pk', flat=True)[0]]
+    if nombre == 'calendario_feed':
+        return [SuscripcionCalendario.para(empleado.usuario).token]
+    if nombre == 'reporte_descargar':
+        return [Reporte.objects.values_list('pk', flat=True).get(estado='listo')]
+    return []
+
+
+# Consultas con que se pide cada página (por defecto, solo la URL sin filtros)
+VARIANTES = {
+    'dashboard': ['', '?equipo=1'],
+    'empleado_list': ['', '?equipo=1', '?estado=en_proceso'],
+    'empleado_detail': ['', '?archivo=1'],
+    'tarea_list': ['', '?estado=pendiente', '?equipo=1', '?completo=1'],
+    'documento_list': ['', '?completo=1'],
+    'documento_completitud': ['', '?exportar=csv'],
+    'analitica_compensacion': ['', '?exportar=grupos', '?exportar=atipicos'],
+    'calendario_celda': [f'?fecha={date.today().isoformat()}&area=rrhh'],
+    'api_autocompletar_usuarios': ['', '?q=nombre', '?q=nombre%20usuario'],
+    'api_autocompletar_puestos': ['', '?q=puesto'],
+}
+
+# Endpoints que solo aceptan POST: el cuerpo crece con los datos
+SOLO_POST = {'api_tarea_lote', 'api_documento_revision'}
+
+
+class PresupuestoVistasTests(PresupuestoConsultasMixin, TestCase):
+    """Cada URL de ``gestor/urls.py`` con pocos datos y con muchos."""
+    
+    def setUp(self):
+        super().setUp()
+        directorio = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(GESTOR_DIRECTORIO_REPORTES=Path(directorio)))
+        # Un reporte listo para la descarga: se generan fuera de las peticiones
+        reportes.solicitar('documentos', 'csv', usuario=self.jefe)
+        reportes.procesar_pendientes()
+    
+    def peticiones(self):
+        peticiones = {}
+        for patron in urls.urlpatterns:
+            self.assertIsInstance(patron, URLPattern)
+            nombre = patron.name
+            if nombre in SOLO_POST:
+                continue
+            for variante in VARIANTES.get(nombre, ['']):
+                peticiones[nombre + variante] = (
+                    lambda empleados, nombre=nombre, variante=variante: self.client.get(
+                        reverse(f'gestor:{nombre}', args=_argumentos(nombre, empleados)) + variante
+                    )
+                )
+        return peticiones
+    
+    def test_consultas_no_crecen_con_las_filas(self):
+        self.comprobar_presupuesto(self.peticiones())
+    
+    def test_lotes_no_crecen_con_los_items(self):
+        def lote_tareas(empleados):
+            tareas = TareaOnboarding.objects.filter(empleado__in=empleados).exclude(estado='completado')
+            return self.client.post(
+                reverse('gestor:api_tarea_lote'),
+                json.dumps({'tareas': [
+                    {'id': pk, 'estado': 'en_progreso', 'notas': 'Revisado'}
+                    for pk in tareas.values_list('pk', flat=True)
+                ]}),
+                content_type='application/json',
+            )
+        
+        def revision(empleados):
+            documentos = Documento.objects.filter(empleado__in=empleados, estado__in=('pendiente', 'en_revision'))
+            return self.client.post(
+                reverse('gestor:api_documento_revision'),
+                json.dumps({
+                    'decisiones': [
+                        {'id': pk, 'estado': 'aprobado', 'comentarios': 'Correcto'}
+                        for pk in documentos.values_list('pk', flat=True)
+                    ],
+                    'reponer': 10,
+                }),
+                content_type='application/json',
+            )
+        
+        self.comprobar_presupuesto({'api_tarea_lote': lote_tareas, 'api_documento_revision': revision})
+
+
+# ======================
+# Admin
+# ======================
+
+class PresupuestoAdminTests(PresupuestoConsultasMixin, TestCase):
+    """Listado, alta y edición de cada modelo de gestor registrado en el admin."""
+    
+    def peticiones(self):
+        peticiones = {}
+        for modelo, modelo_admin in admin.site._registry.items():
+            if modelo._meta.app_label != 'gestor':
+                continue
+            prefijo = f'admin:gestor_{modelo._meta.model_name}'
+            peticiones[f'{prefijo}_changelist'] = (
+                lambda empleados, prefijo=prefijo: self.client.get(reverse(f'{prefijo}_changelist'))
+            )
+            if modelo_admin.has_add_permission(self.peticion_admin()):
+                peticiones[f'{prefijo}_add'] = (
+                    lambda empleados, prefijo=prefijo: self.client.get(reverse(f'{prefijo}_add'))
+                )
+            peticiones[f'{prefijo}_change'] = (
+                lambda empleados, modelo=modelo, prefijo=prefijo: self.client.get(
+                    reverse(f'{prefijo}_change', args=[modelo._base_manager.order_by('-pk')[0].pk])
+                )
+            )
+            for campo in modelo_admin.autocomplete_fields:
+                parametros = {'app_label': 'gestor', 'model_name': modelo._meta.model_name, 'field_name': campo}
+                peticiones[f'admin:autocomplete {modelo._meta.model_name}.{campo}'] = (
+                    lambda empleados, parametros=parametros: self.client.get(reverse('admin:autocomplete'), parametros)
+                )
+        return peticiones
+    
+    def peticion_admin(self):
+        peticion = self.client.get(reverse('admin:index')).wsgi_request
+        peticion.user = self.jefe
+        return peticion
+    
+    def test_consultas_no_crecen_con_las_filas(self):
+        self.comprobar_presupuesto(self.peticiones())
+
+
+# ======================
+# Efectos diferidos
+# ======================
+
+class EfectosTests(TestCase):
+    """Los efectos de muchos ``save()`` en una transacción se ejecutan una vez."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            # Aún no ingresó: pasa a en proceso al empezar sus tareas
+            self.empleado = self.fabrica.empleado(fecha_ingreso=date.today() + timedelta(days=30))
+        efectos.reiniciar_contadores()
+    
+    def test_una_ejecucion_por_empleado_y_transaccion(self):
+        tareas = list(self.empleado.tareas.exclude(estado='bloqueado'))
+        antes = len(connection.run_on_commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for tarea in tareas:
+                    tarea.estado = 'completado'
+                    tarea.save()
+                # Nada se ejecuta antes de confirmar, y con un solo on_commit
+                self.assertEqual(efectos.contadores()['progreso']['ejecutados'], 0)
+                self.assertEqual(sum(
+                    isinstance(getattr(callback, '__self__', None), efectos.Pendientes)
+                    for _, callback, _ in connection.run_on_commit[antes:]
+                ), 1)
+        
+        contadores = efectos.contadores()
+        for nombre in ('progreso', 'estado'):
+            self.assertEqual(contadores[nombre]['pedidos'], len(tareas))
+            self.assertEqual(contadores[nombre]['ejecutados'], 1)
+            self.assertEqual(contadores[nombre]['coalescidos'], len(tareas) - 1)
+        self.empleado.refresh_from_db()
+        self.assertGreater(self.empleado.progreso, 0)
+        self.assertEqual(self.empleado.progreso, self.empleado.calcular_progreso())
+        self.assertEqual(self.empleado.estado, 'en_proceso')
+    
+    def test_revertir_descarta_los_efectos(self):
+        tarea = self.empleado.tareas.exclude(estado='bloqueado').first()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    tarea.estado = 'completado'
+                    tarea.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(efectos.contadores()['progreso']['ejecutados'], 0)
+
+
+class AccionesAdminMixin:
+    """Ejecuta acciones del admin como un superusuario (``self.client`` ya autenticado)."""
+    
+    def accion(self, modelo, accion, objetos):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse(f'admin:gestor_{modelo}_changelist'), {
+                'action': accion, '_selected_action': [objeto.pk for objeto in objetos],
+            })
+        self.assertEqual(respuesta.status_code, 302)
+        return [str(mensaje) for mensaje in get_messages(respuesta.wsgi_request)]
+
+
+# ======================
+# API
+# ======================
+
+class ApiTests(TestCase):
+    """Paginación por cursor estable y GET condicional que sigue a las tablas unidas."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleados = [self.fabrica.empleado() for _ in range(5)]
+            self.client.force_login(self.fabrica.usuario(is_superuser=True))
+    
+    def test_cursor_no_repite_ni_salta_filas(self):
+        url = reverse('gestor:api_empleado_list') + '?limit=2&fields=id'
+        vistos = []
+        primera = True
+        while url:
+            datos = self.client.get(url).json()
+            self.assertEqual(datos['count'], len(self.empleados) + (0 if primera else 1))
+            vistos += [fila['id'] for fila in datos['results']]
+            if primera:
+                # Un alta entre páginas queda antes del cursor: no desplaza a las demás
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.fabrica.empleado()
+                primera = False
+            url = datos['next']
+        esperados = sorted(self.empleados, key=lambda empleado: (empleado.fecha_creacion, empleado.pk), reverse=True)
+        self.assertEqual(vistos, [empleado.pk for empleado in esperados])
+        
+        respuesta = self.client.get(reverse('gestor:api_empleado_list') + '?cursor=basura')
+        self.assertEqual(respuesta.status_code, 400)
+    
+    def test_etag_cambia_con_usuario_puesto_y_departamento(self):
+        empleado = self.empleados[0]
+        url = reverse('gestor:api_empleado_detail', args=[empleado.pk])
+        for cambiar in (
+            lambda: setattr(empleado.usuario, 'email', 'nuevo@rivcon.com') or empleado.usuario.save(),
+            lambda: setattr(empleado.puesto, 'titulo', 'Otro título') or empleado.puesto.save(),
+            lambda: setattr(empleado.puesto.departamento, 'nombre', 'Otro nombre') or empleado.puesto.departamento.save(),
+        ):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            with self.captureOnCommitCallbacks(execute=True):
+                cambiar()
+            respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(respuesta.json()['departamento'], 'Otro nombre')
+    
+    def test_permisos_de_los_recursos_y_del_salario(self):
+        empleado = self.empleados[0]
+        url = reverse('gestor:api_empleado_detail', args=[empleado.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario = self.fabrica.usuario()
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(reverse('gestor:api_tarea_list')).status_code, 403)
+        
+        usuario.user_permissions.add(Permission.objects.get(codename='view_empleado'))
+        self.assertEqual(self.client.get(url).json()['cedula'], empleado.cedula)
+        respuesta = self.client.get(reverse('gestor:api_empleado_list') + '?fields=id,salario')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['error'], 'Sin permiso para los campos: salario.')
+        
+        usuario.user_permissions.add(Permission.objects.get(codename='view_compensacion'))
+        respuesta = self.client.get(url + '?fields=salario')
+        self.assertEqual(float(respuesta.json()['salario']), empleado.salario)
+    
+    def test_autocompletar_pide_los_permisos_de_los_formularios(self):
+        usuarios = reverse('gestor:api_autocompletar_usuarios')
+        supervisores = reverse('gestor:api_autocompletar_supervisores')
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario = self.fabrica.usuario()
+        self.client.logout()
+        self.assertEqual(self.client.get(supervisores).status_code, 401)
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get(usuarios).status_code, 403)
+        # Como el filtro de la lista de empleados, basta con iniciar sesión
+        self.assertEqual(self.client.get(supervisores).status_code, 200)
+        
+        usuario.user_permissions.add(Permission.objects.get(codename='view_empleado'))
+        self.assertEqual(self.client.get(usuarios).status_code, 403)
+        
+        usuario.user_permissions.add(Permission.objects.get(codename='change_tareaonboarding'))
+        respuesta = self.client.get(usuarios + f'?q={usuario.username}')
+        self.assertEqual(respuesta.json()['results'], [{
+            'id': usuario.pk, 'username': usuario.username, 'nombre': 'Nombre',
+            'apellido': usuario.last_name, 'texto': f'Nombre {usuario.last_name} ({usuario.username})',
+        }])
+        # El email no se expone ni sirve para buscar
+        self.assertEqual(self.client.get(usuarios + '?q=usuario1@').json()['results'], [])
+        # Sin ``texto`` propio, la etiqueta son los campos visibles sin el id
+        fila = {'id': 1, 'titulo': 'Analista', 'departamento': None}
+        self.assertEqual(api.AutocompletarAPIView().texto(fila), 'Analista')
+
+
+class LotesApiTests(TestCase):
+    """Los endpoints por lotes validan cada ítem y aplican el resto con UPDATEs por conjunto."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            self.documentos = self.fabrica.documentos(self.empleado)
+            self.client.force_login(self.fabrica.usuario(is_superuser=True))
+    
+    def post(self, nombre, datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse(nombre), json.dumps(datos), content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+    
+    def test_lote_de_tareas(self):
+        libre = self.empleado.tareas.filter(estado='pendiente').order_by('pk').first()
+        bloqueada = self.empleado.tareas.filter(estado='bloqueado').first()
+        datos = self.post('gestor:api_tarea_lote', {'tareas': [
+            {'id': libre.pk, 'estado': 'completado', 'notas': 'Listo'},
+            {'id': libre.pk, 'notas': 'Otra vez'},
+            {'id': bloqueada.pk, 'estado': 'completado'},
+            {'id': 0, 'estado': 'completado'},
+        ]})
+        self.assertEqual((datos['aplicadas'], datos['errores']), (1, 3))
+        self.assertEqual([resultado['ok'] for resultado in datos['resultados']], [True, False, False, False])
+        
+        libre.refresh_from_db()
+        self.assertEqual((libre.estado, libre.notas, libre.fecha_completado), ('completado', 'Listo', date.today()))
+        self.assertIsNotNone(libre.clave_sla)
+        self.assertEqual(ResumenSLA.objects.aggregate(total=Sum('cantidad'))['total'], 1)
+        self.empleado.refresh_from_db()
+        self.assertEqual(self.empleado.progreso, self.empleado.calcular_progreso())
+        self.assertGreater(self.empleado.progreso, 0)
+    
+    def test_revision_de_documentos(self):
+        pendiente, aprobado, en_revision = self.documentos
+        Documento.objects.filter(pk=en_revision.pk).update(comentarios='Nota de otra revisión')
+        datos = self.post('gestor:api_documento_revision', {'decisiones': [
+            {'id': pendiente.pk, 'estado': 'aprobado', 'comentarios': 'Correcto'},
+            {'id': en_revision.pk, 'estado': 'rechazado', 'comentarios': ''},
+            {'id': aprobado.pk, 'estado': 'rechazado'},
+        ]})
+        self.assertEqual([resultado['ok'] for resultado in datos['resultados']], [True, True, False])
+        self.assertEqual(
+            dict(Documento.objects.filter(empleado=self.empleado).values_list('pk', 'estado')),
+            {pendiente.pk: 'aprobado', aprobado.pk: 'aprobado', en_revision.pk: 'rechazado'},
+        )
+        pendiente.refresh_from_db()
+        self.assertEqual(pendiente.comentarios, 'Correcto')
+        self.assertIsNotNone(pendiente.revisado_por)
+        # Un comentario vacío borra la nota anterior
+        en_revision.refresh_from_db()
+        self.assertEqual(en_revision.comentarios, '')
+
+
+# ======================
+# Dependencias entre tareas
+# ======================
+
+class DependenciasTests(AccionesAdminMixin, TestCase):
+    """Grafo de requisitos: ciclos, orden de Kahn y bloqueos al completar o reabrir."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            # Solo una cadena en la que cada tarea requiere a la anterior
+            DependenciaTarea.objects.filter(tarea__empleado=self.empleado).delete()
+            self.empleado.tareas.update(estado='pendiente')
+            self.tareas = list(self.empleado.tareas.order_by('orden', 'pk')[:4])
+            for requisito, tarea in zip(self.tareas, self.tareas[1:]):
+                DependenciaTarea.objects.create(tarea=tarea, requisito=requisito)
+            actualizar_bloqueos(self.empleado.tareas.all())
+            self.client.force_login(self.fabrica.usuario(is_superuser=True, is_staff=True))
+    
+    def estados(self):
+        estados = dict(self.empleado.tareas.values_list('pk', 'estado'))
+        return [estados[tarea.pk] for tarea in self.tareas]
+    
+    def completar(self, *tareas):
+        with self.captureOnCommitCallbacks(execute=True):
+            for tarea in tareas:
+                tarea.refresh_from_db()
+                tarea.estado = 'completado'
+                tarea.save()
+    
+    def test_ciclos_y_orden_topologico(self):
+        # 2 requiere 1 y 3 requiere 2: que 1 requiera 3 cierra 1 -> 3 -> 2 -> 1
+        aristas = [(2, 1), (3, 2)]
+        self.assertEqual(encontrar_ciclo(aristas, 1, [3]), [1, 3, 2])
+        self.assertIsNone(encontrar_ciclo(aristas, 3, [1]))
+        self.assertEqual(orden_topologico([3, 2, 1, 4], aristas), [1, 4, 2, 3])
+        with self.assertRaises(ValueError):
+            orden_topologico([1, 2, 3], aristas + [(1, 3)])
+        
+        primera, *_, ultima = self.tareas
+        with self.assertRaisesMessage(ValidationError, 'formaría un ciclo'):
+            validar_requisitos(primera, [ultima])
+        with self.assertRaisesMessage(ValidationError, 'sí misma'):
+            validar_requisitos(primera, [primera])
+    
+    def test_completar_desbloquea_y_reabrir_bloquea(self):
+        self.assertEqual(self.estados(), ['pendiente', 'bloqueado', 'bloqueado', 'bloqueado'])
+        self.completar(*self.tareas[:2])
+        self.assertEqual(self.estados(), ['completado', 'completado', 'pendiente', 'bloqueado'])
+        
+        # La bloqueada no se reabre; la segunda vuelve a esperar a la primera
+        # y la tercera, que dependía de la segunda, también se bloquea
+        self.accion('tareaonboarding', 'marcar_pendiente', self.tareas[:2] + self.tareas[3:])
+        self.assertEqual(self.estados(), ['pendiente', 'bloqueado', 'bloqueado', 'bloqueado'])
+    
+    def test_acciones_del_admin_omiten_las_bloqueadas(self):
+        mensajes = self.accion('tareaonboarding', 'marcar_en_progreso', self.tareas[:2])
+        self.assertEqual(self.estados(), ['en_progreso', 'bloqueado', 'bloqueado', 'bloqueado'])
+        self.assertIn('1 tarea(s) omitida(s): tienen requisitos sin completar.', mensajes)
+        
+        # Como en el lote de la API, un requisito completado en la misma
+        # selección no bloquea; la cuarta sigue esperando a la tercera
+        mensajes = self.accion('tareaonboarding', 'marcar_completado', self.tareas[:2] + self.tareas[3:])
+        self.assertEqual(self.estados(), ['completado', 'completado', 'pendiente', 'bloqueado'])
+        self.assertIn('2 tarea(s) marcada(s) como Completada.', mensajes)
+
+
+# ======================
+# Rollups de SLA
+# ======================
+
+class SlaTests(AccionesAdminMixin, TestCase):
+    """Los rollups suman al completar y restan al reabrir, en la misma fila."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            # Aún no ingresó: solo está en proceso mientras tenga tareas empezadas
+            self.empleado = self.fabrica.empleado(fecha_ingreso=date.today() + timedelta(days=30))
+            self.tareas = list(self.empleado.tareas.filter(estado='pendiente').order_by('pk')[:2])
+            for tarea in self.tareas:
+                tarea.estado = 'completado'
+                tarea.save()
+            self.client.force_login(self.fabrica.usuario(is_superuser=True, is_staff=True))
+    
+    def rollups(self):
+        return set(ResumenSLA.objects.values_list(
+            'fecha', 'responsable', 'departamento_id', 'ciclo_dias', 'cantidad', 'a_tiempo',
+        ))
+    
+    def test_reabrir_resta_de_la_fila_en_que_se_conto(self):
+        self.assertEqual(sum(fila[4] for fila in self.rollups()), 2)
+        # Cambia todo lo que forma la clave después de completarse
+        TareaOnboarding.objects.filter(pk__in=[tarea.pk for tarea in self.tareas]).update(
+            fecha_completado=date.today() - timedelta(days=3),
+            fecha_limite=date.today() - timedelta(days=5),
+            responsable='it',
+        )
+        Empleado.objects.filter(pk=self.empleado.pk).update(puesto=self.fabrica.puesto(self.fabrica.departamento()))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            tarea = self.tareas[0]
+            tarea.refresh_from_db()
+            tarea.estado = 'pendiente'
+            tarea.save()
+        self.assertEqual(sum(fila[4] for fila in self.rollups()), 1)
+        self.accion('tareaonboarding', 'marcar_pendiente', self.tareas)
+        self.assertEqual(self.rollups(), set())
+    
+    def test_reabrir_en_el_admin_recalcula_progreso_y_estado(self):
+        self.empleado.refresh_from_db()
+        self.assertGreater(self.empleado.progreso, 0)
+        self.assertEqual(self.empleado.estado, 'en_proceso')
+        
+        self.accion('tareaonboarding', 'marcar_pendiente', self.tareas)
+        self.empleado.refresh_from_db()
+        self.assertEqual(self.empleado.progreso, 0)
+        self.assertEqual(self.empleado.estado, 'pre_ingreso')
+    
+    def test_backfill_coincide_con_los_incrementales(self):
+        incrementales = self.rollups()
+        claves = dict(TareaOnboarding.objects.filter(estado='completado').values_list('pk', 'clave_sla'))
+        self.assertEqual(set(claves), {tarea.pk for tarea in self.tareas})
+        self.assertTrue(all(claves.values()))
+        
+        TareaOnboarding.objects.update(clave_sla=None)
+        ResumenSLA.objects.all().delete()
+        self.assertEqual(sla.reconstruir(), (2, len(incrementales)))
+        self.assertEqual(self.rollups(), incrementales)
+        self.assertEqual(
+            dict(TareaOnboarding.objects.filter(estado='completado').values_list('pk', 'clave_sla')), claves,
+        )
+
+
+# ======================
+# Máquina de estados
+# ======================
+
+@override_settings(GESTOR_DOCUMENTOS_REQUERIDOS=list(TIPOS_DOCUMENTO))
+class MaquinaEstadosTests(AccionesAdminMixin, TestCase):
+    """El estado del empleado se deriva de sus tareas y documentos, también en el admin."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado(fecha_ingreso=date.today() + timedelta(days=30))
+            self.documentos = self.fabrica.documentos(self.empleado)
+            self.client.force_login(self.fabrica.usuario(is_superuser=True, is_staff=True))
+    
+    def estado(self):
+        self.empleado.refresh_from_db()
+        return self.empleado.estado
+    
+    def test_transiciones_por_tareas_y_documentos(self):
+        self.assertEqual(self.estado(), 'pre_ingreso')
+        with self.captureOnCommitCallbacks(execute=True):
+            for tarea in self.empleado.tareas.order_by('pk'):
+                tarea.estado = 'completado'
+                tarea.save()
+        # Tareas completas pero documentos sin aprobar
+        self.assertEqual(self.estado(), 'en_proceso')
+        with self.captureOnCommitCallbacks(execute=True):
+            Empleado.objects.filter(pk=self.empleado.pk).update(fecha_ingreso=date.today())
+        
+        self.accion('documento', 'aprobar_documentos', self.documentos)
+        self.assertEqual(self.estado(), 'completado')
+        self.accion('documento', 'rechazar_documentos', self.documentos[:1])
+        self.assertEqual(self.estado(), 'en_proceso')
+        self.accion('documento', 'aprobar_documentos', self.documentos[:1])
+        self.assertEqual(self.estado(), 'completado')
+    
+    def test_el_admin_no_fija_estados_a_mano(self):
+        peticion = RequestFactory().get('/')
+        peticion.user = self.fabrica.usuario(is_superuser=True, is_staff=True)
+        acciones = admin.site._registry[Empleado].get_actions(peticion)
+        self.assertNotIn('marcar_en_proceso', acciones)
+        self.assertNotIn('marcar_completado', acciones)
+
+
+# ======================
+# Historial de transiciones
+# ======================
+
+class HistorialTests(AccionesAdminMixin, TestCase):
+    """Las transiciones se registran al confirmar, con usuario, y no las de un bloque revertido."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            self.empleado.tareas.update(estado='pendiente')
+            self.usuario = self.fabrica.usuario(is_superuser=True, is_staff=True)
+            self.client.force_login(self.usuario)
+        self.tareas = list(self.empleado.tareas.order_by('pk')[:2])
+    
+    def historial(self, tarea):
+        return list(
+            RegistroTransicion.objects.filter(entidad='tareaonboarding', objeto_id=tarea.pk)
+            .exclude(desde='').order_by('pk').values_list('desde', 'hacia', 'usuario_id')
+        )
+    
+    def completar(self, tarea):
+        tarea.refresh_from_db()
+        tarea.estado = 'completado'
+        tarea.save()
+    
+    def test_save_y_acciones_del_admin(self):
+        tarea = self.tareas[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.completar(tarea)
+        # Fuera de una petición no hay usuario; la acción del admin usa update()
+        self.accion('tareaonboarding', 'marcar_pendiente', [tarea])
+        self.assertEqual(self.historial(tarea), [
+            ('pendiente', 'completado', None),
+            ('completado', 'pendiente', self.usuario.pk),
+        ])
+    
+    def test_savepoint_revertido_descarta_sus_entradas(self):
+        primera, segunda = self.tareas
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.completar(primera)
+                try:
+                    with transaction.atomic():
+                        self.completar(segunda)
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                # Después del rollback el bloque externo sigue registrando
+                TareaOnboarding.objects.filter(pk=segunda.pk).update(estado='en_progreso')
+        
+        self.assertEqual(self.historial(primera), [('pendiente', 'completado', None)])
+        self.assertEqual(self.historial(segunda), [('pendiente', 'en_progreso', None)])
+
+
+# ======================
+# Eventos en vivo
+# ======================
+
+class EventosTests(TestCase):
+    """El stream SSE solo se abre con ASGI y las bajas también se publican."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            self.documentos = self.fabrica.documentos(self.empleado)
+            self.client.force_login(self.fabrica.usuario(is_superuser=True, is_staff=True))
+    
+    def test_sin_asgi_no_abre_el_stream(self):
+        # El cliente de pruebas pasa por el handler WSGI
+        self.assertEqual(self.client.get(reverse('gestor:eventos')).status_code, 204)
+        for nombre in ('gestor:dashboard', 'gestor:kanban'):
+            respuesta = self.client.get(reverse(nombre))
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertNotContains(respuesta, 'x-init="conectar()"')
+    
+    def test_las_bajas_descuentan_los_contadores(self):
+        pk = self.empleado.pk
+        tareas = dict(self.empleado.tareas.values_list('pk', 'estado'))
+        with mock.patch('gestor.eventos.get_hub') as get_hub:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.empleado.delete()
+        publicados = [llamada.args[0] for llamada in get_hub.return_value.publicar.call_args_list]
+        
+        bajas = {
+            tipo: {evento['datos']['id']: evento['datos'] for evento in publicados if evento['tipo'] == tipo}
+            for tipo in ('empleado_eliminado', 'tarea_estado', 'documento_estado')
+        }
+        self.assertEqual(bajas['empleado_eliminado'], {
+            pk: {'id': pk, 'estado': self.empleado.estado, 'este_mes': True},
+        })
+        self.assertEqual({pk: datos['desde'] for pk, datos in bajas['tarea_estado'].items()}, tareas)
+        self.assertEqual(
+            {pk: datos['desde'] for pk, datos in bajas['documento_estado'].items()},
+            {documento.pk: documento.estado for documento in self.documentos},
+        )
+        self.assertTrue(all(
+            datos['hacia'] is None for tipo in ('tarea_estado', 'documento_estado') for datos in bajas[tipo].values()
+        ))
+
+
+# ======================
+# Archivo de onboardings
+# ======================
+
+class ArchivoTests(TestCase):
+    """El archivo saca las tareas y documentos de las tablas sin perder datos."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            self.fabrica.documentos(self.empleado)
+            for tarea in self.empleado.tareas.order_by('pk'):
+                tarea.estado = 'completado'
+                tarea.save()
+        self.tareas = set(self.empleado.tareas.values_list('pk', 'titulo', 'estado'))
+        self.documentos = set(self.empleado.documentos.values_list('pk', 'nombre', 'estado'))
+        self.fabrica.archivar(self.empleado)
+        self.empleado.refresh_from_db()
+        self.factory = RequestFactory()
+    
+    def detalle(self, vista, **parametros):
+        usuario = self.fabrica.usuario(is_superuser=True)
+        
+        async def auser():
+            return usuario
+        
+        peticion = self.factory.get('/', parametros)
+        # Lo que deja AuthenticationMiddleware (la vista asíncrona usa auser)
+        peticion.user, peticion.auser = usuario, auser
+        manejador = vista.as_view()
+        if vista.view_is_async:
+            manejador = async_to_sync(manejador)
+        return manejador(peticion, pk=self.empleado.pk).render()
+    
+    def test_detalle_sincrono_y_asincrono_coinciden(self):
+        self.assertTrue(self.empleado.archivado)
+        self.assertEqual(self.empleado.progreso, 100)
+        for parametros in ({}, {'archivo': '1'}):
+            with self.subTest(**parametros):
+                sincrona = self.detalle(views.EmpleadoDetailView, **parametros)
+                asincrona = self.detalle(views.EmpleadoDetailAsyncView, **parametros)
+                for respuesta in (sincrona, asincrona):
+                    self.assertEqual(respuesta.context_data['progreso'], 100)
+                    self.assertEqual(respuesta.context_data['ver_archivo'], bool(parametros))
+                    self.assertContains(respuesta, f'{len(self.tareas)} tareas y')
+                self.assertEqual(
+                    sincrona.context_data['archivo'] if parametros else sincrona.context_data['archivo'].pk,
+                    asincrona.context_data['archivo'] if parametros else asincrona.context_data['archivo'].pk,
+                )
+        for _, titulo, _ in self.tareas:
+            self.assertContains(asincrona, titulo)
+    
+    def test_backfill_sla_exige_desde_con_archivados(self):
+        with self.assertRaisesMessage(CommandError, 'Hay onboardings archivados'):
+            call_command('backfill_sla', stdout=StringIO())
+        # Un --desde que alcanza a las archivadas también borraría sus rollups
+        with self.assertRaisesMessage(CommandError, 'Hay onboardings archivados'):
+            call_command('backfill_sla', desde=date.today().isoformat(), stdout=StringIO())
+        salida = StringIO()
+        call_command('backfill_sla', desde=(date.today() + timedelta(days=1)).isoformat(), stdout=salida)
+        self.assertIn('0 tarea(s)', salida.getvalue())
+    
+    def test_restaurar_devuelve_las_mismas_filas(self):
+        self.assertFalse(self.empleado.tareas.exists())
+        self.assertFalse(self.empleado.documentos.exists())
+        
+        self.assertEqual(archivo.restaurar([self.empleado.pk]), 1)
+        self.empleado.refresh_from_db()
+        self.assertFalse(self.empleado.archivado)
+        self.assertFalse(ArchivoOnboarding.objects.filter(empleado=self.empleado).exists())
+        self.assertEqual(set(self.empleado.tareas.values_list('pk', 'titulo', 'estado')), self.tareas)
+        self.assertEqual(set(self.empleado.documentos.values_list('pk', 'nombre', 'estado')), self.documentos)
+
+
+# ======================
+# Asignación automática
+# ======================
+
+@override_settings(GESTOR_ASIGNACION_AREAS={'rrhh': 'RRHH', 'finanzas': 'RRHH', 'it': 'IT'})
+class AsignacionTests(TestCase):
+    """Las tareas automáticas van al miembro del grupo con menos tareas abiertas."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        self.fabrica.puesto(self.fabrica.departamento())
+        rrhh, it = Group.objects.create(name='RRHH'), Group.objects.create(name='IT')
+        self.rrhh = [self.fabrica.usuario() for _ in range(3)]
+        self.it = self.fabrica.usuario()
+        for usuario in self.rrhh:
+            usuario.groups.add(rrhh)
+        # En los dos grupos: su carga de IT cuenta también para RRHH
+        self.rrhh[0].groups.add(it)
+        self.it.groups.add(it)
+        self.fuera = self.fabrica.usuario(is_active=False)
+        self.fuera.groups.add(rrhh)
+    
+    def test_reparte_por_carga_en_un_recorrido(self):
+        tareas = [
+            TareaOnboarding(titulo=f'Tarea {i}', responsable=area, fecha_limite=date.today())
+            for i, area in enumerate(['it'] * 4 + ['rrhh'] * 6 + ['finanzas', 'supervisor'])
+        ]
+        with self.assertNumQueries(2):
+            asignador = asignacion.Asignador()
+        with self.assertNumQueries(0):
+            self.assertEqual(asignador.asignar(tareas), 11)
+        
+        carga = Counter(tarea.responsable_usuario_id for tarea in tareas)
+        self.assertEqual(carga[self.fuera.pk], 0)
+        self.assertIsNone(tareas[-1].responsable_usuario_id)
+        # 11 tareas entre 4 personas: nadie con más de una de diferencia
+        repartidas = [carga[usuario.pk] for usuario in self.rrhh + [self.it]]
+        self.assertEqual(sum(repartidas), 11)
+        self.assertLessEqual(max(repartidas) - min(repartidas), 1)
+    
+    def test_alta_asigna_al_menos_cargado(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            empleado = self.fabrica.empleado()
+        asignadas = Counter(
+            empleado.tareas.filter(responsable__in=('rrhh', 'finanzas'))
+            .values_list('responsable_usuario_id', flat=True)
+        )
+        self.assertNotIn(None, asignadas)
+        self.assertLessEqual(max(asignadas.values()) - min(asignadas.values()), 1)
+        self.assertFalse(empleado.tareas.filter(responsable='empleado', responsable_usuario__isnull=False).exists())
+        
+        # La segunda alta empieza por quienes recibieron menos
+        menos = min(asignadas.values())
+        with self.captureOnCommitCallbacks(execute=True):
+            otro = self.fabrica.empleado()
+        primera = otro.tareas.filter(responsable__in=('rrhh', 'finanzas')).order_by('pk').first()
+        self.assertEqual(asignadas.get(primera.responsable_usuario_id, 0), menos)
+    
+    def test_comando_asigna_las_pendientes(self):
+        with self.settings(GESTOR_ASIGNACION_AREAS={}):
+            with self.captureOnCommitCallbacks(execute=True):
+                empleado = self.fabrica.empleado()
+        sin_asignar = empleado.tareas.filter(responsable__in=('rrhh', 'finanzas', 'it')).exclude(estado='completado')
+        total = sin_asignar.count()
+        self.assertFalse(sin_asignar.filter(responsable_usuario__isnull=False).exists())
+        
+        self.assertEqual(sum(asignacion.asignar_sin_responsable(simular=True).values()), total)
+        self.assertTrue(sin_asignar.filter(responsable_usuario__isnull=True).exists())
+        reparto = asignacion.asignar_sin_responsable()
+        self.assertEqual(sum(reparto.values()), total)
+        self.assertFalse(sin_asignar.filter(responsable_usuario__isnull=True).exists())
+
+
+# ======================
+# Calendario (iCalendar)
+# ======================
+
+class CalendarioFeedTests(TestCase):
+    """Feed por token: contenido, GET condicional y rearmado incremental."""
+    
+    def setUp(self):
+        cache.clear()
+        self.fabrica = Fabrica()
+        # Todo dentro: un efecto pedido antes quedaría con los de después sin ejecutar
+        with self.captureOnCommitCallbacks(execute=True):
+            self.responsable = self.fabrica.usuario()
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            self.otro = self.fabrica.empleado()
+            self.asignada = self.otro.tareas.order_by('pk')[0]
+            self.asignada.responsable_usuario = self.responsable
+            self.asignada.save()
+        self.url = reverse('gestor:calendario_feed', args=[SuscripcionCalendario.para(self.responsable).token])
+    
+    def test_tareas_asignadas_y_propias(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'text/calendar; charset=utf-8')
+        contenido = respuesta.content.decode()
+        self.assertTrue(contenido.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'UID:tarea-{self.asignada.pk}@', contenido)
+        self.assertTrue(all(len(linea.encode()) <= 75 for linea in contenido.split('\r\n')))
+        
+        propio = self.client.get(reverse(
+            'gestor:calendario_feed', args=[SuscripcionCalendario.para(self.empleado.usuario).token]
+        ))
+        self.assertEqual(
+            propio.content.decode().count('BEGIN:VEVENT'),
+            self.empleado.tareas.exclude(estado='cancelado').count(),
+        )
+    
+    def test_sin_cambios_304_sin_consultar_tareas(self):
+        primera = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+        # Solo el token
+        self.assertEqual(len(capturadas), 1)
+        self.assertNotIn('gestor_tareaonboarding', capturadas[0]['sql'])
+        
+        # Cambios de tareas de otros no lo afectan
+        with self.captureOnCommitCallbacks(execute=True):
+            tarea = self.empleado.tareas.order_by('pk')[0]
+            tarea.titulo = 'Otro título'
+            tarea.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 304)
+    
+    def test_cambio_rearma_solo_la_tarea_cambiada(self):
+        primera = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva = self.otro.tareas.order_by('pk')[1]
+            nueva.responsable_usuario = self.responsable
+            nueva.save()
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], primera['ETag'])
+        self.assertEqual(respuesta.content.decode().count('BEGIN:VEVENT'), 2)
+        # Token, (id, fecha_actualizacion) de las tareas y los datos de la nueva
+        self.assertEqual(len(capturadas), 3)
+        self.assertIn(f'IN ({nueva.pk})', capturadas[2]['sql'])
+        
+        # Reasignarla la quita de su feed
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva.responsable_usuario = None
+            nueva.save()
+        self.assertEqual(self.client.get(self.url).content.decode().count('BEGIN:VEVENT'), 1)
+    
+    def test_update_masivo_renueva_todos(self):
+        primera = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            TareaOnboarding.objects.filter(pk=self.asignada.pk).update(titulo='Cambiada')
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(respuesta.status_code, 200)
+        # Aunque fecha_actualizacion no cambió, el VEVENT se rearma
+        self.assertIn('SUMMARY:Cambiada', respuesta.content.decode())
+    
+    def test_token_regenerado_o_invalido(self):
+        suscripcion = SuscripcionCalendario.para(self.responsable)
+        suscripcion.regenerar()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('gestor:calendario_feed', args=[suscripcion.token])).status_code, 200,
+        )
+
+
+# ======================
+# Reportes
+# ======================
+
+class ReportesTests(TestCase):
+    """Cola, caché por versión de datos, formatos y descarga de los reportes."""
+    
+    def setUp(self):
+        directorio = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(GESTOR_DIRECTORIO_REPORTES=Path(directorio)))
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departamento = self.fabrica.departamento()
+            self.fabrica.puesto(self.departamento)
+            self.empleados = [self.fabrica.empleado(fecha_ingreso=date.today()) for _ in range(3)]
+            for empleado in self.empleados:
+                self.fabrica.documentos(empleado)
+            self.jefe = self.fabrica.usuario(is_staff=True, is_superuser=True)
+            self.otro = self.fabrica.usuario()
+        self.otro.user_permissions.add(Permission.objects.get(codename='view_dashboard'))
+    
+    def test_pedidos_iguales_comparten_trabajo_y_archivo(self):
+        reporte, encolado = reportes.solicitar('ingresos', 'csv', usuario=self.jefe)
+        self.assertTrue(encolado)
+        igual, encolado = reportes.solicitar('ingresos', 'csv', usuario=self.otro)
+        self.assertEqual((igual.pk, encolado), (reporte.pk, False))
+        self.assertEqual(set(reporte.solicitantes.all()), {self.jefe, self.otro})
+        self.assertEqual(reportes.procesar_pendientes(), 1)
+        
+        # Sin cambios en los datos se reutiliza el archivo, sin volver a la cola
+        igual, encolado = reportes.solicitar('ingresos', 'csv')
+        self.assertEqual((igual.pk, igual.estado, encolado), (reporte.pk, 'listo', False))
+        self.assertEqual(reportes.procesar_pendientes(), 0)
+        # Otro formato u otro mes es otro reporte
+        self.assertNotEqual(reportes.solicitar('ingresos', 'xlsx')[0].pk, reporte.pk)
+        self.assertNotEqual(reportes.solicitar('ingresos', 'csv', mes=date(2020, 1, 1))[0].pk, reporte.pk)
+    
+    def test_datos_nuevos_generan_otra_version(self):
+        reporte, _ = reportes.solicitar('documentos', 'csv')
+        reportes.procesar_pendientes()
+        with self.captureOnCommitCallbacks(execute=True):
+            documento = Documento.objects.filter(empleado=self.empleados[0], estado='pendiente')[0]
+            documento.estado = 'aprobado'
+            documento.save()
+        nuevo, encolado = reportes.solicitar('documentos', 'csv')
+        self.assertTrue(encolado)
+        self.assertNotEqual(nuevo.pk, reporte.pk)
+    
+    def test_formatos(self):
+        for formato in ('csv', 'xlsx', 'html'):
+            reportes.solicitar('ingresos', formato)
+        self.assertEqual(reportes.procesar_pendientes(), 3)
+        archivos = {
+            reporte.formato: reportes.ruta(reporte)
+            for reporte in Reporte.objects.filter(estado='listo')
+        }
+        
+        with open(archivos['csv'], encoding='utf-8-sig', newline='') as archivo:
+            filas = list(csv.reader(archivo))
+        self.assertEqual(filas[0][:3], ['Departamento', 'Puesto', 'Ingresos'])
+        self.assertEqual(filas[1][:3], [self.departamento.nombre, self.fabrica.puestos[0].titulo, '3'])
+        
+        with zipfile.ZipFile(archivos['xlsx']) as libro:
+            hoja = ElementTree.fromstring(libro.read('xl/worksheets/sheet1.xml'))
+            ElementTree.fromstring(libro.read('xl/workbook.xml'))
+        espacio = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        self.assertEqual(hoja.find(f'.//{espacio}c[@r="A2"]//{espacio}t').text, self.departamento.nombre)
+        self.assertEqual(hoja.find(f'.//{espacio}c[@r="C2"]/{espacio}v').text, '3')
+        
+        html = archivos['html'].read_text()
+        self.assertIn('<h1>Ingresos por departamento</h1>', html)
+        self.assertIn(self.departamento.nombre, html)
+    
+    def test_fallo_y_reintento(self):
+        with (
+            mock.patch.dict(reportes.DEFINICIONES['ingresos'], funcion=lambda *args: 1 / 0),
+            self.assertLogs('gestor.reportes', 'ERROR'),
+        ):
+            reporte, _ = reportes.solicitar('ingresos', 'csv')
+            self.assertEqual(reportes.procesar_pendientes(), 1)
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'error')
+        self.assertIn('ZeroDivisionError', reporte.error)
+        
+        # Pedirlo de nuevo lo devuelve a la cola
+        igual, encolado = reportes.solicitar('ingresos', 'csv')
+        self.assertEqual((igual.pk, igual.estado, encolado), (reporte.pk, 'pendiente', True))
+        reportes.procesar_pendientes()
+        igual.refresh_from_db()
+        self.assertEqual(igual.estado, 'listo')
+    
+    def test_colgados_vuelven_a_la_cola(self):
+        reporte, _ = reportes.solicitar('ingresos', 'csv')
+        for intento in range(1, reportes.INTENTOS_MAXIMOS + 1):
+            self.assertEqual(reportes.tomar_siguiente().pk, reporte.pk)
+            Reporte.objects.filter(pk=reporte.pk).update(fecha_inicio=timezone.now() - timedelta(hours=1))
+            liberados = reportes.liberar_colgados(minutos=30)
+            self.assertEqual(liberados, 0 if intento == reportes.INTENTOS_MAXIMOS else 1)
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'error')
+    
+    def test_pagina_y_descarga(self):
+        self.client.force_login(self.otro)
+        respuesta = self.client.post(reverse('gestor:reportes'), {'definicion': 'ingresos', 'formato': 'csv'})
+        self.assertRedirects(respuesta, reverse('gestor:reportes'))
+        reporte = self.otro.reportes.get()
+        self.assertContains(self.client.get(reverse('gestor:reportes')), 'http-equiv="refresh"')
+        
+        url = reverse('gestor:reporte_descargar', args=[reporte.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        reportes.procesar_pendientes()
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(f'filename="ingresos_{date.today():%Y-%m}.csv"', respuesta['Content-Disposition'])
+        self.assertIn('Ingresos', b''.join(respuesta.streaming_content).decode('utf-8-sig'))
+        # FileResponse cierra el archivo al cerrar la respuesta
+        respuesta.close()
+        
+        # Quien no lo pidió no lo descarga (salvo un superusuario)
+        otro_staff = self.fabrica.usuario()
+        otro_staff.user_permissions.add(Permission.objects.get(codename='view_dashboard'))
+        self.client.force_login(otro_staff)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.jefe)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        respuesta.close()
+
+
+# ======================
+# Configuración de la base
+# ======================
+
+class ConfiguracionBaseTests(TestCase):
+    """``DATABASES`` se arma desde las variables de entorno ``DB_*``."""
+    
+    def cargar(self, **entorno):
+        ruta = Path(settings.BASE_DIR) / 'RivconRRHH' / 'settings.py'
+        with mock.patch.dict(os.environ, entorno):
+            return runpy.run_path(str(ruta))['DATABASES']['default']
+    
+    def test_sqlite_por_defecto(self):
+        base = self.cargar(DB_ENGINE='sqlite', DB_CONN_MAX_AGE='30')
+        self.assertEqual((base['ENGINE'], base['CONN_MAX_AGE']), ('django.db.backends.sqlite3', 30))
+        self.assertEqual(base['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        # Los PRAGMA se aplican a cada conexión, también a la de los tests
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+    
+    def test_postgres_con_pool(self):
+        base = self.cargar(DB_ENGINE='Postgres', DB_NAME='rrhh', DB_POOL_MAX_SIZE='20')
+        self.assertEqual((base['ENGINE'], base['NAME']), ('django.db.backends.postgresql', 'rrhh'))
+        # Con pool, Django exige CONN_MAX_AGE = 0
+        self.assertEqual(base['CONN_MAX_AGE'], 0)
+        self.assertEqual(base['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10})
+    
+    def test_motor_desconocido(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "DB_ENGINE desconocido: 'mysql'"):
+            self.cargar(DB_ENGINE='mysql')
+
+
+# ======================
+# Avisos de vencimiento
+# ======================
+
+class AvisosTests(TestCase):
+    """Un resumen por destinatario y cada tarea avisada una vez por nivel."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        self.hoy = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            empleado = self.fabrica.empleado()
+            self.responsable = self.fabrica.usuario()
+            rrhh = self.fabrica.usuario()
+            rrhh.groups.add(Group.objects.create(name='RRHH'))
+            # Solo las tres tareas del test entran en la ventana
+            empleado.tareas.update(
+                estado='pendiente', responsable='it', responsable_usuario=None,
+                fecha_limite=self.hoy + timedelta(days=60),
+            )
+            self.vencida, self.proxima, self.del_area = empleado.tareas.order_by('pk')[:3]
+            TareaOnboarding.objects.filter(pk__in=[self.vencida.pk, self.proxima.pk]).update(
+                responsable_usuario=self.responsable,
+            )
+            TareaOnboarding.objects.filter(pk=self.vencida.pk).update(fecha_limite=self.hoy - timedelta(days=1))
+            TareaOnboarding.objects.filter(pk=self.proxima.pk).update(fecha_limite=self.hoy + timedelta(days=1))
+            TareaOnboarding.objects.filter(pk=self.del_area.pk).update(
+                responsable='rrhh', fecha_limite=self.hoy - timedelta(days=3),
+            )
+        self.correo_rrhh = rrhh.email
+        # Sin el correo de bienvenida del alta
+        mail.outbox.clear()
+    
+    def test_un_resumen_por_destinatario_sin_repetir(self):
+        resultado = avisos.escanear(hoy=self.hoy)
+        self.assertEqual((resultado.tareas, resultado.resumenes_enviados), (3, 2))
+        correos = {tuple(correo.to): correo for correo in mail.outbox}
+        self.assertEqual(set(correos), {(self.responsable.email,), (self.correo_rrhh,)})
+        self.assertEqual(correos[(self.responsable.email,)].subject, 'Tareas de onboarding: 1 vencidas, 1 por vencer')
+        
+        # Otra ejecución el mismo día no repite avisos
+        self.assertEqual(avisos.escanear(hoy=self.hoy).resumenes_enviados, 0)
+        self.assertEqual(len(mail.outbox), 2)
+        
+        # La próxima se avisa otra vez al vencer; la vencida ya no
+        resultado = avisos.escanear(hoy=self.hoy + timedelta(days=2))
+        self.assertEqual((resultado.tareas, resultado.resumenes_enviados), (1, 1))
+        self.assertEqual(mail.outbox[-1].subject, 'Tareas de onboarding: 1 vencidas, 0 por vencer')
+    
+    def test_un_nuevo_plazo_rehabilita_el_aviso_y_dry_run_no_marca(self):
+        avisos.escanear(hoy=self.hoy)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vencida.refresh_from_db()
+            self.vencida.fecha_limite = self.hoy
+            self.vencida.save()
+        
+        resultado = avisos.escanear(hoy=self.hoy, enviar=False)
+        self.assertEqual((resultado.tareas, resultado.tareas_avisadas), (1, 0))
+        self.assertEqual(avisos.escanear(hoy=self.hoy).tareas_avisadas, 1)
+
+
+# ======================
+# Listas sin paginar
+# ======================
+
+class ListaStreamingTests(TestCase):
+    """``?completo=1`` envía todas las filas en bloques; sin él, la lista se pagina."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            self.client.force_login(self.fabrica.usuario(is_superuser=True))
+        self.total = self.empleado.tareas.count()
+        self.enterContext(mock.patch.multiple(views.TareaListView, paginate_by=2, tamano_bloque=3))
+    
+    def test_todas_las_filas_en_bloques(self):
+        url = reverse('gestor:tarea_list')
+        paginada = self.client.get(url)
+        self.assertFalse(paginada.streaming)
+        self.assertEqual(paginada.content.decode().count('<tr class="hover'), 2)
+        
+        respuesta = self.client.get(url + '?completo=1')
+        self.assertTrue(respuesta.streaming)
+        partes = [parte.decode() for parte in respuesta.streaming_content]
+        # Cabecera, un bloque cada tres filas y pie
+        self.assertEqual(len(partes), 2 + (self.total + 2) // 3)
+        self.assertEqual(''.join(partes).count('<tr class="hover'), self.total)
+        self.assertIn('</html>', partes[-1])
+    
+    def test_sin_filas_muestra_el_mensaje_vacio(self):
+        respuesta = self.client.get(reverse('gestor:tarea_list') + '?completo=1&estado=cancelado')
+        self.assertIn('No se encontraron tareas', b''.join(respuesta.streaming_content).decode())
+
+
+# ======================
+# Calendario de carga
+# ======================
+
+class CargaTests(TestCase):
+    """La grilla cuenta las tareas abiertas por persona o área y día límite."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        self.inicio = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            empleado = self.fabrica.empleado()
+            self.responsable = self.fabrica.usuario()
+            # Fuera de la grilla salvo las que se ubican abajo
+            empleado.tareas.update(
+                estado='pendiente', responsable='it', responsable_usuario=None,
+                fecha_limite=self.inicio + timedelta(days=60),
+            )
+            ubicacion = [
+                # (día, con persona responsable, estado)
+                (0, True, 'pendiente'),
+                (0, True, 'en_progreso'),
+                (2, True, 'bloqueado'),
+                (1, False, 'pendiente'),
+                (0, True, 'completado'),
+            ]
+            self.tareas = list(empleado.tareas.order_by('pk')[:len(ubicacion)])
+            for tarea, (dia, con_persona, estado) in zip(self.tareas, ubicacion):
+                TareaOnboarding.objects.filter(pk=tarea.pk).update(
+                    fecha_limite=self.inicio + timedelta(days=dia), estado=estado,
+                    responsable_usuario=self.responsable if con_persona else None,
+                )
+    
+    def test_grilla_y_detalle_de_celda(self):
+        fechas, filas, totales = carga.calcular_carga(self.inicio, 3)
+        self.assertEqual(fechas, [self.inicio + timedelta(days=dia) for dia in range(3)])
+        # Primero las personas; la completada no cuenta
+        self.assertEqual(
+            [(fila.tipo, fila.valor, fila.celdas) for fila in filas],
+            [('usuario', self.responsable.pk, [2, 0, 1]), ('area', 'it', [0, 1, 0])],
+        )
+        self.assertEqual(filas[1].nombre, 'Tecnología (IT) (sin asignar)')
+        self.assertEqual((filas[0].total, filas[0].maximo), (3, 2))
+        self.assertEqual(totales, [2, 1, 1])
+        
+        celda = carga.tareas_de_celda(self.inicio, usuario_id=self.responsable.pk)
+        self.assertEqual({tarea.pk for tarea in celda}, {self.tareas[0].pk, self.tareas[1].pk})
+        area = carga.tareas_de_celda(self.inicio + timedelta(days=1), area='it')
+        self.assertEqual([tarea.pk for tarea in area], [self.tareas[3].pk])
+        self.assertEqual(carga.calcular_carga(self.inicio, 3, responsable='rrhh')[1], [])
+
+
+# ======================
+# Dotación
+# ======================
+
+class OrganizacionTests(TestCase):
+    """Los conteos de puestos y empleados no se multiplican entre sí."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.departamento = self.fabrica.departamento()
+            self.puestos = [self.fabrica.puesto(self.departamento) for _ in range(3)]
+            self.vacio = self.fabrica.departamento()
+            self.fabrica.puesto(self.vacio)
+            self.empleados = [self.fabrica.empleado(puesto=self.puestos[0]) for _ in range(2)]
+    
+    def test_conteos_por_departamento_y_puesto(self):
+        departamentos = {
+            departamento.pk: (departamento.total_puestos, departamento.total_empleados)
+            for departamento in organizacion.anotar_departamentos(Departamento.objects.all())
+        }
+        self.assertEqual(departamentos[self.departamento.pk], (3, 2))
+        self.assertEqual(departamentos[self.vacio.pk], (1, 0))
+        puestos = {p.pk: p.total_empleados for p in organizacion.anotar_puestos(Puesto.objects.all())}
+        self.assertEqual([puestos[puesto.pk] for puesto in self.puestos], [2, 0, 0])
+        
+        dotacion = organizacion.resumen()['departamentos'][self.departamento.pk]
+        self.assertEqual((dotacion.puestos, dotacion.total), (3, 2))
+    
+    def test_el_resumen_se_invalida_al_cambiar_un_empleado(self):
+        estado = self.empleados[0].estado
+        self.assertEqual(organizacion.resumen()['puestos'][self.puestos[0].pk].por_estado, {estado: 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            Empleado.objects.filter(pk=self.empleados[0].pk).update(estado='cancelado')
+        self.assertEqual(
+            organizacion.resumen()['puestos'][self.puestos[0].pk].por_estado, {estado: 1, 'cancelado': 1},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empleados[1].puesto = self.puestos[1]
+            self.empleados[1].save()
+        self.assertEqual(organizacion.resumen()['puestos'][self.puestos[1].pk].total, 1)
+
+
+# ======================
+# Línea de reporte
+# ======================
+
+class JerarquiaTests(TestCase):
+    """La clausura sigue a los cambios de supervisor y coincide con una reconstrucción."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.jefe = self.fabrica.usuario()
+            self.otro_jefe = self.fabrica.usuario()
+            # jefe <- a <- b <- c
+            self.a = self.fabrica.empleado(supervisor=self.jefe)
+            self.b = self.fabrica.empleado(supervisor=self.a.usuario)
+            self.c = self.fabrica.empleado(supervisor=self.b.usuario)
+    
+    def equipo(self, usuario):
+        return set(jerarquia.descendientes(usuario))
+    
+    def clausura(self):
+        # Sin las filas de profundidad 0: un exjefe sin equipo conserva la suya
+        # hasta que se reconstruye la tabla
+        return set(
+            JerarquiaSupervision.objects.filter(profundidad__gt=0)
+            .values_list('ancestro_id', 'descendiente_id', 'profundidad')
+        )
+    
+    def test_consultas_sobre_la_clausura(self):
+        self.assertEqual(self.equipo(self.jefe), {self.a.usuario, self.b.usuario, self.c.usuario})
+        self.assertEqual(jerarquia.ancestros(self.c.usuario), [self.b.usuario, self.a.usuario, self.jefe])
+        self.assertTrue(jerarquia.es_subordinado(self.c.usuario, self.a.usuario))
+        self.assertFalse(jerarquia.es_subordinado(self.a.usuario, self.c.usuario))
+        equipo = jerarquia.filtrar_equipo(Empleado.objects.all(), self.a.usuario, incluir_propio=True)
+        self.assertEqual(set(equipo), {self.a, self.b, self.c})
+    
+    def test_mover_un_subarbol_y_reconstruir(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.b.supervisor = self.otro_jefe
+            self.b.save()
+        self.assertEqual(self.equipo(self.jefe), {self.a.usuario})
+        self.assertEqual(self.equipo(self.otro_jefe), {self.b.usuario, self.c.usuario})
+        
+        # Un update() masivo también reubica
+        with self.captureOnCommitCallbacks(execute=True):
+            Empleado.objects.filter(pk=self.a.pk).update(supervisor=self.otro_jefe)
+        self.assertEqual(self.equipo(self.jefe), set())
+        
+        incremental = self.clausura()
+        jerarquia.reconstruir()
+        self.assertEqual(self.clausura(), incremental)
+    
+    def test_no_admite_ciclos(self):
+        self.a.supervisor = self.c.usuario
+        with self.assertRaises(ValidationError):
+            self.a.full_clean()
+        with self.assertRaises(jerarquia.CicloJerarquia):
+            jerarquia.mover(self.a.usuario_id, self.c.usuario_id)
+
+
+# ======================
+# Compensación
+# ======================
+
+class CompensacionTests(TestCase):
+    """Métricas vectorizadas frente a un cálculo directo, y caché por versión de datos."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            # Banda 1000-5000 (punto medio 3000)
+            self.puesto = self.fabrica.puesto(self.fabrica.departamento())
+            self.debajo, self.medio, self.encima = [
+                self.fabrica.empleado(puesto=self.puesto, salario=salario) for salario in (500, 3000, 6000)
+            ]
+    
+    def test_metricas_de_banda(self):
+        datos = compensacion.calcular()
+        total = datos['total']
+        self.assertEqual((total['empleados'], total['con_banda'], total['debajo'], total['encima']), (3, 3, 1, 1))
+        self.assertAlmostEqual(total['compa_ratio'], (500 / 3000 + 1 + 2) / 3, places=3)
+        self.assertAlmostEqual(total['penetracion'], (-0.125 + 0.5 + 1.25) / 3, places=3)
+        self.assertEqual(total['percentiles'][2], 3000)
+        
+        grupo, = datos['grupos']
+        self.assertEqual((grupo['departamento_id'], grupo['nivel']), (self.puesto.departamento_id, 'junior'))
+        self.assertEqual(grupo['percentiles'], total['percentiles'])
+        # El mayor desvío relativo primero: -50 % bajo el mínimo, +20 % sobre el máximo
+        self.assertEqual(
+            [(fila['empleado_id'], fila['desvio']) for fila in datos['atipicos']],
+            [(self.debajo.pk, -0.5), (self.encima.pk, 0.2)],
+        )
+    
+    def test_resumen_sigue_a_la_version_de_datos(self):
+        self.assertEqual(compensacion.resumen()['total']['debajo'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.debajo.salario = 2000
+            self.debajo.save()
+        self.assertEqual(compensacion.resumen()['total']['debajo'], 0)
+        
+        # Los cancelados no cuentan
+        with self.captureOnCommitCallbacks(execute=True):
+            Empleado.objects.filter(pk=self.encima.pk).update(estado='cancelado')
+        self.assertEqual(compensacion.resumen()['total']['empleados'], 2)
+
+
+# ======================
+# Revisión de documentos
+# ======================
+
+class RevisionTests(TestCase):
+    """Orden de la cola, tipo de vista previa y reposición después de decidir un lote."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fabrica.puesto(self.fabrica.departamento())
+            self.empleado = self.fabrica.empleado()
+            # contrato pendiente, cédula aprobada y NDA en revisión
+            self.documentos = self.fabrica.documentos(self.empleado)
+            self.client.force_login(self.fabrica.usuario(is_superuser=True))
+    
+    def test_cola_de_revision_y_reposicion(self):
+        pendiente, _, en_revision = self.documentos
+        with self.captureOnCommitCallbacks(execute=True):
+            obligatorio = Documento.objects.create(
+                empleado=self.empleado, tipo='titulo', nombre='Título', archivo='documentos/titulo.png',
+                obligatorio=True,
+            )
+        # Pendientes antes que los dejados en revisión; los obligatorios primero
+        cola = revision.cola()
+        self.assertEqual([documento.pk for documento in cola], [obligatorio.pk, pendiente.pk, en_revision.pk])
+        self.assertEqual(revision.item_cola(cola[0])['vista_previa'], 'imagen')
+        self.assertEqual(revision.tipo_vista_previa('contrato.PDF'), 'pdf')
+        
+        # Se repone sin lo decidido ni lo que el revisor ya tiene cargado
+        datos = {
+            'decisiones': [{'id': obligatorio.pk, 'estado': 'aprobado'}],
+            'reponer': 5, 'excluir': [pendiente.pk],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(
+                reverse('gestor:api_documento_revision'), json.dumps(datos), content_type='application/json',
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([item['id'] for item in respuesta.json()['siguientes']], [en_revision.pk])
+
+
+# ======================
+# Completitud documental
+# ======================
+
+class CompletitudTests(TestCase):
+    """Matriz empleado × tipo con el mejor estado por tipo y los requeridos de cada puesto."""
+    
+    def setUp(self):
+        self.fabrica = Fabrica()
+        with self.captureOnCommitCallbacks(execute=True):
+            departamento = self.fabrica.departamento()
+            # Sin requeridos propios: contrato, cédula, NDA y antecedentes
+            self.empleado = self.fabrica.empleado(puesto=self.fabrica.puesto(departamento))
+            # contrato pendiente, cédula aprobada y NDA en revisión
+            self.documentos = self.fabrica.documentos(self.empleado)
+            solo_cedula = self.fabrica.puesto(departamento)
+            solo_cedula.documentos_requeridos = ['cedula']
+            solo_cedula.save()
+            self.completo = self.fabrica.empleado(puesto=solo_cedula)
+            self.fabrica.documentos(self.completo)
+    
+    def fila(self, matriz, empleado):
+        return next(fila for fila in matriz['filas'] if fila[0] == empleado.pk)
+    
+    def test_matriz_y_resumen(self):
+        matriz = completitud.calcular()
+        self.assertEqual(matriz['tipos'], ['contrato', 'cedula', 'nda', 'antecedentes'])
+        pendiente, aprobado, faltante = completitud.PENDIENTE, completitud.APROBADO, completitud.FALTANTE
+        self.assertEqual(self.fila(matriz, self.empleado)[3], (pendiente, aprobado, pendiente, faltante))
+        self.assertEqual(self.fila(matriz, self.completo)[3], (None, aprobado, None, None))
+        self.assertEqual(matriz['completos'], 1)
+        self.assertEqual(matriz['resumen']['cedula'], {
+            'requerido': 2, 'aprobado': 2, 'pendiente': 0, 'rechazado': 0, 'faltante': 0,
+        })
+        self.assertEqual(matriz['resumen']['antecedentes']['faltante'], 1)
+        self.assertEqual([fila[0] for fila in completitud.filtrar(matriz, incompletos=True)], [self.empleado.pk])
+        self.assertEqual(completitud.filtrar(matriz, tipo='antecedentes'), [self.fila(matriz, self.empleado)])
+    
+    def test_el_mejor_estado_gana_y_la_cache_se_invalida(self):
+        contrato = self.documentos[0]
+        self.assertEqual(self.fila(completitud.resumen(), self.empleado)[3][0], completitud.PENDIENTE)
+        with self.captureOnCommitCallbacks(execute=True):
+            contrato.estado = 'rechazado'
+            contrato.save()
+            Documento.objects.create(
+                empleado=self.empleado, tipo='contrato', nombre='Contrato firmado',
+                archivo='documentos/contrato_firmado.pdf', estado='aprobado',
+            )
+        self.assertEqual(self.fila(completitud.resumen(), self.empleado)[3][0], completitud.APROBADO)
+    
+    def test_los_empleados_no_ven_la_matriz(self):
+        call_command('setup_groups', stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario = self.fabrica.usuario()
+            usuario.groups.add(Group.objects.get(name='Empleados'))
+        self.client.force_login(usuario)
+        for nombre in ('gestor:documento_completitud', 'gestor:api_documento_completitud'):
+            self.assertEqual(self.client.get(reverse(nombre)).status_code, 403)
+
+
+# ======================
+# Respaldos
+# ======================
+
+class RespaldoTests(TestCase):
+    """Respaldos incrementales de MEDIA_ROOT, verificación por hash y restauración."""
+    
+    def setUp(self):
+        raiz = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.media = raiz / 'media'
+        self.destino = raiz / 'respaldos'
+        (self.media / 'documentos').mkdir(parents=True)
+        (self.media / 'contrato.pdf').write_bytes(b'contrato')
+        (self.media / 'documentos' / 'cedula.pdf').write_bytes(b'cedula')
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        # La base de los tests vive en memoria: se respalda un archivo SQLite aparte
+        base = raiz / 'base.sqlite3'
+        with sqlite3.connect(base) as conexion:
+            conexion.execute('CREATE TABLE t (x)')
+        conexion.close()
+        self.enterContext(mock.patch.dict(connection.settings_dict, NAME=str(base)))
+    
+    def respaldar(self, numero):
+        directorio, resumen = respaldo.respaldar(self.destino)
+        # El nombre tiene precisión de segundos: se renombra para respaldar de nuevo
+        renombrado = directorio.with_name(f'20000101-00000{numero}')
+        directorio.rename(renombrado)
+        return renombrado, resumen
+    
+    def test_incremental_verificacion_y_restauracion(self):
+        primero, resumen = self.respaldar(1)
+        self.assertEqual((resumen['archivos'], resumen['copiados']), (2, 2))
+        self.assertEqual(respaldo.verificar(primero), [])
+        
+        # Sin cambios solo se copia la base; un archivo cambiado se copia solo
+        self.assertEqual(self.respaldar(2)[1]['copiados'], 0)
+        (self.media / 'contrato.pdf').write_bytes(b'contrato firmado')
+        tercero, resumen = self.respaldar(3)
+        self.assertEqual((resumen['archivos'], resumen['copiados']), (2, 1))
+        
+        (self.media / 'contrato.pdf').unlink()
+        (self.media / 'documentos' / 'cedula.pdf').write_bytes(b'otra')
+        self.assertEqual(respaldo.restaurar(tercero, base=False), {'archivos': 2, 'restaurados': 2})
+        self.assertEqual((self.media / 'contrato.pdf').read_bytes(), b'contrato firmado')
+        self.assertEqual((self.media / 'documentos' / 'cedula.pdf').read_bytes(), b'cedula')
+        
+        # Al podar se borran los respaldos viejos y los objetos que solo ellos usaban
+        self.assertEqual(respaldo.podar(self.destino, 1), 2)
+        self.assertEqual(respaldo.respaldos(self.destino), [tercero])
+        self.assertEqual(respaldo.verificar(tercero), [])
+        objetos = [ruta for ruta in (self.destino / respaldo.OBJETOS).rglob('*') if ruta.is_file()]
+        self.assertEqual(len(objetos), 2)
+    
+    def test_verificar_detecta_danos_y_restaurar_se_niega(self):
+        directorio, _ = self.respaldar(1)
+        manifiesto = respaldo.leer_manifiesto(directorio)
+        sha256 = manifiesto['media']['contrato.pdf']['sha256']
+        (self.destino / respaldo.OBJETOS / sha256[:2] / sha256).write_bytes(b'alterado')
+        with open(directorio / manifiesto['base']['archivo'], 'ab') as base:
+            base.write(b'basura')
+        
+        self.assertEqual(respaldo.verificar(directorio), [
+            f'La base {manifiesto["base"]["archivo"]} no coincide con su hash.',
+            'Falta o está dañado el archivo contrato.pdf.',
+        ])
+        with self.assertRaisesMessage(respaldo.ErrorRespaldo, 'no pasó la verificación'):
+            respaldo.restaurar(directorio, base=False)
+        # La verificación corre antes de tocar MEDIA_ROOT
+        self.assertEqual((self.media / 'contrato.pdf').read_bytes(), b'contrato')
+
+
+# ======================
+# Dashboard
+# ======================
+
+class DashboardTests(TestCase):
+    """Los meses del dashboard son meses calendario consecutivos."""
+    
+    def test_meses_calendario_hacia_atras(self):
+        # Restando 30 días desde el 31 de marzo se repetía marzo y se saltaba febrero
+        meses = views.meses_dashboard(date(2026, 3, 31))
+        self.assertEqual([mes for mes, _, _ in meses], [
+            date(2026, 3, 1), date(2026, 2, 1), date(2026, 1, 1),
+            date(2025, 12, 1), date(2025, 11, 1), date(2025, 10, 1),
+        ])
+        # Cada mes termina donde empieza el siguiente
+        self.assertEqual(meses[0][2], views.inicio_del_dia(date(2026, 4, 1)))
+        self.assertEqual([fin for _, _, fin in meses[1:]], [inicio for _, inicio, _ in meses[:-1]])
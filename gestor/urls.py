@@ -1,27 +1,57 @@
 """
 URLs de la aplicación gestor - Sistema de Onboarding de RRHH
 """
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'gestor'
 
+# Bajo ASGI (GESTOR_VISTAS_ASYNC=1) se sirven las variantes asíncronas
+if settings.GESTOR_VISTAS_ASYNC:
+    DashboardView = views.DashboardAsyncView
+    KanbanView = views.KanbanAsyncView
+    EmpleadoDetailView = views.EmpleadoDetailAsyncView
+else:
+    DashboardView = views.DashboardView
+    KanbanView = views.KanbanView
+    EmpleadoDetailView = views.EmpleadoDetailView
+
 urlpatterns = [
     # Dashboard
-    path('', views.DashboardView.as_view(), name='dashboard'),
+    path('', DashboardView.as_view(), name='dashboard'),
     
     # Empleados
     path('empleados/', views.EmpleadoListView.as_view(), name='empleado_list'),
     path('empleados/nuevo/', views.EmpleadoCreateView.as_view(), name='empleado_create'),
-    path('empleados/<int:pk>/', views.EmpleadoDetailView.as_view(), name='empleado_detail'),
+    path('empleados/<int:pk>/', EmpleadoDetailView.as_view(), name='empleado_detail'),
     path('empleados/<int:pk>/editar/', views.EmpleadoUpdateView.as_view(), name='empleado_update'),
     path('empleados/<int:pk>/eliminar/', views.EmpleadoDeleteView.as_view(), name='empleado_delete'),
     
     # Vista Kanban
-    path('kanban/', views.KanbanView.as_view(), name='kanban'),
+    path('kanban/', KanbanView.as_view(), name='kanban'),
+    
+    # Analítica
+    path('analitica/sla/', views.AnaliticaSLAView.as_view(), name='analitica_sla'),
+    path('analitica/compensacion/', views.AnaliticaCompensacionView.as_view(), name='analitica_compensacion'),
+    
+    # Calendario de carga
+    path('calendario/carga/', views.CalendarioCargaView.as_view(), name='calendario_carga'),
+    path('calendario/carga/celda/', views.CalendarioCeldaView.as_view(), name='calendario_celda'),
+    path('calendario/suscripcion/', views.CalendarioSuscripcionView.as_view(), name='calendario_suscripcion'),
+    path('calendario/<str:token>.ics', views.CalendarioFeedView.as_view(), name='calendario_feed'),
+    
+    # Reportes en segundo plano
+    path('reportes/', views.ReportesView.as_view(), name='reportes'),
+    path('reportes/<int:pk>/descargar/', views.ReporteDescargaView.as_view(), name='reporte_descargar'),
+    
+    # Eventos en vivo (SSE)
+    path('eventos/', views.EventosView.as_view(), name='eventos'),
     
     # Documentos
     path('documentos/', views.DocumentoListView.as_view(), name='documento_list'),
+    path('documentos/revision/', views.RevisionDocumentosView.as_view(), name='documento_revision'),
+    path('documentos/completitud/', views.CompletitudDocumentosView.as_view(), name='documento_completitud'),
     path('documentos/<int:pk>/revisar/', views.DocumentoRevisarView.as_view(), name='documento_revisar'),
     path('empleados/<int:empleado_pk>/documentos/nuevo/', views.DocumentoCreateView.as_view(), name='documento_create'),
     
@@ -37,5 +67,22 @@ urlpatterns = [
     # Puestos
     path('puestos/', views.PuestoListView.as_view(), name='puesto_list'),
     path('puestos/nuevo/', views.PuestoCreateView.as_view(), name='puesto_create'),
+    
+    # API JSON de solo lectura (v1)
+    path('api/v1/empleados/', api.EmpleadoListAPIView.as_view(), name='api_empleado_list'),
+    path('api/v1/empleados/<int:pk>/', api.EmpleadoDetailAPIView.as_view(), name='api_empleado_detail'),
+    path('api/v1/tareas/', api.TareaListAPIView.as_view(), name='api_tarea_list'),
+    path('api/v1/tareas/<int:pk>/', api.TareaDetailAPIView.as_view(), name='api_tarea_detail'),
+    path('api/v1/tareas/lote/', api.TareaLoteAPIView.as_view(), name='api_tarea_lote'),
+    path('api/v1/documentos/', api.DocumentoListAPIView.as_view(), name='api_documento_list'),
+    path('api/v1/documentos/revision/', api.DocumentoRevisionLoteAPIView.as_view(), name='api_documento_revision'),
+    path('api/v1/documentos/completitud/', api.CompletitudAPIView.as_view(), name='api_documento_completitud'),
+    path('api/v1/documentos/<int:pk>/', api.DocumentoDetailAPIView.as_view(), name='api_documento_detail'),
+    path('api/v1/efectos/', api.EfectosAPIView.as_view(), name='api_efectos'),
+    
+    # Autocompletado de los selects grandes (usuarios, puestos)
+    path('api/v1/autocompletar/usuarios/', api.UsuarioAutocompletarAPIView.as_view(), name='api_autocompletar_usuarios'),
+    path('api/v1/autocompletar/supervisores/', api.SupervisorAutocompletarAPIView.as_view(), name='api_autocompletar_supervisores'),
+    path('api/v1/autocompletar/puestos/', api.PuestoAutocompletarAPIView.as_view(), name='api_autocompletar_puestos'),
 ]
 
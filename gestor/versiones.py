@@ -0,0 +1,37 @@
+"""
+Versión de las tablas que la API une a sus recursos: usuarios, puestos y
+departamentos.
+
+Esas tablas no tienen ``fecha_actualizacion``, así que un cambio en ellas (un
+departamento renombrado, el email de un usuario) no movería el ETag de los
+empleados que muestran sus columnas. Sus signals renuevan un sello en la caché
+al confirmar la transacción (la hora del último cambio) y la API lo suma al
+ETag y al Last-Modified. Sin sello (caché vacía o expirada) cuenta como un
+cambio ahora: en el peor caso el cliente recibe un 200 de más, nunca un 304
+desactualizado.
+"""
+import time
+
+from django.core.cache import cache
+
+from . import efectos
+
+CLAVE_CACHE = 'gestor:versiones:relacionadas'
+
+
+def sello():
+    """Hora (timestamp) del último cambio en usuarios, puestos o departamentos."""
+    valor = cache.get(CLAVE_CACHE)
+    if valor is None:
+        cache.add(CLAVE_CACHE, time.time(), None)
+        valor = cache.get(CLAVE_CACHE, time.time())
+    return valor
+
+
+def _renovar():
+    cache.set(CLAVE_CACHE, time.time(), None)
+
+
+def invalidar(using=None):
+    """Renueva el sello al confirmar la transacción (una vez por transacción)."""
+    efectos.diferir('versiones', None, _renovar, using=using)
@@ -1,23 +1,194 @@
+import asyncio
+import csv
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.views.generic import (
-    ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
+    ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, TemplateView, View
 )
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
 from django.db.models import Q, Count
 from django.utils import timezone
-from datetime import timedelta
-from .models import Empleado, Documento, TareaOnboarding, Departamento, Puesto
+from datetime import date, datetime, time, timedelta
+from asgiref.sync import sync_to_async
+import secrets
+from . import agenda, archivo, carga, compensacion, completitud, eventos, jerarquia, organizacion, reportes, revision
+from .dependencias import calcular_ruta_critica, cargar_aristas
+from .models import (
+    Empleado, Documento, TareaOnboarding, Departamento, Puesto,
+    DependenciaTarea, ResumenSLA, ArchivoOnboarding, Reporte, SuscripcionCalendario, actualizar_bloqueos,
+)
+from . import sla
 from .forms import (
     EmpleadoForm, DocumentoForm, DocumentoRevisionForm,
     TareaOnboardingForm, TareaEstadoForm, FiltroEmpleadosForm,
-    DepartamentoForm, PuestoForm
+    DepartamentoForm, PuestoForm, FiltroCompletitudForm, SolicitudReporteForm
 )
 
 
-class DashboardView(LoginRequiredMixin, TemplateView):
+def inicio_del_dia(dia):
+    """Medianoche local de ``dia``, con zona horaria (para comparar con un ``DateTimeField``)."""
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def meses_dashboard(hoy):
+    """``(mes, inicio, fin)`` de los últimos 6 meses, del actual hacia atrás (fin excluido)."""
+    meses = []
+    anio, numero = hoy.year, hoy.month
+    for _ in range(6):
+        mes = date(anio, numero, 1)
+        mes_siguiente = date(anio + numero // 12, numero % 12 + 1, 1)
+        meses.append((mes, inicio_del_dia(mes), inicio_del_dia(mes_siguiente)))
+        # Un mes calendario hacia atrás (restar 30 días repite o salta meses)
+        anio, numero = (anio, numero - 1) if numero > 1 else (anio - 1, 12)
+    return meses
+
+
+def estado_dashboard_en_vivo(context):
+    """Valores iniciales que el dashboard actualiza con los eventos SSE."""
+    return {
+        'total_empleados': context['total_empleados'],
+        'empleados_este_mes': context['empleados_este_mes'],
+        'tareas_pendientes': context['tareas_pendientes'],
+        'documentos_pendientes': context['documentos_pendientes'],
+        'por_estado': {
+            fila['estado']: fila['total'] for fila in context['empleados_por_estado']
+        },
+    }
+
+
+class FiltroEquipoMixin:
+    """
+    Con ``?equipo=1`` limita la vista a la línea de reporte del usuario: todos
+    los que dependen de él, directa o indirectamente (una consulta sobre la
+    clausura ``JerarquiaSupervision``, ver ``gestor.jerarquia``).
+    """
+    
+    parametro_equipo = 'equipo'
+    
+    def es_filtro_equipo(self):
+        return self.request.GET.get(self.parametro_equipo) == '1'
+    
+    def filtrar_equipo(self, queryset, campo):
+        if self.es_filtro_equipo():
+            return jerarquia.filtrar_equipo(queryset, self.request.user, campo)
+        return queryset
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['equipo_filtro'] = self.es_filtro_equipo()
+        # El botón "Mi equipo" solo se ofrece a quien tiene a alguien a cargo. Se
+        # evalúa al renderizar, así también sirve en las vistas async.
+        context['tiene_equipo'] = jerarquia.descendientes(self.request.user).exists
+        return context
+
+
+class ListaStreamingMixin:
+    """
+    Con ``?completo=1`` una ``ListView`` se envía sin paginar como
+    ``StreamingHttpResponse``: primero la cabecera de la página y luego las
+    filas en bloques leídos con ``iterator()``, así la memoria del servidor no
+    crece con el número de filas y el primer byte sale de inmediato.
+    
+    La plantilla de la página debe imprimir ``{{ marcador_filas }}`` donde van
+    las filas cuando ``streaming`` es verdadero; ``plantilla_filas`` renderiza
+    un bloque de objetos (el mismo parcial que usa la vista paginada).
+    """
+    
+    parametro_streaming = 'completo'
+    plantilla_filas = None
+    tamano_bloque = 500
+    
+    def es_streaming(self):
+        return self.request.GET.get(self.parametro_streaming) == '1'
+    
+    def get_paginate_by(self, queryset):
+        if self.es_streaming():
+            return None
+        return super().get_paginate_by(queryset)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['parametros_streaming'] = self.request.GET.copy()
+        context['parametros_streaming'].pop('page', None)
+        context['parametros_streaming'][self.parametro_streaming] = '1'
+        return context
+    
+    def render_to_response(self, context, **response_kwargs):
+        if not self.es_streaming():
+            return super().render_to_response(context, **response_kwargs)
+        
+        partes = self.generar_pagina(context)
+        if isinstance(self.request, ASGIRequest):
+            # Con un iterador síncrono el handler ASGI acumularía toda la
+            # respuesta en memoria antes de enviarla
+            partes = self.iterar_en_hilo(partes)
+        respuesta = StreamingHttpResponse(partes, content_type='text/html; charset=utf-8')
+        respuesta['X-Accel-Buffering'] = 'no'
+        return respuesta
+    
+    def generar_pagina(self, context):
+        marcador = f'<!--filas-{secrets.token_hex(8)}-->'
+        context.update({'streaming': True, 'marcador_filas': mark_safe(marcador)})
+        pagina = get_template(self.template_name).render(context, self.request)
+        cabecera, pie = pagina.split(marcador, 1)
+        yield cabecera
+        
+        plantilla = get_template(self.plantilla_filas)
+        nombre = self.get_context_object_name(context['object_list'])
+        bloque, hubo_filas = [], False
+        for objeto in context['object_list'].iterator(chunk_size=self.tamano_bloque):
+            bloque.append(objeto)
+            if len(bloque) >= self.tamano_bloque:
+                yield plantilla.render({nombre: bloque}, self.request)
+                bloque, hubo_filas = [], True
+        if bloque or not hubo_filas:
+            # Un bloque vacío muestra el mensaje de "sin resultados" del parcial
+            yield plantilla.render({nombre: bloque}, self.request)
+        yield pie
+    
+    @staticmethod
+    async def iterar_en_hilo(partes):
+        siguiente = sync_to_async(next, thread_sensitive=True)
+        while (parte := await siguiente(partes, None)) is not None:
+            yield parte
+
+
+class EventosEnVivoMixin:
+    """
+    Indica a la plantilla si puede abrir el stream SSE (``EventosView``): solo
+    bajo ASGI. Con WSGI el stream ocuparía un worker sin enviar nada.
+    """
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['en_vivo'] = isinstance(self.request, ASGIRequest)
+        return context
+
+
+class DashboardEquipoMixin(FiltroEquipoMixin):
+    """Conjuntos de datos comunes a los dashboards síncrono y asíncrono."""
+    
+    def conjuntos(self):
+        """Empleados, tareas y documentos del dashboard (con ``?equipo=1``, solo los del equipo)."""
+        return (
+            self.filtrar_equipo(Empleado.objects.all(), 'usuario'),
+            self.filtrar_equipo(TareaOnboarding.objects.all(), 'empleado__usuario'),
+            self.filtrar_equipo(Documento.objects.all(), 'empleado__usuario'),
+        )
+
+
+class DashboardView(LoginRequiredMixin, EventosEnVivoMixin, DashboardEquipoMixin, TemplateView):
     """Vista principal del dashboard con KPIs y estadísticas."""
     
     template_name = 'gestor/dashboard.html'
@@ -26,66 +197,66 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         
         # Calcular fechas
-        hoy = timezone.now().date()
-        inicio_mes = hoy.replace(day=1)
-        fin_mes = (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        hoy = timezone.localdate()
+        meses = meses_dashboard(hoy)
+        _, inicio_mes, fin_mes = meses[0]
+        empleados, tareas, documentos = self.conjuntos()
         
         # KPIs principales
-        context['total_empleados'] = Empleado.objects.count()
-        context['empleados_este_mes'] = Empleado.objects.filter(
+        context['total_empleados'] = empleados.count()
+        context['empleados_este_mes'] = empleados.filter(
             fecha_creacion__gte=inicio_mes,
-            fecha_creacion__lte=fin_mes
+            fecha_creacion__lt=fin_mes
         ).count()
-        context['tareas_pendientes'] = TareaOnboarding.objects.filter(
+        context['tareas_pendientes'] = tareas.filter(
             estado__in=['pendiente', 'en_progreso']
         ).count()
-        context['documentos_pendientes'] = Documento.objects.filter(
+        context['documentos_pendientes'] = documentos.filter(
             estado__in=['pendiente', 'en_revision']
         ).count()
         
         # Empleados por estado
-        context['empleados_por_estado'] = Empleado.objects.values(
+        context['empleados_por_estado'] = empleados.values(
             'estado'
         ).annotate(
             total=Count('id')
         ).order_by('estado')
         
         # Empleados recientes
-        context['empleados_recientes'] = Empleado.objects.select_related(
+        context['empleados_recientes'] = empleados.select_related(
             'usuario', 'puesto', 'puesto__departamento'
         ).order_by('-fecha_creacion')[:5]
         
         # Tareas urgentes (próximas a vencer en 7 días)
         fecha_limite = hoy + timedelta(days=7)
-        context['tareas_urgentes'] = TareaOnboarding.objects.filter(
+        context['tareas_urgentes'] = tareas.filter(
             fecha_limite__lte=fecha_limite,
             estado__in=['pendiente', 'en_progreso']
         ).select_related('empleado', 'empleado__usuario').order_by('fecha_limite')[:10]
         
         # Documentos sin verificar
-        context['documentos_sin_verificar'] = Documento.objects.filter(
+        context['documentos_sin_verificar'] = documentos.filter(
             estado='pendiente'
         ).select_related('empleado', 'empleado__usuario').order_by('-fecha_subida')[:5]
         
         # Gráficos - Empleados por mes (últimos 6 meses)
         meses_data = []
-        for i in range(6):
-            mes = (hoy - timedelta(days=30*i)).replace(day=1)
-            mes_siguiente = (mes + timedelta(days=32)).replace(day=1)
-            count = Empleado.objects.filter(
-                fecha_creacion__gte=mes,
-                fecha_creacion__lt=mes_siguiente
+        for mes, inicio, fin in meses:
+            count = empleados.filter(
+                fecha_creacion__gte=inicio,
+                fecha_creacion__lt=fin
             ).count()
             meses_data.append({
                 'mes': mes.strftime('%b'),
                 'count': count
             })
         context['empleados_por_mes'] = reversed(meses_data)
+        context['estado_en_vivo'] = estado_dashboard_en_vivo(context)
         
         return context
 
 
-class EmpleadoListView(LoginRequiredMixin, ListView):
+class EmpleadoListView(LoginRequiredMixin, FiltroEquipoMixin, ListView):
     """Vista para listar todos los empleados con filtros."""
     
     model = Empleado
@@ -119,10 +290,12 @@ class EmpleadoListView(LoginRequiredMixin, ListView):
                 queryset = queryset.filter(puesto__departamento=departamento)
             
             supervisor = form.cleaned_data.get('supervisor')
-            if supervisor:
+            if supervisor and form.cleaned_data.get('toda_la_linea'):
+                queryset = jerarquia.filtrar_equipo(queryset, supervisor)
+            elif supervisor:
                 queryset = queryset.filter(supervisor=supervisor)
         
-        return queryset
+        return self.filtrar_equipo(queryset, 'usuario')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -130,6 +303,21 @@ class EmpleadoListView(LoginRequiredMixin, ListView):
         return context
 
 
+def contexto_archivo(request, empleado):
+    """
+    Tareas y documentos archivados de ``empleado`` para el detalle: solo se
+    descomprimen a pedido (``?archivo=1``); si no, basta el resumen.
+    """
+    if not empleado.archivado:
+        return {}
+    if request.GET.get('archivo') == '1':
+        return {'ver_archivo': True, 'archivo': archivo.leer(empleado)}
+    return {
+        'ver_archivo': False,
+        'archivo': ArchivoOnboarding.objects.filter(empleado=empleado).defer('datos').first(),
+    }
+
+
 class EmpleadoDetailView(LoginRequiredMixin, DetailView):
     """Vista detallada del proceso de onboarding de un empleado."""
     
@@ -141,11 +329,18 @@ class EmpleadoDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         empleado = self.object
         
-        # Tareas del empleado
-        context['tareas'] = empleado.tareas.all().order_by('orden', 'fecha_limite')
+        # Tareas del empleado, con fechas estimadas según sus dependencias
+        context['tareas'] = list(empleado.tareas.all().order_by('orden', 'fecha_limite'))
+        context['fin_estimado'], context['ruta_critica'] = calcular_ruta_critica(
+            context['tareas'], cargar_aristas(empleado.pk)
+        )
         context['tareas_por_estado'] = empleado.tareas.values('estado').annotate(
             total=Count('id')
         )
+        context['tareas_completadas'] = sum(
+            fila['total'] for fila in context['tareas_por_estado']
+            if fila['estado'] == 'completado'
+        )
         
         # Documentos del empleado
         context['documentos'] = empleado.documentos.all().order_by('-fecha_subida')
@@ -155,7 +350,7 @@ class EmpleadoDetailView(LoginRequiredMixin, DetailView):
         
         # Progreso
         context['progreso'] = empleado.calcular_progreso()
-        
+        context.update(contexto_archivo(self.request, empleado))
         return context
 
 
@@ -212,18 +407,19 @@ class EmpleadoDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView
         return super().delete(request, *args, **kwargs)
 
 
-class DocumentoListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
-    """Vista para gestionar documentos (RRHH)."""
+class DocumentoListView(LoginRequiredMixin, PermissionRequiredMixin, ListaStreamingMixin, ListView):
+    """Vista para gestionar documentos (RRHH). Con ``?completo=1``, todos sin paginar."""
     
     model = Documento
     template_name = 'gestor/documento_list.html'
+    plantilla_filas = 'gestor/partials/_filas_documentos.html'
     context_object_name = 'documentos'
     paginate_by = 30
     permission_required = 'gestor.approve_documents'
     
     def get_queryset(self):
         queryset = Documento.objects.select_related(
-            'empleado', 'empleado__usuario', 'revisado_por'
+            'empleado', 'empleado__usuario', 'empleado__puesto', 'revisado_por'
         ).order_by('-fecha_subida')
         
         # Filtrar por estado si se especifica
@@ -286,11 +482,112 @@ class DocumentoRevisarView(LoginRequiredMixin, PermissionRequiredMixin, UpdateVi
         return super().form_valid(form)
 
 
-class TareaListView(LoginRequiredMixin, ListView):
-    """Vista para listar tareas de onboarding."""
+class RevisionDocumentosView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """
+    Espacio de revisión: una cola de documentos pendientes (cargada con una
+    consulta) que se recorre sin recargar la página. El archivo siguiente se
+    precarga mientras se revisa el actual y las decisiones se envían en lotes
+    a la API, que repone la cola en la misma respuesta.
+    """
+    
+    template_name = 'gestor/documento_revision.html'
+    permission_required = 'gestor.approve_documents'
+    tamano_cola = 30
+    # Decisiones acumuladas antes de enviarlas (también se envían al vaciar la cola)
+    tamano_lote = 10
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cola'] = [revision.item_cola(documento) for documento in revision.cola(self.tamano_cola)]
+        context['tamano_cola'] = self.tamano_cola
+        context['tamano_lote'] = self.tamano_lote
+        return context
+
+
+class EcoCSV:
+    """Pseudo-archivo para ``csv.writer``: devuelve cada línea en vez de guardarla."""
+    
+    def write(self, valor):
+        return valor
+
+
+class CompletitudDocumentosView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """
+    Matriz empleado × tipo de documento requerido: aprobado, pendiente,
+    rechazado o faltante. Sale de una consulta con agregación condicional
+    (``completitud.calcular``), guardada en caché por versión de datos; las
+    páginas y el filtro de incompletos se resuelven sobre ese resultado.
+    ``?exportar=csv`` descarga todas las filas del filtro.
+    """
+    
+    template_name = 'gestor/documento_completitud.html'
+    permission_required = 'gestor.approve_documents'
+    paginate_by = 100
+    
+    def get(self, request, *args, **kwargs):
+        self.form = FiltroCompletitudForm(request.GET)
+        if not self.form.is_valid():
+            self.form = FiltroCompletitudForm({})
+            self.form.is_valid()
+        self.matriz = self.form.matriz()
+        if request.GET.get('exportar') == 'csv':
+            return self.exportar_csv()
+        return super().get(request, *args, **kwargs)
+    
+    def exportar_csv(self):
+        tipos = self.matriz['tipos']
+        nombres_tipo = dict(Documento.TIPO_CHOICES)
+        escritor = csv.writer(EcoCSV())
+        
+        def lineas():
+            yield escritor.writerow(
+                ['ID', 'Empleado', 'Puesto'] + [nombres_tipo[tipo] for tipo in tipos] + ['Completo']
+            )
+            for pk, nombre, puesto, celdas in self.matriz['filas']:
+                yield escritor.writerow(
+                    [pk, nombre, puesto]
+                    + [completitud.NOMBRES_ESTADO.get(celda, 'no requerido') for celda in celdas]
+                    + ['sí' if completitud.es_completa(celdas) else 'no']
+                )
+        
+        respuesta = StreamingHttpResponse(lineas(), content_type='text/csv; charset=utf-8')
+        respuesta['Content-Disposition'] = 'attachment; filename="completitud_documental.csv"'
+        return respuesta
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tipos = self.matriz['tipos']
+        nombres_tipo = dict(Documento.TIPO_CHOICES)
+        pagina = Paginator(self.matriz['filas'], self.paginate_by).get_page(self.request.GET.get('page'))
+        pagina.object_list = [
+            {
+                'id': pk,
+                'nombre': nombre,
+                'puesto': puesto,
+                'celdas': [completitud.NOMBRES_ESTADO.get(celda) for celda in celdas],
+                'completa': completitud.es_completa(celdas),
+            }
+            for pk, nombre, puesto, celdas in pagina.object_list
+        ]
+        parametros = self.request.GET.copy()
+        parametros.pop('page', None)
+        context.update({
+            'form': self.form,
+            'tipos': [(tipo, nombres_tipo[tipo], self.matriz['resumen'][tipo]) for tipo in tipos],
+            'page_obj': pagina,
+            'filas': pagina.object_list,
+            'completos': self.matriz['completos'],
+            'parametros': parametros.urlencode(),
+        })
+        return context
+
+
+class TareaListView(LoginRequiredMixin, FiltroEquipoMixin, ListaStreamingMixin, ListView):
+    """Vista para listar tareas de onboarding. Con ``?completo=1``, todas sin paginar."""
     
     model = TareaOnboarding
     template_name = 'gestor/tarea_list.html'
+    plantilla_filas = 'gestor/partials/_filas_tareas.html'
     context_object_name = 'tareas'
     paginate_by = 50
     
@@ -308,7 +605,7 @@ class TareaListView(LoginRequiredMixin, ListView):
         if responsable:
             queryset = queryset.filter(responsable=responsable)
         
-        return queryset
+        return self.filtrar_equipo(queryset, 'empleado__usuario')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -343,7 +640,9 @@ class TareaCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
         if empleado_pk:
             form.instance.empleado_id = empleado_pk
         messages.success(self.request, 'Tarea creada exitosamente.')
-        return super().form_valid(form)
+        respuesta = super().form_valid(form)
+        actualizar_bloqueos(TareaOnboarding.objects.filter(pk=self.object.pk))
+        return respuesta
 
 
 class TareaUpdateView(LoginRequiredMixin, UpdateView):
@@ -370,7 +669,10 @@ class TareaUpdateView(LoginRequiredMixin, UpdateView):
         
         tarea.save()
         messages.success(self.request, 'Tarea actualizada exitosamente.')
-        return super().form_valid(form)
+        respuesta = super().form_valid(form)
+        # Con los requisitos ya guardados, bloquear o desbloquear la tarea
+        actualizar_bloqueos(TareaOnboarding.objects.filter(pk=self.object.pk))
+        return respuesta
 
 
 class DepartamentoListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
@@ -381,11 +683,13 @@ class DepartamentoListView(LoginRequiredMixin, PermissionRequiredMixin, ListView
     context_object_name = 'departamentos'
     permission_required = 'gestor.view_departamento'
     
-    def get_queryset(self):
-        return Departamento.objects.annotate(
-            total_puestos=Count('puestos'),
-            total_empleados=Count('puestos__empleados')
-        )
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Dotación desde la caché: no cuenta sobre el JOIN puestos × empleados
+        dotacion = organizacion.resumen()['departamentos']
+        for departamento in context['departamentos']:
+            departamento.dotacion = dotacion.get(departamento.pk, organizacion.Dotacion())
+        return context
 
 
 class DepartamentoCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
@@ -411,9 +715,14 @@ class PuestoListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     permission_required = 'gestor.view_puesto'
     
     def get_queryset(self):
-        return Puesto.objects.select_related('departamento').annotate(
-            total_empleados=Count('empleados')
-        )
+        return Puesto.objects.select_related('departamento')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        dotacion = organizacion.resumen()['puestos']
+        for puesto in context['puestos']:
+            puesto.dotacion = dotacion.get(puesto.pk, organizacion.Dotacion())
+        return context
 
 
 class PuestoCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
@@ -430,8 +739,323 @@ class PuestoCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+class AnaliticaSLAView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """
+    Cumplimiento de plazos y tiempos de ciclo por área responsable y
+    departamento. Se calcula sobre los rollups de ``ResumenSLA``, no sobre las
+    tareas: el costo depende de la ventana de días, no del volumen histórico.
+    """
+    
+    template_name = 'gestor/analitica_sla.html'
+    permission_required = 'gestor.view_dashboard'
+    ventanas = (30, 90, 365)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            dias = int(self.request.GET.get('dias', 90))
+        except ValueError:
+            dias = 90
+        if dias not in self.ventanas:
+            dias = 90
+        desde = timezone.localdate() - timedelta(days=dias)
+        
+        rollups = ResumenSLA.objects.filter(fecha__gt=desde)
+        departamentos = Departamento.objects.order_by('nombre')
+        departamento_id = self.request.GET.get('departamento', '')
+        if departamento_id.isdigit():
+            rollups = rollups.filter(departamento_id=departamento_id)
+        
+        estadisticas = sla.estadisticas(rollups)
+        responsables = dict(TareaOnboarding.RESPONSABLE_CHOICES)
+        for fila in estadisticas['responsable']:
+            fila['nombre'] = responsables.get(fila['grupo'], fila['grupo'])
+        nombres = dict(departamentos.values_list('pk', 'nombre'))
+        for fila in estadisticas['departamento']:
+            fila['nombre'] = nombres.get(fila['grupo'], 'Sin departamento')
+        
+        context.update({
+            'dias': dias,
+            'ventanas': self.ventanas,
+            'departamentos': departamentos,
+            'departamento_id': departamento_id,
+            'por_responsable': estadisticas['responsable'],
+            'por_departamento': estadisticas['departamento'],
+            'total': estadisticas['total'],
+        })
+        return context
+
+
+class AnaliticaCompensacionView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """
+    Bandas salariales por departamento y nivel: percentiles, compa-ratio,
+    penetración en la banda y empleados fuera de ella. Las métricas se calculan
+    vectorizadas (``compensacion.calcular``) y se guardan en caché por versión
+    de datos. ``?exportar=grupos`` o ``?exportar=atipicos`` descarga un CSV.
+    """
+    
+    template_name = 'gestor/analitica_compensacion.html'
+    permission_required = 'gestor.view_compensacion'
+    
+    def get(self, request, *args, **kwargs):
+        exportar = request.GET.get('exportar')
+        if exportar in ('grupos', 'atipicos'):
+            return self.exportar_csv(exportar)
+        return super().get(request, *args, **kwargs)
+    
+    def filtros(self):
+        departamento_id = self.request.GET.get('departamento', '')
+        nivel = self.request.GET.get('nivel', '')
+        if not departamento_id.isdigit():
+            departamento_id = ''
+        if nivel not in dict(Puesto.NIVEL_CHOICES):
+            nivel = ''
+        return departamento_id, nivel
+    
+    def datos(self):
+        departamento_id, nivel = self.filtros()
+        datos = compensacion.resumen(departamento_id, nivel)
+        departamentos = dict(Departamento.objects.values_list('pk', 'nombre'))
+        niveles = dict(Puesto.NIVEL_CHOICES)
+        for grupo in datos['grupos']:
+            grupo['departamento'] = departamentos.get(grupo['departamento_id'], 'Sin departamento')
+            grupo['nivel_nombre'] = niveles.get(grupo['nivel'], 'Sin nivel')
+        # Nombres de los empleados fuera de banda en una sola consulta
+        empleados = Empleado.objects.select_related('usuario', 'puesto').in_bulk(
+            [atipico['empleado_id'] for atipico in datos['atipicos']]
+        )
+        for atipico in datos['atipicos']:
+            atipico['empleado'] = empleados.get(atipico['empleado_id'])
+        return datos
+    
+    def exportar_csv(self, tipo):
+        datos = self.datos()
+        respuesta = HttpResponse(content_type='text/csv; charset=utf-8')
+        respuesta['Content-Disposition'] = f'attachment; filename="compensacion_{tipo}.csv"'
+        escritor = csv.writer(respuesta)
+        if tipo == 'grupos':
+            escritor.writerow(
+                ['Departamento', 'Nivel', 'Empleados', 'Con banda', 'Media']
+                + [f'P{p}' for p in compensacion.PERCENTILES]
+                + ['Compa-ratio', 'Penetración', 'Bajo banda', 'Sobre banda']
+            )
+            for grupo in datos['grupos']:
+                escritor.writerow(
+                    [grupo['departamento'], grupo['nivel_nombre'], grupo['empleados'],
+                     grupo['con_banda'], grupo['media']]
+                    + grupo['percentiles']
+                    + [grupo['compa_ratio'], grupo['penetracion'], grupo['debajo'], grupo['encima']]
+                )
+        else:
+            escritor.writerow(['Empleado', 'Puesto', 'Salario', 'Mínimo', 'Máximo', 'Desvío'])
+            for atipico in datos['atipicos']:
+                empleado = atipico['empleado']
+                escritor.writerow([
+                    (empleado.usuario.get_full_name() or empleado.usuario.username) if empleado else atipico['empleado_id'],
+                    empleado.puesto.titulo if empleado and empleado.puesto else '',
+                    atipico['salario'], atipico['minimo'], atipico['maximo'], atipico['desvio'],
+                ])
+        return respuesta
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        departamento_id, nivel = self.filtros()
+        context.update(self.datos())
+        context.update({
+            'departamentos': Departamento.objects.order_by('nombre'),
+            'niveles': Puesto.NIVEL_CHOICES,
+            'departamento_id': departamento_id,
+            'nivel': nivel,
+            'percentiles': compensacion.PERCENTILES,
+        })
+        return context
+
+
+class CalendarioCargaView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """
+    Tareas abiertas por responsable y día límite en las próximas semanas, para
+    detectar días sobrecargados. La grilla sale de una consulta agrupada
+    (``carga.calcular_carga``); el detalle de cada celda se carga al abrirla.
+    """
+    
+    template_name = 'gestor/calendario_carga.html'
+    permission_required = 'gestor.view_tareaonboarding'
+    semanas_maximas = 12
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        hoy = timezone.localdate()
+        try:
+            inicio = date.fromisoformat(self.request.GET.get('desde', ''))
+        except ValueError:
+            inicio = hoy
+        # La grilla empieza siempre en lunes
+        inicio -= timedelta(days=inicio.weekday())
+        try:
+            semanas = min(max(int(self.request.GET.get('semanas', 4)), 1), self.semanas_maximas)
+        except ValueError:
+            semanas = 4
+        responsable = self.request.GET.get('responsable', '')
+        if responsable not in dict(TareaOnboarding.RESPONSABLE_CHOICES):
+            responsable = ''
+        
+        fechas, filas, totales = carga.calcular_carga(inicio, semanas * 7, responsable or None)
+        context.update({
+            'fechas': fechas,
+            'fechas_iso': [fecha.isoformat() for fecha in fechas],
+            'filas': filas,
+            'totales': totales,
+            'hoy': hoy,
+            'semanas': semanas,
+            'responsable_filtro': responsable,
+            'responsables': TareaOnboarding.RESPONSABLE_CHOICES,
+            'umbral': getattr(settings, 'GESTOR_CARGA_DIARIA_MAXIMA', 5),
+            'anterior': inicio - timedelta(days=7 * semanas),
+            'siguiente': inicio + timedelta(days=7 * semanas),
+        })
+        return context
+
+
+class CalendarioCeldaView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """Parcial con las tareas de una celda del calendario de carga."""
+    
+    template_name = 'gestor/partials/_celda_carga.html'
+    permission_required = 'gestor.view_tareaonboarding'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        parametros = self.request.GET
+        try:
+            fecha = date.fromisoformat(parametros.get('fecha', ''))
+            usuario_id = int(parametros['usuario']) if parametros.get('usuario') else None
+        except ValueError:
+            raise Http404('Celda inválida')
+        area = parametros.get('area')
+        if not usuario_id and area not in dict(TareaOnboarding.RESPONSABLE_CHOICES):
+            raise Http404('Celda inválida')
+        
+        context['fecha'] = fecha
+        context['tareas'] = carga.tareas_de_celda(
+            fecha, usuario_id=usuario_id, area=area,
+            responsable=parametros.get('responsable') or None,
+        )
+        return context
+
+
+class CalendarioSuscripcionView(LoginRequiredMixin, TemplateView):
+    """
+    URL del calendario (iCalendar) de tareas del usuario para suscribirse desde
+    su aplicación de calendario; con POST se regenera y la anterior deja de servir.
+    """
+    
+    template_name = 'gestor/calendario_suscripcion.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        suscripcion = SuscripcionCalendario.para(self.request.user)
+        url = self.request.build_absolute_uri(reverse('gestor:calendario_feed', args=[suscripcion.token]))
+        context.update({
+            'suscripcion': suscripcion,
+            'url': url,
+            'url_webcal': 'webcal://' + url.split('://', 1)[1],
+            'total_tareas': agenda.tareas_de(self.request.user.pk).count(),
+        })
+        return context
+    
+    def post(self, request, *args, **kwargs):
+        SuscripcionCalendario.para(request.user).regenerar()
+        messages.success(request, 'Se generó una nueva URL. La anterior ya no funciona.')
+        return redirect('gestor:calendario_suscripcion')
+
+
+class CalendarioFeedView(View):
+    """
+    Feed iCalendar de las tareas de un usuario, identificado por el token de
+    la URL (los clientes de calendario no inician sesión). ETag y
+    Last-Modified salen de los sellos de ``agenda``: sin cambios, 304 sin
+    consultar tareas.
+    """
+    
+    def get(self, request, *args, **kwargs):
+        usuario_id = SuscripcionCalendario.objects.filter(
+            token=kwargs['token'], usuario__is_active=True
+        ).values_list('usuario_id', flat=True).first()
+        if usuario_id is None:
+            raise Http404('Calendario no encontrado')
+        
+        marca = agenda.sello(usuario_id)
+        etag = quote_etag(agenda.etag(usuario_id, marca))
+        respuesta = get_conditional_response(request, etag=etag, last_modified=int(marca))
+        if respuesta is None:
+            respuesta = HttpResponse(agenda.feed(usuario_id, marca), content_type='text/calendar; charset=utf-8')
+            respuesta['Content-Disposition'] = 'inline; filename="tareas.ics"'
+        respuesta['ETag'] = etag
+        respuesta['Last-Modified'] = http_date(int(marca))
+        respuesta['Cache-Control'] = 'private, no-cache'
+        return respuesta
+
+
+class ReportesView(LoginRequiredMixin, PermissionRequiredMixin, FormView):
+    """
+    Pedido y estado de los reportes en segundo plano (``gestor.reportes``): el
+    form los pone en cola y la lista muestra los del usuario, con la descarga
+    de los que ya están listos. Mientras haya alguno en cola se recarga sola.
+    """
+    
+    template_name = 'gestor/reportes.html'
+    form_class = SolicitudReporteForm
+    permission_required = 'gestor.view_dashboard'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        lista = list(self.request.user.reportes.order_by('-fecha_solicitud', '-pk')[:50])
+        departamentos = dict(Departamento.objects.filter(
+            pk__in={reporte.parametros.get('departamento') for reporte in lista} - {None}
+        ).values_list('pk', 'nombre'))
+        for reporte in lista:
+            info = reportes.DEFINICIONES.get(reporte.definicion)
+            reporte.titulo = info['titulo'] if info else reporte.definicion
+            reporte.descripcion = reportes.describir(reporte, departamentos)
+        context.update({
+            'reportes': lista,
+            'definiciones': reportes.DEFINICIONES,
+            'en_curso': any(reporte.estado in ('pendiente', 'en_proceso') for reporte in lista),
+        })
+        return context
+    
+    def form_valid(self, form):
+        reporte, encolado = form.solicitar(self.request.user)
+        if encolado:
+            messages.success(self.request, 'Reporte en cola: se generará en segundo plano.')
+        elif reporte.estado == 'listo':
+            messages.info(self.request, 'Ya había un reporte igual con los datos vigentes: está listo para descargar.')
+        else:
+            messages.info(self.request, 'Ya se está generando un reporte igual: quedó también en tu lista.')
+        return redirect('gestor:reportes')
+
+
+class ReporteDescargaView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Archivo de un reporte listo, para quienes lo pidieron (o un superusuario)."""
+    
+    permission_required = 'gestor.view_dashboard'
+    
+    def get(self, request, *args, **kwargs):
+        reportes_visibles = Reporte.objects.filter(estado='listo')
+        if not request.user.is_superuser:
+            reportes_visibles = reportes_visibles.filter(solicitantes=request.user)
+        reporte = get_object_or_404(reportes_visibles, pk=kwargs['pk'])
+        try:
+            archivo = open(reportes.ruta(reporte), 'rb')
+        except FileNotFoundError:
+            raise Http404('El archivo del reporte ya no existe; vuelve a pedirlo.')
+        return FileResponse(
+            archivo, as_attachment=True, filename=reportes.nombre_descarga(reporte),
+            content_type=reportes.TIPOS_CONTENIDO[reporte.formato],
+        )
+
+
 # Vista adicional para tablero Kanban
-class KanbanView(LoginRequiredMixin, TemplateView):
+class KanbanView(LoginRequiredMixin, EventosEnVivoMixin, TemplateView):
     """Vista tipo Kanban para visualizar el proceso de onboarding."""
     
     template_name = 'gestor/kanban.html'
@@ -452,4 +1076,202 @@ class KanbanView(LoginRequiredMixin, TemplateView):
             estado='completado'
         ).select_related('usuario', 'puesto')
         
+        # Tarjetas serializadas para el tablero Alpine.js (se actualiza por SSE)
+        context['tablero'] = [
+            eventos.tarjeta_empleado(empleado)
+            for columna in ('empleados_pre_ingreso', 'empleados_en_proceso', 'empleados_completados')
+            for empleado in context[columna]
+        ]
+        
         return context
+
+
+# ======================
+# Vistas asíncronas (ASGI)
+# ======================
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    Variante de LoginRequiredMixin para vistas async.
+    
+    Resuelve el usuario con ``request.auser()`` para no consultar la sesión
+    de forma síncrona dentro del event loop.
+    """
+    
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+async def _alist(queryset):
+    """Materializa un queryset con iteración asíncrona."""
+    return [obj async for obj in queryset]
+
+
+class DashboardAsyncView(AsyncLoginRequiredMixin, EventosEnVivoMixin, DashboardEquipoMixin, TemplateView):
+    """Dashboard con consultas asíncronas y agregados lanzados en paralelo."""
+    
+    template_name = 'gestor/dashboard.html'
+    
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        
+        hoy = timezone.localdate()
+        meses = meses_dashboard(hoy)
+        _, inicio_mes, fin_mes = meses[0]
+        fecha_limite = hoy + timedelta(days=7)
+        empleados, tareas, documentos = self.conjuntos()
+        
+        # Altas de los últimos 6 meses en un solo agregado condicional
+        conteos_mensuales = {
+            f'mes_{i}': Count('id', filter=Q(fecha_creacion__gte=inicio, fecha_creacion__lt=fin))
+            for i, (_, inicio, fin) in enumerate(meses)
+        }
+        
+        (
+            kpis_empleados,
+            tareas_pendientes,
+            documentos_pendientes,
+            por_mes,
+            empleados_por_estado,
+            empleados_recientes,
+            tareas_urgentes,
+            documentos_sin_verificar,
+        ) = await asyncio.gather(
+            empleados.aaggregate(
+                total_empleados=Count('id'),
+                empleados_este_mes=Count('id', filter=Q(
+                    fecha_creacion__gte=inicio_mes,
+                    fecha_creacion__lt=fin_mes
+                )),
+            ),
+            tareas.filter(
+                estado__in=['pendiente', 'en_progreso']
+            ).acount(),
+            documentos.filter(
+                estado__in=['pendiente', 'en_revision']
+            ).acount(),
+            empleados.aaggregate(**conteos_mensuales),
+            _alist(empleados.values('estado').annotate(
+                total=Count('id')
+            ).order_by('estado')),
+            _alist(empleados.select_related(
+                'usuario', 'puesto', 'puesto__departamento'
+            ).order_by('-fecha_creacion')[:5]),
+            _alist(tareas.filter(
+                fecha_limite__lte=fecha_limite,
+                estado__in=['pendiente', 'en_progreso']
+            ).select_related('empleado', 'empleado__usuario').order_by('fecha_limite')[:10]),
+            _alist(documentos.filter(
+                estado='pendiente'
+            ).select_related('empleado', 'empleado__usuario').order_by('-fecha_subida')[:5]),
+        )
+        
+        context.update(kpis_empleados)
+        context['tareas_pendientes'] = tareas_pendientes
+        context['documentos_pendientes'] = documentos_pendientes
+        context['empleados_por_estado'] = empleados_por_estado
+        context['empleados_recientes'] = empleados_recientes
+        context['tareas_urgentes'] = tareas_urgentes
+        context['documentos_sin_verificar'] = documentos_sin_verificar
+        context['empleados_por_mes'] = [
+            {'mes': mes.strftime('%b'), 'count': por_mes[f'mes_{i}']}
+            for i, (mes, _, _) in reversed(list(enumerate(meses)))
+        ]
+        context['estado_en_vivo'] = estado_dashboard_en_vivo(context)
+        return self.render_to_response(context)
+
+
+class KanbanAsyncView(AsyncLoginRequiredMixin, EventosEnVivoMixin, TemplateView):
+    """Tablero Kanban que carga las tres columnas en paralelo."""
+    
+    template_name = 'gestor/kanban.html'
+    
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        base = Empleado.objects.select_related('usuario', 'puesto')
+        (
+            context['empleados_pre_ingreso'],
+            context['empleados_en_proceso'],
+            context['empleados_completados'],
+        ) = await asyncio.gather(
+            _alist(base.filter(estado='pre_ingreso')),
+            _alist(base.filter(estado='en_proceso')),
+            _alist(base.filter(estado='completado')),
+        )
+        context['tablero'] = [
+            eventos.tarjeta_empleado(empleado)
+            for columna in ('empleados_pre_ingreso', 'empleados_en_proceso', 'empleados_completados')
+            for empleado in context[columna]
+        ]
+        return self.render_to_response(context)
+
+
+class EmpleadoDetailAsyncView(AsyncLoginRequiredMixin, TemplateView):
+    """Detalle del empleado con tareas y documentos cargados en paralelo."""
+    
+    template_name = 'gestor/empleado_detail.html'
+    
+    async def get(self, request, *args, **kwargs):
+        try:
+            empleado = await Empleado.objects.select_related(
+                'usuario', 'puesto', 'puesto__departamento', 'supervisor'
+            ).aget(pk=kwargs['pk'])
+        except Empleado.DoesNotExist:
+            raise Http404('No se encontró el empleado solicitado.')
+        
+        context = self.get_context_data(**kwargs)
+        (
+            context['tareas'],
+            context['tareas_por_estado'],
+            context['documentos'],
+            context['documentos_por_estado'],
+            aristas,
+            context['progreso'],
+            archivado,
+        ) = await asyncio.gather(
+            _alist(empleado.tareas.all().order_by('orden', 'fecha_limite')),
+            _alist(empleado.tareas.values('estado').annotate(total=Count('id'))),
+            _alist(empleado.documentos.all().order_by('-fecha_subida')),
+            _alist(empleado.documentos.values('estado').annotate(total=Count('id'))),
+            _alist(
+                DependenciaTarea.objects.filter(tarea__empleado=empleado)
+                .values_list('tarea_id', 'requisito_id')
+            ),
+            # Igual que la vista síncrona (un archivado conserva el progreso fijado al archivar)
+            sync_to_async(empleado.calcular_progreso)(),
+            sync_to_async(contexto_archivo)(request, empleado),
+        )
+        context['fin_estimado'], context['ruta_critica'] = calcular_ruta_critica(
+            context['tareas'], aristas
+        )
+        context['tareas_completadas'] = sum(
+            fila['total'] for fila in context['tareas_por_estado']
+            if fila['estado'] == 'completado'
+        )
+        context.update(archivado)
+        context['empleado'] = context['object'] = empleado
+        return self.render_to_response(context)
+
+
+class EventosView(AsyncLoginRequiredMixin, View):
+    """
+    Stream SSE con los cambios en vivo del Kanban y el dashboard.
+    
+    Mantiene la conexión abierta, por lo que debe servirse con ASGI. Con WSGI
+    el handler acumularía el stream infinito sin enviar nada y retendría el
+    worker: responde 204, que indica al EventSource que no reconecte.
+    """
+    
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(status=204)
+        respuesta = StreamingHttpResponse(
+            eventos.flujo_sse(), content_type='text/event-stream'
+        )
+        respuesta['Cache-Control'] = 'no-cache'
+        # Evita que nginx acumule el stream en su buffer
+        respuesta['X-Accel-Buffering'] = 'no'
+        return respuesta